@@ -36,6 +36,7 @@ from lib.errors import RelaxError, RelaxFileError, RelaxNoPipeError
 from lib.io import determine_compression, get_file_path
 from lib.text.sectioning import section, subsection, subtitle, title
 from lib.warnings import RelaxWarning
+from multi import Processor_box
 from pipe_control.mol_res_spin import return_spin, spin_loop
 from pipe_control.pipes import has_pipe
 from prompt.interpreter import Interpreter
@@ -249,6 +250,105 @@ class Relax_disp:
         self.interpreter.spectrum.error_analysis_per_field()
 
 
+    def fit_model(self, model=None):
+        """Create the data pipe for the model, optimise the model, and write out the results.
+
+        This is a generator which yields after each stage queuing commands for the slave processors (see optimise()).
+
+
+        @keyword model: The model to be optimised.
+        @type model:    str
+        """
+
+        # Printout.
+        subtitle(file=sys.stdout, text="The '%s' model" % model, prespace=3)
+
+        # The results directory path.
+        model_path = model.replace(" ", "_")
+        path = self.results_dir+sep+model_path
+
+        # The name of the data pipe for the model.
+        model_pipe = self.name_pipe(model)
+
+        # Check that results do not already exist - i.e. a previous run was interrupted.
+        path1 = path + sep + 'results'
+        path2 = path1 + '.bz2'
+        path3 = path1 + '.gz'
+        if access(path1, F_OK) or access(path2, F_OK) or access(path2, F_OK):
+            # Printout.
+            print("Detected the presence of results files for the '%s' model - loading these instead of performing optimisation for a second time." % model)
+
+            # Create a data pipe and switch to it.
+            self.interpreter.pipe.create(pipe_name=model_pipe, pipe_type='relax_disp', bundle=self.pipe_bundle)
+            self.interpreter.pipe.switch(model_pipe)
+
+            # Load the results.
+            self.interpreter.results.read(file='results', dir=path)
+
+            # Nothing more to do.
+            return
+
+        # Create the data pipe by copying the base pipe, then switching to it.
+        self.interpreter.pipe.copy(pipe_from=self.pipe_name, pipe_to=model_pipe, bundle_to=self.pipe_bundle)
+        self.interpreter.pipe.switch(model_pipe)
+
+        # Select the model.
+        self.interpreter.relax_disp.select_model(model)
+
+        # Copy the R2eff values from the R2eff model data pipe.
+        if model != MODEL_R2EFF and MODEL_R2EFF in self.models:
+            self.interpreter.value.copy(pipe_from=self.name_pipe(MODEL_R2EFF), pipe_to=model_pipe, param='r2eff')
+
+        # Calculate the R2eff values for the fixed relaxation time period data types.
+        if model == MODEL_R2EFF and not has_exponential_exp_type():
+            self.interpreter.minimise.calculate()
+
+        # Optimise the model.
+        else:
+            for stage in self.optimise(model=model, model_path=model_path):
+                yield
+
+        # Write out the results.
+        self.write_results(path=path, model=model)
+
+
+    def model_levels(self):
+        """Determine the levels of the model dependency graph, for the concurrent optimisation of the models.
+
+        All dispersion models depend on the 'R2eff' model, as the R2eff values are copied from its data pipe.  A model also depends on the previously analysed model it is nested in, as the parameters are copied from that model (see nesting()).  The models of each level only depend on models of the previous levels.
+
+
+        @return:    The list of models for each level, each in the order of self.models.
+        @rtype:     list of list of str
+        """
+
+        # Loop over the models, starting with the 'R2eff' model, determining the level of each.
+        model_level = {}
+        levels = []
+        for model in sorted(self.models, key=lambda model: model != MODEL_R2EFF):
+            # The models which must be optimised first.
+            dependencies = []
+            if model != MODEL_R2EFF and MODEL_R2EFF in self.models:
+                dependencies.append(MODEL_R2EFF)
+            model_info, comparable_model_info = nesting_model(self_models=self.models, model=model)
+            if comparable_model_info != None:
+                dependencies.append(comparable_model_info.model)
+
+            # The level, one above the highest dependency.
+            level = 0
+            for dependency in dependencies:
+                level = max(level, model_level[dependency] + 1)
+            model_level[model] = level
+
+            # Store the model.
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(model)
+
+        # Return the levels.
+        return levels
+
+
     def name_pipe(self, prefix):
         """Generate a unique name for the data pipe.
 
@@ -350,6 +450,9 @@ class Relax_disp:
     def optimise(self, model=None, model_path=None):
         """Optimise the model, taking model nesting into account.
 
+        This is a generator which yields after each user function call which queues commands for the slave processors, so that the optimisation of independent models can be interleaved by run() and the queued commands executed together.
+
+
         @keyword model:         The model to be optimised.
         @type model:            str
         @keyword model_path:    The folder name for the model, where possible spaces has been replaced with underscore.
@@ -395,6 +498,7 @@ class Relax_disp:
                 # Grid search.
                 if self.grid_inc:
                     self.interpreter.minimise.grid_search(inc=self.grid_inc)
+                    yield
 
                 # Default values.
                 else:
@@ -450,6 +554,7 @@ class Relax_disp:
         # Do the minimisation.
         if do_minimise:
             self.interpreter.minimise.execute(min_algor=min_algor, func_tol=self.opt_func_tol, max_iter=self.opt_max_iterations, constraints=constraints)
+            yield
 
         # Model elimination.
         if self.eliminate:
@@ -509,6 +614,7 @@ class Relax_disp:
                 self.interpreter.monte_carlo.create_data()
                 self.interpreter.monte_carlo.initial_values()
                 self.interpreter.minimise.execute(min_algor=min_algor, func_tol=self.opt_func_tol, max_iter=self.opt_max_iterations, constraints=constraints)
+                yield
                 if self.eliminate:
                     self.interpreter.eliminate()
                 self.interpreter.monte_carlo.error_analysis()
@@ -563,60 +669,45 @@ class Relax_disp:
             # No print out.
             self.interpreter.relax_disp.r1_fit(fit=self.r1_fit)
 
-        # Loop over the models.
+        # The data pipes for model selection.
         self.model_pipes = []
         for model in self.models:
-            # Printout.
-            subtitle(file=sys.stdout, text="The '%s' model" % model, prespace=3)
-
-            # The results directory path.
-            model_path = model.replace(" ", "_")
-            path = self.results_dir+sep+model_path
-
-            # The name of the data pipe for the model.
-            model_pipe = self.name_pipe(model)
             if self.is_model_for_selection(model):
-                self.model_pipes.append(model_pipe)
-
-            # Check that results do not already exist - i.e. a previous run was interrupted.
-            path1 = path + sep + 'results'
-            path2 = path1 + '.bz2'
-            path3 = path1 + '.gz'
-            if access(path1, F_OK) or access(path2, F_OK) or access(path2, F_OK):
-                # Printout.
-                print("Detected the presence of results files for the '%s' model - loading these instead of performing optimisation for a second time." % model)
-
-                # Create a data pipe and switch to it.
-                self.interpreter.pipe.create(pipe_name=model_pipe, pipe_type='relax_disp', bundle=self.pipe_bundle)
-                self.interpreter.pipe.switch(model_pipe)
-
-                # Load the results.
-                self.interpreter.results.read(file='results', dir=path)
-
-                # Jump to the next model.
-                continue
-
-            # Create the data pipe by copying the base pipe, then switching to it.
-            self.interpreter.pipe.copy(pipe_from=self.pipe_name, pipe_to=model_pipe, bundle_to=self.pipe_bundle)
-            self.interpreter.pipe.switch(model_pipe)
-
-            # Select the model.
-            self.interpreter.relax_disp.select_model(model)
-
-            # Copy the R2eff values from the R2eff model data pipe.
-            if model != MODEL_R2EFF and MODEL_R2EFF in self.models:
-                self.interpreter.value.copy(pipe_from=self.name_pipe(MODEL_R2EFF), pipe_to=model_pipe, param='r2eff')
-
-            # Calculate the R2eff values for the fixed relaxation time period data types.
-            if model == MODEL_R2EFF and not has_exponential_exp_type():
-                self.interpreter.minimise.calculate()
-
-            # Optimise the model.
-            else:
-                self.optimise(model=model, model_path=model_path)
-
-            # Write out the results.
-            self.write_results(path=path, model=model)
+                self.model_pipes.append(self.name_pipe(model))
+
+        # Get the Processor box singleton (it contains the Processor instance) and alias the Processor.
+        processor_box = Processor_box()
+        processor = processor_box.processor
+
+        # Loop over the levels of the model dependency graph.
+        for level in self.model_levels():
+            # The model fitting generators.
+            fits = []
+            for model in level:
+                fits.append([self.name_pipe(model), self.fit_model(model=model)])
+
+            # Fit the independent models together, one stage at a time, executing the commands queued by all models for each stage in a single processor queue.
+            while fits:
+                processor.hold_queue()
+                try:
+                    for fit in fits[:]:
+                        # Switch to the data pipe of the model.
+                        if has_pipe(fit[0]):
+                            self.interpreter.pipe.switch(fit[0])
+
+                        # The next stage.
+                        try:
+                            next(fit[1])
+                        except StopIteration:
+                            fits.remove(fit)
+
+                # Discard the queued commands of the other models on failure.
+                except:
+                    processor.release_queue(run=False)
+                    raise
+
+                # Execute the commands.
+                processor.release_queue()
 
         # The final model selection data pipe.
         if len(self.models) >= 2:
@@ -45,6 +45,7 @@ __all__ = [
     'mathematics',
     'model_selection',
     'nmr',
+    'optimisation',
     'order',
     'periodic_table',
     'physical_constants',
@@ -26,6 +26,7 @@
 __all__ = [
     'b14',
     'cr72',
+    'derivatives',
     'dpl94',
     'it99',
     'lm63',
@@ -0,0 +1,1010 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""The first and second partial derivatives of the analytic relaxation dispersion models.
+
+The derivatives are calculated by second order forward mode differentiation.  Each quantity in the model equations is represented by a Jet, which holds the values in the {Ei, Si, Mi, Oi, Di} numpy array layout of the dispersion target functions together with the first and second partial derivatives with respect to a small number of model parameters (the jet variables).  Every arithmetic operation and mathematical function propagates the derivatives via the chain rule, hence the results are exact to machine precision rather than finite difference approximations.  Only the structurally non-zero derivatives are stored, as many parameters such as R20 enter the equations linearly.
+
+The jet_* functions of this module mirror the R2eff and R1rho equations of the corresponding lib.dispersion modules, but without the special handling of the parameter values which are undefined for the model (for example dw = 0.0 or kex = 0.0).  At these points the derivatives may not be finite, and the target function code is responsible for removing them.
+"""
+
+# Python module imports.
+import numpy
+
+
+class Jet(object):
+    """The values of a quantity together with the first and second partial derivatives with respect to the jet variables."""
+
+    # Stop numpy from treating jets as array elements, so that the jet operators are used when an array is the left hand operand.
+    __array_priority__ = 100
+    __array_ufunc__ = None
+
+    def __init__(self, val=None, d1=None, d2=None, order=2):
+        """Set up the jet.
+
+        @keyword val:   The values.
+        @type val:      float, complex, or numpy array
+        @keyword d1:    The first partial derivatives, keyed by the jet variable index.  Missing keys correspond to derivatives of zero.
+        @type d1:       dict of int and float or numpy array
+        @keyword d2:    The second partial derivatives, keyed by the ordered jet variable index pair (i, j) with i <= j.  Missing keys correspond to derivatives of zero.
+        @type d2:       dict of tuple of int and float or numpy array
+        @keyword order: The derivative order, 1 to only propagate the first partial derivatives and 2 for both the first and second.
+        @type order:    int
+        """
+
+        # Store the arguments.
+        self.val = val
+        self.d1 = d1
+        self.d2 = d2
+        self.order = order
+
+        # Initialise the derivatives.
+        if self.d1 == None:
+            self.d1 = {}
+        if self.d2 == None:
+            self.d2 = {}
+
+
+    def __add__(self, other):
+        """The addition operator.
+
+        @param other:   The value to add.
+        @type other:    Jet instance, float, complex, or numpy array
+        @return:        The sum.
+        @rtype:         Jet instance
+        """
+
+        # Constant addition.
+        if not isinstance(other, Jet):
+            return Jet(self.val + other, dict(self.d1), dict(self.d2), self.order)
+
+        # Jet addition.
+        return Jet(self.val + other.val, merge(self.d1, other.d1), merge(self.d2, other.d2), min(self.order, other.order))
+
+
+    def __div__(self, other):
+        """The division operator for Python 2.
+
+        @param other:   The divisor.
+        @type other:    Jet instance, float, complex, or numpy array
+        @return:        The quotient.
+        @rtype:         Jet instance
+        """
+
+        # Redirect.
+        return self.__truediv__(other)
+
+
+    def __mul__(self, other):
+        """The multiplication operator, implementing the product rule.
+
+        @param other:   The value to multiply by.
+        @type other:    Jet instance, float, complex, or numpy array
+        @return:        The product.
+        @rtype:         Jet instance
+        """
+
+        # Constant multiplication.
+        if not isinstance(other, Jet):
+            d1 = {}
+            for key in self.d1:
+                d1[key] = self.d1[key] * other
+            d2 = {}
+            for key in self.d2:
+                d2[key] = self.d2[key] * other
+            return Jet(self.val * other, d1, d2, self.order)
+
+        # The first partial derivatives.
+        order = min(self.order, other.order)
+        d1 = {}
+        for key in self.d1:
+            d1[key] = self.d1[key] * other.val
+        for key in other.d1:
+            add_term(d1, key, self.val * other.d1[key])
+
+        # The second partial derivatives.
+        d2 = {}
+        if order == 2:
+            for key in self.d2:
+                d2[key] = self.d2[key] * other.val
+            for key in other.d2:
+                add_term(d2, key, self.val * other.d2[key])
+            for i in self.d1:
+                for j in other.d1:
+                    term = self.d1[i] * other.d1[j]
+                    if i == j:
+                        term = 2.0 * term
+                    add_term(d2, (min(i, j), max(i, j)), term)
+
+        # Return the product.
+        return Jet(self.val * other.val, d1, d2, order)
+
+
+    def __neg__(self):
+        """The negation operator.
+
+        @return:    The negated jet.
+        @rtype:     Jet instance
+        """
+
+        # Negate everything.
+        return self * -1.0
+
+
+    def __pow__(self, power):
+        """The power operator for constant exponents.
+
+        @param power:   The exponent.
+        @type power:    float or numpy array
+        @return:        The jet raised to the given power.
+        @rtype:         Jet instance
+        """
+
+        # Square.
+        if isinstance(power, (int, float)) and power == 2:
+            return unary(self, self.val**2, 2.0*self.val, 2.0)
+
+        # The general case.
+        return unary(self, self.val**power, power * self.val**(power - 1), power * (power - 1) * self.val**(power - 2))
+
+
+    def __radd__(self, other):
+        """The reflected addition operator.
+
+        @param other:   The value to add.
+        @type other:    float, complex, or numpy array
+        @return:        The sum.
+        @rtype:         Jet instance
+        """
+
+        # Addition is commutative.
+        return self.__add__(other)
+
+
+    def __rdiv__(self, other):
+        """The reflected division operator for Python 2.
+
+        @param other:   The dividend.
+        @type other:    float, complex, or numpy array
+        @return:        The quotient.
+        @rtype:         Jet instance
+        """
+
+        # Redirect.
+        return self.__rtruediv__(other)
+
+
+    def __rmul__(self, other):
+        """The reflected multiplication operator.
+
+        @param other:   The value to multiply by.
+        @type other:    float, complex, or numpy array
+        @return:        The product.
+        @rtype:         Jet instance
+        """
+
+        # Multiplication is commutative.
+        return self.__mul__(other)
+
+
+    def __rsub__(self, other):
+        """The reflected subtraction operator.
+
+        @param other:   The value to subtract from.
+        @type other:    float, complex, or numpy array
+        @return:        The difference.
+        @rtype:         Jet instance
+        """
+
+        # Negate and add.
+        return (-self).__add__(other)
+
+
+    def __rtruediv__(self, other):
+        """The reflected division operator.
+
+        @param other:   The dividend.
+        @type other:    float, complex, or numpy array
+        @return:        The quotient.
+        @rtype:         Jet instance
+        """
+
+        # Multiply by the reciprocal.
+        return self.reciprocal() * other
+
+
+    def __sub__(self, other):
+        """The subtraction operator.
+
+        @param other:   The value to subtract.
+        @type other:    Jet instance, float, complex, or numpy array
+        @return:        The difference.
+        @rtype:         Jet instance
+        """
+
+        # Constant subtraction.
+        if not isinstance(other, Jet):
+            return Jet(self.val - other, dict(self.d1), dict(self.d2), self.order)
+
+        # Jet subtraction.
+        return Jet(self.val - other.val, merge(self.d1, other.d1, sign=-1.0), merge(self.d2, other.d2, sign=-1.0), min(self.order, other.order))
+
+
+    def __truediv__(self, other):
+        """The division operator.
+
+        @param other:   The divisor.
+        @type other:    Jet instance, float, complex, or numpy array
+        @return:        The quotient.
+        @rtype:         Jet instance
+        """
+
+        # Constant division.
+        if not isinstance(other, Jet):
+            return self * (1.0 / other)
+
+        # Multiply by the reciprocal.
+        return self * other.reciprocal()
+
+
+    def reciprocal(self):
+        """Return the reciprocal of the jet.
+
+        @return:    The reciprocal.
+        @rtype:     Jet instance
+        """
+
+        # The reciprocal and its derivatives.
+        inv = 1.0 / self.val
+        inv2 = inv**2
+        return unary(self, inv, -inv2, 2.0*inv2*inv)
+
+
+    @property
+    def real(self):
+        """The real part of the jet.
+
+        @return:    The real part of the values and derivatives.
+        @rtype:     Jet instance
+        """
+
+        # Take the real parts.
+        d1 = {}
+        for key in self.d1:
+            d1[key] = numpy.real(self.d1[key])
+        d2 = {}
+        for key in self.d2:
+            d2[key] = numpy.real(self.d2[key])
+        return Jet(numpy.real(self.val), d1, d2, self.order)
+
+
+
+def add_term(derivs, key, term):
+    """Add a term to a derivative, in place.
+
+    @param derivs:  The first or second partial derivatives of a jet.
+    @type derivs:   dict
+    @param key:     The derivative key.
+    @type key:      int or tuple of int
+    @param term:    The term to add.
+    @type term:     float, complex, or numpy array
+    """
+
+    # Add to the existing derivative.
+    if key in derivs:
+        derivs[key] = derivs[key] + term
+
+    # A new non-zero derivative.
+    else:
+        derivs[key] = term
+
+
+def arccosh(x):
+    """The inverse hyperbolic cosine.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The inverse hyperbolic cosine.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.arccosh(x)
+
+    # The derivatives.
+    fact = 1.0 / (x.val**2 - 1.0)
+    dfdx = numpy.sqrt(fact)
+    return unary(x, numpy.arccosh(x.val), dfdx, -x.val * fact * dfdx)
+
+
+def arctan2(y, x):
+    """The arc tangent of y/x, choosing the quadrant correctly.
+
+    @param y:   The y-coordinate.
+    @type y:    Jet instance or numpy array
+    @param x:   The x-coordinate.
+    @type x:    Jet instance or numpy array
+    @return:    The angle.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(y, Jet) and not isinstance(x, Jet):
+        return numpy.arctan2(y, x)
+
+    # Convert constants to jets.
+    if not isinstance(y, Jet):
+        y = Jet(y, order=x.order)
+    if not isinstance(x, Jet):
+        x = Jet(x, order=y.order)
+
+    # The partial derivatives of arctan2.
+    inv_r2 = 1.0 / (x.val**2 + y.val**2)
+    inv_r4 = inv_r2**2
+    dfdy = x.val * inv_r2
+    dfdx = -y.val * inv_r2
+    d2fdy2 = -2.0 * x.val * y.val * inv_r4
+    d2fdx2 = -d2fdy2
+    d2fdxdy = (y.val**2 - x.val**2) * inv_r4
+
+    # The first partial derivatives.
+    order = min(x.order, y.order)
+    d1 = {}
+    for key in y.d1:
+        d1[key] = dfdy * y.d1[key]
+    for key in x.d1:
+        add_term(d1, key, dfdx * x.d1[key])
+
+    # The second partial derivatives.
+    d2 = {}
+    if order == 2:
+        for key in y.d2:
+            d2[key] = dfdy * y.d2[key]
+        for key in x.d2:
+            add_term(d2, key, dfdx * x.d2[key])
+        keys = sorted(set(y.d1) | set(x.d1))
+        for a in range(len(keys)):
+            for b in range(a, len(keys)):
+                i, j = keys[a], keys[b]
+                yi, yj, xi, xj = y.d1.get(i), y.d1.get(j), x.d1.get(i), x.d1.get(j)
+                if yi is not None and yj is not None:
+                    add_term(d2, (i, j), d2fdy2 * yi * yj)
+                if xi is not None and xj is not None:
+                    add_term(d2, (i, j), d2fdx2 * xi * xj)
+                if yi is not None and xj is not None:
+                    add_term(d2, (i, j), d2fdxdy * yi * xj)
+                if xi is not None and yj is not None:
+                    add_term(d2, (i, j), d2fdxdy * xi * yj)
+
+    # Return the angle.
+    return Jet(numpy.arctan2(y.val, x.val), d1, d2, order)
+
+
+def cos(x):
+    """The cosine.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The cosine.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.cos(x)
+
+    # The derivatives.
+    cos_x = numpy.cos(x.val)
+    return unary(x, cos_x, -numpy.sin(x.val), -cos_x)
+
+
+def cosh(x):
+    """The hyperbolic cosine.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The hyperbolic cosine.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.cosh(x)
+
+    # The derivatives.
+    cosh_x = numpy.cosh(x.val)
+    return unary(x, cosh_x, numpy.sinh(x.val), cosh_x)
+
+
+def jet_variables(values, order=2):
+    """Convert the parameter values into independent jet variables.
+
+    @param values:  The parameter values.  The index of each value in this list is the jet variable index.
+    @type values:   list of float or numpy array
+    @keyword order: The derivative order, 1 to only propagate the first partial derivatives and 2 for both the first and second.
+    @type order:    int
+    @return:        The jet variables.
+    @rtype:         list of Jet instances
+    """
+
+    # The unit first partial derivative of each variable with respect to itself.
+    return [Jet(values[i], d1={i: 1.0}, order=order) for i in range(len(values))]
+
+
+def log(x):
+    """The natural logarithm.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The natural logarithm.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.log(x)
+
+    # The derivatives.
+    inv = 1.0 / x.val
+    return unary(x, numpy.log(x.val), inv, -inv**2)
+
+
+def merge(derivs1, derivs2, sign=1.0):
+    """Merge the derivatives of two jets for addition or subtraction.
+
+    @param derivs1: The first or second partial derivatives of the first jet.
+    @type derivs1:  dict
+    @param derivs2: The first or second partial derivatives of the second jet.
+    @type derivs2:  dict
+    @keyword sign:  The sign of the second jet, 1.0 for addition and -1.0 for subtraction.
+    @type sign:     float
+    @return:        The merged derivatives.
+    @rtype:         dict
+    """
+
+    # Add or subtract all terms.
+    derivs = dict(derivs1)
+    for key in derivs2:
+        add_term(derivs, key, sign * derivs2[key])
+
+    # Return the derivatives.
+    return derivs
+
+
+def sin(x):
+    """The sine.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The sine.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.sin(x)
+
+    # The derivatives.
+    sin_x = numpy.sin(x.val)
+    return unary(x, sin_x, numpy.cos(x.val), -sin_x)
+
+
+def sinh(x):
+    """The hyperbolic sine.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The hyperbolic sine.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.sinh(x)
+
+    # The derivatives.
+    sinh_x = numpy.sinh(x.val)
+    return unary(x, sinh_x, numpy.cosh(x.val), sinh_x)
+
+
+def sqrt(x):
+    """The square root.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The square root.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.sqrt(x)
+
+    # The derivatives.
+    sqrt_x = numpy.sqrt(x.val)
+    dfdx = 0.5 / sqrt_x
+    return unary(x, sqrt_x, dfdx, -0.5 * dfdx / x.val)
+
+
+def tanh(x):
+    """The hyperbolic tangent.
+
+    @param x:   The argument.
+    @type x:    Jet instance or numpy array
+    @return:    The hyperbolic tangent.
+    @rtype:     Jet instance or numpy array
+    """
+
+    # Constants.
+    if not isinstance(x, Jet):
+        return numpy.tanh(x)
+
+    # The derivatives.
+    tanh_x = numpy.tanh(x.val)
+    dfdx = 1.0 - tanh_x**2
+    return unary(x, tanh_x, dfdx, -2.0 * tanh_x * dfdx)
+
+
+def unary(x, val, dfdx, d2fdx2):
+    """Apply the chain rule for a function of a single jet.
+
+    @param x:       The function argument.
+    @type x:        Jet instance
+    @param val:     The function values f(x).
+    @type val:      float, complex, or numpy array
+    @param dfdx:    The first derivative of the function f'(x).
+    @type dfdx:     float, complex, or numpy array
+    @param d2fdx2:  The second derivative of the function f''(x).
+    @type d2fdx2:   float, complex, or numpy array
+    @return:        The function values and partial derivatives.
+    @rtype:         Jet instance
+    """
+
+    # The first partial derivatives.
+    d1 = {}
+    for key in x.d1:
+        d1[key] = dfdx * x.d1[key]
+
+    # The second partial derivatives.
+    d2 = {}
+    if x.order == 2:
+        for key in x.d2:
+            d2[key] = dfdx * x.d2[key]
+        keys = sorted(x.d1)
+        for a in range(len(keys)):
+            for b in range(a, len(keys)):
+                add_term(d2, (keys[a], keys[b]), d2fdx2 * x.d1[keys[a]] * x.d1[keys[b]])
+
+    # Return the jet.
+    return Jet(val, d1, d2, x.order)
+
+
+
+# The model equations.
+######################
+
+
+def jet_r1rho_DPL94(r1rho_prime=None, phi_ex=None, kex=None, theta=None, R1=0.0, spin_lock_fields2=None):
+    """Calculate the R1rho values and partial derivatives for the DPL94 model.
+
+    See the lib.dispersion.dpl94 module for details.
+
+
+    @keyword r1rho_prime:       The R1rho_prime parameter value (R1rho with no exchange).
+    @type r1rho_prime:          Jet instance
+    @keyword phi_ex:            The phi_ex parameter value (pA * pB * delta_omega^2).
+    @type phi_ex:               Jet instance
+    @keyword kex:               The kex parameter value (the exchange rate in rad/s).
+    @type kex:                  Jet instance
+    @keyword theta:             The rotating frame tilt angles for each dispersion point.
+    @type theta:                numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword R1:                The R1 relaxation rate.
+    @type R1:                   Jet instance or numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields2: The R1rho spin-lock field strengths squared (in rad^2.s^-2).
+    @type spin_lock_fields2:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:                    The R1rho values and partial derivatives.
+    @rtype:                     Jet instance
+    """
+
+    # The non-Rex factors.
+    sin_theta2 = numpy.sin(theta)**2
+    R1_R2 = R1 * numpy.cos(theta)**2 + r1rho_prime * sin_theta2
+
+    # The R1rho values.
+    return R1_R2 + sin_theta2 * phi_ex * kex / (kex**2 + spin_lock_fields2)
+
+
+def jet_r1rho_M61(r1rho_prime=None, phi_ex=None, kex=None, spin_lock_fields2=None):
+    """Calculate the R1rho values and partial derivatives for the M61 model.
+
+    See the lib.dispersion.m61 module for details.
+
+
+    @keyword r1rho_prime:       The R1rho_prime parameter value (R1rho with no exchange).
+    @type r1rho_prime:          Jet instance
+    @keyword phi_ex:            The phi_ex parameter value (pA * pB * delta_omega^2).
+    @type phi_ex:               Jet instance
+    @keyword kex:               The kex parameter value (the exchange rate in rad/s).
+    @type kex:                  Jet instance
+    @keyword spin_lock_fields2: The R1rho spin-lock field strengths squared (in rad^2.s^-2).
+    @type spin_lock_fields2:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:                    The R1rho values and partial derivatives.
+    @rtype:                     Jet instance
+    """
+
+    # The R1rho values.
+    return r1rho_prime + phi_ex * kex / (kex**2 + spin_lock_fields2)
+
+
+def jet_r1rho_MP05(r1rho_prime=None, omega=None, offset=None, pA=None, dw=None, kex=None, R1=0.0, spin_lock_fields=None, spin_lock_fields2=None):
+    """Calculate the R1rho values and partial derivatives for the MP05 model.
+
+    See the lib.dispersion.mp05 module for details.
+
+
+    @keyword r1rho_prime:       The R1rho_prime parameter value (R1rho with no exchange).
+    @type r1rho_prime:          Jet instance
+    @keyword omega:             The chemical shift for the spin in rad/s.
+    @type omega:                numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword offset:            The spin-lock offsets for the data.
+    @type offset:               numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword pA:                The population of state A.
+    @type pA:                   Jet instance
+    @keyword dw:                The chemical exchange difference between states A and B in rad/s.
+    @type dw:                   Jet instance
+    @keyword kex:               The kex parameter value (the exchange rate in rad/s).
+    @type kex:                  Jet instance
+    @keyword R1:                The R1 relaxation rate.
+    @type R1:                   Jet instance or numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields:  The R1rho spin-lock field strengths (in rad.s^-1).
+    @type spin_lock_fields:     numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields2: The R1rho spin-lock field strengths squared (in rad^2.s^-2).
+    @type spin_lock_fields2:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:                    The R1rho values and partial derivatives.
+    @rtype:                     Jet instance
+    """
+
+    # Repetitive calculations.
+    pB = 1.0 - pA
+    kex2 = kex**2
+    phi_ex = pA * pB * dw**2
+
+    # The average resonance offsets.
+    da = omega - offset
+    db = dw + da
+    d = pB * dw + da
+
+    # The effective fields.
+    waeff2 = spin_lock_fields2 + da**2
+    wbeff2 = db**2 + spin_lock_fields2
+    weff2 = d**2 + spin_lock_fields2
+
+    # The rotating frame tilt angle.
+    sin_theta2 = sin(arctan2(spin_lock_fields, d))**2
+
+    # The R1rho values.
+    waeff2_wbeff2 = waeff2 * wbeff2
+    fact = 1.0 + 2.0 * kex2 * (pA * waeff2 + pB * wbeff2) / (waeff2_wbeff2 + weff2 * kex2)
+    denom = waeff2_wbeff2 / weff2 + kex2 - sin_theta2 * phi_ex * fact
+    return R1 * (1.0 - sin_theta2) + r1rho_prime * sin_theta2 + sin_theta2 * phi_ex * kex / denom
+
+
+def jet_r1rho_TAP03(r1rho_prime=None, omega=None, offset=None, pA=None, dw=None, kex=None, R1=0.0, spin_lock_fields=None, spin_lock_fields2=None):
+    """Calculate the R1rho values and partial derivatives for the TAP03 model.
+
+    See the lib.dispersion.tap03 module for details.
+
+
+    @keyword r1rho_prime:       The R1rho_prime parameter value (R1rho with no exchange).
+    @type r1rho_prime:          Jet instance
+    @keyword omega:             The chemical shift for the spin in rad/s.
+    @type omega:                numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword offset:            The spin-lock offsets for the data.
+    @type offset:               numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword pA:                The population of state A.
+    @type pA:                   Jet instance
+    @keyword dw:                The chemical exchange difference between states A and B in rad/s.
+    @type dw:                   Jet instance
+    @keyword kex:               The kex parameter value (the exchange rate in rad/s).
+    @type kex:                  Jet instance
+    @keyword R1:                The R1 relaxation rate.
+    @type R1:                   Jet instance or numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields:  The R1rho spin-lock field strengths (in rad.s^-1).
+    @type spin_lock_fields:     numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields2: The R1rho spin-lock field strengths squared (in rad^2.s^-2).
+    @type spin_lock_fields2:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:                    The R1rho values and partial derivatives.
+    @rtype:                     Jet instance
+    """
+
+    # Repetitive calculations.
+    pB = 1.0 - pA
+    kex2 = kex**2
+    phi_ex = pA * pB * dw**2
+
+    # The average resonance offsets.
+    da = omega - offset
+    db = dw + da
+    d = pB * dw + da
+
+    # The gamma factor.
+    sigma2 = (pB * da + pA * db)**2
+    gamma = 1.0 + phi_ex * (sigma2 - kex2 + spin_lock_fields2) / (sigma2 + kex2 + spin_lock_fields2)**2
+
+    # The effective fields.
+    gamma_fields2 = gamma * spin_lock_fields2
+    waeff2 = gamma_fields2 + da**2
+    wbeff2 = gamma_fields2 + db**2
+    weff2 = gamma_fields2 + d**2
+
+    # The rotating frame tilt angles.
+    sin_theta2 = sin(arctan2(spin_lock_fields, d))**2
+    hat_sin_theta2 = sin(arctan2(sqrt(gamma) * spin_lock_fields, d))**2
+
+    # The R1rho values.
+    denom = waeff2 * wbeff2 / weff2 + kex2 - 2.0 * hat_sin_theta2 * phi_ex + (1.0 - gamma) * spin_lock_fields2
+    return R1 * (1.0 - sin_theta2) + r1rho_prime * sin_theta2 + hat_sin_theta2 * phi_ex * kex / denom / gamma
+
+
+def jet_r1rho_TP02(r1rho_prime=None, omega=None, offset=None, pA=None, dw=None, kex=None, R1=0.0, spin_lock_fields=None, spin_lock_fields2=None):
+    """Calculate the R1rho values and partial derivatives for the TP02 model.
+
+    See the lib.dispersion.tp02 module for details.
+
+
+    @keyword r1rho_prime:       The R1rho_prime parameter value (R1rho with no exchange).
+    @type r1rho_prime:          Jet instance
+    @keyword omega:             The chemical shift for the spin in rad/s.
+    @type omega:                numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword offset:            The spin-lock offsets for the data.
+    @type offset:               numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword pA:                The population of state A.
+    @type pA:                   Jet instance
+    @keyword dw:                The chemical exchange difference between states A and B in rad/s.
+    @type dw:                   Jet instance
+    @keyword kex:               The kex parameter value (the exchange rate in rad/s).
+    @type kex:                  Jet instance
+    @keyword R1:                The R1 relaxation rate.
+    @type R1:                   Jet instance or numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields:  The R1rho spin-lock field strengths (in rad.s^-1).
+    @type spin_lock_fields:     numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword spin_lock_fields2: The R1rho spin-lock field strengths squared (in rad^2.s^-2).
+    @type spin_lock_fields2:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:                    The R1rho values and partial derivatives.
+    @rtype:                     Jet instance
+    """
+
+    # Repetitive calculations.
+    pB = 1.0 - pA
+
+    # The average resonance offsets.
+    da = omega - offset
+    db = dw + da
+    d = pB * dw + da
+
+    # The effective fields.
+    waeff2 = spin_lock_fields2 + da**2
+    wbeff2 = db**2 + spin_lock_fields2
+    weff2 = d**2 + spin_lock_fields2
+
+    # The rotating frame tilt angle.
+    sin_theta2 = sin(arctan2(spin_lock_fields, d))**2
+
+    # The R1rho values.
+    denom = waeff2 * wbeff2 / weff2 + kex**2
+    return R1 * (1.0 - sin_theta2) + r1rho_prime * sin_theta2 + sin_theta2 * pA * pB * dw**2 * kex / denom
+
+
+def jet_r2eff_B14(r20a=None, r20b=None, pA=None, dw=None, kex=None, ncyc=None, inv_tcpmg=None, tcp=None):
+    """Calculate the R2eff values and partial derivatives for the B14 model.
+
+    See the lib.dispersion.b14 module for details.
+
+
+    @keyword r20a:      The R20 parameter value of state A (R2 with no exchange).
+    @type r20a:         Jet instance
+    @keyword r20b:      The R20 parameter value of state B (R2 with no exchange).
+    @type r20b:         Jet instance
+    @keyword pA:        The population of state A.
+    @type pA:           Jet instance
+    @keyword dw:        The chemical exchange difference between states A and B in rad/s.
+    @type dw:           Jet instance
+    @keyword kex:       The kex parameter value (the exchange rate in rad/s).
+    @type kex:          Jet instance
+    @keyword ncyc:      The matrix exponential power array.  The number of CPMG blocks.
+    @type ncyc:         numpy int16 array of rank [NE][NS][NM][NO][ND]
+    @keyword inv_tcpmg: The inverse of the total duration of the CPMG element (in inverse seconds).
+    @type inv_tcpmg:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @keyword tcp:       The tau_CPMG times (1 / 4.nu1).
+    @type tcp:          numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:            The R2eff values and partial derivatives.
+    @rtype:             Jet instance
+    """
+
+    # Parameter conversions.
+    k_BA = pA * kex
+    k_AB = kex - k_BA
+
+    # Repetitive calculations.
+    deltaR2 = r20a - r20b
+    dw2 = dw**2
+    two_tcp = 2.0 * tcp
+
+    # The Carver and Richards (1972) alpha_minus short notation.
+    alpha_m = deltaR2 + k_AB - k_BA
+    zeta = 2.0 * dw * alpha_m
+    Psi = alpha_m**2 + 4.0 * k_BA * k_AB - dw2
+
+    # The real and imaginary components of the exchange induced shift.
+    quad_zeta2_Psi2 = (zeta**2 + Psi**2)**0.25
+    fact = 0.5 * arctan2(-zeta, Psi)
+    g3 = cos(fact) * quad_zeta2_Psi2
+    g4 = sin(fact) * quad_zeta2_Psi2
+    g32 = g3**2
+    g42 = g4**2
+
+    # The time independent factors.
+    N = g3 + g4*1j
+    NNc = g32 + g42
+    F0 = (dw2 + g32) / NNc
+    F2 = (dw2 - g42) / NNc
+    F1b = (dw + g4) * (dw - g3*1j) / NNc
+    F1a_plus_b = (2.0 * dw2 + zeta*1j) / NNc
+
+    # The time dependent factors.
+    E0 = two_tcp * g3
+    E2 = two_tcp * g4
+    E1 = (g3 - g4*1j) * tcp
+
+    # The Baldwin (2014) v factors.
+    v1s = F0 * sinh(E0) - F2 * sin(E2)*1j
+    v4 = F1b * (-alpha_m - g3) + F1b * (dw - g4)*1j
+    v5 = (kex - deltaR2 + dw*1j) * v1s - 2.0 * (v4 + k_AB * F1a_plus_b) * sinh(E1)
+    v1c = F0 * cosh(E0) - F2 * cos(E2)
+    v3 = sqrt(v1c**2 - 1.0)
+    y = ((v1c - v3) / (v1c + v3))**ncyc
+    Tog = 0.5 * (1.0 + y) + (1.0 - y) * v5 / (2.0 * v3 * N)
+
+    # The R2eff values.
+    return (r20a + r20b + kex) / 2.0 - inv_tcpmg * (ncyc * arccosh(v1c.real) + log(Tog.real))
+
+
+def jet_r2eff_CR72(r20a=None, r20b=None, pA=None, dw=None, kex=None, cpmg_frqs=None):
+    """Calculate the R2eff values and partial derivatives for the CR72 model.
+
+    See the lib.dispersion.cr72 module for details.
+
+
+    @keyword r20a:      The R20 parameter value of state A (R2 with no exchange).
+    @type r20a:         Jet instance
+    @keyword r20b:      The R20 parameter value of state B (R2 with no exchange).
+    @type r20b:         Jet instance
+    @keyword pA:        The population of state A.
+    @type pA:           Jet instance
+    @keyword dw:        The chemical exchange difference between states A and B in rad/s.
+    @type dw:           Jet instance
+    @keyword kex:       The kex parameter value (the exchange rate in rad/s).
+    @type kex:          Jet instance
+    @keyword cpmg_frqs: The CPMG nu1 frequencies.
+    @type cpmg_frqs:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:            The R2eff values and partial derivatives.
+    @rtype:             Jet instance
+    """
+
+    # Parameter conversions.
+    k_BA = pA * kex
+    k_AB = kex - k_BA
+
+    # The Psi and zeta values (the general form for R20A != R20B).
+    dw2 = dw**2
+    fact = r20a - r20b - k_BA + k_AB
+    Psi = fact**2 - dw2 + 4.0 * k_BA * k_AB
+    zeta = 2.0 * dw * fact
+    sqrt_psi2_zeta2 = sqrt(Psi**2 + zeta**2)
+
+    # The D+/- values.
+    D_part = (0.5 * Psi + dw2) / sqrt_psi2_zeta2
+    Dpos = 0.5 + D_part
+    Dneg = D_part - 0.5
+
+    # The eta+/- values.
+    eta_fact = 2.0**(-3.0/2.0) / cpmg_frqs
+    etapos = sqrt(Psi + sqrt_psi2_zeta2) * eta_fact
+    etaneg = sqrt(sqrt_psi2_zeta2 - Psi) * eta_fact
+
+    # The R2eff values.
+    return (r20a + r20b + kex) / 2.0 - arccosh(Dpos * cosh(etapos) - Dneg * cos(etaneg)) * cpmg_frqs
+
+
+def jet_r2eff_IT99(r20=None, pA=None, dw=None, tex=None, cpmg_frqs=None):
+    """Calculate the R2eff values and partial derivatives for the IT99 model.
+
+    See the lib.dispersion.it99 module for details.
+
+
+    @keyword r20:       The R20 parameter value (R2 with no exchange).
+    @type r20:          Jet instance
+    @keyword pA:        The population of state A.
+    @type pA:           Jet instance
+    @keyword dw:        The chemical exchange difference between states A and B in rad/s.
+    @type dw:           Jet instance
+    @keyword tex:       The tex parameter value (the time of exchange in s/rad).
+    @type tex:          Jet instance
+    @keyword cpmg_frqs: The CPMG nu1 frequencies.
+    @type cpmg_frqs:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:            The R2eff values and partial derivatives.
+    @rtype:             Jet instance
+    """
+
+    # Repetitive calculations.
+    padw2 = pA * dw**2
+    numer = padw2 * (1.0 - pA) * tex
+    omega_a2 = sqrt(padw2**2 + 2304.0 * cpmg_frqs**4)
+
+    # The R2eff values.
+    return r20 + numer / (omega_a2 * tex**2 + 1.0)
+
+
+def jet_r2eff_LM63(r20=None, phi_ex=None, kex=None, cpmg_frqs=None):
+    """Calculate the R2eff values and partial derivatives for the LM63 model.
+
+    See the lib.dispersion.lm63 module for details.
+
+
+    @keyword r20:       The R20 parameter value (R2 with no exchange).
+    @type r20:          Jet instance
+    @keyword phi_ex:    The phi_ex parameter value (pA * pB * delta_omega^2).
+    @type phi_ex:       Jet instance
+    @keyword kex:       The kex parameter value (the exchange rate in rad/s).
+    @type kex:          Jet instance
+    @keyword cpmg_frqs: The CPMG nu1 frequencies.
+    @type cpmg_frqs:    numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:            The R2eff values and partial derivatives.
+    @rtype:             Jet instance
+    """
+
+    # The R2eff values.
+    return r20 + phi_ex / kex * (1.0 - 4.0 / kex * cpmg_frqs * tanh(kex / (4.0 * cpmg_frqs)))
+
+
+def jet_r2eff_TSMFK01(r20a=None, dw=None, k_AB=None, tcp=None):
+    """Calculate the R2eff values and partial derivatives for the TSMFK01 model.
+
+    See the lib.dispersion.tsmfk01 module for details.
+
+
+    @keyword r20a:  The R20 parameter value of state A (R2 with no exchange).
+    @type r20a:     Jet instance
+    @keyword dw:    The chemical exchange difference between states A and B in rad/s.
+    @type dw:       Jet instance
+    @keyword k_AB:  The k_AB parameter value (the forward exchange rate in rad/s).
+    @type k_AB:     Jet instance
+    @keyword tcp:   The tau_CPMG times (1 / 4.nu1).
+    @type tcp:      numpy float array of rank [NE][NS][NM][NO][ND]
+    @return:        The R2eff values and partial derivatives.
+    @rtype:         Jet instance
+    """
+
+    # The R2eff values.
+    denom = dw * tcp
+    return r20a + k_AB - k_AB * sin(denom) / denom
@@ -24,9 +24,30 @@
 """Module for the calculation of the matrix exponential, for higher dimensional data."""
 
 # Python module imports.
-from numpy import array, any, complex128, dot, einsum, eye, exp, iscomplex, int16, newaxis, multiply, tile, sqrt, version, zeros
+from numpy import abs, arange, array, any, ceil, complex128, dot, einsum, eye, exp, expm1, iscomplex, isfinite, int16, log2, newaxis, multiply, tile, sqrt, version, where, zeros
 from numpy.lib.stride_tricks import as_strided
-from numpy.linalg import eig, inv
+from numpy.linalg import eig, inv, solve
+
+# The degrees of the Pade approximants of the matrix exponential.
+PADE_DEGREES = [3, 5, 7, 9, 13]
+
+# The coefficients of the Pade approximants (Higham, 2005).
+PADE_COEFF = {
+    3: [120.0, 60.0, 12.0, 1.0],
+    5: [30240.0, 15120.0, 3360.0, 420.0, 30.0, 1.0],
+    7: [17297280.0, 8648640.0, 1995840.0, 277200.0, 25200.0, 1512.0, 56.0, 1.0],
+    9: [17643225600.0, 8821612800.0, 2075673600.0, 302702400.0, 30270240.0, 2162160.0, 110880.0, 3960.0, 90.0, 1.0],
+    13: [64764752532480000.0, 32382376266240000.0, 7771770303897600.0, 1187353796428800.0, 129060195264000.0, 10559470521600.0, 670442572800.0, 33522128640.0, 1323241920.0, 40840800.0, 960960.0, 16380.0, 182.0, 1.0]
+}
+
+# The maximum matrix 1-norms for which the Pade approximants are accurate to double precision, without scaling (Higham, 2005).
+PADE_THETA = {
+    3: 1.495585217958292e-2,
+    5: 2.539398330063230e-1,
+    7: 9.504178996162932e-1,
+    9: 2.097847961257068,
+    13: 5.371920351148152
+}
 
 
 def create_index(NE=None, NS=None, NM=None, NO=None, ND=None):
@@ -166,6 +187,108 @@ def data_view_via_striding_array_row_col(data_array=None):
 
 
 def matrix_exponential(A, dtype=None):
+    """Calculate the exact matrix exponential for higher dimensional data.  This of dimension [NE][NS][NM][NO][ND][X][X] or [NS][NM][NO][ND][X][X].
+
+    Here X is the Row and Column length, of the outer square matrix.  The calculation is dispatched to a kernel chosen from this size:
+
+        - X = 2:  The closed form of the matrix_exponential_2x2() function.
+        - X > 2:  The scaling and squaring Pade approximation of the matrix_exponential_pade() function, or the eigenvalue decomposition of the matrix_exponential_eig() function for numpy versions which cannot solve stacks of linear systems (numpy < 1.8).
+
+
+    @param A:               The square matrix to calculate the matrix exponential of.
+    @type A:                numpy float array of rank [NE][NS][NM][NO][ND][X][X]
+    @param dtype:           If provided, forces the calculation to use the data type specified.
+    @type dtype:            data-type, optional
+    @return:                The matrix exponential.  This will have the same dimensionality as the A matrix.
+    @rtype:                 numpy float array of rank [NE][NS][NM][NO][ND][X][X]
+    """
+
+    # The per matrix eigenvalue decomposition for old numpy versions.
+    if A.shape[-1] != 2 and not numpy_stacked_linalg():
+        return matrix_exponential_eig(A, dtype=dtype)
+
+    # Convert dtype, if specified.
+    if dtype != None:
+        dtype_mat = A.dtype
+
+        # If the dtype is different from the input.
+        if dtype_mat != dtype:
+            # This needs to be made as a copy.
+            A = A.astype(dtype)
+
+    # Is the original matrix real?
+    complex_flag = any(iscomplex(A))
+
+    # The closed form for the 2x2 matrices.
+    if A.shape[-1] == 2:
+        eA = matrix_exponential_2x2(A)
+
+    # The Pade approximation for all larger matrices.
+    else:
+        eA = matrix_exponential_pade(A)
+
+    # Return the complex matrix.
+    if complex_flag:
+        return array(eA)
+
+    # Return only the real part.
+    else:
+        return array(eA.real)
+
+
+def matrix_exponential_2x2(A):
+    """Calculate the exact matrix exponential of 2x2 matrices using the closed form in terms of the matrix elements, for higher dimensional data.  This is of dimension [...][2][2].
+
+    For the matrix A = [[a, b], [c, d]], with m = (a+d)/2 and h = (a-d)/2, the matrix N = A - m.I satisfies N.N = delta^2.I with delta^2 = h^2 + b.c.  The exponential is therefore::
+
+        exp(A) = exp(m) . ( cosh(delta).I + sinh(delta)/delta . N ),
+
+    where the complex square root is used for delta, and sinh(delta)/delta is one for delta = 0.  This avoids the eigenvalue decomposition, and is exact for defective matrices.
+
+    As the principal square root has Re(delta) >= 0, the hyperbolic functions are evaluated as::
+
+        exp(m) . cosh(delta) = exp(m+delta) . (1 + exp(-2.delta)) / 2,
+        exp(m) . sinh(delta)/delta = -exp(m+delta) . expm1(-2.delta) / (2.delta),
+
+    so that only the dominant exponential exp(m+delta) can overflow.  This avoids the inf*0 = NaN of exp(m)*cosh(delta) when exp(m) underflows and cosh(delta) overflows, as for large exchange rates.
+
+
+    @param A:       The square matrix to calculate the matrix exponential of.
+    @type A:        numpy float or complex array of rank [...][2][2]
+    @return:        The matrix exponential.  This is complex and has the same dimensionality as the A matrix.
+    @rtype:         numpy complex array of rank [...][2][2]
+    """
+
+    # The matrix elements, as complex numbers.
+    a = A[..., 0, 0] + 0j
+    b = A[..., 0, 1] + 0j
+    c = A[..., 1, 0] + 0j
+    d = A[..., 1, 1] + 0j
+
+    # The mean and half difference of the diagonal, and the square root of the discriminant.
+    m = 0.5 * (a + d)
+    h = 0.5 * (a - d)
+    delta = sqrt(h**2 + b*c)
+
+    # The hyperbolic functions scaled by exp(m), with the limit of sinh(delta)/delta at zero.
+    zero = delta == 0.0
+    exp_max = exp(m + delta)
+    expm1_min = expm1(-2.0 * delta)
+    cosh_delta = exp_max * (1.0 + 0.5 * expm1_min)
+    sinhc_delta = exp_max * where(zero, 1.0, -expm1_min / where(zero, 1.0, 2.0 * delta))
+
+    # The exponential.
+    eA = zeros(a.shape + (2, 2), a.dtype)
+    eA[..., 0, 0] = cosh_delta + sinhc_delta * h
+    eA[..., 0, 1] = sinhc_delta * b
+    eA[..., 1, 0] = sinhc_delta * c
+    eA[..., 1, 1] = cosh_delta - sinhc_delta * h
+
+    # Return the exponential.
+    return eA
+
+
+def matrix_exponential_eig(A, dtype=None):
     """Calculate the exact matrix exponential using the eigenvalue decomposition approach, for higher dimensional data.  This of dimension [NE][NS][NM][NO][ND][X][X] or [NS][NM][NO][ND][X][X].
 
     Here X is the Row and Column length, of the outer square matrix.
@@ -203,7 +326,7 @@ def matrix_exponential(A, dtype=None):
     complex_flag = any(iscomplex(A))
 
     # If numpy is under 1.8, there would be a need to do eig(A) per matrix.
-    if float(version.version[:3]) < 1.8:
+    if not numpy_stacked_linalg():
         # Make array to store results
         if NE != None:
             if dtype != None:
@@ -309,98 +432,90 @@ def matrix_exponential(A, dtype=None):
         return array(eA.real)
 
 
-def matrix_exponential_rank_NS_NM_NO_ND_2_2(A, dtype=None):
-    """Calculate the exact matrix exponential using the closed form in terms of the matrix elements., for higher dimensional data.  This is of dimension [NS][NM][NO][ND][2][2].
+def matrix_exponential_pade(A):
+    """Calculate the matrix exponential using the scaling and squaring Pade approximation, for higher dimensional data.  This is of dimension [...][X][X].
+
+    This is the algorithm of Higham (2005), SIAM J. Matrix Anal. Appl., 26, 1179-1193 (doi: http://dx.doi.org/10.1137/04061101X).  If the 1-norms of all matrices are small enough, the lowest sufficient Pade degree of 3, 5, 7 or 9 is used for the whole stack without scaling.  Otherwise the degree 13 approximation is used, with each matrix scaled by its own power of two and the result squared back the same number of times.
 
-    Here X is the Row and Column length, of the outer square matrix.
 
     @param A:       The square matrix to calculate the matrix exponential of.
-    @type A:        numpy float array of rank [NS][NM][NO][ND][2][2]
-    @param dtype:   If provided, forces the calculation to use the data type specified.
-    @type dtype:    data-type, optional
-    @return:        The matrix exponential.  This will have the same dimensionality as the A matrix.
-    @rtype:         numpy float array of rank [NS][NM][NO][ND][2][2]
+    @type A:        numpy float or complex array of rank [...][X][X]
+    @return:        The matrix exponential.  This will have the same dimensionality and type as the A matrix.
+    @rtype:         numpy float or complex array of rank [...][X][X]
     """
 
-    # Extract shapes from data.
-    NS, NM, NO, ND, Row, Col = A.shape
-
-    # Convert dtype, if specified.
-    if dtype != None:
-        dtype_mat = A.dtype
-
-        # If the dtype is different from the input.
-        if dtype_mat != dtype:
-            # This needs to be made as a copy.
-            A = A.astype(dtype)
-
-    # Is the original matrix real?
-    complex_flag = any(iscomplex(A))
-
-    # Make array to store results
-    if dtype != None:
-        eA_mat = zeros([NS, NM, NO, ND, Row, Col], dtype)
+    # Extract shapes from data, and flatten the outer dimensions.
+    shape = A.shape
+    Row = shape[-1]
+    dtype = A.dtype
+    A = A.reshape(-1, Row, Row)
+
+    # The 1-norm of each matrix.
+    norm = abs(A).sum(axis=1).max(axis=1)
+
+    # The identity matrices.
+    eye_mat = zeros(A.shape, dtype)
+    eye_mat[:, arange(Row), arange(Row)] = 1.0
+
+    # The number of squarings of each matrix.
+    s = zeros(len(A), int)
+
+    # The lowest Pade degree for which all matrices are within the bound, without scaling.
+    for m in PADE_DEGREES[:-1]:
+        if not any(norm > PADE_THETA[m]):
+            # The even matrix powers, from the identity to A^(m-1).
+            b = PADE_COEFF[m]
+            A_pow = [eye_mat, einsum('...ij, ...jk', A, A)]
+            for j in range(2, (m+1)//2):
+                A_pow.append(einsum('...ij, ...jk', A_pow[-1], A_pow[1]))
+
+            # The odd and even parts of the Pade approximant.
+            U = b[1] * A_pow[0]
+            V = b[0] * A_pow[0]
+            for j in range(1, (m+1)//2):
+                U = U + b[2*j+1] * A_pow[j]
+                V = V + b[2*j] * A_pow[j]
+            U = einsum('...ij, ...jk', A, U)
+            break
+
+    # The degree 13 Pade approximant with scaling.
     else:
-        eA_mat = zeros([NS, NM, NO, ND, Row, Col], dtype)
+        # The scaling of each matrix by a power of two.
+        theta = PADE_THETA[13]
+        scale = (norm > theta) & isfinite(norm)
+        s[scale] = ceil(log2(norm[scale] / theta))
+        A = A * (0.5**s)[:, newaxis, newaxis]
 
-    # Get the data view, from the helper function.
-    A_view = data_view_via_striding_array_row_col(data_array=A)
+        # The even matrix powers.
+        b = PADE_COEFF[13]
+        A2 = einsum('...ij, ...jk', A, A)
+        A4 = einsum('...ij, ...jk', A2, A2)
+        A6 = einsum('...ij, ...jk', A2, A4)
 
-    # The index view could be pre formed in init.
-    index = create_index(NS=NS, NM=NM, NO=NO, ND=ND)
-    index_view = data_view_via_striding_array_col(data_array=index)
+        # The odd and even parts of the Pade approximant.
+        U = einsum('...ij, ...jk', A6, b[13]*A6 + b[11]*A4 + b[9]*A2) + b[7]*A6 + b[5]*A4 + b[3]*A2 + b[1]*eye_mat
+        U = einsum('...ij, ...jk', A, U)
+        V = einsum('...ij, ...jk', A6, b[12]*A6 + b[10]*A4 + b[8]*A2) + b[6]*A6 + b[4]*A4 + b[2]*A2 + b[0]*eye_mat
 
-    # Zip them together and iterate over them.
-    for A_i, index_i in zip(A_view, index_view):
-        a11 = A_i[0, 0]
-        a12 = A_i[0, 1]
-        a21 = A_i[1, 0]
-        a22 = A_i[1, 1]
+    # The Pade approximant.
+    eA = solve(V - U, V + U)
 
-        # Discriminant
-        a = 1
-        b = -a11 - a22
-        c = a11 * a22 - a12 * a21
-        dis = b**2 - 4*a*c
+    # Undo the scaling by repeated squaring of the scaled matrices.
+    if len(s):
+        for i in range(s.max()):
+            index = (s > i).nonzero()[0]
+            eA[index] = einsum('...ij, ...jk', eA[index], eA[index])
 
-        # If dis is positive: two distinct real roots
-        # If dis is zero: one distinct real roots
-        # If dis is negative: two complex roots
+    # Return the exponential with the original dimensions.
+    return eA.reshape(shape).astype(dtype)
 
-        # Eigenvalues lambda_1, lambda_2.
-        l1 = (-b + dis) / (2*a)
-        l2 = (-b - dis) / (2*a)
 
-        # Define M: M = V^-1 * [ [l1 0], [0 l2] ] * V
-        W_m = array([ [l1, 0], [0, l2] ])
+def numpy_stacked_linalg():
+    """Determine if the numpy linear algebra functions operate on stacks of matrices (numpy >= 1.8).
 
-        v1_1 = 1
-        v1_2 = (l1 - a11) / a12
-
-        v2_1 = 1
-        v2_2 = (l2 - a11) / a12
-
-        # normalized eigenvector
-        v1_1_norm = v1_1 / (sqrt(v1_1**2 + v1_2**2) )
-        v1_2_norm = v1_2 / (sqrt(v1_1**2 + v1_2**2) )
-        v2_1_norm = v2_1 / (sqrt(v2_1**2 + v2_2**2) )
-        v2_2_norm = v2_2 / (sqrt(v2_1**2 + v2_2**2) )
-
-        #V_m = array([ [v1_norm], [v2_norm] ])
-        V_m = array([ [v1_1_norm, v2_1_norm], [v1_2_norm, v2_2_norm] ])
-
-        V_inv_m = inv(V_m)
-
-        # Calculate the exact exponential.
-        dot_V_W = dot(V_m, W_m)
-        eA_m = dot(dot_V_W, V_inv_m)
-
-        # Save results.
-
-        # Extract index from index_view.
-        si, mi, oi, di = index_i
-
-        # Store the result.
-        eA_mat[si, mi, oi, di, :] = eA_m
+    @return:    True if the numpy linear algebra functions support stacks of matrices.
+    @rtype:     bool
+    """
 
-    return eA_mat
+    # Compare the major and minor version numbers.
+    return [int(val) for val in version.version.split('.')[:2]] >= [1, 8]
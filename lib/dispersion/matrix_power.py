@@ -25,7 +25,7 @@
 
 # Python module imports.
 from numpy.lib.stride_tricks import as_strided
-from numpy import float64, int16, zeros
+from numpy import arange, array, einsum, float64, int16, int64, zeros
 from numpy.linalg import matrix_power
 
 
@@ -48,6 +48,59 @@ def create_index(data):
     return index
 
 
+def matrix_power_rankN(data, power):
+    """Calculate the exact matrix power of all outer square matrices of the higher dimensional data at once, each raised to its own integer power.
+
+    The powers are calculated by binary exponentiation (repeated squaring) of the whole stack of matrices, so that the Python loop is over the bits of the largest power rather than over the matrices.  At each step, the matrix product is updated for all matrices with the current bit of their power set, and the matrices are squared.  Matrices for which all remaining bits of the power are zero are dropped from the stack.
+
+    Here X is the Row and Column length, of the outer square matrix.
+
+    @param data:        The square matrices to raise to the power.
+    @type data:         numpy float or complex array of rank [...][X][X]
+    @keyword power:     The non-negative integer power of each matrix.
+    @type power:        numpy int array of rank [...]
+    @return:            The matrix power.  This will have the same dimensionality and type as the data matrix.
+    @rtype:             numpy float or complex array of rank [...][X][X]
+    """
+
+    # Extract shapes from data.
+    shape = data.shape
+    Row = shape[-1]
+
+    # Flatten the outer dimensions, copying the powers as they are halved at each step.
+    data = data.reshape(-1, Row, Row)
+    power = array(power, int64).reshape(-1)
+
+    # Start with the identity matrices.
+    calc = zeros(data.shape, data.dtype)
+    calc[:, arange(Row), arange(Row)] = 1.0
+
+    # The index of the matrices with remaining bits of the power set.
+    index = power.nonzero()[0]
+    power = power[index]
+    data = data[index]
+
+    # Loop over the bits of the powers.
+    while len(index):
+        # Multiply the product by the current square for all odd powers.
+        odd = power % 2 == 1
+        calc[index[odd]] = einsum('...ij,...jk', calc[index[odd]], data[odd])
+
+        # Shift to the next bit, dropping the finished matrices.
+        power //= 2
+        active = power > 0
+        index = index[active]
+        power = power[active]
+
+        # Square the remaining matrices.
+        if len(index):
+            data = data[active]
+            data = einsum('...ij,...jk', data, data)
+
+    # Return the matrix powers with the original dimensions.
+    return calc.reshape(shape)
+
+
 def matrix_power_strided_rank_NE_NS_NM_NO_ND_x_x(data, power):
     """Calculate the exact matrix power by striding through higher dimensional data.  This of dimension [NE][NS][NM][NO][ND][X][X].
 
@@ -55,13 +55,12 @@ More information on the NS CPMG 2-site 3D full model can be found in the:
 """
 
 # Python module imports.
-from numpy import array, dot, fabs, float64, einsum, isfinite, log, min, multiply, rollaxis, sum
-from numpy.linalg import matrix_power
+from numpy import arange, array, fabs, float64, einsum, isfinite, log, maximum, min, multiply, newaxis, rollaxis, sum
 from numpy.ma import fix_invalid, masked_where
 
 # relax module imports.
-from lib.float import isNaN
 from lib.dispersion.matrix_exponential import matrix_exponential
+from lib.dispersion.matrix_power import matrix_power_rankN
 
 # Repetitive calculations (to speed up calculations).
 m_r10a = array([
@@ -312,41 +311,24 @@ def r2eff_ns_cpmg_2site_3D(r180x=None, M0=None, M0_T=None, r10a=0.0, r10b=0.0, r
     # Preform the initial magnetisation.
     evolution_matrix_T_M0_mat = einsum('...ij,...jk', M0_T, evolution_matrix_T_mat)
 
-    # Loop over the spins
-    for si in range(NS):
-        # Loop over the spectrometer frequencies.
-        for mi in range(NM):
-            # Extract number of points.
-            num_points_si_mi = int(num_points[0, si, mi, 0])
-
-            # Loop over the time points, back calculating the R2eff values.
-            for di in range(num_points_si_mi):
-                # Extract the values from the higher dimensional arrays.
-                inv_tcpmg_si_mi_di = inv_tcpmg[0, si, mi, 0, di]
-                power_si_mi_di = int(power[0, si, mi, 0, di])
-                r20a_si_mi_di = r20a[0, si, mi, 0, di]
-
-                # Initial magnetisation.
-                Mint_T_i = evolution_matrix_T_M0_mat[0, si, mi, 0, di]
-
-                # This matrix is a propagator that will evolve the magnetization with the matrix R for a delay tcp.
-                evolution_matrix_T_i = evolution_matrix_T_mat[0, si, mi, 0, di]
-
-                # Get which power to raise the matrix to.
-                l = int(power_si_mi_di-1)
-
-                # Raise the square evolution matrix to the power l.
-                evolution_matrix_T_power_i = matrix_power(evolution_matrix_T_i, l)
-
-                # Evolve the magnetisation.
-                Mint_T_i = dot(Mint_T_i, evolution_matrix_T_power_i)
-
-                # The next lines calculate the R2eff using a two-point approximation, i.e. assuming that the decay is mono-exponential.
-                Mx = Mint_T_i[0][1] / pA
-                if Mx <= 0.0 or isNaN(Mx):
-                    back_calc[0, si, mi, 0, di] = r20a_si_mi_di
-                else:
-                    back_calc[0, si, mi, 0, di] = - inv_tcpmg_si_mi_di * log(Mx)
+    # Raise the square evolution matrices of all dispersion points to the power l = power - 1 (the padding points past the end of each dispersion curve are raised to the zeroth power).
+    evolution_matrix_T_power_mat = matrix_power_rankN(evolution_matrix_T_mat, maximum(power - 1, 0))
+
+    # Evolve the magnetisation.
+    Mint_T_mat = einsum('...ij,...jk', evolution_matrix_T_M0_mat, evolution_matrix_T_power_mat)
+
+    # The next lines calculate the R2eff using a two-point approximation, i.e. assuming that the decay is mono-exponential.
+    Mx = Mint_T_mat[:, :, :, :, :, 0, 1] / pA
+
+    # The zero, negative and NaN magnetisations, for which the R2eff value is set to R20.
+    mask_Mx = ~(Mx > 0.0)
+    Mx[mask_Mx] = 1.0
+    r2eff = - inv_tcpmg * log(Mx)
+    r2eff[mask_Mx] = r20a[mask_Mx]
+
+    # Store the values of all points on the dispersion curves.
+    mask_points = arange(ND) < num_points[:, :, :, :, newaxis]
+    back_calc[mask_points] = r2eff[mask_points]
 
     # Replace data in array.
     # If dw is zero.
@@ -56,13 +56,11 @@ More information on the NS MMQ 3-site model can be found in the:
 """
 
 # Python module imports.
-from math import floor
-from numpy import array, conj, dot, einsum, float64, log, multiply
-from numpy.linalg import matrix_power
+from numpy import arange, array, conj, einsum, float64, log, maximum, multiply, newaxis, where
 
 # relax module imports.
-from lib.float import isNaN
 from lib.dispersion.matrix_exponential import matrix_exponential
+from lib.dispersion.matrix_power import matrix_power_rankN
 
 # Repetitive calculations (to speed up calculations).
 # R20.
@@ -284,7 +282,7 @@ def r2eff_ns_mmq_3site_mq(M0=None, F_vector=array([1, 0, 0], float64), R20A=None
     M0[2] = pC
 
     # Extract shape of experiment.
-    NS, NM, NO = num_points.shape
+    NS, NM, NO, ND = back_calc.shape
 
     # Populate the m1 and m2 matrices (only once per function call for speed).
     # D+ matrix component.
@@ -314,89 +312,37 @@ def r2eff_ns_mmq_3site_mq(M0=None, F_vector=array([1, 0, 0], float64), R20A=None
     M1_M2_M2_M1_star_mat = einsum('...ij, ...jk', M1_M2_star_mat, M2_M1_star_mat)
     M2_M1_M1_M2_star_mat = einsum('...ij, ...jk', M2_M1_star_mat, M1_M2_star_mat)
 
-    # Loop over spins.
-    for si in range(NS):
-        # Loop over the spectrometer frequencies.
-        for mi in range(NM):
-            # Loop over offsets:
-            for oi in range(NO):
-                # Extract parameters from array.
-                num_points_i = num_points[si, mi, oi]
-
-                # Loop over the time points, back calculating the R2eff values.
-                for i in range(num_points_i):
-                    # Extract data from array.
-                    power_i = int(power[si, mi, oi, i])
-                    M1_M2_i = M1_M2_mat[si, mi, oi, i]
-                    M1_M2_star_i = M1_M2_star_mat[si, mi, oi, i]
-                    M2_M1_i = M2_M1_mat[si, mi, oi, i]
-                    M2_M1_star_i = M2_M1_star_mat[si, mi, oi, i]
-                    M1_M2_M2_M1_i = M1_M2_M2_M1_mat[si, mi, oi, i]
-                    M2_M1_M1_M2_star_i = M2_M1_M1_M2_star_mat[si, mi, oi, i]
-                    M2_M1_M1_M2_i = M2_M1_M1_M2_mat[si, mi, oi, i]
-                    M1_M2_M2_M1_star_i = M1_M2_M2_M1_star_mat[si, mi, oi, i]
-
-                    # Special case of 1 CPMG block - the power is zero.
-                    if power_i == 1:
-                        # M1.M2.
-                        A = M1_M2_i
-
-                        # M1*.M2*.
-                        B = M1_M2_star_i
-
-                        # M2.M1.
-                        C = M2_M1_i
-
-                        # M2*.M1*.
-                        D = M2_M1_star_i
-
-                    # Matrices for even number of CPMG blocks.
-                    elif power_i % 2 == 0:
-                        # The power factor (only calculate once).
-                        fact = int(floor(power_i / 2))
-
-                        # (M1.M2.M2.M1)^(n/2).
-                        A = matrix_power(M1_M2_M2_M1_i, fact)
-
-                        # (M2*.M1*.M1*.M2*)^(n/2).
-                        B = matrix_power(M2_M1_M1_M2_star_i, fact)
-
-                        # (M2.M1.M1.M2)^(n/2).
-                        C = matrix_power(M2_M1_M1_M2_i, fact)
-
-                        # (M1*.M2*.M2*.M1*)^(n/2).
-                        D = matrix_power(M1_M2_M2_M1_star_i, fact)
-
-                    # Matrices for odd number of CPMG blocks.
-                    else:
-                        # The power factor (only calculate once).
-                        fact = int(floor((power_i - 1) / 2))
-
-                        # (M1.M2.M2.M1)^((n-1)/2).M1.M2.
-                        A = matrix_power(M1_M2_M2_M1_i, fact)
-                        A = dot(A, M1_M2_i)
-
-                        # (M1*.M2*.M2*.M1*)^((n-1)/2).M1*.M2*.
-                        B = matrix_power(M1_M2_M2_M1_star_i, fact)
-                        B = dot(B, M1_M2_star_i)
-
-                        # (M2.M1.M1.M2)^((n-1)/2).M2.M1.
-                        C = matrix_power(M2_M1_M1_M2_i, fact)
-                        C = dot(C, M2_M1_i)
-
-                        # (M2*.M1*.M1*.M2*)^((n-1)/2).M2*.M1*.
-                        D = matrix_power(M2_M1_M1_M2_star_i, fact)
-                        D = dot(D, M2_M1_star_i)
-
-                    # The next lines calculate the R2eff using a two-point approximation, i.e. assuming that the decay is mono-exponential.
-                    A_B = dot(A, B)
-                    C_D = dot(C, D)
-                    Mx = dot(dot(F_vector, (A_B + C_D)), M0)
-                    Mx = Mx.real / 2.0
-                    if Mx <= 0.0 or isNaN(Mx):
-                        back_calc[si, mi, oi, i] = 1e99
-                    else:
-                        back_calc[si, mi, oi, i]= -inv_tcpmg[si, mi, oi, i] * log(Mx / pA)
+    # The power factor for the even and odd number of CPMG blocks (for a single CPMG block, the odd case with a zeroth power), and the padding points past the end of each dispersion curve raised to the zeroth power.
+    fact = maximum(power, 0) // 2
+    odd = (power % 2 == 1)[..., newaxis, newaxis]
+
+    # The matrix powers of all dispersion points (the powers of the complex conjugate matrices are the complex conjugates of the powers).
+    M1_M2_M2_M1_power_mat = matrix_power_rankN(M1_M2_M2_M1_mat, fact)
+    M2_M1_M1_M2_power_mat = matrix_power_rankN(M2_M1_M1_M2_mat, fact)
+    M1_M2_M2_M1_star_power_mat = conj(M1_M2_M2_M1_power_mat)
+    M2_M1_M1_M2_star_power_mat = conj(M2_M1_M1_M2_power_mat)
+
+    # Matrices for even number of CPMG blocks, (M1.M2.M2.M1)^(n/2), (M2*.M1*.M1*.M2*)^(n/2), (M2.M1.M1.M2)^(n/2), and (M1*.M2*.M2*.M1*)^(n/2), or for odd number of CPMG blocks, (M1.M2.M2.M1)^((n-1)/2).M1.M2, (M1*.M2*.M2*.M1*)^((n-1)/2).M1*.M2*, (M2.M1.M1.M2)^((n-1)/2).M2.M1, and (M2*.M1*.M1*.M2*)^((n-1)/2).M2*.M1*.
+    A_mat = where(odd, einsum('...ij, ...jk', M1_M2_M2_M1_power_mat, M1_M2_mat), M1_M2_M2_M1_power_mat)
+    B_mat = where(odd, einsum('...ij, ...jk', M1_M2_M2_M1_star_power_mat, M1_M2_star_mat), M2_M1_M1_M2_star_power_mat)
+    C_mat = where(odd, einsum('...ij, ...jk', M2_M1_M1_M2_power_mat, M2_M1_mat), M2_M1_M1_M2_power_mat)
+    D_mat = where(odd, einsum('...ij, ...jk', M2_M1_M1_M2_star_power_mat, M2_M1_star_mat), M1_M2_M2_M1_star_power_mat)
+
+    # The next lines calculate the R2eff using a two-point approximation, i.e. assuming that the decay is mono-exponential.
+    A_B_mat = einsum('...ij, ...jk', A_mat, B_mat)
+    C_D_mat = einsum('...ij, ...jk', C_mat, D_mat)
+    Mx = einsum('i,...ij,j', F_vector, A_B_mat + C_D_mat, M0)
+    Mx = Mx.real / 2.0
+
+    # The zero, negative and NaN magnetisations, for which the R2eff value is set to 1e99.
+    mask_Mx = ~(Mx > 0.0)
+    Mx[mask_Mx] = pA
+    r2eff = -inv_tcpmg * log(Mx / pA)
+    r2eff[mask_Mx] = 1e99
+
+    # Store the values of all points on the dispersion curves.
+    mask_points = arange(ND) < num_points[:, :, :, newaxis]
+    back_calc[mask_points] = r2eff[mask_points]
 
 
 def r2eff_ns_mmq_3site_sq_dq_zq(M0=None, F_vector=array([1, 0, 0], float64), R20A=None, R20B=None, R20C=None, pA=None, pB=None, dw_AB=None, dw_BC=None, dwH_AB=None, dwH_BC=None, kex_AB=None, kex_BC=None, kex_AC=None, inv_tcpmg=None, tcp=None, back_calc=None, num_points=None, power=None):
@@ -468,7 +414,7 @@ def r2eff_ns_mmq_3site_sq_dq_zq(M0=None, F_vector=array([1, 0, 0], float64), R20
     M0[2] = pC
 
     # Extract shape of experiment.
-    NS, NM, NO = num_points.shape
+    NS, NM, NO, ND = back_calc.shape
 
     # Populate the m1 and m2 matrices (only once per function call for speed).
     # D+ matrix component.
@@ -485,28 +431,19 @@ def r2eff_ns_mmq_3site_sq_dq_zq(M0=None, F_vector=array([1, 0, 0], float64), R20
     evol_block_mat = einsum('...ij, ...jk', A_neg_mat, evol_block_mat)
     evol_block_mat = einsum('...ij, ...jk', A_pos_mat, evol_block_mat)
 
-    # Loop over spins.
-    for si in range(NS):
-        # Loop over the spectrometer frequencies.
-        for mi in range(NM):
-            # Loop over offsets:
-            for oi in range(NO):
-                # Extract parameters from array.
-                num_points_i = num_points[si, mi, oi]
-
-                # Loop over the time points, back calculating the R2eff values.
-                for i in range(num_points_i):
-                    # Extract data from array.
-                    power_i = int(power[si, mi, oi, i])
-                    evol_block_i = evol_block_mat[si, mi, oi, i]
-
-                    # The full evolution.
-                    evol = matrix_power(evol_block_i, power_i)
-
-                    # The next lines calculate the R2eff using a two-point approximation, i.e. assuming that the decay is mono-exponential.
-                    Mx = dot(F_vector, dot(evol, M0))
-                    Mx = Mx.real
-                    if Mx <= 0.0 or isNaN(Mx):
-                        back_calc[si, mi, oi, i] = 1e99
-                    else:
-                        back_calc[si, mi, oi, i] = -inv_tcpmg[si, mi, oi, i] * log(Mx / pA)
+    # The full evolution of all dispersion points (the padding points past the end of each dispersion curve are raised to the zeroth power).
+    evol_mat = matrix_power_rankN(evol_block_mat, maximum(power, 0))
+
+    # The next lines calculate the R2eff using a two-point approximation, i.e. assuming that the decay is mono-exponential.
+    Mx = einsum('i,...ij,j', F_vector, evol_mat, M0)
+    Mx = Mx.real
+
+    # The zero, negative and NaN magnetisations, for which the R2eff value is set to 1e99.
+    mask_Mx = ~(Mx > 0.0)
+    Mx[mask_Mx] = pA
+    r2eff = -inv_tcpmg * log(Mx / pA)
+    r2eff[mask_Mx] = 1e99
+
+    # Store the values of all points on the dispersion curves.
+    mask_points = arange(ND) < num_points[:, :, :, newaxis]
+    back_calc[mask_points] = r2eff[mask_points]
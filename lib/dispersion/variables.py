@@ -398,6 +398,14 @@ MODEL_LIST_DW_MIX_DOUBLE = [MODEL_LM63_3SITE, MODEL_MMQ_CR72, MODEL_NS_MMQ_2SITE
 MODEL_LIST_DW_MIX_QUADRUPLE = [MODEL_NS_MMQ_3SITE, MODEL_NS_MMQ_3SITE_LINEAR]
 """Models using parameters with mixed dw, and has four variables. For example with both dw_AB, dw_BC, dwH_AB and dwH_BC."""
 
+# The models with analytic chi-squared gradients and Hessians.
+MODEL_LIST_DERIVS = [MODEL_B14, MODEL_B14_FULL, MODEL_CR72, MODEL_CR72_FULL, MODEL_DPL94, MODEL_IT99, MODEL_LM63, MODEL_M61, MODEL_MP05, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01]
+"""The list of models for which the first and second partial derivatives of the chi-squared value are implemented, allowing gradient based optimisation."""
+
+# The models in which the R20 parameters enter linearly.
+MODEL_LIST_R20_LINEAR = [MODEL_B14, MODEL_CR72, MODEL_DPL94, MODEL_IT99, MODEL_LM63, MODEL_LM63_3SITE, MODEL_M61, MODEL_M61B, MODEL_MMQ_CR72, MODEL_MP05, MODEL_NS_CPMG_2SITE_3D, MODEL_NS_CPMG_2SITE_EXPANDED, MODEL_NS_CPMG_2SITE_STAR, MODEL_NS_MMQ_2SITE, MODEL_NS_MMQ_3SITE, MODEL_NS_MMQ_3SITE_LINEAR, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01]
+"""The list of models for which the back-calculated R2eff/R1rho values are linear in the single R20 (or R1rho') parameter of each experiment, spin and field, allowing these parameters to be profiled out of the optimisation by a closed-form linear least-squares solution.  The models with separate R20A and R20B parameters and the numeric R1rho models are not linear in these parameters."""
+
 # The models which currently support R1 fitting via target function switching.
 MODEL_LIST_FIT_R1 = [MODEL_NOREX, MODEL_DPL94, MODEL_TP02, MODEL_TAP03, MODEL_MP05, MODEL_NS_R1RHO_2SITE]
 
@@ -0,0 +1,295 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""Module for the simultaneous optimisation of many small and independent problems.
+
+The minfx library optimises a single target function at a time.  When the same model is fitted to a large number of independent data sets (for example the free spins of a relaxation dispersion analysis), the Python overhead of the many small optimisations dominates.  The algorithms of this module instead advance all problems together, with each iteration consisting of a single vectorised call to the target function, gradient and Hessian for the whole batch.  Problems which have converged are dropped from the batch, so that the remaining iterations only operate on the active problems.
+
+The grid search of this module similarly evaluates whole blocks of grid points in single calls to a vectorised target function, rather than calling the target function once per grid point.
+"""
+
+# Python module imports.
+from numpy import abs, arange, array, argmin, clip, diagonal, dot, einsum, float64, inf, isfinite, isnan, max, ones, prod, where, zeros
+from numpy.linalg import LinAlgError, pinv, solve
+
+
+def bounds_from_constraints(A=None, b=None, n=None):
+    """Convert linear constraints of the form A.x >= b consisting of simple parameter bounds into lower and upper bounds.
+
+    @keyword A: The linear constraint matrix A, or None if there are no constraints.
+    @type A:    numpy rank-2 float array or None
+    @keyword b: The linear constraint vector b.
+    @type b:    numpy rank-1 float array or None
+    @keyword n: The number of parameters.
+    @type n:    int
+    @return:    The lower and upper bounds, or None if the constraints are not simple parameter bounds.
+    @rtype:     tuple of numpy rank-1 float array or None
+    """
+
+    # No constraints.
+    lower = -inf * ones(n, float64)
+    upper = inf * ones(n, float64)
+    if A is None:
+        return lower, upper
+
+    # Loop over the constraints.
+    for i in range(len(A)):
+        # The constrained parameters.
+        index = A[i].nonzero()[0]
+
+        # A constraint involving more than one parameter.
+        if len(index) != 1:
+            return None
+
+        # The bound.
+        j = index[0]
+        bound = b[i] / A[i, j]
+        if A[i, j] > 0.0 and bound > lower[j]:
+            lower[j] = bound
+        elif A[i, j] < 0.0 and bound < upper[j]:
+            upper[j] = bound
+
+    # Return the bounds.
+    return lower, upper
+
+
+def grid_batch(func=None, lower=None, upper=None, inc=None, A=None, b=None, block_size=10000, verbosity=0):
+    """Grid search using a target function which evaluates a whole block of grid points at once.
+
+    The grid points are identical to those of the minfx grid search, with the first parameter varying the fastest, and the first grid point with the lowest target function value is returned.  Grid points violating the linear constraints A.x >= b are skipped.  The target function is called with the matrix of grid points of each block, one point per row, and must return the rank-1 array of target function values.
+
+
+    @keyword func:          The vectorised target function.
+    @type func:             func
+    @keyword lower:         The lower bounds of the grid search.
+    @type lower:            list of float
+    @keyword upper:         The upper bounds of the grid search.
+    @type upper:            list of float
+    @keyword inc:           The number of increments for each dimension of the grid.  For a single increment, the lower bound is used.
+    @type inc:              list of int
+    @keyword A:             The linear constraint matrix A, or None if there are no constraints.
+    @type A:                numpy rank-2 float array or None
+    @keyword b:             The linear constraint vector b.
+    @type b:                numpy rank-1 float array or None
+    @keyword block_size:    The maximum number of grid points passed to the target function at once.
+    @type block_size:       int
+    @keyword verbosity:     The amount of information to print.  The higher the value, the greater the verbosity.
+    @type verbosity:        int
+    @return:                The parameter vector and target function value of the grid point with the lowest value, the number of target function evaluations, and the warning (None).
+    @rtype:                 numpy rank-1 float array, float, int, None
+    """
+
+    # The grid values of each dimension.
+    n = len(inc)
+    values = []
+    for j in range(n):
+        if inc[j] == 1:
+            values.append(array([lower[j]], float64))
+        else:
+            values.append(lower[j] + arange(inc[j]) * ((upper[j] - lower[j]) / (inc[j] - 1.0)))
+
+    # The total number of grid points, and the stride of each dimension in the flat grid point index.
+    total = int(prod(inc))
+    strides = [int(prod(inc[:j])) for j in range(n)]
+
+    # Printout.
+    if verbosity:
+        print("Searching through %i grid nodes." % total)
+
+    # Loop over the blocks of grid points.
+    min_params = None
+    f_min = inf
+    f_count = 0
+    for start in range(0, total, block_size):
+        # The grid points of the block.
+        index = arange(start, min(start + block_size, total))
+        points = zeros((len(index), n), float64)
+        for j in range(n):
+            points[:, j] = values[j][(index // strides[j]) % inc[j]]
+
+        # Remove the grid points violating the constraints.
+        if A is not None:
+            points = points[(dot(points, A.T) - b).min(axis=1) >= 0.0]
+            if not len(points):
+                continue
+
+        # The target function values.
+        f = func(points)
+        f_count += len(points)
+        f[isnan(f)] = inf
+
+        # The first lowest value.
+        i = argmin(f)
+        if min_params is None or f[i] < f_min:
+            min_params = points[i]
+            f_min = f[i]
+
+    # No grid points satisfying the constraints.
+    if min_params is None:
+        return array(lower, float64), inf, f_count, "No grid points satisfy the constraints."
+
+    # Printout.
+    if verbosity:
+        print("Minimum found at %s with a function value of %s." % (list(min_params), f_min))
+
+    # Return the results.
+    return min_params, f_min, f_count, None
+
+
+def newton_batch(func=None, dfunc=None, d2func=None, x0=None, lower=None, upper=None, func_tol=1e-25, grad_tol=None, maxiter=1e6, mu=1e-3, mu_max=1e10):
+    """Bound constrained and damped Newton optimisation of a batch of independent problems.
+
+    Each iteration solves the Marquardt damped Newton equations::
+
+        (H + mu.diag(|H|)) . dx = -g,
+
+    for all active problems at once, where g is the gradient, H is the Hessian and mu is the damping factor of each problem.  Parameters at a bound with the gradient pointing out of the bounds are held fixed for the step, and the new position is projected onto the parameter bounds and accepted if the target function decreases, after which the damping factor is decreased.  Otherwise the position is rejected and the damping factor increased, moving the step towards a short steepest descent step.  A problem has converged once the decrease of the target function is less than or equal to the function tolerance, the projected gradient norm is less than the gradient tolerance, or when the damping factor exceeds mu_max as no lower position can be found.
+
+    The target function, gradient and Hessian functions are called with the parameter matrix of the active problems and the indices of these problems in the batch, for example func(x, index), and must respectively return the rank-1, rank-2 and rank-3 arrays of the target function values, gradients and Hessians of these problems.  Positions for which the target function is undefined should have a target function value of infinity.  The gradients and Hessians are only recalculated for the problems whose position has changed, i.e. after an accepted step, as a rejected step only changes the damping factor.
+
+
+    @keyword func:      The target function.
+    @type func:         func
+    @keyword dfunc:     The gradient function.
+    @type dfunc:        func
+    @keyword d2func:    The Hessian function.
+    @type d2func:       func
+    @keyword x0:        The initial parameter matrix, with the first dimension corresponding to the problem.
+    @type x0:           numpy rank-2 float array
+    @keyword lower:     The lower parameter bounds, common to all problems.
+    @type lower:        numpy rank-1 float array or None
+    @keyword upper:     The upper parameter bounds, common to all problems.
+    @type upper:        numpy rank-1 float array or None
+    @keyword func_tol:  The function tolerance which, when reached, terminates the optimisation of a problem.
+    @type func_tol:     float
+    @keyword grad_tol:  The projected gradient tolerance which, when reached, terminates the optimisation of a problem.  Setting this to None turns off the check.
+    @type grad_tol:     None or float
+    @keyword maxiter:   The maximum number of iterations for each problem.
+    @type maxiter:      int
+    @keyword mu:        The initial damping factor.
+    @type mu:           float
+    @keyword mu_max:    The maximum damping factor, at which a problem is considered as converged.
+    @type mu_max:       float
+    @return:            The optimised parameter matrix, the target function values, and the iteration, function, gradient and Hessian counts and warnings for each problem.
+    @rtype:             numpy rank-2 float array, numpy rank-1 float array, numpy rank-1 int array, numpy rank-1 int array, numpy rank-1 int array, numpy rank-1 int array, list of str or None
+    """
+
+    # The dimensions and bounds.
+    N, n = x0.shape
+    if lower is None:
+        lower = -inf * ones(n, float64)
+    if upper is None:
+        upper = inf * ones(n, float64)
+
+    # Initialise the batch.
+    x = clip(x0, lower, upper)
+    f = func(x, arange(N))
+    damping = mu * ones(N, float64)
+    iter_count = zeros(N, int)
+    f_count = ones(N, int)
+    g_count = zeros(N, int)
+    h_count = zeros(N, int)
+    warnings = [None] * N
+
+    # The gradients and Hessians of the current positions, and the flags for the problems for which these need to be recalculated.
+    grad = zeros((N, n), float64)
+    hess = zeros((N, n, n), float64)
+    stale = ones(N, bool)
+
+    # The active problems (excluding the undefined starting positions).
+    active = isfinite(f).nonzero()[0]
+    for i in (~isfinite(f)).nonzero()[0]:
+        warnings[i] = "Infinite function value encountered."
+
+    # Iterate until all problems have converged.
+    while len(active):
+        # Maximum number of iterations.
+        done = iter_count[active] >= maxiter
+        for i in active[done]:
+            warnings[i] = "Maximum number of iterations reached"
+        active = active[~done]
+        if not len(active):
+            break
+
+        # The gradients and Hessians of the active problems, only recalculated for the new positions.
+        update = active[stale[active]]
+        if len(update):
+            grad[update] = dfunc(x[update], update)
+            hess[update] = d2func(x[update], update)
+            g_count[update] += 1
+            h_count[update] += 1
+            stale[update] = False
+        xa = x[active]
+        g = grad[active]
+        H = hess[active]
+
+        # Projected gradient convergence.
+        if grad_tol != None:
+            pg = xa - clip(xa - g, lower, upper)
+            done = einsum('ij,ij->i', pg, pg)**0.5 < grad_tol
+            active = active[~done]
+            if not len(active):
+                break
+            xa, g, H = xa[~done], g[~done], H[~done]
+
+        # The parameters held at the bounds, which are excluded from the Newton step.
+        fixed = ((xa <= lower) & (g > 0.0)) | ((xa >= upper) & (g < 0.0))
+        g = where(fixed, 0.0, g)
+        H = where(fixed[:, :, None] | fixed[:, None, :], 0.0, H)
+
+        # The Marquardt damping of the Hessian diagonal.
+        diag = abs(diagonal(H, axis1=1, axis2=2))
+        diag = diag + 1e-10 * max(diag, axis=1)[:, None] + 1e-300
+        H_damped = H.copy()
+        index = arange(n)
+        H_damped[:, index, index] += damping[active][:, None] * diag
+        H_damped[:, index, index] += fixed
+
+        # The damped Newton steps.
+        try:
+            dx = -solve(H_damped, g[:, :, None])[:, :, 0]
+        except LinAlgError:
+            dx = zeros(g.shape, float64)
+            for i in range(len(active)):
+                dx[i] = -pinv(H_damped[i]).dot(g[i])
+
+        # The new positions, projected onto the bounds.
+        x_new = clip(xa + dx, lower, upper)
+        f_new = func(x_new, active)
+        iter_count[active] += 1
+        f_count[active] += 1
+
+        # Accept the positions which decrease the target function.
+        accept = f_new < f[active]
+        decrease = f[active] - f_new
+        x[active[accept]] = x_new[accept]
+        f[active[accept]] = f_new[accept]
+        stale[active[accept]] = True
+        damping[active[accept]] = damping[active[accept]] * 0.1
+        damping[active[~accept]] = damping[active[~accept]] * 10.0
+
+        # Convergence.
+        done = (accept & (decrease <= func_tol)) | (damping[active] > mu_max)
+        active = active[~done]
+
+    # Return the results.
+    return x, f, iter_count, f_count, g_count, h_count, warnings
@@ -26,7 +26,7 @@
 1 Introduction
 ==============
 
-This package is an abstraction of specific multi-processor implementations or fabrics such as MPI via mpi4py.  It is designed to be extended for use on other fabrics such as grid computing via SSH tunnelling, threading, etc.  It also has a uni-processor mode as the default fabric.
+This package is an abstraction of specific multi-processor implementations or fabrics such as MPI via mpi4py.  It is designed to be extended for use on other fabrics such as grid computing via SSH tunnelling, threading, etc.  It also has a uni-processor mode as the default fabric, and a local multi-core fabric via the Python multiprocessing module for when no MPI implementation is available.
 
 
 2 API
@@ -101,6 +101,12 @@ To execute the calculations, the final part of the calculation code on the maste
     processor_box.processor.run_queue().
 
 
+3.4 Crash-safe journal
+----------------------
+
+Long calculations can be protected against crashes and pre-emption by setting a journal file via the processor's set_journal() method (or the relax --journal command line option).  All slave commands which provide a stable identity via the Slave_command.identity() method, and which are queued with a memo, will have their results recorded in this file as soon as they complete.  When the program is restarted with the same journal file, the results of these commands are replayed on the master and only the missing commands are sent to the slaves.
+
+
 4 Example
 =========
 
@@ -118,15 +124,20 @@ This appears to be an OpenMPI problem with late 2.6 Linux kernels.
 """
 
 
-__all__ = ['memo',
+__all__ = ['journal',
+           'memo',
            'misc',
+           'mpi4py_hybrid_processor',
            'mpi4py_processor',
+           'multiprocess_processor',
            'multi_processor_base',
            'processor',
            'processor_io',
            'result_commands',
            'result_queue',
+           'shared_data',
            'slave_commands',
+           'telemetry',
            'uni_processor']
 
 # Python module imports.
@@ -164,7 +175,7 @@ def load_multiprocessor(processor_name, callback, processor_size, verbosity=1):
     """
 
     # Check that the processor type is supported.
-    if processor_name not in ['uni', 'mpi4py']:
+    if processor_name not in ['uni', 'mpi4py', 'mpi4py_hybrid', 'multiprocess']:
         _sys.stderr.write("The processor type '%s' is not supported.\n" % processor_name)
         _sys.exit()
 
@@ -198,6 +209,44 @@ def load_multiprocessor(processor_name, callback, processor_size, verbosity=1):
     return object
 
 
+def cache_data(name=None, value=None):
+    """API function for placing static data into the versioned data cache of the master processor.
+
+    The name and returned version should be stored in the slave commands in place of the data, as the cache_name and cache_version attributes, and the data obtained on the slaves via the fetch_cached_data() function.  The data is sent to each slave together with the first command using it, and is evicted once the last command using it has completed.
+
+    @keyword name:  The unique name of the data.
+    @type name:     str
+    @keyword value: The static data.
+    @type value:    anything picklable
+    @return:        The version of the cached data.
+    @rtype:         str
+    """
+
+    # Load the Processor_box.
+    processor_box = Processor_box()
+
+    # Forward the call to the processor instance.
+    return processor_box.processor.cache_data(name=name, value=value)
+
+
+def fetch_cached_data(name=None, version=None):
+    """API function for obtaining data from the versioned data cache of the current processor.
+
+    @keyword name:      The unique name of the data.
+    @type name:         str
+    @keyword version:   The version of the data, as returned by cache_data().
+    @type version:      str
+    @return:            The cached data.
+    @rtype:             anything
+    """
+
+    # Load the Processor_box.
+    processor_box = Processor_box()
+
+    # Forward the call to the processor instance.
+    return processor_box.processor.fetch_cached_data(name=name, version=version)
+
+
 def fetch_data(name=None):
     """API function for obtaining data from the Processor instance's data store.
 
@@ -256,6 +305,45 @@ def send_data_to_slaves(name=None, value=None):
     processor_box.processor.send_data_to_slaves(name=name, value=value)
 
 
+def release_shared_array(handle=None):
+    """API function for releasing a shared array on the master and all slave processors.
+
+    @attention:     Inter-processor communications may be performed.
+
+    @keyword handle:    The handle of the shared array, as returned by share_array().
+    @type handle:       multi.shared_data.Shared_array instance
+    """
+
+    # Load the Processor_box.
+    processor_box = Processor_box()
+
+    # Forward the call to the processor instance.
+    processor_box.processor.release_shared_array(handle)
+
+
+def share_array(name=None, value=None):
+    """API function for publishing a large read-only numpy array to all slave processors.
+
+    The array is transferred once and, depending on the processor fabric, placed in shared memory.  The returned handle should be stored in the slave commands in place of the array, and the array obtained on the slaves via the handle's get() method or the multi.shared_data.fetch_shared() function.
+
+
+    @attention:     Inter-processor communications are performed.
+
+    @keyword name:  The unique name of the shared array.
+    @type name:     str
+    @keyword value: The array to share.
+    @type value:    numpy array
+    @return:        The handle of the shared array.
+    @rtype:         multi.shared_data.Shared_array instance
+    """
+
+    # Load the Processor_box.
+    processor_box = Processor_box()
+
+    # Forward the call to the processor instance.
+    return processor_box.processor.share_array(name=name, value=value)
+
+
 
 class Application_callback(object):
     """Call backs provided to the host application by the multi processor framework.
@@ -0,0 +1,131 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""Module containing the crash-safe on-disk journal of completed slave commands.
+
+The journal is an append-only file of pickled records, each consisting of the identity of a slave command, as returned by its Slave_command.identity() method, and the list of result commands returned for it.  Each record is flushed and synchronised to disk as soon as it is written, so that a crashed or pre-empted run loses at most the commands which were running.  When relax is restarted with the same journal file, the results of the journalled commands are replayed on the master and only the missing commands are dispatched to the slaves.
+"""
+
+# Python module imports.
+import os
+import pickle
+
+
+class Job_journal(object):
+    """The on-disk journal of completed slave commands."""
+
+    def __init__(self, file_name=None):
+        """Set up the journal, loading all records of a previous run.
+
+        @keyword file_name: The name of the journal file.  This will be created if it does not exist.
+        @type file_name:    str
+        """
+
+        # Store the arguments.
+        self.file_name = file_name
+
+        # The results of the completed commands, keyed by command identity.
+        self.records = {}
+
+        # Load the previous records.
+        if os.path.exists(file_name):
+            self.load()
+
+        # Open the file for appending.
+        self.file = open(file_name, 'ab')
+
+
+    def close(self):
+        """Close the journal file."""
+
+        # Close the file.
+        if self.file != None:
+            self.file.close()
+            self.file = None
+
+
+    def has(self, identity):
+        """Determine if the command of the given identity has been completed.
+
+        @param identity:    The command identity.
+        @type identity:     str
+        @return:            True if the results of the command are in the journal.
+        @rtype:             bool
+        """
+
+        return identity in self.records
+
+
+    def load(self):
+        """Load all complete records from the journal file.
+
+        A truncated final record, as left by a crash during writing, is ignored and removed from the file so that new records can be appended.
+        """
+
+        # Read the records.
+        file = open(self.file_name, 'rb')
+        end = 0
+        while True:
+            try:
+                identity, results = pickle.load(file)
+            except (EOFError, pickle.UnpicklingError):
+                break
+            self.records[identity] = results
+            end = file.tell()
+
+        # Truncate any partial record.
+        file.seek(0, os.SEEK_END)
+        if file.tell() != end:
+            file.close()
+            file = open(self.file_name, 'r+b')
+            file.truncate(end)
+        file.close()
+
+
+    def record(self, identity, results):
+        """Record the results of a completed command.
+
+        @param identity:    The command identity.
+        @type identity:     str
+        @param results:     The result commands returned by the command.
+        @type results:      list of Result_command instances
+        """
+
+        # Store the results.
+        self.records[identity] = results
+
+        # Write the record, and force it onto the disk.
+        pickle.dump((identity, results), self.file, 2)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+
+    def results(self, identity):
+        """Return the results of the completed command.
+
+        @param identity:    The command identity.
+        @type identity:     str
+        @return:            The result commands returned by the command.
+        @rtype:             list of Result_command instances
+        """
+
+        return self.records[identity]
@@ -27,14 +27,28 @@ This is for internal use only.  To access the multi-processor API, see the __ini
 """
 
 # Python module imports.
+from hashlib import md5
 try:
     import importlib
 except:
     importlib = None
+import pickle
 import sys
 import traceback, textwrap
 
 
+def checksum(value):
+    """Return a checksum of the pickled data, for the identification of the data across processors and program runs.
+
+    @param value:   The data.
+    @type value:    anything picklable
+    @return:        The hexadecimal MD5 checksum.
+    @rtype:         str
+    """
+
+    return md5(pickle.dumps(value, 2)).hexdigest()
+
+
 def import_module(module_path):
     """Import the python module named by module_path.
 
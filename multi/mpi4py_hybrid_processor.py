@@ -0,0 +1,228 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""The hybrid two-level processor fabric, using MPI between the nodes and local worker processes within each node.
+
+The master is MPI rank 0 and each other MPI rank acts as a sub-master for one node.  The program should hence be started with one MPI rank per node plus the master, for example via the '--map-by ppr:1:node' or equivalent options of the MPI launcher.  Each sub-master starts local worker processes via the multiprocessing module, using the multiprocess fabric internally, and the commands sent to the node are executed on these workers.  Hence the master only communicates with one process per node, the commands and results are batched per node, and the master's pickling and result receipt is reduced accordingly.
+
+Commands which modify the state of the slave processor itself (the data store, the data cache, shared arrays and the telemetry flag) are executed on the sub-master and on all of its local workers.  Shared arrays are sent once to each node and placed in a node-local shared memory segment for the workers.
+"""
+
+# Python module imports.
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+# multi module imports.
+from multi.misc import Verbosity; verbosity = Verbosity()
+from multi.mpi4py_processor import MPI, Mpi4py_processor
+from multi.multi_processor_base import Multi_processor
+from multi.multiprocess_processor import Multiprocess_processor
+from multi.result_commands import Batched_result_command, Result_exception
+from multi.slave_commands import Data_cache_clear_command, Exit_command, Shared_array_command, Shared_array_release_command, Slave_storage_command, Telemetry_command
+
+
+class Mpi4py_hybrid_processor(Mpi4py_processor):
+    """The hybrid MPI and local multi-core processor class."""
+
+    def __init__(self, processor_size, callback):
+        """Initialise the hybrid processor.
+
+        @param processor_size:  The number of local worker processes per node.  The default value of -1 from the command line will cause one worker to be created per CPU core of the node.
+        @type processor_size:   int
+        @param callback:        The application callback.
+        @type callback:         multi.Application_callback instance
+        """
+
+        # The multiprocessing module is required.
+        if multiprocessing == None:
+            raise Exception("The multiprocessing Python module is not available, the hybrid processor fabric cannot be used.")
+
+        # The number of local workers per node.
+        self._local_size = processor_size
+
+        # Initialise the base class, with one slave per MPI rank (the requested number of processors refers to the local workers).
+        super(Mpi4py_hybrid_processor, self).__init__(processor_size=-1, callback=callback)
+
+        # The sub-master's local multiprocess fabric, created by self.pre_run().
+        self._local = None
+
+        # The handles of the node-local shared arrays, keyed by the shared array name.
+        self._local_handles = {}
+
+
+    def _local_global_command(self, command):
+        """Execute a command modifying the state of the slave processor on the sub-master and all local workers.
+
+        @param command: The slave command.
+        @type command:  Slave_command instance
+        """
+
+        # Exit, shutting down the local workers.
+        if isinstance(command, Exit_command):
+            command.run(self, True)
+            self._local._shutdown_slaves()
+
+        # Shared arrays, placed into node-local shared memory.
+        elif isinstance(command, Shared_array_command):
+            command.run(self, True)
+            self._local_handles[command.handle.name] = self._local.share_array(name=command.handle.name, value=self._shared_arrays[command.handle.name])
+            self._local.run_command_globally(Shared_array_command(handle=self._local_handles[command.handle.name]))
+
+        # Release of the shared arrays.
+        elif isinstance(command, Shared_array_release_command):
+            command.run(self, True)
+            if command.handle.name in self._local_handles:
+                self._local.release_shared_array(self._local_handles.pop(command.handle.name))
+
+        # Clearing of the data cache, together with the tracking of the data held by the local workers.
+        elif isinstance(command, Data_cache_clear_command):
+            command.run(self, True)
+            self._local.flush_cached_data()
+
+        # All other commands.
+        else:
+            command.run(self, True)
+            self._local.run_command_globally(command)
+
+
+    def get_intro_string(self):
+        """Return the string to append to the end of the relax introduction string.
+
+        @return:    The string describing this Processor fabric.
+        @rtype:     str
+        """
+
+        # Get the specific MPI version.
+        version_info = MPI.Get_version()
+
+        # The vendor info.
+        vendor = MPI.get_vendor()
+        vendor_name = vendor[0]
+        vendor_version = str(vendor[1][0])
+        for i in range(1, len(vendor[1])):
+            vendor_version = vendor_version + '.%i' % vendor[1][i]
+
+        # The number of local workers.
+        local_size = self._local_size
+        if local_size == -1:
+            local_size = 'CPU count'
+
+        # Return the string.
+        return "Hybrid MPI %s.%s running via mpi4py with %i node sub-masters & 1 master, and local worker processes per node (%s).  Using %s %s." % (version_info[0], version_info[1], self.processor_size(), local_size, vendor_name, vendor_version)
+
+
+    def pre_run(self):
+        """Start the local worker processes on the node sub-masters prior to the execution of the main loop."""
+
+        # Execute the base class method.
+        super(Mpi4py_hybrid_processor, self).pre_run()
+
+        # Only the sub-masters start local workers.
+        if self.on_master():
+            return
+
+        # The local multiprocess fabric, with the sub-master as its master.
+        self._local = Multiprocess_processor(processor_size=self._local_size, callback=None)
+        self._local.pre_run()
+
+        # The local fabric shares the data cache of the sub-master, for sending the cached data to the local workers.
+        self._local._data_cache = self._data_cache
+
+
+    def share_array(self, name=None, value=None):
+        """Publish a large read-only numpy array to all slaves.
+
+        The array is sent once to each node sub-master, which places it into a node-local shared memory segment for its local workers.
+
+
+        @keyword name:  The unique name of the shared array.  Sharing a new array with the same name replaces the old one.
+        @type name:     str
+        @keyword value: The array to share.
+        @type value:    numpy array
+        @return:        The handle of the shared array.
+        @rtype:         multi.shared_data.Shared_array instance
+        """
+
+        # Send one copy to each sub-master.
+        return Multi_processor.share_array(self, name=name, value=value)
+
+
+    def slave_execute_commands(self, commands):
+        """Execute the commands received from the master on the local workers of the node.
+
+        The commands are chunked and dispatched to the local workers as they become idle, and all of their results and IO are collected for a single batched return to the master.
+
+
+        @param commands:    The commands from the master.
+        @type commands:     list of Slave_command instances
+        """
+
+        # Commands modifying the state of the slave processor.
+        global_commands = (Data_cache_clear_command, Exit_command, Shared_array_command, Shared_array_release_command, Slave_storage_command, Telemetry_command)
+        if len(commands) == 1 and isinstance(commands[0], global_commands):
+            self._local_global_command(commands[0])
+            return
+
+        # Store the cached data sent with the commands, passing the evictions on to the local workers.
+        for command in commands:
+            for name in getattr(command, 'cache_evict', []):
+                self._local.evict_cached_data(name=name)
+            self.receive_cached_data(command)
+
+        # The local queue.
+        queue = self._local.chunk_queue(commands)
+        if self._local.longest_job_first:
+            queue = sorted(queue, key=self._local.command_cost)
+
+        # Dispatch the commands to the local workers as they become idle.
+        running_set = set()
+        idle_set = set(range(1, self._local.processor_size()+1))
+        while len(queue) != 0 or len(running_set) != 0:
+            # Feed all idle workers.
+            while len(idle_set) != 0 and len(queue) != 0:
+                dest = idle_set.pop()
+                command = queue.pop()
+                self._local.attach_cached_data(command, dest)
+                self._local.master_queue_command(command=command, dest=dest)
+                running_set.add(dest)
+
+            # Get the next result.
+            result = self._local.master_receive_result()
+
+            # A worker failure.
+            if isinstance(result, Result_exception):
+                raise result.exception
+
+            # Shift the worker to the idle set.
+            if result.completed:
+                idle_set.add(result.rank)
+                running_set.remove(result.rank)
+
+            # Collect the results and IO for the batched return to the master.
+            if isinstance(result, Batched_result_command):
+                self.result_list.extend(result.result_commands)
+                if result.io_data:
+                    self.io_data.extend(result.io_data)
+            else:
+                self.result_list.append(result)
@@ -32,11 +32,17 @@ try:
     from mpi4py import MPI
 except ImportError:
     MPI = None
+try:
+    from mpi4py.util import pkl5
+except ImportError:
+    pkl5 = None
+from numpy import ascontiguousarray, dtype, ndarray
 import os
 import sys
 
 # relax module imports.
-from multi.slave_commands import Exit_command
+from multi.shared_data import create_handle
+from multi.slave_commands import Exit_command, Shared_array_command
 from multi.multi_processor_base import Multi_processor, Too_few_slaves_exception
 
 
@@ -64,22 +70,64 @@ class Mpi4py_processor(Multi_processor):
         # Initialise a flag for determining if we are in the run() method or not.
         self.in_main_loop = False
 
+        # The communicator for the commands and results.  With pickle protocol 5 (mpi4py 3.1 and Python 3.8 or higher), large numpy arrays are sent as raw out-of-band buffers rather than being copied into the pickle byte string.
+        self._comm = MPI.COMM_WORLD
+        if pkl5 != None:
+            self._comm = pkl5.Intracomm(MPI.COMM_WORLD)
+
+        # The MPI-3 node-local shared memory windows, keyed by the shared array name.
+        self._windows = {}
+
+        # Set up the communicators for the node-local shared memory (this is collective over all ranks).
+        self._node_comm = None
+        self._leader_comm = None
+        if hasattr(MPI, 'COMM_TYPE_SHARED') and hasattr(MPI.Win, 'Allocate_shared'):
+            # The communicator between the slaves of one node.
+            world = MPI.COMM_WORLD
+            slave_comm = world.Split(color=int(world.rank != 0), key=world.rank)
+            if world.rank != 0:
+                self._node_comm = slave_comm.Split_type(MPI.COMM_TYPE_SHARED, key=world.rank)
+
+            # The communicator between the master and the first slave of each node.
+            leader = (world.rank == 0 or self._node_comm.rank == 0)
+            color = MPI.UNDEFINED
+            if leader:
+                color = 0
+            self._leader_comm = world.Split(color=color, key=world.rank)
+
 
     def _broadcast_command(self, command):
         for i in range(1, MPI.COMM_WORLD.size):
             if i != 0:
-                MPI.COMM_WORLD.send(obj=command, dest=i)
+                self._comm.send(obj=command, dest=i)
 
 
     def _ditch_all_results(self):
         for i in range(1, MPI.COMM_WORLD.size):
             if i != 0:
                 while True:
-                    result = MPI.COMM_WORLD.recv(source=i)
+                    result = self._comm.recv(source=i)
                     if result.completed:
                         break
 
 
+    def _free_window(self, name):
+        """Free the node-local shared memory window of the given shared array on the slave.
+
+        @param name:    The name of the shared array.
+        @type name:     str
+        """
+
+        # Nothing to do.
+        if name not in self._windows:
+            return
+
+        # Remove the array, then free the window (collective over the node).
+        if name in self._shared_arrays:
+            del self._shared_arrays[name]
+        self._windows.pop(name).Free()
+
+
     def abort(self):
         MPI.COMM_WORLD.Abort()
 
@@ -168,8 +216,8 @@ class Mpi4py_processor(Multi_processor):
         @type dest:     int
         """
 
-        # Use a basic MPI send call to transfer the result command.
-        MPI.COMM_WORLD.send(obj=command, dest=dest)
+        # Send the command (large numpy arrays are transferred as out-of-band buffers).
+        self._comm.send(obj=command, dest=dest)
 
 
     def master_receive_result(self):
@@ -182,15 +230,71 @@ class Mpi4py_processor(Multi_processor):
         """
 
         # Catch and return the result command.
-        return MPI.COMM_WORLD.recv(source=MPI.ANY_SOURCE)
+        return self._comm.recv(source=MPI.ANY_SOURCE)
 
 
     def rank(self):
         return MPI.COMM_WORLD.rank
 
 
+    def receive_shared_array(self, handle, value):
+        """Receive the broadcast array on the slave into a node-local shared memory window.
+
+        This is collective over all slaves, as the command is sent to each slave exactly once.
+
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        @param value:   The array data, if sent with the command.
+        @type value:    numpy array or None
+        """
+
+        # The data was sent with the command.
+        if value is not None:
+            return super(Mpi4py_processor, self).receive_shared_array(handle, value)
+
+        # Free an old version of the array.
+        self._free_window(handle.name)
+
+        # Allocate the window, with the memory owned by the first slave of the node.
+        itemsize = dtype(handle.dtype).itemsize
+        size = 0
+        if self._node_comm.rank == 0:
+            size = handle.nbytes()
+        window = MPI.Win.Allocate_shared(size, itemsize, comm=self._node_comm)
+        buf, itemsize = window.Shared_query(0)
+        array = ndarray(shape=handle.shape, dtype=handle.dtype, buffer=buf)
+
+        # The first slave of each node receives the data from the master.
+        if self._node_comm.rank == 0:
+            self._leader_comm.Bcast(array, root=0)
+
+        # Wait for the data, then make it read-only.
+        self._node_comm.Barrier()
+        array.flags.writeable = False
+
+        # Store the window and array.
+        self._windows[handle.name] = window
+        self._shared_arrays[handle.name] = array
+
+
+    def release_shared_array(self, handle):
+        """Release the shared array on the master and all slaves, freeing the shared memory windows.
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        """
+
+        # Free the window on the slave (this is collective over the node).
+        if self.on_slave():
+            self._free_window(handle.name)
+
+        # Base class method.
+        super(Mpi4py_processor, self).release_shared_array(handle)
+
+
     def return_result_command(self, result_object):
-        MPI.COMM_WORLD.send(obj=result_object, dest=0)
+        self._comm.send(obj=result_object, dest=0)
 
 
     def run(self):
@@ -199,5 +303,43 @@ class Mpi4py_processor(Multi_processor):
         self.in_main_loop = False
 
 
+    def share_array(self, name=None, value=None):
+        """Publish a large read-only numpy array to all slaves.
+
+        The array is broadcast once to the first slave of each node, which places it into a node-local MPI-3 shared memory window for all slaves of that node.  Without MPI-3, one copy is sent to each slave.
+
+
+        @keyword name:  The unique name of the shared array.  Sharing a new array with the same name replaces the old one.
+        @type name:     str
+        @keyword value: The array to share.
+        @type value:    numpy array
+        @return:        The handle of the shared array.
+        @rtype:         multi.shared_data.Shared_array instance
+        """
+
+        # No MPI-3 shared memory, so fall back to copying.
+        if self._leader_comm == None:
+            return super(Mpi4py_processor, self).share_array(name=name, value=value)
+
+        # This must be the master processor!
+        self.assert_on_master()
+
+        # Store the array on the master.
+        value = ascontiguousarray(value)
+        self._shared_arrays[name] = value
+        handle = create_handle(name=name, value=value)
+
+        # Send the command to all slaves, then broadcast the data to the first slave of each node.
+        self._broadcast_command(Shared_array_command(handle=handle))
+        self._leader_comm.Bcast(value, root=0)
+
+        # Process the results from all slaves.
+        for i in range(self.processor_size()):
+            self.process_result(self.master_receive_result())
+
+        # Return the handle.
+        return handle
+
+
     def slave_receive_commands(self):
-        return MPI.COMM_WORLD.recv(source=0)
+        return self._comm.recv(source=0)
@@ -41,6 +41,7 @@ import sys
 from multi.misc import raise_unimplemented, Result, Result_string, Verbosity; verbosity = Verbosity()
 from multi.processor import Processor
 from multi.result_commands import Batched_result_command, Result_command, Result_exception
+from multi.slave_commands import Shared_array_command, Shared_array_release_command
 
 
 class Multi_processor(Processor):
@@ -70,6 +71,81 @@ class Multi_processor(Processor):
 
     #TODO: move up a level
     def chunk_queue(self, queue):
+        """Split the command queue into chunks of commands to be sent to the slaves.
+
+        If the commands provide cost hints via Slave_command.cost(), cost weighted guided self-scheduling is used.  Each chunk then receives a fraction 1/(processors * grainyness) of the remaining cost, so that the chunks shrink towards the end of the queue and fill in the gaps at the end of the calculation.  The chunk cost never drops below the self.min_chunk_fraction fraction of an equal cost split.  If the self.longest_job_first flag is set, the most expensive commands are chunked first.  Without cost hints, the queue is split into chunks of equal length.
+
+        As the queue is consumed from the end, the first chunk to be dispatched is the last element of the returned list.
+
+
+        @param queue:   The command queue.
+        @type queue:    list of Slave_command instances
+        @return:        The chunked queue.
+        @rtype:         list of lists of Slave_command instances or list of Slave_command instances
+        """
+
+        # The cost hints.
+        costs = [self.command_cost(command) for command in queue]
+        total = sum(costs)
+
+        # No cost hints, so chunk by count.
+        if total <= 0.0:
+            return self.chunk_queue_by_count(queue)
+
+        # The command order.
+        order = list(range(len(queue)))
+        if self.longest_job_first:
+            order.sort(key=lambda i: costs[i], reverse=True)
+
+        # The divisor for the guided self-scheduling, and the minimum chunk cost.
+        divisor = float(self.processor_size() * self.grainyness)
+        min_cost = self.min_chunk_fraction * total / divisor
+
+        # Guided self-scheduling.
+        result = []
+        remaining = total
+        chunk = []
+        chunk_cost = 0.0
+        target = max(remaining / divisor, min_cost)
+        for i in order:
+            # The command would overfill the current chunk by more than it is underfilled, so close it.
+            if len(chunk) and chunk_cost + costs[i] - target > target - chunk_cost:
+                result.append(chunk)
+                remaining -= chunk_cost
+                chunk = []
+                chunk_cost = 0.0
+                target = max(remaining / divisor, min_cost)
+
+            # Add the command to the current chunk.
+            chunk.append(queue[i])
+            chunk_cost += costs[i]
+
+            # The chunk is full.
+            if chunk_cost >= target:
+                result.append(chunk)
+                remaining -= chunk_cost
+                chunk = []
+                chunk_cost = 0.0
+                target = max(remaining / divisor, min_cost)
+
+        # The last chunk.
+        if len(chunk):
+            result.append(chunk)
+
+        # Reverse the chunks so that the biggest is dispatched first.
+        result.reverse()
+        return result
+
+
+    def chunk_queue_by_count(self, queue):
+        """Split the command queue into chunks of equal numbers of commands.
+
+        @param queue:   The command queue.
+        @type queue:    list of Slave_command instances
+        @return:        The chunked queue.
+        @rtype:         list of lists of Slave_command instances or list of Slave_command instances
+        """
+
         lqueue = copy(queue)
         result = []
         processors = self.processor_size()
@@ -118,9 +194,19 @@ class Multi_processor(Processor):
                 if result.memo_id != None:
                     memo = self.memo_map[result.memo_id]
                 result.run(self, memo)
+                self.journal_result(result)
                 if result.memo_id != None and result.completed:
                     del self.memo_map[result.memo_id]
 
+                # All commands of the batch have completed, so write them to the journal.
+                if isinstance(result, Batched_result_command) and self._journal_pending:
+                    self.journal_flush()
+
+                # Release the memos of all commands completed by the slave, as soon as their last result has been processed.
+                for memo_id in getattr(result, 'release_memo_ids', []):
+                    if memo_id in self.memo_map:
+                        del self.memo_map[memo_id]
+
             elif isinstance(result, Result_string):
                 #FIXME can't cope with multiple lines
                 sys.stdout.write(result.string)
@@ -156,6 +242,45 @@ class Multi_processor(Processor):
         raise_unimplemented(self.slave_queue_result)
 
 
+    def release_shared_array(self, handle):
+        """Release the shared array on the master and all slaves.
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        """
+
+        # Release the local reference.
+        super(Multi_processor, self).release_shared_array(handle)
+
+        # Release the array on all slaves.
+        if self.on_master():
+            self.run_command_globally(Shared_array_release_command(handle=handle))
+
+
+    def share_array(self, name=None, value=None):
+        """Publish a large read-only numpy array to all slaves.
+
+        This base implementation for fabrics without shared memory sends one copy of the array to each slave.
+
+
+        @keyword name:  The unique name of the shared array.  Sharing a new array with the same name replaces the old one.
+        @type name:     str
+        @keyword value: The array to share.
+        @type value:    numpy array
+        @return:        The handle of the shared array.
+        @rtype:         multi.shared_data.Shared_array instance
+        """
+
+        # Store the array on the master.
+        handle = super(Multi_processor, self).share_array(name=name, value=value)
+
+        # Send a copy to each slave.
+        self.run_command_globally(Shared_array_command(handle=handle, value=value))
+
+        # Return the handle.
+        return handle
+
+
     def slave_receive_commands(self):
         raise_unimplemented(self.slave_receive_commands)
 
@@ -0,0 +1,472 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""The local multi-core processor fabric via the Python multiprocessing module.
+
+This fabric requires no MPI installation.  The master processor is the relax process itself, and the slave processors are local worker processes started by the master at the start of the main loop.  The communication between the master and slaves uses one multiprocessing queue per slave for the commands and a single shared queue for the results.  Hence the standard Slave_command, Result_command and Memo protocol of the multi-processor package is used unchanged.
+
+Arrays published via share_array() are placed in shared memory segments (for Python 3.8 and higher), which the slaves map into their address space on first access.
+"""
+
+# Python module imports.
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker, shared_memory = None, None
+from numpy import copyto, ndarray
+import os
+import platform
+import signal
+import sys
+
+# multi module imports.
+from multi.misc import Verbosity; verbosity = Verbosity()
+from multi.multi_processor_base import Multi_processor
+from multi.shared_data import create_handle
+from multi.slave_commands import Exit_command, Shared_array_release_command
+
+
+def slave_main(processor_size=None, rank=None, command_queue=None, result_queue=None, verbosity_level=0):
+    """The entry point for the worker processes, executing the main loop of a slave processor.
+
+    This is a module level function so that it can be used with all of the multiprocessing start methods, including 'spawn' where the master's processor instance is not available to the worker process.
+
+
+    @keyword processor_size:    The total number of slave processors.
+    @type processor_size:       int
+    @keyword rank:              The rank of this slave processor.
+    @type rank:                 int
+    @keyword command_queue:     The queue for receiving commands from the master.
+    @type command_queue:        multiprocessing.Queue instance
+    @keyword result_queue:      The queue for returning results to the master.
+    @type result_queue:         multiprocessing.Queue instance
+    @keyword verbosity_level:   The verbosity level of the multi-processor package.
+    @type verbosity_level:      int
+    """
+
+    # Keyboard interrupts are handled by the master, which will terminate the slaves.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Set the verbosity level (needed for the 'spawn' start method).
+    verbosity.set(verbosity_level)
+
+    # Initialise the slave processor.
+    processor = Multiprocess_processor(processor_size=processor_size, callback=None, rank=rank, command_queue=command_queue, result_queue=result_queue)
+
+    # Store the processor in the Processor_box singleton of the worker process.
+    from multi import Processor_box
+    processor_box = Processor_box()
+    processor_box.processor = processor
+    processor_box.processor_name = 'multiprocess_processor'
+    processor_box.class_name = 'Multiprocess_processor'
+
+    # Execute the slave main loop until an Exit_command is received.
+    processor.run()
+
+
+
+class Multiprocess_processor(Multi_processor):
+    """The local multi-core processor class."""
+
+    def __init__(self, processor_size, callback, rank=0, command_queue=None, result_queue=None):
+        """Initialise the multiprocess processor.
+
+        The master processor is initialised with the default keyword arguments, whereas the slave processors are initialised within the worker processes via the slave_main() function.
+
+
+        @param processor_size:  The requested number of slave processors.  The default value of -1 from the command line will cause one slave processor to be created per CPU core.
+        @type processor_size:   int
+        @param callback:        The application callback.  This is None for the slave processors.
+        @type callback:         multi.Application_callback instance or None
+        @keyword rank:          The rank of the processor, 0 for the master.
+        @type rank:             int
+        @keyword command_queue: The queue for receiving commands from the master (slaves only).
+        @type command_queue:    multiprocessing.Queue instance or None
+        @keyword result_queue:  The queue for returning results to the master (slaves only).
+        @type result_queue:     multiprocessing.Queue instance or None
+        """
+
+        # The multiprocessing module is required.
+        if multiprocessing == None:
+            raise Exception("The multiprocessing Python module is not available, the multiprocess processor fabric cannot be used.")
+
+        # Default to one slave per CPU core.
+        if processor_size == -1:
+            processor_size = multiprocessing.cpu_count()
+
+        # Sanity check.
+        if processor_size < 1:
+            raise Exception("The multiprocess processor fabric requires at least one slave processor, %s were requested." % processor_size)
+
+        # Store the arguments (the rank is needed by the base class).
+        self._rank = rank
+        self._command_queue = command_queue
+        self._result_queue = result_queue
+
+        # Initialise the base class.
+        super(Multiprocess_processor, self).__init__(processor_size=processor_size, callback=callback)
+
+        # The master's list of slave command queues and worker processes, created by self.pre_run().
+        self._command_queues = []
+        self._slaves = []
+
+        # The shared memory segments, keyed by the shared array name.
+        self._segments = {}
+
+        # Initialise a flag for determining if we are in the run() method or not.
+        self.in_main_loop = False
+
+
+    def _close_segment(self, name):
+        """Close (and on the master unlink) the shared memory segment of the given shared array.
+
+        @param name:    The name of the shared array.
+        @type name:     str
+        """
+
+        # Nothing to do.
+        if name not in self._segments:
+            return
+
+        # Remove all references to the array, as the memory cannot be unmapped while these exist.
+        segment = self._segments.pop(name)
+        if name in self._shared_arrays:
+            del self._shared_arrays[name]
+
+        # Close the segment, ignoring any remaining references held by user code (the memory is then freed on exit).
+        try:
+            segment.close()
+        except BufferError:
+            pass
+
+        # Free the memory.
+        if self.on_master():
+            segment.unlink()
+
+
+    def _shutdown_slaves(self):
+        """Send the exit command to all slaves, wait for their termination and clean up."""
+
+        # No slaves.
+        if not self._slaves:
+            return
+
+        # Send the exit command to all slaves.
+        for dest in range(1, self.processor_size()+1):
+            self.master_queue_command(command=Exit_command(), dest=dest)
+
+        # Dump all results, waiting for the completion of each slave.
+        completed = 0
+        while completed < self.processor_size():
+            result = self.master_receive_result()
+            if result.completed:
+                completed += 1
+
+        # Wait for the worker processes to terminate.
+        for slave in self._slaves:
+            slave.join()
+
+        # Reset.
+        self._slaves = []
+        self._command_queues = []
+
+
+    def abort(self):
+        """Kill the slave processes and terminate the program.
+
+        This mimics MPI.COMM_WORLD.Abort() of the mpi4py processor fabric, as this can be called from the result processing thread where sys.exit() would only terminate the thread.
+        """
+
+        # Kill all slaves.
+        for slave in self._slaves:
+            if slave.is_alive():
+                slave.terminate()
+        self._slaves = []
+
+        # Free all shared memory.
+        for name in list(self._segments.keys()):
+            self._close_segment(name)
+
+        # Flush the IO streams and terminate.
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1)
+
+
+    def assert_on_master(self):
+        """Make sure that this is the master processor and not a slave.
+
+        @raises Exception:  If not on the master processor.
+        """
+
+        # Check if this processor is a slave, and if so throw an exception.
+        if self.on_slave():
+            msg = 'running on slave when expected master with rank == 0, rank was %d' % self.rank()
+            raise Exception(msg)
+
+
+    def exit(self, status=0):
+        """Exit the multiprocess processor with the given status.
+
+        @keyword status:    The program exit status.
+        @type status:       int
+        """
+
+        # Execution on the slave.
+        if self.on_slave():
+            # Catch sys.exit being called on an executing slave.
+            if self.in_main_loop:
+                raise Exception('sys.exit unexpectedly called on slave!')
+
+        # Execution on the master.
+        else:
+            # Slave clean up.
+            self._shutdown_slaves()
+
+            # Free all shared memory.
+            for name in list(self._segments.keys()):
+                self._close_segment(name)
+
+            # Exit the program with the given status.
+            sys.exit(status)
+
+
+    def fetch_shared_array(self, handle):
+        """Return the shared array, mapping the shared memory segment on first access by a slave.
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        @return:        The read-only shared array.
+        @rtype:         numpy array
+        """
+
+        # Not in shared memory, or already mapped.
+        if handle.key == None or (handle.name in self._segments and self._segments[handle.name].name == handle.key):
+            return self._shared_arrays[handle.name]
+
+        # Unmap an old version of the array.
+        self._close_segment(handle.name)
+
+        # Map the segment.
+        segment = shared_memory.SharedMemory(name=handle.key)
+        array = ndarray(shape=handle.shape, dtype=handle.dtype, buffer=segment.buf)
+        array.flags.writeable = False
+
+        # Store and return the array.
+        self._segments[handle.name] = segment
+        self._shared_arrays[handle.name] = array
+        return array
+
+
+    def get_intro_string(self):
+        """Return the string to append to the end of the relax introduction string.
+
+        @return:    The string describing this Processor fabric.
+        @rtype:     str
+        """
+
+        # Return the string.
+        return "Local multi-core processing via the Python multiprocessing module with %i slave processors & 1 master." % self.processor_size()
+
+
+    def get_name(self):
+        """Return the name of the current processor.
+
+        @return:    The processor identifier, consisting of the host name and process ID.
+        @rtype:     str
+        """
+
+        return '%s-pid%s' % (platform.node(), os.getpid())
+
+
+    def master_queue_command(self, command, dest):
+        """Master to slave processor data transfer - send the command to the slave.
+
+        @param command: The command to send to the slave.
+        @type command:  Slave_command instance or list of Slave_command instances
+        @param dest:    The destination processor's rank.
+        @type dest:     int
+        """
+
+        # Place the command on the slave's private queue.
+        self._command_queues[dest-1].put(command)
+
+
+    def master_receive_result(self):
+        """Slave to master processor data transfer - receive the result command from the slave.
+
+        This is invoked by the master processor.
+
+        @return:        The result command sent by the slave.
+        @rtype:         Result_command instance
+        """
+
+        # Catch and return the result command.
+        return self._result_queue.get()
+
+
+    def pre_run(self):
+        """Start the slave worker processes prior to the execution of the main loop on the master."""
+
+        # Execute the base class method.
+        super(Multiprocess_processor, self).pre_run()
+
+        # Only the master starts the slaves.
+        if self.on_slave() or self._slaves:
+            return
+
+        # Start the resource tracker for the shared memory segments, so that it is inherited by and common to all slaves.
+        if resource_tracker != None:
+            resource_tracker.ensure_running()
+
+        # The shared result queue.
+        self._result_queue = multiprocessing.Queue()
+
+        # Start the slaves.
+        for rank in range(1, self.processor_size()+1):
+            # The private command queue.
+            command_queue = multiprocessing.Queue()
+            self._command_queues.append(command_queue)
+
+            # The worker process.
+            slave = multiprocessing.Process(target=slave_main, kwargs={'processor_size': self.processor_size(), 'rank': rank, 'command_queue': command_queue, 'result_queue': self._result_queue, 'verbosity_level': verbosity.level()})
+            slave.daemon = True
+            slave.start()
+            self._slaves.append(slave)
+
+
+    def rank(self):
+        """Return the rank of the processor.
+
+        @return:    The rank of the processor, 0 for the master.
+        @rtype:     int
+        """
+
+        return self._rank
+
+
+    def receive_shared_array(self, handle, value):
+        """Store a shared array on the slave, mapping the shared memory segment straight away if the data is not sent with the command.
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        @param value:   The array data, if sent with the command.
+        @type value:    numpy array or None
+        """
+
+        # The data is in a shared memory segment.
+        if value is None and handle.key != None:
+            self.fetch_shared_array(handle)
+
+        # Base class method.
+        else:
+            super(Multiprocess_processor, self).receive_shared_array(handle, value)
+
+
+    def release_shared_array(self, handle):
+        """Release the shared array on the master and all slaves, freeing the shared memory.
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        """
+
+        # Fabric without shared memory.
+        if handle.key == None:
+            return super(Multiprocess_processor, self).release_shared_array(handle)
+
+        # Unmap the segment on all slaves first.
+        if self.on_master():
+            self.run_command_globally(Shared_array_release_command(handle=handle))
+
+        # Unmap and free the segment.
+        self._close_segment(handle.name)
+
+
+    def return_result_command(self, result_object):
+        """Slave to master processor data transfer - send the result command to the master.
+
+        @param result_object:   The result command to send to the master.
+        @type result_object:    Result_command instance
+        """
+
+        # Place the result on the shared result queue.
+        self._result_queue.put(result_object)
+
+
+    def run(self):
+        """Execute the main loop, catching the master's exit."""
+
+        self.in_main_loop = True
+        super(Multiprocess_processor, self).run()
+        self.in_main_loop = False
+
+
+    def share_array(self, name=None, value=None):
+        """Publish a large read-only numpy array to all slaves via a shared memory segment.
+
+        The array is copied once into the segment, and the slaves map the segment on first access via the handle.
+
+
+        @keyword name:  The unique name of the shared array.  Sharing a new array with the same name replaces the old one.
+        @type name:     str
+        @keyword value: The array to share.
+        @type value:    numpy array
+        @return:        The handle of the shared array.
+        @rtype:         multi.shared_data.Shared_array instance
+        """
+
+        # No shared memory support, so fall back to copying.
+        if shared_memory == None:
+            return super(Multiprocess_processor, self).share_array(name=name, value=value)
+
+        # This must be the master processor!
+        self.assert_on_master()
+
+        # Free an old version of the array.
+        self._close_segment(name)
+
+        # Create the segment (of at least one byte) and copy in the data.
+        handle = create_handle(name=name, value=value)
+        segment = shared_memory.SharedMemory(create=True, size=max(handle.nbytes(), 1))
+        array = ndarray(shape=handle.shape, dtype=handle.dtype, buffer=segment.buf)
+        copyto(array, value)
+        array.flags.writeable = False
+        handle.key = segment.name
+
+        # Store and return the handle.
+        self._segments[name] = segment
+        self._shared_arrays[name] = array
+        return handle
+
+
+    def slave_receive_commands(self):
+        """Slave to master processor data transfer - receive the commands from the master.
+
+        @return:    The command or list of commands from the master.
+        @rtype:     Slave_command instance or list of Slave_command instances
+        """
+
+        return self._command_queue.get()
@@ -98,14 +98,17 @@ The following are yet to be implemented:
 #TODO: check exceptions on master.
 
 # Python module imports.
-import time, datetime, math, sys
+import time, datetime, math, pickle, sys
 
 # multi module imports.
-from multi.misc import Capturing_exception, raise_unimplemented, Verbosity; verbosity = Verbosity()
-from multi.result_queue import Threaded_result_queue
+from multi.journal import Job_journal
+from multi.misc import Capturing_exception, checksum, raise_unimplemented, Verbosity; verbosity = Verbosity()
+from multi.result_queue import Immediate_result_queue, Threaded_result_queue
 from multi.processor_io import Redirect_text
 from multi.result_commands import Batched_result_command, Null_result_command, Result_exception
-from multi.slave_commands import Slave_storage_command
+from multi.shared_data import create_handle
+from multi.slave_commands import Data_cache_clear_command, Slave_storage_command, Telemetry_command
+from multi.telemetry import Telemetry
 
 
 class Data_store:
@@ -158,6 +161,9 @@ class Processor(object):
         self.grainyness = 1
         """The number of sub jobs to queue for each processor if we have more jobs than processors."""
 
+        self.min_chunk_fraction = 0.25
+        """The minimum cost of a chunk of commands, as a fraction of an equal cost split, for the guided self-scheduling of cost hinted commands."""
+
 #        # CHECKME: am I implemented?, should I be an application callback function
 #        self.pre_queue_command = None
 #        """ command to call before the queue is run"""
@@ -173,12 +179,54 @@ class Processor(object):
         self.data_store = Data_store()
         """The processor data store."""
 
+        self._shared_arrays = {}
+        """The shared read-only arrays of this processor, keyed by name."""
+
+        self._data_cache = {}
+        """The versioned data cache of this processor, keyed by name with values of {version: data}."""
+
+        self._data_cache_users = {}
+        """The number of queued commands using each version of the cached data on the master, keyed by the (name, version) tuple."""
+
+        self._slave_data_cache = {}
+        """The versions of the cached data held by each slave, keyed by the slave rank with values of {name: version}."""
+
+        self._slave_data_evict = {}
+        """The names of the cached data to be evicted from each slave together with the next command sent to it, keyed by the slave rank."""
+
+        self.journal_file = None
+        """The name of the optional crash-safe journal file of completed slave commands."""
+
+        self._journal = None
+        self._journal_ids = {}
+        self._journal_pending = {}
+
+        self.telemetry = None
+        """The per-command execution telemetry.  On the master this is a Telemetry instance, and on the slaves a flag for collecting the slave metrics."""
+
+        self.telemetry_file = None
+        """The name of the optional file for exporting the telemetry."""
+
+        self._telemetry_slaves = False
+
         self._processor_size = processor_size
         """Number of slave processors available in this processor."""
 
         self.threaded_result_processing = True
         """Flag for the handling of result processing via self.run_command_queue()."""
 
+        self.result_queue_size = 100
+        """The maximum number of results held in memory by the threaded result processing, or 0 for no limit.  When reached, the master stops receiving results from the slaves until space is freed."""
+
+        self.result_spill = False
+        """Flag for spilling the results to temporary files rather than waiting when the threaded result processing is full."""
+
+        self.longest_job_first = True
+        """Flag for dispatching the most expensive commands first in self.run_command_queue(), based on the Slave_command.cost() hints."""
+
+        self.queue_held = False
+        """Flag which, when set by self.hold_queue(), causes self.run_queue() to accumulate the queued commands rather than executing them."""
+
 
     def abort(self):
         """Shutdown the multi processor in exceptional conditions - designed for overriding.
@@ -224,6 +272,151 @@ class Processor(object):
         raise_unimplemented(self.assert_on_master)
 
 
+    def attach_cached_data(self, command, dest):
+        """Attach the cached data to the commands of a queue item prior to sending it to a slave.
+
+        The data is only attached to the first command using it which is sent to the slave, or if the version held by the slave has changed.  The names of the data to be evicted from the slave are attached to the first command with cached data.
+
+
+        @param command: The queue item, either a single slave command or a chunk of commands.
+        @type command:  Slave_command instance or list of Slave_command instances
+        @param dest:    The rank of the slave processor.
+        @type dest:     int
+        """
+
+        # A chunk of commands.
+        if isinstance(command, list):
+            for elem in command:
+                self.attach_cached_data(elem, dest)
+            return
+
+        # No cached data.
+        if getattr(command, 'cache_name', None) == None:
+            return
+
+        # The pending evictions.
+        if dest in self._slave_data_evict:
+            command.cache_evict = self._slave_data_evict.pop(dest)
+
+        # The data is already present on the slave.
+        held = self._slave_data_cache.setdefault(dest, {})
+        if held.get(command.cache_name) == command.cache_version:
+            return
+
+        # Send the data with the command.
+        command.cache_value = self._data_cache[command.cache_name][command.cache_version]
+        held[command.cache_name] = command.cache_version
+
+
+    def cache_data(self, name=None, value=None):
+        """Place static data into the versioned data cache of the master.
+
+        The returned version should be stored in the slave commands as the cache_version attribute, together with the name as the cache_name attribute, and the data obtained on the slave via the fetch_cached_data() method.  The data is sent to each slave together with the first command using it, and only once per slave for the same version, as detected by a checksum of the pickled data.  The data is evicted from the master and slaves once the last command using it has completed, or at the latest at the end of the execution of the queue.
+
+
+        @keyword name:  The unique name of the data.
+        @type name:     str
+        @keyword value: The static data.
+        @type value:    anything picklable
+        @return:        The version of the cached data.
+        @rtype:         str
+        """
+
+        # This must be the master processor!
+        self.assert_on_master()
+
+        # The version.
+        version = checksum(value)
+
+        # Store the data.
+        versions = self._data_cache.setdefault(name, {})
+        if version not in versions:
+            versions[version] = value
+
+        # Return the version.
+        return version
+
+
+    def cached_data_keys(self, command):
+        """Return the cached data keys of a command queue item.
+
+        @param command: The queue item, either a single slave command or a chunk of commands.
+        @type command:  Slave_command instance or list of Slave_command instances
+        @return:        The (name, version) keys of the cached data used by the commands.
+        @rtype:         list of tuple of str
+        """
+
+        # A chunk of commands.
+        if isinstance(command, list):
+            keys = []
+            for elem in command:
+                keys += self.cached_data_keys(elem)
+            return keys
+
+        # A single command.
+        if getattr(command, 'cache_name', None) == None:
+            return []
+        return [(command.cache_name, command.cache_version)]
+
+
+    def clear_cached_data(self):
+        """Remove all data from the data cache of this processor, together with the tracking of the data held by the slaves."""
+
+        self._data_cache.clear()
+        self._data_cache_users.clear()
+        self._slave_data_cache.clear()
+        self._slave_data_evict.clear()
+
+
+    def command_cost(self, command):
+        """Return the estimated cost of a command queue item for scheduling purposes.
+
+        @param command: The queue item, either a single slave command or a chunk of commands.
+        @type command:  Slave_command instance or list of Slave_command instances
+        @return:        The estimated relative cost.  Commands without a cost hint count as zero.
+        @rtype:         float
+        """
+
+        # A chunk of commands.
+        if isinstance(command, list):
+            return sum([self.command_cost(elem) for elem in command])
+
+        # The cost hint of the command.
+        cost = None
+        if hasattr(command, 'cost'):
+            cost = command.cost()
+        if cost == None:
+            return 0.0
+        return float(cost)
+
+
+    def evict_cached_data(self, name=None, version=None):
+        """Remove the data from the data cache of the master, and schedule its eviction from the slaves holding it.
+
+        The eviction is sent to the slaves together with the next command using cached data, or at the end of the execution of the queue.
+
+
+        @keyword name:      The unique name of the data.
+        @type name:         str
+        @keyword version:   The version of the data, or None for all versions.
+        @type version:      str or None
+        """
+
+        # Remove the data from the master.
+        if version == None:
+            self._data_cache.pop(name, None)
+        elif name in self._data_cache:
+            self._data_cache[name].pop(version, None)
+            if not self._data_cache[name]:
+                del self._data_cache[name]
+
+        # Schedule the eviction from the slaves.
+        for dest, held in self._slave_data_cache.items():
+            if name in held and (version == None or held[name] == version):
+                del held[name]
+                self._slave_data_evict.setdefault(dest, []).append(name)
+
+
     def exit(self, status=0):
         """Exit the processor with the given status.
 
@@ -253,6 +446,57 @@ class Processor(object):
         return obj
 
 
+    def fetch_cached_data(self, name=None, version=None):
+        """Return the data of the given name and version from the data cache.
+
+        This can be run on the master or slave processors.
+
+
+        @keyword name:      The unique name of the data.
+        @type name:         str
+        @keyword version:   The version of the data, as returned by cache_data().
+        @type version:      str
+        @raises Exception:  If the data is not present or the cached version does not match.
+        @return:            The cached data.
+        @rtype:             anything
+        """
+
+        # Check the cache.
+        if name not in self._data_cache:
+            raise Exception("The data '%s' is not present in the data cache of the processor %s." % (name, self.rank()))
+        if version not in self._data_cache[name]:
+            raise Exception("The version '%s' of the data '%s' does not match the cached versions %s of the processor %s." % (version, name, sorted(self._data_cache[name].keys()), self.rank()))
+
+        # Return the data.
+        return self._data_cache[name][version]
+
+
+    def fetch_shared_array(self, handle):
+        """Return the shared array corresponding to the handle - designed for overriding.
+
+        This can be run on the master or slave processors.
+
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        @return:        The shared array.
+        @rtype:         numpy array
+        """
+
+        return self._shared_arrays[handle.name]
+
+
+    def flush_cached_data(self):
+        """Remove all data from the data cache of the master and slaves, at the end of the execution of the queue."""
+
+        # Clear the data cache of the slaves, if they hold data.
+        if any(self._slave_data_cache.values()) or any(self._slave_data_evict.values()):
+            self.run_command_globally(Data_cache_clear_command())
+
+        # Clear the master.
+        self.clear_cached_data()
+
+
     def get_intro_string(self):
         """Get a string describing the multi processor - designed for overriding.
 
@@ -344,6 +588,16 @@ class Processor(object):
         return time_delta_str
 
 
+    def hold_queue(self):
+        """Hold the execution of the processor queue.
+
+        Until self.release_queue() is called, self.run_queue() will return without executing any commands.  This allows the commands queued by multiple independent calculations, for example the optimisation of different models in different data pipes, to be executed together in a single queue across the slave processors.
+        """
+
+        # Set the flag.
+        self.queue_held = True
+
+
     def is_queued(self):
         """Determine if any slave commands are queued.
 
@@ -359,6 +613,100 @@ class Processor(object):
         return False
 
 
+    def journal_flush(self):
+        """Write the results of all completed commands to the journal.
+
+        This must only be called once all results of the pending commands have been processed.
+        """
+
+        # Loop over the pending commands.
+        for memo_id in self._journal_pending:
+            self._journal.record(self._journal_ids.pop(memo_id), self._journal_pending[memo_id])
+
+        # Reset.
+        self._journal_pending = {}
+
+
+    def journal_replay(self, queue):
+        """Replay the results of the commands already present in the journal.
+
+        The results of all commands of the queue which have been completed in a previous run are processed on the master, as if they were freshly returned by the slaves.  Only commands with a memo and with the Slave_command.identity() hint are journalled.
+
+
+        @param queue:   The command queue.
+        @type queue:    list of Slave_command instances
+        @return:        The commands which still need to be run.
+        @rtype:         list of Slave_command instances
+        """
+
+        # No journal.
+        if self.journal_file == None:
+            return queue
+
+        # Open the journal.
+        if self._journal == None:
+            self._journal = Job_journal(file_name=self.journal_file)
+
+        # Loop over the commands.
+        new_queue = []
+        replay_count = 0
+        for command in queue:
+            # The command identity.
+            identity = None
+            if command.memo_id != None:
+                identity = command.identity()
+
+            # Not journalled.
+            if identity == None:
+                new_queue.append(command)
+                continue
+
+            # Replay the results.
+            if self._journal.has(identity):
+                memo = self.memo_map[command.memo_id]
+                for result in self._journal.results(identity):
+                    result.memo_id = command.memo_id
+                    result.run(self, memo)
+                replay_count += 1
+                continue
+
+            # Remember the identity for the results.
+            self._journal_ids[command.memo_id] = identity
+            new_queue.append(command)
+
+        # Printout.
+        if replay_count:
+            print("Replayed the results of %s of %s commands from the journal file '%s'." % (replay_count, len(queue), self.journal_file))
+
+        # Return the remaining commands.
+        return new_queue
+
+
+    def journal_reset(self):
+        """Forget all commands of the last queue which did not complete."""
+
+        # Reset.
+        self._journal_ids = {}
+        self._journal_pending = {}
+
+
+    def journal_result(self, result):
+        """Hold a result command on the master until its command has completed, for writing to the journal.
+
+        @param result:  The result command returned by the slave.
+        @type result:   Result_command instance
+        """
+
+        # Not journalled.
+        if result.memo_id not in self._journal_ids:
+            return
+
+        # Store the result.
+        if result.memo_id not in self._journal_pending:
+            self._journal_pending[result.memo_id] = []
+        self._journal_pending[result.memo_id].append(result)
+
+
     def master_queue_command(self, command, dest):
         """Slave to master processor data transfer - send the result command from the slave.
 
@@ -386,6 +734,43 @@ class Processor(object):
         raise_unimplemented(self.master_receive_result)
 
 
+    def memo_ids(self, command):
+        """Return the memo IDs of a command queue item.
+
+        @param command: The queue item, either a single slave command or a chunk of commands.
+        @type command:  Slave_command instance or list of Slave_command instances
+        @return:        The memo IDs of the commands with memos.
+        @rtype:         list of str
+        """
+
+        # A chunk of commands.
+        if isinstance(command, list):
+            memo_ids = []
+            for elem in command:
+                memo_ids += self.memo_ids(elem)
+            return memo_ids
+
+        # A single command.
+        if command.memo_id == None:
+            return []
+        return [command.memo_id]
+
+
+    def output_telemetry(self):
+        """Print the telemetry summary and write the telemetry file, if the telemetry has been turned on."""
+
+        # No telemetry.
+        if self.telemetry == None:
+            return
+
+        # The summary.
+        print(self.telemetry.summary())
+
+        # The file.
+        if self.telemetry_file != None:
+            self.telemetry.write(file_name=self.telemetry_file)
+
+
     def post_run(self):
         """Method called after the application main loop has finished - designed for overriding.
 
@@ -398,6 +783,9 @@ class Processor(object):
             end_time = time.time()
             time_delta_str = self.get_time_delta(self.start_time, end_time)
 
+            # The telemetry summary and file.
+            self.output_telemetry()
+
             # Print out of the total run time.
             if verbosity.level():
                 print('\nOverall runtime: ' + time_delta_str + '\n')
@@ -463,6 +851,74 @@ class Processor(object):
         return int(math.ceil(math.log10(self.processor_size())))
 
 
+    def receive_cached_data(self, command):
+        """Store the data sent together with the command in the data cache of the slave.
+
+        The evicted data is removed first, and any older version of the sent data is replaced.
+
+
+        @param command: The slave command from the master.
+        @type command:  Slave_command instance
+        """
+
+        # The evictions.
+        if hasattr(command, 'cache_evict'):
+            for name in command.cache_evict:
+                self._data_cache.pop(name, None)
+            del command.cache_evict
+
+        # The data.
+        if hasattr(command, 'cache_value'):
+            self._data_cache[command.cache_name] = {command.cache_version: command.cache_value}
+            del command.cache_value
+
+
+    def release_cached_data(self, keys):
+        """Release the cached data used by completed commands, evicting the data once the last command using it has completed.
+
+        @param keys:    The (name, version) keys of the cached data, as returned by cached_data_keys().
+        @type keys:     list of tuple of str
+        """
+
+        for key in keys:
+            # Decrement the number of users.
+            if key not in self._data_cache_users:
+                continue
+            self._data_cache_users[key] -= 1
+
+            # Evict the data.
+            if self._data_cache_users[key] <= 0:
+                del self._data_cache_users[key]
+                self.evict_cached_data(name=key[0], version=key[1])
+
+
+    def receive_shared_array(self, handle, value):
+        """Store a shared array on the slave - designed for overriding.
+
+        This is called by the Shared_array_command on the slave processors.
+
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        @param value:   The array data, if sent with the command.
+        @type value:    numpy array or None
+        """
+
+        self._shared_arrays[handle.name] = value
+
+
+    def release_shared_array(self, handle):
+        """Release the shared array corresponding to the handle - designed for overriding.
+
+        @param handle:  The handle of the shared array.
+        @type handle:   multi.shared_data.Shared_array instance
+        """
+
+        # Remove the reference.
+        if handle.name in self._shared_arrays:
+            del self._shared_arrays[handle.name]
+
+
     def return_object(self, result):
         """Return a result to the master processor from a slave - an abstract method.
 
@@ -528,20 +984,24 @@ class Processor(object):
                     # Capture the standard IO streams for the slaves.
                     self.stdio_capture()
 
-                    # Execute each command, one by one.
-                    for i, command in enumerate(commands):
-                        # Set the completed flag if this is the last command.
-                        completed = (i == len(commands)-1)
+                    # The start of the execution, for the telemetry.
+                    start_time = time.time()
 
-                        # Execute the calculation.
-                        command.run(self, completed)
+                    # Execute the commands.
+                    self.slave_execute_commands(commands)
 
                     # Restore the IO.
                     self.stdio_restore()
 
                     # Process the batched results.
                     if self.batched_returns:
-                        self.return_object(Batched_result_command(processor=self, result_commands=self.result_list, io_data=self.io_data))
+                        result = Batched_result_command(processor=self, result_commands=self.result_list, io_data=self.io_data)
+
+                        # Add the slave metrics for the telemetry.
+                        if self.telemetry:
+                            result.timing = {'exec_time': time.time() - start_time, 'result_size': len(pickle.dumps(result, 2))}
+
+                        self.return_object(result)
                         self.result_list = None
 
                 # Capture and process all slave exceptions.
@@ -576,6 +1036,9 @@ class Processor(object):
     def run_command_queue(self, queue):
         """Process all commands on the queue and wait for completion.
 
+        The scheduling is non-blocking and continuously refilling - as soon as a slave reports that its commands have completed, it is sent the next item of the queue.  Hence one slow command does not hold back the other slaves.  If the self.longest_job_first flag is set, the queue items are dispatched in order of decreasing cost, as estimated by the Slave_command.cost() hints.
+
+
         @param queue:   The command queue.
         @type queue:    list of Command instances
         """
@@ -591,39 +1054,97 @@ class Processor(object):
         else:
             result_queue = Immediate_result_queue(self)
 
-        while len(queue) != 0:
-
-            while len(idle_set) != 0:
-                if len(queue) != 0:
-                    command = queue.pop()
-                    dest = idle_set.pop()
-                    self.master_queue_command(command=command, dest=dest)
-                    running_set.add(dest)
-                else:
-                    break
+        # Longest job first ordering (the queue is consumed from the end, and the sort is stable so the order is unchanged if no cost hints are given).  The queue is sorted and consumed in place, so that the commands are freed as soon as they are sent.
+        if self.longest_job_first:
+            queue.sort(key=self.command_cost)
+
+        # Telemetry, turning on the collection of the slave metrics the first time.
+        telemetry = self.telemetry
+        if telemetry != None:
+            if not self._telemetry_slaves:
+                self._telemetry_slaves = True
+                self.run_command_globally(Telemetry_command(flag=True))
+            telemetry.start_queue()
+            records = {}
+
+        # The memo IDs of the commands running on each slave, to be released once the slave has completed.
+        dispatched = {}
+
+        # The users of the cached data, so that the data is evicted once the last command using it has completed.
+        cached = {}
+        for command in queue:
+            for key in self.cached_data_keys(command):
+                self._data_cache_users[key] = self._data_cache_users.get(key, 0) + 1
+
+        # Loop until the queue of calculations is depleted and all slaves have returned.
+        while len(queue) != 0 or len(running_set) != 0:
+            # Feed all idle slaves.
+            while len(idle_set) != 0 and len(queue) != 0:
+                command = queue.pop()
+                dest = idle_set.pop()
+                if telemetry != None:
+                    records[dest] = telemetry.dispatch(command, dest)
+                dispatched[dest] = self.memo_ids(command)
+                cached[dest] = self.cached_data_keys(command)
+                self.attach_cached_data(command, dest)
+                self.master_queue_command(command=command, dest=dest)
+                running_set.add(dest)
+
+            # Get the next result.
+            result = self.master_receive_result()
+
+            # Telemetry.
+            if telemetry != None and result.completed and result.rank in records:
+                telemetry.receive(records.pop(result.rank), result)
+
+            # Debugging printout.
+            if verbosity.level():
+                print('\nIdle set:    %s' % idle_set)
+                print('Running set: %s' % running_set)
 
-            # Loop until the queue of calculations is depleted.
-            while len(running_set) != 0:
-                # Get the result.
-                result = self.master_receive_result()
+            # Shift the processor rank to the idle set, so that it is refilled straight away.
+            if result.completed:
+                idle_set.add(result.rank)
+                running_set.remove(result.rank)
 
-                # Debugging printout.
-                if verbosity.level():
-                    print('\nIdle set:    %s' % idle_set)
-                    print('Running set: %s' % running_set)
+                # The memos of the completed commands are released once this last result has been processed, including for the commands which only return processor.NULL_RESULT.
+                result.release_memo_ids = dispatched.pop(result.rank, [])
 
-                # Shift the processor rank to the idle set.
-                if result.completed:
-                    idle_set.add(result.rank)
-                    running_set.remove(result.rank)
+                # Evict the cached data no longer used.
+                self.release_cached_data(cached.pop(result.rank, []))
 
-                # Add to the result queue for instant or threaded processing.
-                result_queue.put(result)
+            # Add to the result queue for instant or threaded processing.
+            result_queue.put(result)
 
         # Process the threaded results.
         if self.threaded_result_processing:
             result_queue.run_all()
 
+        # Telemetry.
+        if telemetry != None:
+            telemetry.end_queue()
+
+
+    def release_queue(self, run=True):
+        """Release the processor queue held by self.hold_queue().
+
+        @keyword run:   A flag which if True will cause all accumulated commands to be executed.  If False, the accumulated commands are discarded, for example after a failure of one of the calculations.
+        @type run:      bool
+        """
+
+        # Unset the flag.
+        self.queue_held = False
+
+        # Execute the commands.
+        if run:
+            self.run_queue()
+
+        # Discard the commands and their cached data.
+        else:
+            del self.command_queue[:]
+            self.memo_map.clear()
+            self.flush_cached_data()
+
 
     def run_queue(self):
         """Run the processor queue - an abstract method.
@@ -632,9 +1153,31 @@ class Processor(object):
         thread to block until the command has completed.
         """
 
+        # The queue is held.
+        if self.queue_held:
+            return
+
         #FIXME: need a finally here to cleanup exceptions states
-        lqueue = self.chunk_queue(self.command_queue)
-        self.run_command_queue(lqueue)
+        queue = self.journal_replay(self.command_queue)
+
+        # Hand the commands over to the chunked queue, so that they are freed as soon as they are sent to the slaves.
+        self.command_queue = []
+        lqueue = self.chunk_queue(queue)
+        del queue
+        try:
+            self.run_command_queue(lqueue)
+
+        # The state of the data cache of the slaves is unknown after a failure.
+        except:
+            self.clear_cached_data()
+            raise
+
+        # Write the remaining completed commands to the journal.
+        self.journal_flush()
+        self.journal_reset()
+
+        # Remove the cached data from the master and slaves.
+        self.flush_cached_data()
 
         del self.command_queue[:]
         self.memo_map.clear()
@@ -667,6 +1210,86 @@ class Processor(object):
         self.run_queue()
 
 
+    def set_journal(self, file_name=None):
+        """Set the crash-safe journal file of completed slave commands.
+
+        The results of all journalled commands (see the Slave_command.identity() method) are recorded in this file as soon as they are returned.  When restarting a crashed or pre-empted run with the same journal file, the completed commands are skipped and their results replayed on the master.
+
+
+        @keyword file_name: The name of the journal file, or None to turn off journalling.
+        @type file_name:    str or None
+        """
+
+        # Close any open journal.
+        if self._journal != None:
+            self._journal.close()
+            self._journal = None
+
+        # Store the file name.
+        self.journal_file = file_name
+
+
+    def set_telemetry(self, file_name=None):
+        """Turn on the collection of the per-command execution telemetry on the master and slaves.
+
+        A summary of the metrics per rank is printed at the end of the program run.
+
+
+        @keyword file_name: The optional name of the file to export the metrics to at the end of the program run.  Files ending in '.json' are written in the JSON format, all others as CSV.
+        @type file_name:    str or None
+        """
+
+        # Set up the telemetry.
+        self.telemetry = Telemetry()
+        self.telemetry_file = file_name
+
+
+    def share_array(self, name=None, value=None):
+        """Publish a large read-only numpy array to all slaves - designed for overriding.
+
+        The returned handle should be stored in the slave commands in place of the array itself, and the array obtained on the slave via the handle's get() method.  This default implementation for the master and slave being one and the same simply holds a reference to the array.
+
+
+        @keyword name:  The unique name of the shared array.  Sharing a new array with the same name replaces the old one.
+        @type name:     str
+        @keyword value: The array to share.
+        @type value:    numpy array
+        @return:        The handle of the shared array.
+        @rtype:         multi.shared_data.Shared_array instance
+        """
+
+        # This must be the master processor!
+        self.assert_on_master()
+
+        # Store the array.
+        self._shared_arrays[name] = value
+
+        # Return the handle.
+        return create_handle(name=name, value=value)
+
+
+    def slave_execute_commands(self, commands):
+        """Execute the commands received from the master on the slave - designed for overriding.
+
+        The default implementation executes each command, one by one, with the results returned via self.return_object().
+
+
+        @param commands:    The commands from the master.
+        @type commands:     list of Slave_command instances
+        """
+
+        # Execute each command, one by one.
+        for i, command in enumerate(commands):
+            # Set the completed flag if this is the last command.
+            completed = (i == len(commands)-1)
+
+            # Store the cached data sent with the command.
+            self.receive_cached_data(command)
+
+            # Execute the calculation.
+            command.run(self, completed)
+
+
     def stdio_capture(self):
         """Enable capture of the STDOUT and STDERR.
         
@@ -24,8 +24,12 @@
 """Module containing the results queue objects."""
 
 # Python module imports.
+import os
+import pickle
 import sys
+from tempfile import mkstemp
 import threading
+import time
 import traceback
 
 # multi module imports.
@@ -44,11 +48,70 @@ RESULT_QUEUE_EXIT_COMMAND = Exit_queue_result_command()
 
 
 
+class Spilled_result(object):
+    """A placeholder for a result which has been spilled to disk by the result queue."""
+
+    def __init__(self, job):
+        """Write the result to a temporary file.
+
+        @param job:     The result command.
+        @type job:      Result_command instance
+        """
+
+        # The telemetry record is kept in memory, as it is shared with the telemetry object.
+        self.telemetry_record = getattr(job, 'telemetry_record', None)
+
+        # Write the result.
+        fd, self.file_name = mkstemp(prefix='relax_result_')
+        file = os.fdopen(fd, 'wb')
+        pickle.dump(job, file, pickle.HIGHEST_PROTOCOL)
+        file.close()
+
+
+    def load(self):
+        """Read the result back in and delete the temporary file.
+
+        @return:    The result command.
+        @rtype:     Result_command instance
+        """
+
+        # Read the result.
+        file = open(self.file_name, 'rb')
+        job = pickle.load(file)
+        file.close()
+        os.remove(self.file_name)
+
+        # Restore the telemetry record.
+        if self.telemetry_record != None:
+            job.telemetry_record = self.telemetry_record
+
+        # Return the result.
+        return job
+
+
+
 class Result_queue(object):
     def __init__(self, processor):
         self.processor = processor
 
 
+    def process(self, job):
+        """Process the result on the master, timing the processing for the telemetry.
+
+        @param job:     The result command.
+        @type job:      Result_command instance
+        """
+
+        # Process the result.
+        start_time = time.time()
+        self.processor.process_result(job)
+
+        # Store the processing time in the telemetry record.
+        record = getattr(job, 'telemetry_record', None)
+        if record != None:
+            record['processing_time'] = time.time() - start_time
+
+
     def put(self, job):
         if isinstance(job, Result_exception) :
             self.processor.process_result(job)
@@ -63,7 +126,7 @@ class Immediate_result_queue(Result_queue):
     def put(self, job):
         super(Immediate_result_queue, self).put(job)
         try:
-            self.processor.process_result(job)
+            self.process(job)
         except:
             traceback.print_exc(file=sys.stdout)
             # FIXME: this doesn't work because this isn't the main thread so sys.exit fails...
@@ -76,12 +139,24 @@ class Immediate_result_queue(Result_queue):
 
 
 class Threaded_result_queue(Result_queue):
+    """Result queue processing the results in a separate thread, as they are received from the slaves.
+
+    The number of results held in memory is bounded by the processor's result_queue_size.  When full, the master either stops receiving results (which applies backpressure to the slaves) or, if the processor's result_spill flag is set, spills the excess results to temporary files until they are processed.
+    """
+
     def __init__(self, processor):
         super(Threaded_result_queue, self).__init__(processor)
         self.queue = queue.Queue()
         self.sleep_time = 0.05
         self.processor = processor
         self.running = 1
+
+        # The bound on the number of results held in memory.
+        self.slots = None
+        if processor.result_queue_size > 0:
+            self.slots = threading.Semaphore(processor.result_queue_size)
+        self.spill = processor.result_spill
+
         # FIXME: syntax error here produces exception but no quit
         self.thread1 = threading.Thread(target=self.workerThread)
         self.thread1.setDaemon(1)
@@ -90,6 +165,18 @@ class Threaded_result_queue(Result_queue):
 
     def put(self, job):
         super(Threaded_result_queue, self).put(job)
+
+        # Bounded memory.
+        if self.slots != None:
+            # Spill to disk if full.
+            if self.spill:
+                if not self.slots.acquire(False):
+                    job = Spilled_result(job)
+
+            # Wait for space.
+            else:
+                self.slots.acquire()
+
         self.queue.put_nowait(job)
 
 
@@ -104,7 +191,17 @@ class Threaded_result_queue(Result_queue):
                     job = self.queue.get()
                     if job == RESULT_QUEUE_EXIT_COMMAND:
                         break
-                    self.processor.process_result(job)
+
+                    # Results spilled to disk.
+                    if isinstance(job, Spilled_result):
+                        self.process(job.load())
+
+                    # Results held in memory, freeing the slot once processed.
+                    else:
+                        self.process(job)
+                        del job
+                        if self.slots != None:
+                            self.slots.release()
             except:
                 traceback.print_exc(file=sys.stdout)
                 # FIXME: this doesn't work because this isn't the main thread so sys.exit fails...
@@ -0,0 +1,127 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""Module containing the handles and commands for the sharing of large read-only arrays with the slaves.
+
+Large numpy arrays are published once via Processor.share_array(), which returns a Shared_array handle.  This small handle can then be stored in any number of Slave_command objects, and the array is obtained on the slave via the handle's get() method.  How the array data reaches the slaves depends on the processor fabric:
+
+    - The uni-processor simply holds a reference to the array.
+    - The multiprocess fabric places the array in a shared memory segment which all slaves map into their address space.
+    - The mpi4py fabric broadcasts the array once to one slave per node, which places it in a node-local MPI-3 shared memory window for all slaves of that node.
+    - Other fabrics fall back to sending one copy of the array to each slave.
+"""
+
+# Python module imports.
+from numpy import asarray, dtype
+
+
+def fetch_shared(value):
+    """Convenience function for obtaining the array of a Shared_array handle.
+
+    @param value:   A Shared_array handle or any other object.
+    @type value:    Shared_array instance or anything
+    @return:        The shared array if a handle is given, otherwise the value unmodified.
+    @rtype:         numpy array or anything
+    """
+
+    # A handle.
+    if isinstance(value, Shared_array):
+        return value.get()
+
+    # Anything else.
+    return value
+
+
+
+class Shared_array(object):
+    """A small picklable handle for a read-only numpy array shared with all slave processors."""
+
+    def __init__(self, name=None, shape=None, dtype=None, key=None):
+        """Set up the handle.
+
+        @keyword name:  The unique name of the shared array.
+        @type name:     str
+        @keyword shape: The shape of the array.
+        @type shape:    tuple of int
+        @keyword dtype: The numpy data type string of the array.
+        @type dtype:    str
+        @keyword key:   A processor fabric specific key for locating the data, for example the name of a shared memory segment.
+        @type key:      anything
+        """
+
+        # Store the arguments.
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.key = key
+
+
+    def get(self):
+        """Return the shared array on the current processor.
+
+        @return:    The read-only shared array.
+        @rtype:     numpy array
+        """
+
+        # Load the Processor_box (a delayed import to avoid circular imports).
+        from multi import Processor_box
+        processor_box = Processor_box()
+
+        # Forward the call to the processor instance.
+        return processor_box.processor.fetch_shared_array(self)
+
+
+    def nbytes(self):
+        """Return the size of the array data.
+
+        @return:    The number of bytes of the array data.
+        @rtype:     int
+        """
+
+        # The number of elements.
+        size = 1
+        for dim in self.shape:
+            size *= dim
+
+        # Return the size.
+        return size * dtype(self.dtype).itemsize
+
+
+
+def create_handle(name=None, value=None, key=None):
+    """Create a handle for the given array.
+
+    @keyword name:  The unique name of the shared array.
+    @type name:     str
+    @keyword value: The array to share.
+    @type value:    numpy array
+    @keyword key:   A processor fabric specific key for locating the data.
+    @type key:      anything
+    @return:        The handle.
+    @rtype:         Shared_array instance
+    """
+
+    # Convert to a numpy array.
+    value = asarray(value)
+
+    # Return the handle.
+    return Shared_array(name=name, shape=value.shape, dtype=value.dtype.str, key=key)
@@ -46,6 +46,32 @@ class Slave_command(object):
         self.memo_id = None
 
 
+    def cost(self):
+        """Return an estimate of the computational cost of the command - designed for overriding.
+
+        This optional hint is used by the master for scheduling, so that the most expensive commands are dispatched first.  Only the relative values between commands of the same queue are of importance.
+
+
+        @return:    The estimated relative cost of the command, or None if unknown.
+        @rtype:     float or None
+        """
+
+        return None
+
+
+    def identity(self):
+        """Return a stable identity of the command for the crash-safe journal - designed for overriding.
+
+        The identity must be identical for the same command across different program runs, and should therefore include a checksum of all of the command inputs (see the multi.misc.checksum() function).  The randomised data of Monte Carlo simulations is regenerated in each run, so for these commands the simulation index together with a checksum of the static inputs, excluding the simulated data, should be used instead.  Commands without an identity are never journalled.
+
+
+        @return:    The unique identity of the command, or None if the command should not be journalled.
+        @rtype:     str or None
+        """
+
+        return None
+
+
     def run(self, processor, completed):
         """Run the slave command on the slave processor
         
@@ -78,6 +104,26 @@ class Slave_command(object):
 
 
 
+class Data_cache_clear_command(Slave_command):
+    """Special command for removing all data from the data cache of the slaves."""
+
+    def run(self, processor, completed):
+        """Clear the data cache of the slave.
+
+        @param processor:   The slave processor the command is running on.  Results from the command are returned via calls to processor.return_object.
+        @type processor:    Processor instance
+        @param completed:   The flag used in batching result returns to indicate that the sequence of batched result commands has completed.
+        @type completed:    bool
+        """
+
+        # First return no result.
+        processor.return_object(processor.NULL_RESULT)
+
+        # Clear the cache.
+        processor.clear_cached_data()
+
+
+
 class Exit_command(Slave_command):
     """Special command for terminating slave processors.
 
@@ -155,3 +201,111 @@ class Slave_storage_command(Slave_command):
 
         # Clear the data.
         self.clear()
+
+
+
+class Telemetry_command(Slave_command):
+    """Special command for turning the collection of the telemetry metrics on the slaves on or off."""
+
+    def __init__(self, flag=True):
+        """Set up the command.
+
+        @keyword flag:  The telemetry flag.
+        @type flag:     bool
+        """
+
+        # Initialise the base class.
+        super(Telemetry_command, self).__init__()
+
+        # Store the arguments.
+        self.flag = flag
+
+
+    def run(self, processor, completed):
+        """Set the slave processor's telemetry flag.
+
+        @param processor:   The slave processor the command is running on.  Results from the command are returned via calls to processor.return_object.
+        @type processor:    Processor instance
+        @param completed:   The flag used in batching result returns to indicate that the sequence of batched result commands has completed.
+        @type completed:    bool
+        """
+
+        # First return no result.
+        processor.return_object(processor.NULL_RESULT)
+
+        # Set the flag.
+        processor.telemetry = self.flag
+
+
+
+class Shared_array_command(Slave_command):
+    """Special command for publishing a shared read-only array on the slaves."""
+
+    def __init__(self, handle=None, value=None):
+        """Set up the command.
+
+        @keyword handle:    The handle of the shared array.
+        @type handle:       multi.shared_data.Shared_array instance
+        @keyword value:     The array data for the processor fabrics without shared memory, otherwise None.
+        @type value:        numpy array or None
+        """
+
+        # Initialise the base class.
+        super(Shared_array_command, self).__init__()
+
+        # Store the arguments.
+        self.handle = handle
+        self.value = value
+
+
+    def run(self, processor, completed):
+        """Receive the shared array on the slave.
+
+        @param processor:   The slave processor the command is running on.  Results from the command are returned via calls to processor.return_object.
+        @type processor:    Processor instance
+        @param completed:   The flag used in batching result returns to indicate that the sequence of batched result commands has completed.
+        @type completed:    bool
+        """
+
+        # First return no result.
+        processor.return_object(processor.NULL_RESULT)
+
+        # Receive the array.
+        processor.receive_shared_array(self.handle, self.value)
+
+        # Clear the data.
+        self.value = None
+
+
+
+class Shared_array_release_command(Slave_command):
+    """Special command for releasing a shared array on the slaves."""
+
+    def __init__(self, handle=None):
+        """Set up the command.
+
+        @keyword handle:    The handle of the shared array.
+        @type handle:       multi.shared_data.Shared_array instance
+        """
+
+        # Initialise the base class.
+        super(Shared_array_release_command, self).__init__()
+
+        # Store the arguments.
+        self.handle = handle
+
+
+    def run(self, processor, completed):
+        """Release the shared array on the slave.
+
+        @param processor:   The slave processor the command is running on.  Results from the command are returned via calls to processor.return_object.
+        @type processor:    Processor instance
+        @param completed:   The flag used in batching result returns to indicate that the sequence of batched result commands has completed.
+        @type completed:    bool
+        """
+
+        # First return no result.
+        processor.return_object(processor.NULL_RESULT)
+
+        # Release the array.
+        processor.release_shared_array(self.handle)
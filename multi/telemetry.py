@@ -0,0 +1,254 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Module docstring.
+"""Module containing the collection of per-command execution telemetry for the processor fabrics.
+
+For each item sent from the master to a slave (either a single command or a chunk of commands), the following metrics are collected:
+
+    - queue:  The index of the command queue run by the master.
+    - item:  The index of the item within the queue.
+    - rank:  The rank of the slave processor.
+    - commands:  The number of commands of the item.
+    - name:  The class name of the first command of the item.
+    - wait_time:  The time between the start of the queue run and the dispatch of the item, in seconds.
+    - command_size:  The size of the pickled item, in bytes.
+    - exec_time:  The time spent executing the commands on the slave, in seconds.
+    - result_size:  The size of the pickled results on the slave, in bytes.
+    - round_trip:  The time between the dispatch of the item and the receipt of its results on the master, in seconds.
+    - processing_time:  The time spent by the master result queue processing the results, in seconds.
+
+The round trip time minus the execution time is the overhead of the serialisation, communication and waiting for the slave.  The metrics can be exported as CSV or JSON files, and summarised per rank.
+"""
+
+# Python module imports.
+import csv
+import json
+import pickle
+import time
+
+
+class Telemetry(object):
+    """The collection of the execution metrics on the master processor."""
+
+    fields = ['queue', 'item', 'rank', 'commands', 'name', 'wait_time', 'command_size', 'exec_time', 'result_size', 'round_trip', 'processing_time']
+    """The metrics of each record, in the order of the CSV columns."""
+
+    def __init__(self):
+        """Set up the data structures."""
+
+        # The records.
+        self.records = []
+
+        # The queue and item indices, the queue start time, and the wall clock time of all queues.
+        self.queue = -1
+        self.item = 0
+        self.queue_start = None
+        self.wall_time = 0.0
+
+
+    def dispatch(self, command, rank):
+        """Create the record for an item dispatched to a slave.
+
+        @param command: The item sent to the slave.
+        @type command:  Slave_command instance or list of Slave_command instances
+        @param rank:    The rank of the slave processor.
+        @type rank:     int
+        @return:        The new record.
+        @rtype:         dict
+        """
+
+        # The commands of the item.
+        commands = command
+        if not isinstance(command, list):
+            commands = [command]
+
+        # The record.
+        record = {}
+        for field in self.fields:
+            record[field] = None
+        record['queue'] = self.queue
+        record['item'] = self.item
+        self.item += 1
+        record['rank'] = rank
+        record['commands'] = len(commands)
+        if len(commands):
+            record['name'] = commands[0].__class__.__name__
+        record['command_size'] = len(pickle.dumps(command, 2))
+
+        # The times.
+        record['dispatch'] = time.time()
+        record['wait_time'] = record['dispatch'] - self.queue_start
+
+        # Store and return the record.
+        self.records.append(record)
+        return record
+
+
+    def end_queue(self):
+        """Mark the end of a queue run on the master."""
+
+        # Update the wall clock time.
+        self.wall_time += time.time() - self.queue_start
+
+
+    def execute(self, command, rank, exec_time):
+        """Create the record for a command executed directly on the master, as in the uni-processor fabric.
+
+        @param command:     The command.
+        @type command:      Slave_command instance
+        @param rank:        The rank of the processor.
+        @type rank:         int
+        @param exec_time:   The execution time, including the processing of results, in seconds.
+        @type exec_time:    float
+        """
+
+        # The record.
+        record = {}
+        for field in self.fields:
+            record[field] = None
+        record['queue'] = self.queue
+        record['item'] = self.item
+        self.item += 1
+        record['rank'] = rank
+        record['commands'] = 1
+        record['name'] = command.__class__.__name__
+        record['exec_time'] = exec_time
+        record['round_trip'] = exec_time
+
+        # Store the record.
+        self.records.append(record)
+
+
+    def receive(self, record, result):
+        """Complete the record on receipt of the final result of the item from the slave.
+
+        @param record:  The record created by dispatch().
+        @type record:   dict
+        @param result:  The final result command of the item.
+        @type result:   Result_command instance
+        """
+
+        # The round trip.
+        record['round_trip'] = time.time() - record['dispatch']
+
+        # The slave metrics.
+        timing = getattr(result, 'timing', None)
+        if timing != None:
+            record['exec_time'] = timing['exec_time']
+            record['result_size'] = timing['result_size']
+
+        # Link the result to the record, for the result processing time.
+        result.telemetry_record = record
+
+
+    def start_queue(self):
+        """Mark the start of a queue run on the master."""
+
+        # Increment the queue index, and store the start time.
+        self.queue += 1
+        self.item = 0
+        self.queue_start = time.time()
+
+
+    def summary(self):
+        """Return a summary of the metrics per rank.
+
+        @return:    The formatted summary table.
+        @rtype:     str
+        """
+
+        # Sum the metrics per rank.
+        ranks = {}
+        for record in self.records:
+            if record['rank'] not in ranks:
+                ranks[record['rank']] = [0, 0, 0.0, 0.0, 0.0, 0, 0]
+            data = ranks[record['rank']]
+            data[0] += 1
+            data[1] += record['commands']
+            data[2] += record['exec_time'] or 0.0
+            data[3] += record['round_trip'] or 0.0
+            data[4] += record['processing_time'] or 0.0
+            data[5] += record['command_size'] or 0
+            data[6] += record['result_size'] or 0
+
+        # The table.
+        text = "\nProcessor telemetry (total queue wall time of %.3f s):\n\n" % self.wall_time
+        text += "%-6s %8s %10s %12s %12s %12s %14s %14s %12s\n" % ("Rank", "Items", "Commands", "Exec (s)", "Overhead (s)", "Master (s)", "Sent (bytes)", "Recv (bytes)", "Utilisation")
+        for rank in sorted(ranks):
+            data = ranks[rank]
+            utilisation = 0.0
+            if self.wall_time > 0.0:
+                utilisation = data[2] / self.wall_time
+            text += "%-6s %8i %10i %12.3f %12.3f %12.3f %14i %14i %11.1f%%\n" % (rank, data[0], data[1], data[2], data[3]-data[2], data[4], data[5], data[6], utilisation*100.0)
+
+        # Return the table.
+        return text
+
+
+    def write(self, file_name=None):
+        """Write the records to file, the format being determined by the file extension.
+
+        @keyword file_name: The name of the file.  Files ending in '.json' are written in the JSON format, all others as CSV.
+        @type file_name:    str
+        """
+
+        # JSON.
+        if file_name.lower().endswith('.json'):
+            self.write_json(file_name)
+
+        # CSV.
+        else:
+            self.write_csv(file_name)
+
+
+    def write_csv(self, file_name=None):
+        """Write the records to a CSV file.
+
+        @keyword file_name: The name of the file.
+        @type file_name:    str
+        """
+
+        # Write the header and one row per record.
+        file = open(file_name, 'w')
+        writer = csv.writer(file)
+        writer.writerow(self.fields)
+        for record in self.records:
+            writer.writerow([record[field] for field in self.fields])
+        file.close()
+
+
+    def write_json(self, file_name=None):
+        """Write the records to a JSON file.
+
+        @keyword file_name: The name of the file.
+        @type file_name:    str
+        """
+
+        # The records, without the internal values.
+        records = []
+        for record in self.records:
+            records.append(dict([(field, record[field]) for field in self.fields]))
+
+        # Write the file.
+        file = open(file_name, 'w')
+        json.dump({'wall_time': self.wall_time, 'records': records}, file, indent=1)
+        file.close()
@@ -25,7 +25,7 @@
 
 
 # Python module imports.
-import sys, os
+import sys, os, time
 
 # multi module imports.
 from multi.misc import Result_string
@@ -130,7 +130,10 @@ class Uni_processor(Processor):
 
 
     def post_run(self):
-        """Dummy function for preventing the printing of the run time."""
+        """Prevent the printing of the run time, only outputting the telemetry if turned on."""
+
+        # The telemetry.
+        self.output_telemetry()
 
 
     def processor_size(self):
@@ -164,6 +167,7 @@ class Uni_processor(Processor):
             if result.memo_id != None:
                 memo = self.memo_map[result.memo_id]
             result.run(self, memo)
+            self.journal_result(result)
             if result.memo_id != None and result.completed:
                 del self.memo_map[result.memo_id]
 
@@ -177,16 +181,48 @@ class Uni_processor(Processor):
     def run_queue(self):
         """Safely run each command in the queue, cleaning up after failures."""
 
+        # The queue is held.
+        if self.queue_held:
+            return
+
+        # Telemetry.
+        if self.telemetry != None:
+            self.telemetry.start_queue()
+
         # Run each command in the queue.
         try:
-            last_command = len(self.command_queue)-1
-            for i, command  in enumerate(self.command_queue):
+            queue = self.journal_replay(self.command_queue)
+            last_command = len(queue)-1
+
+            # The users of the cached data, so that the data is evicted once the last command using it has completed.
+            for command in queue:
+                for key in self.cached_data_keys(command):
+                    self._data_cache_users[key] = self._data_cache_users.get(key, 0) + 1
+            for i, command  in enumerate(queue):
                 completed = (i == last_command)
 
+                start_time = time.time()
                 command.run(self, completed)
 
+                # Telemetry.
+                if self.telemetry != None:
+                    self.telemetry.execute(command, self.rank(), time.time() - start_time)
+
+                # Release the command, its memo and its cached data, as all results have been processed.
+                if command.memo_id in self.memo_map:
+                    del self.memo_map[command.memo_id]
+                self.release_cached_data(self.cached_data_keys(command))
+                queue[i] = None
+
+                # Write the completed command to the journal.
+                self.journal_flush()
+
         # Clear the queue, even if a failure occurs.
         finally:
             #TODO: add cheques for empty queues and maps if now warn
+            if self.telemetry != None:
+                self.telemetry.end_queue()
+            self.journal_reset()
             del self.command_queue[:]
             self.memo_map.clear()
+            self.clear_cached_data()
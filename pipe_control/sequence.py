@@ -358,11 +358,13 @@ def read(file=None, dir=None, file_data=None, spin_id_col=None, mol_name_col=Non
     write_spin_data(sys.stdout, mol_names=mol_names, res_nums=res_nums, res_names=res_names, spin_nums=spin_nums, spin_names=spin_names)
 
 
-def return_attached_protons(spin_id=None):
+def return_attached_protons(spin_id=None, pipe=None):
     """Return a list of all proton spin containers attached to the given spin.
 
     @keyword spin_id:   The spin ID string.
     @type spin_id:      str
+    @keyword pipe:      The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:         str or None
     @return:            The list of proton spin containers attached to the given spin.
     @rtype:             list of SpinContainer instances
     """
@@ -371,7 +373,7 @@ def return_attached_protons(spin_id=None):
     spin_list = []
 
     # Get all interatomic data containers.
-    interatoms = return_interatom_list(spin_id)
+    interatoms = return_interatom_list(spin_id, pipe=pipe)
 
     # No containers.
     if not len(interatoms):
@@ -381,9 +383,9 @@ def return_attached_protons(spin_id=None):
     for i in range(len(interatoms)):
         # Get the attached spin.
         if interatoms[i].spin_id1 == spin_id:
-            attached = return_spin(interatoms[i].spin_id2)
+            attached = return_spin(interatoms[i].spin_id2, pipe=pipe)
         else:
-            attached = return_spin(interatoms[i].spin_id1)
+            attached = return_spin(interatoms[i].spin_id1, pipe=pipe)
 
         # Is it a proton?
         if (hasattr(attached, 'element') and attached.element == 'H') or attached.name == 'H':
@@ -113,6 +113,10 @@ def copy_frequencies(pipe_from=None, pipe_to=None, id=None):
     # Copy the frequency.
     dp_to.spectrometer_frq[id] = dp_from.spectrometer_frq[id]
 
+    # Reset any index of the spectrum metadata.
+    if hasattr(dp_to, '_spectrum_index'):
+        del dp_to._spectrum_index
+
     # New frequency.
     if dp_to.spectrometer_frq[id] not in dp_to.spectrometer_frq_list:
         dp_to.spectrometer_frq_list.append(dp_to.spectrometer_frq[id])
@@ -276,6 +280,10 @@ def set_frequency(id=None, frq=None, units='Hz'):
     # Set the frequency.
     cdp.spectrometer_frq[id] = frq * conv
 
+    # Reset any index of the spectrum metadata.
+    if hasattr(cdp, '_spectrum_index'):
+        del cdp._spectrum_index
+
     # Some checks.
     frequency_checks(cdp.spectrometer_frq[id])
 
@@ -98,6 +98,9 @@ def start(mode=None, profile_flag=False):
         relax.tee_file = None
         relax.multiprocessor_type = 'uni'
         relax.n_processors = 1
+        relax.journal_file = None
+        relax.telemetry = False
+        relax.telemetry_file = None
 
     # Process the command line arguments.
     else:
@@ -113,6 +116,14 @@ def start(mode=None, profile_flag=False):
         verbosity = 1
     processor = load_multiprocessor(relax.multiprocessor_type, callbacks, processor_size=relax.n_processors, verbosity=verbosity)
 
+    # The crash-safe journal of completed calculations.
+    if relax.journal_file:
+        processor.set_journal(relax.journal_file)
+
+    # The per-command execution telemetry.
+    if relax.telemetry:
+        processor.set_telemetry(relax.telemetry_file)
+
     # Place the processor fabric intro string into the info box.
     info = Info_box()
     info.multi_processor_string = processor.get_intro_string()
@@ -301,6 +312,9 @@ class Relax:
         group = OptionGroup(parser, 'Multi-processor options')
         group.add_option('-m', '--multi', action='store', type='string', dest='multiprocessor', default='uni', help='set multi processor method')
         group.add_option('-n', '--processors', action='store', type='int', dest='n_processors', default=-1, help='set number of processors (may be ignored)')
+        group.add_option('-j', '--journal', action='store', type='string', dest='journal', help='record the completed multi-processor calculations in the file JOURNAL_FILE, and skip these when restarting a crashed run', metavar='JOURNAL_FILE')
+        group.add_option('--telemetry', action='store_true', dest='telemetry', default=0, help='collect and summarise the per-command execution telemetry of the multi-processor fabric')
+        group.add_option('--telemetry-file', action='store', type='string', dest='telemetry_file', help='export the per-command execution telemetry to the CSV or JSON (for the .json extension) file TELEMETRY_FILE', metavar='TELEMETRY_FILE')
         parser.add_option_group(group)
 
         # Recognised command line options for IO redirection.
@@ -412,9 +426,12 @@ class Relax:
         # Set the multi-processor type and number.
         self.multiprocessor_type = options.multiprocessor
         self.n_processors = options.n_processors
+        self.journal_file = options.journal
+        self.telemetry = options.telemetry or options.telemetry_file != None
+        self.telemetry_file = options.telemetry_file
 
         # Checks for the multiprocessor mode.
-        if self.multiprocessor_type == 'mpi4py' and not dep_check.mpi4py_module:
+        if self.multiprocessor_type in ['mpi4py', 'mpi4py_hybrid'] and not dep_check.mpi4py_module:
             parser.error(dep_check.mpi4py_message)
 
 
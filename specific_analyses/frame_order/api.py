@@ -35,6 +35,7 @@ from lib.errors import RelaxError, RelaxNoModelError
 from lib.frame_order.variables import MODEL_ISO_CONE_FREE_ROTOR
 from lib.warnings import RelaxWarning
 from multi import Processor_box
+from multi.shared_data import Shared_array
 from pipe_control import pipes
 from pipe_control.interatomic import interatomic_loop, return_interatom
 from pipe_control.mol_res_spin import return_spin, spin_loop
@@ -42,7 +43,7 @@ from specific_analyses.api_base import API_base
 from specific_analyses.api_common import API_common
 from specific_analyses.frame_order.checks import check_pivot
 from specific_analyses.frame_order.data import domain_moving
-from specific_analyses.frame_order.optimisation import Frame_order_grid_command, Frame_order_memo, Frame_order_minimise_command, count_sobol_points, grid_row, store_bc_data, target_fn_data_setup
+from specific_analyses.frame_order.optimisation import Frame_order_grid_command, Frame_order_memo, Frame_order_minimise_command, count_sobol_points, grid_row, share_data, store_bc_data, target_fn_data_setup
 from specific_analyses.frame_order.parameter_object import Frame_order_params
 from specific_analyses.frame_order.parameters import assemble_param_vector, linear_constraints, param_num, update_model
 from target_functions import frame_order
@@ -487,6 +488,9 @@ class Frame_order(API_base, API_common):
             # Randomise the points.
             shuffle(pts)
 
+            # Publish the large data arrays once, rather than sending a copy with each grid subdivision.
+            rdcs, rdc_err, rdc_weight, rdc_vect, rdc_const, pcs, pcs_err, pcs_weight, atomic_pos = share_data(processor=processor, data=[rdcs, rdc_err, rdc_weight, rdc_vect, rdc_const, pcs, pcs_err, pcs_weight, atomic_pos], names=['rdcs', 'rdc_err', 'rdc_weight', 'rdc_vect', 'rdc_const', 'pcs', 'pcs_err', 'pcs_weight', 'atomic_pos'])
+
         # Loop over each grid subdivision, with all points violating constraints being eliminated.
         for subdivision in grid_split_array(divisions=processor.processor_size(), points=pts, A=A, b=b, verbosity=verbosity):
             # Set up the memo for storage on the master.
@@ -501,6 +505,11 @@ class Frame_order(API_base, API_common):
         # Execute the queued elements.
         processor.run_queue()
 
+        # Free the shared data.
+        for handle in [rdcs, rdc_err, rdc_weight, rdc_vect, rdc_const, pcs, pcs_err, pcs_weight, atomic_pos]:
+            if isinstance(handle, Shared_array):
+                processor.release_shared_array(handle)
+
 
     def map_bounds(self, param, spin_id=None):
         """Create bounds for the OpenDX mapping function.
@@ -42,6 +42,7 @@ from lib.periodic_table import periodic_table
 from lib.physical_constants import dipolar_constant
 from lib.warnings import RelaxWarning
 from multi import Memo, Result_command, Slave_command
+from multi.shared_data import fetch_shared
 from pipe_control.interatomic import interatomic_loop
 from pipe_control.mol_res_spin import return_spin, spin_loop
 from pipe_control.structure.mass import pipe_centre_of_mass
@@ -686,6 +687,34 @@ def opt_uses_rdc(align_id):
     return True
 
 
+def share_data(processor=None, data=None, names=None):
+    """Publish the numpy data arrays to the slave processors as shared read-only arrays.
+
+    @keyword processor: The processor instance.
+    @type processor:    multi.processor.Processor instance
+    @keyword data:      The list of data structures to share.
+    @type data:         list of numpy arrays or None
+    @keyword names:     The names of the data structures.
+    @type names:        list of str
+    @return:            The list of shared array handles, with all other structures, such as None, passed through unmodified.
+    @rtype:             list of multi.shared_data.Shared_array instances or anything
+    """
+
+    # Loop over the data structures.
+    shared = []
+    for i in range(len(data)):
+        # Not a numpy array.
+        if not isinstance(data[i], ndarray):
+            shared.append(data[i])
+            continue
+
+        # Publish the array.
+        shared.append(processor.share_array(name='frame_order_%s' % names[i], value=data[i]))
+
+    # Return the handles.
+    return shared
+
+
 def store_bc_data(A_5D_bc=None, pcs_theta=None, rdc_theta=None):
     """Store the back-calculated data.
 
@@ -1032,8 +1061,8 @@ class Frame_order_grid_command(Slave_command):
     def run(self, processor, completed):
         """Set up and perform the optimisation."""
 
-        # Set up the optimisation target function class.
-        target_fn = Frame_order(model=self.model, init_params=self.param_vector, full_tensors=self.full_tensors, full_in_ref_frame=self.full_in_ref_frame, rdcs=self.rdcs, rdc_errors=self.rdc_err, rdc_weights=self.rdc_weight, rdc_vect=self.rdc_vect, dip_const=self.rdc_const, pcs=self.pcs, pcs_errors=self.pcs_err, pcs_weights=self.pcs_weight, atomic_pos=self.atomic_pos, temp=self.temp, frq=self.frq, paramag_centre=self.paramag_centre, scaling_matrix=self.scaling_matrix, com=self.com, ave_pos_pivot=self.ave_pos_pivot, pivot=self.pivot, pivot_opt=self.pivot_opt, sobol_max_points=self.sobol_max_points, sobol_oversample=self.sobol_oversample, quad_int=self.quad_int)
+        # Set up the optimisation target function class (the large data arrays may be shared).
+        target_fn = Frame_order(model=self.model, init_params=self.param_vector, full_tensors=self.full_tensors, full_in_ref_frame=self.full_in_ref_frame, rdcs=fetch_shared(self.rdcs), rdc_errors=fetch_shared(self.rdc_err), rdc_weights=fetch_shared(self.rdc_weight), rdc_vect=fetch_shared(self.rdc_vect), dip_const=fetch_shared(self.rdc_const), pcs=fetch_shared(self.pcs), pcs_errors=fetch_shared(self.pcs_err), pcs_weights=fetch_shared(self.pcs_weight), atomic_pos=fetch_shared(self.atomic_pos), temp=self.temp, frq=self.frq, paramag_centre=self.paramag_centre, scaling_matrix=self.scaling_matrix, com=self.com, ave_pos_pivot=self.ave_pos_pivot, pivot=self.pivot, pivot_opt=self.pivot_opt, sobol_max_points=self.sobol_max_points, sobol_oversample=self.sobol_oversample, quad_int=self.quad_int)
 
         # Grid search.
         results = grid_point_array(func=target_fn.func, args=(), points=self.points, verbosity=self.verbosity)
@@ -1373,7 +1373,7 @@ class Model_free(API_base, API_common):
                     command = MF_grid_command()
 
                     # Pass in the data and optimisation parameters.
-                    command.store_data(deepcopy(data_store), deepcopy(opt_params))
+                    command.store_data(deepcopy(data_store), deepcopy(opt_params), sim_index=sim_index)
 
                     # Set up the model-free memo and add it to the processor queue.
                     memo = MF_memo(model_free=self, model_type=data_store.model_type, spin=spin, sim_index=sim_index, scaling_matrix=data_store.scaling_matrix)
@@ -1394,7 +1394,7 @@ class Model_free(API_base, API_common):
                 command = MF_minimise_command()
 
             # Pass in the data and optimisation parameters.
-            command.store_data(deepcopy(data_store), deepcopy(opt_params))
+            command.store_data(deepcopy(data_store), deepcopy(opt_params), sim_index=sim_index)
 
             # Set up the model-free memo and add it to the processor queue.
             memo = MF_memo(model_free=self, model_type=data_store.model_type, spin=spin, sim_index=sim_index, scaling_matrix=data_store.scaling_matrix)
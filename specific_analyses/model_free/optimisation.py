@@ -36,6 +36,7 @@ from lib.float import isNaN, isInf
 from lib.periodic_table import periodic_table
 from lib.text.sectioning import subsection
 from multi import Memo, Result_command, Slave_command
+from multi.misc import checksum
 from pipe_control import pipes
 from pipe_control.interatomic import return_interatom_list
 from pipe_control.mol_res_spin import return_spin, return_spin_from_index
@@ -530,6 +531,31 @@ class MF_minimise_command(Slave_command):
         # Execute the base class __init__() method.
         super(MF_minimise_command, self).__init__()
 
+        # The optional MC simulation index.
+        self.sim_index = None
+
+
+    def cost(self):
+        """Estimate the computational cost of the optimisation for the scheduling on the master.
+
+        @return:    The number of relaxation data points of all spins.
+        @rtype:     float
+        """
+
+        return float(sum(self.data.num_ri))
+
+
+    def identity(self):
+        """Return the stable identity of the command for the crash-safe journal."""
+
+        # The inputs, excluding the simulated relaxation data.
+        inputs = dict(self.data.__dict__)
+        if self.sim_index != None:
+            inputs.pop('ri_data')
+
+        # Return the identity.
+        return "model_free %s %s %s %s %s" % (self.__class__.__name__, self.data.model_type, self.data.spin_id, self.sim_index, checksum([sorted(inputs.items()), self.opt_params]))
+
 
     def optimise(self):
         """Model-free optimisation.
@@ -564,18 +590,21 @@ class MF_minimise_command(Slave_command):
         processor.return_object(MF_result_command(processor, self.memo_id, param_vector, func, iter, fc, gc, hc, warning, completed=False))
 
 
-    def store_data(self, data, opt_params):
+    def store_data(self, data, opt_params, sim_index=None):
         """Store all the data required for model-free optimisation.
 
         @param data:        The data used to initialise the model-free target function class.
         @type data:         class instance
         @param opt_params:  The parameters and data required for optimisation using minfx.
         @type opt_params:   class instance
+        @keyword sim_index: The optional MC simulation index.
+        @type sim_index:    None or int
         """
 
         # Store the data.
         self.data = data
         self.opt_params = opt_params
+        self.sim_index = sim_index
 
 
 
@@ -589,6 +618,27 @@ class MF_grid_command(MF_minimise_command):
         super(MF_grid_command, self).__init__()
 
 
+    def cost(self):
+        """Estimate the computational cost of the grid search for the scheduling on the master.
+
+        @return:    The number of relaxation data points of all spins multiplied by the number of grid points.
+        @rtype:     float
+        """
+
+        # The number of data points.
+        points = super(MF_grid_command, self).cost()
+
+        # The number of grid points.
+        if not hasattr(self.opt_params, 'subdivision'):
+            for x in self.opt_params.inc:
+                points *= x
+        else:
+            points *= len(self.opt_params.subdivision)
+
+        # Return the estimate.
+        return points
+
+
     def optimise(self):
         """Model-free grid search.
 
@@ -27,7 +27,8 @@
 # Python module imports.
 import bmrblib
 from copy import deepcopy
-from numpy import int32, sqrt, zeros
+from math import ceil
+from numpy import diag, int32, sqrt, zeros
 from re import match, search
 import string
 import sys
@@ -35,7 +36,7 @@ from types import MethodType
 
 # relax module imports.
 from lib.arg_check import is_list, is_str_list
-from lib.dispersion.variables import EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, MODEL_LIST_MMQ, MODEL_R2EFF, PARAMS_R20
+from lib.dispersion.variables import EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, MODEL_LIST_DERIVS, MODEL_LIST_MMQ, MODEL_R2EFF, PARAMS_R20
 from lib.errors import RelaxError, RelaxImplementError
 from lib.text.sectioning import subsection
 from multi import Processor_box
@@ -48,8 +49,8 @@ from pipe_control.sequence import return_attached_protons
 from specific_analyses.api_base import API_base
 from specific_analyses.api_common import API_common
 from specific_analyses.relax_disp.checks import check_model_type
-from specific_analyses.relax_disp.data import average_intensity, calc_rotating_frame_params, find_intensity_keys, generate_r20_key, has_exponential_exp_type, has_proton_mmq_cpmg, loop_cluster, loop_exp_frq, loop_exp_frq_offset_point, loop_time, pack_back_calc_r2eff, return_param_key_from_data, spin_ids_to_containers
-from specific_analyses.relax_disp.optimisation import Disp_memo, Disp_minimise_command, back_calc_peak_intensities, back_calc_r2eff, calculate_r2eff, minimise_r2eff
+from specific_analyses.relax_disp.data import average_intensity, calc_rotating_frame_params, find_intensity_keys, generate_r20_key, has_exponential_exp_type, has_proton_mmq_cpmg, is_newton_batched, loop_cluster, loop_exp_frq, loop_exp_frq_offset_point, loop_time, pack_back_calc_r2eff, return_param_key_from_data, spin_ids_to_containers
+from specific_analyses.relax_disp.optimisation import Disp_batch_memo, Disp_batch_minimise_command, Disp_memo, Disp_minimise_command, back_calc_peak_intensities, back_calc_r2eff, calculate_r2eff, minimise_r2eff
 from specific_analyses.relax_disp.parameter_object import Relax_disp_params
 from specific_analyses.relax_disp.parameters import get_param_names, get_value, loop_parameters, param_index_to_param_info, param_num, r1_setup
 
@@ -741,12 +742,31 @@ class Relax_disp(API_base, API_common):
 
             # If the Jacobian and Hessian matrix have not been specified for fitting, 'simplex' should be used.
             else:
+                # Are the analytic chi-squared gradients and Hessians implemented for the models of all spins?
+                derivs = True
+                for spin in spin_loop(skip_desel=True):
+                    if not hasattr(spin, 'model') or spin.model not in MODEL_LIST_DERIVS:
+                        derivs = False
+                        break
+
                 if match('^[Gg]rid$', algor):
                     allow = True
 
                 elif match('^[Ss]implex$', algor):
                     allow = True
 
+                # Quasi-Newton BFGS minimisation.
+                elif derivs and match('^[Bb][Ff][Gg][Ss]$', algor):
+                    allow = True
+
+                # Newton minimisation.
+                elif derivs and match('^[Nn]ewton$', algor):
+                    allow = True
+
+                # Constrained method, Method of Multipliers.
+                elif derivs and (match('^[Mm][Oo][Mm]$', algor) or match('[Mm]ethod of [Mm]ultipliers$', algor)):
+                    allow = True
+
         # Do not allow, if no model has been specified.
         else:
             model_type = 'None'
@@ -754,7 +774,7 @@ class Relax_disp(API_base, API_common):
             allow = False
 
         if not allow:
-            raise RelaxError("Minimisation algorithm '%s' is not allowed, since function gradients for model '%s' is not implemented.  Only the 'simplex' minimisation algorithm is supported for the relaxation dispersion analysis of this model."%(algor, model_type))
+            raise RelaxError("Minimisation algorithm '%s' is not allowed, since function gradients for model '%s' is not implemented.  Only the 'simplex' minimisation algorithm is supported for the relaxation dispersion analysis of this model, whereas the gradient based algorithms are supported for the analytic models %s."%(algor, model_type, MODEL_LIST_DERIVS))
 
         # Initialise some empty data pipe structures so that the target function set up does not fail.
         if not hasattr(cdp, 'cpmg_frqs_list'):
@@ -778,6 +798,10 @@ class Relax_disp(API_base, API_common):
             fields = cdp.spectrometer_frq_list
             field_count = cdp.spectrometer_frq_count
 
+        # If turned on by the relax_disp.newton_batch user function, the free spins of the analytic models are optimised together in batches with the Newton algorithm, keyed by the model and scaling.
+        batch = cdp.model_type != MODEL_R2EFF and match('^[Nn]ewton$', algor)
+        batches = {}
+
         # Loop over the spin blocks.
         model_index = -1
         for spin_ids in self.model_loop():
@@ -814,6 +838,15 @@ class Relax_disp(API_base, API_common):
                 # Skip the rest.
                 continue
 
+            # Collect the free spins for the batched optimisation.
+            if batch and len(spins) == 1 and is_newton_batched(spins[0].model):
+                key = (spins[0].model, tuple(diag(scaling_matrix[model_index])))
+                if key not in batches:
+                    batches[key] = [[], [], scaling_matrix[model_index]]
+                batches[key][0].append(spins[0])
+                batches[key][1].append(spin_ids[0])
+                continue
+
             # Set up the slave command object.
             command = Disp_minimise_command(spins=spins, spin_ids=spin_ids, sim_index=sim_index, scaling_matrix=scaling_matrix[model_index], min_algor=min_algor, min_options=min_options, func_tol=func_tol, grad_tol=grad_tol, max_iterations=max_iterations, constraints=constraints, verbosity=verbosity, lower=lower_i, upper=upper_i, inc=inc_i, fields=fields, param_names=get_param_names(spins=spins, full=True))
 
@@ -823,6 +856,27 @@ class Relax_disp(API_base, API_common):
             # Add the slave command and memo to the processor queue.
             processor.add_to_queue(command, memo)
 
+        # The batched optimisation of the free spins, split evenly over the slave processors.
+        for key in sorted(batches):
+            batch_spins, batch_ids, batch_scaling = batches[key]
+            size = int(ceil(len(batch_spins) / float(processor.processor_size())))
+            for i in range(0, len(batch_spins), size):
+                # The spins of the batch.
+                spins = batch_spins[i:i+size]
+                spin_ids = batch_ids[i:i+size]
+
+                # Set up the slave command object.
+                command = Disp_batch_minimise_command(spins=spins, spin_ids=spin_ids, sim_index=sim_index, scaling_matrix=batch_scaling, func_tol=func_tol, grad_tol=grad_tol, max_iterations=max_iterations, constraints=constraints, verbosity=verbosity, fields=fields, param_names=get_param_names(spins=[spins[0]], full=True))
+
+                # Set up the memo, holding the individual memo of each spin.
+                memos = []
+                for j in range(len(spins)):
+                    memos.append(Disp_memo(spins=[spins[j]], spin_ids=[spin_ids[j]], sim_index=sim_index, scaling_matrix=batch_scaling, verbosity=verbosity))
+                memo = Disp_batch_memo(memos=memos)
+
+                # Add the slave command and memo to the processor queue.
+                processor.add_to_queue(command, memo)
+
 
     def model_desc(self, model_info=None):
         """Return a description of the model.
@@ -30,6 +30,7 @@ These functions raise various RelaxErrors to help the user understand what went
 from dep_check import C_module_exp_fn
 from lib.dispersion.variables import EXP_TYPE_LIST_CPMG, EXP_TYPE_LIST_R1RHO, MODEL_LIST_R1RHO_OFF_RES, MODEL_NOREX
 from lib.errors import RelaxError, RelaxFuncSetupError, RelaxNoPeakIntensityError
+from pipe_control.pipes import get_pipe
 import specific_analyses
 
 
@@ -184,19 +185,26 @@ def check_pipe_type():
         raise RelaxFuncSetupError(specific_analyses.setup.get_string(function_type))
 
 
-def check_missing_r1(model=None):
+def check_missing_r1(model=None, pipe=None):
     """Check if R1 data is missing for the model.
 
     @keyword model: The model to test for.
     @type model:    str
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
     @return:        Return True if R1 data is not available for the model.
     @rtype:         bool
     """
 
+    # The data pipe.
+    dp = cdp
+    if pipe != None:
+        dp = get_pipe(pipe)
+
     # Check that the model uses R1 data.
     if model in [MODEL_NOREX] + MODEL_LIST_R1RHO_OFF_RES:
         # If R1 ids are present.
-        if hasattr(cdp, 'ri_ids'):
+        if hasattr(dp, 'ri_ids'):
             return False
 
         # If not present.
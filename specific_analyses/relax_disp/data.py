@@ -51,6 +51,7 @@ The data structures used in this module consist of many different index types wh
 """
 
 # Python module imports.
+from copy import deepcopy
 from math import cos, pi, sin, sqrt
 from numpy import array, concatenate, float64, int32, max, ones, unique, zeros
 from os import F_OK, access
@@ -61,7 +62,7 @@ import sys
 from warnings import warn
 
 # relax module imports.
-from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, EXP_TYPE_CPMG_SQ, EXP_TYPE_CPMG_ZQ, EXP_TYPE_DESC_CPMG_DQ, EXP_TYPE_DESC_CPMG_MQ, EXP_TYPE_DESC_CPMG_PROTON_MQ, EXP_TYPE_DESC_CPMG_PROTON_SQ, EXP_TYPE_DESC_CPMG_SQ, EXP_TYPE_DESC_CPMG_ZQ, EXP_TYPE_DESC_R1RHO, EXP_TYPE_LIST, EXP_TYPE_LIST_CPMG, EXP_TYPE_LIST_R1RHO, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_DPL94, MODEL_LIST_FIT_R1, MODEL_LIST_MMQ, MODEL_LIST_NUMERIC_CPMG, MODEL_LIST_R1RHO_FULL, MODEL_LIST_R1RHO_ON_RES, MODEL_MP05, MODEL_NOREX, MODEL_NS_R1RHO_2SITE, MODEL_PARAMS, MODEL_R2EFF, MODEL_TAP03, MODEL_TP02, PARAMS_R20
+from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, EXP_TYPE_CPMG_SQ, EXP_TYPE_CPMG_ZQ, EXP_TYPE_DESC_CPMG_DQ, EXP_TYPE_DESC_CPMG_MQ, EXP_TYPE_DESC_CPMG_PROTON_MQ, EXP_TYPE_DESC_CPMG_PROTON_SQ, EXP_TYPE_DESC_CPMG_SQ, EXP_TYPE_DESC_CPMG_ZQ, EXP_TYPE_DESC_R1RHO, EXP_TYPE_LIST, EXP_TYPE_LIST_CPMG, EXP_TYPE_LIST_R1RHO, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_DPL94, MODEL_LIST_DERIVS, MODEL_LIST_FIT_R1, MODEL_LIST_MMQ, MODEL_LIST_NUMERIC_CPMG, MODEL_LIST_R1RHO_FULL, MODEL_LIST_R1RHO_ON_RES, MODEL_LIST_R20_LINEAR, MODEL_MP05, MODEL_NOREX, MODEL_NS_R1RHO_2SITE, MODEL_PARAMS, MODEL_R2EFF, MODEL_TAP03, MODEL_TP02, PARAMS_R20
 from lib.errors import RelaxError, RelaxNoSpectraError, RelaxNoSpinError, RelaxSpinTypeError
 from lib.float import isNaN
 from lib.io import extract_data, get_file_path, open_write_file, strip, write_data
@@ -73,7 +74,7 @@ from lib.sequence import read_spin_data, write_spin_data
 from lib.text.sectioning import section
 from lib.warnings import RelaxWarning, RelaxNoSpinWarning
 from pipe_control.mol_res_spin import check_mol_res_spin_data, exists_mol_res_spin_data, generate_spin_id_unique, generate_spin_string, return_spin, spin_loop
-from pipe_control.pipes import check_pipe
+from pipe_control.pipes import check_pipe, get_pipe
 from pipe_control.result_files import add_result_file
 from pipe_control.selection import desel_spin
 from pipe_control.sequence import return_attached_protons
@@ -89,6 +90,9 @@ from os import chmod, sep
 # Module variables.
 R20_KEY_FORMAT = "%s - %.8f MHz"
 
+# The spectrum metadata structures of the data pipe from which the spectrum index is built.
+SPECTRUM_INDEX_DATA = ['spectrum_ids', 'exp_type', 'spectrometer_frq', 'spin_lock_offset', 'cpmg_frqs', 'spin_lock_nu1', 'relax_times', 'exp_type_list', 'spectrometer_frq_list', 'cpmg_frqs_list', 'spin_lock_nu1_list', 'relax_time_list']
+
 # Plotting variables.
 Y_AXIS_R2_EFF = "r2_eff"
 Y_AXIS_R2_R1RHO = "r2_r1rho"
@@ -295,6 +299,38 @@ def check_intensity_errors(spin_id=None):
             error_analysis(subset=ids)
 
 
+def cluster_cache(spins=None, spin_ids=None):
+    """Return the cache of the target function data structures of the spin cluster.
+
+    The cache is stored in the private (and hence not saved) cdp._cluster_cache dictionary, with one dictionary per cluster keyed by the spin IDs.  The cache of the cluster is emptied if the spectrum metadata has changed (see the spectrum_index() function), or if the spin containers or their selection, isotope, chemical shift or presence of R2eff/R1rho data have changed.
+
+
+    @keyword spins:     The list of spin containers in the cluster.
+    @type spins:        list of SpinContainer instances
+    @keyword spin_ids:  The list of spin IDs for the cluster.
+    @type spin_ids:     list of str
+    @return:            The cache of the cluster.
+    @rtype:             dict
+    """
+
+    # The current state of the cluster.
+    state = [spectrum_index()]
+    for spin in spins:
+        state.append((spin, spin.select, hasattr(spin, 'r2eff'), getattr(spin, 'isotope', None), getattr(spin, 'chemical_shift', None)))
+
+    # Initialise the cache.
+    if not hasattr(cdp, '_cluster_cache'):
+        cdp._cluster_cache = {}
+    key = tuple(spin_ids)
+
+    # A new cluster or a changed state.
+    if key not in cdp._cluster_cache or cdp._cluster_cache[key]['state'][0] is not state[0] or cdp._cluster_cache[key]['state'][1:] != state[1:]:
+        cdp._cluster_cache[key] = {'state': state}
+
+    # Return the cache.
+    return cdp._cluster_cache[key]
+
+
 def count_exp():
     """Count the number of experiments present.
 
@@ -338,25 +374,13 @@ def count_relax_times(exp_type=None, frq=None, offset=None, point=None, ei=None)
     @rtype:                     int
     """
 
-    # Loop over the times.
+    # No data for the experiment.
+    if not spectrum_index_ids(exp_type=cdp.exp_type_list[ei]):
+        return 0
+
+    # Count the times.
     count = 0
     for time in loop_time(exp_type=exp_type, frq=frq, offset=offset, point=point):
-        # Find a matching experiment ID.
-        found = False
-        for id in cdp.exp_type:
-            # Skip non-matching experiments.
-            if cdp.exp_type[id] != cdp.exp_type_list[ei]:
-                continue
-
-            # Found.
-            found = True
-            break
-
-        # No data.
-        if not found:
-            continue
-
-        # A new time.
         count += 1
 
     # Return the count.
@@ -426,6 +450,9 @@ def cpmg_setup(spectrum_id=None, cpmg_frq=None, ncyc_even=True):
     # Add the ncyc flag.
     cdp.ncyc_even[spectrum_id] = ncyc_even
 
+    # The spectrum metadata has changed.
+    spectrum_index_reset()
+
     # Printout.
     print("The spectrum ID '%s' CPMG frequency is set to %s Hz." % (spectrum_id, cdp.cpmg_frqs[spectrum_id]))
     print("The spectrum ID '%s' even number of CPMG blocks flag is set to %s." % (spectrum_id, cdp.ncyc_even[spectrum_id]))
@@ -473,40 +500,19 @@ def find_intensity_keys(exp_type=None, frq=None, offset=None, point=None, time=N
     if isNaN(point):
         point = None
 
-    # The dispersion data.
-    if exp_type in EXP_TYPE_LIST_CPMG:
-        disp_data = cdp.cpmg_frqs
-    else:
-        disp_data = cdp.spin_lock_nu1
-
-    # Loop over all spectrum IDs, returning the matching ID.
-    ids = []
-    for id in cdp.exp_type:
-        # Skip non-matching experiments.
-        if cdp.exp_type[id] != exp_type:
-            continue
-
-        # Skip non-matching spectrometer frequencies.
-        if hasattr(cdp, 'spectrometer_frq') and cdp.spectrometer_frq[id] != frq:
-            continue
-
-        # Skip non-matching offsets.
-        if offset != None and hasattr(cdp, 'spin_lock_offset') and cdp.spin_lock_offset[id] != offset:
-            continue
-
-        # Skip non-matching dispersion points.
-        if disp_data[id] != point:
-            continue
+    # The frequency and offset filters only apply if the data is present.
+    if not hasattr(cdp, 'spectrometer_frq'):
+        frq = None
+    if not hasattr(cdp, 'spin_lock_offset'):
+        offset = None
 
-        # The reference point, so checking the time is pointless (and can fail as specifying the time should not be necessary).
-        if point == None or isNaN(point):
-            ids.append(id)
+    # The reference point, so checking the time is pointless (and can fail as specifying the time should not be necessary).
+    if point == None:
+        ids = spectrum_index_ids(exp_type=exp_type, frq=frq, offset=offset, ref=True)
 
-        # Matching time.
-        elif time == None:
-            ids.append(id)
-        elif cdp.relax_times[id] == time:
-            ids.append(id)
+    # Matching dispersion point and time.
+    else:
+        ids = spectrum_index_ids(exp_type=exp_type, frq=frq, offset=offset, point=point, time=time)
 
     # Check for missing IDs.
     if raise_error and len(ids) == 0:
@@ -553,8 +559,12 @@ def get_curve_type(id=None):
         if has_exponential_exp_type():
             curve_type = 'exponential'
 
-    # A specific ID.
+    # A specific ID, using the curve type stored in the spectrum index.
     else:
+        index = spectrum_index()
+        if id in index['curve_type']:
+            return index['curve_type'][id]
+
         # Determine the curve type.
         curve_type = 'exponential'
         exp_type = cdp.exp_type[id]
@@ -562,6 +572,9 @@ def get_curve_type(id=None):
         if count_relax_times(exp_type = exp_type, frq = frq, ei = cdp.exp_type_list.index(cdp.exp_type[id])) == 1:
             curve_type = 'fixed time'
 
+        # Store the type.
+        index['curve_type'][id] = curve_type
+
     # Return the type.
     return curve_type
 
@@ -683,56 +696,68 @@ def has_fixed_time_exp_type():
     return False
 
 
-def has_proton_mmq_cpmg():
+def has_proton_mmq_cpmg(pipe=None):
     """Determine if the current data pipe contains either proton SQ or MQ (MMQ) CPMG data.
 
     This is only for the MMQ models.
 
 
-    @return:    True if either proton SQ or MQ CPMG data exists, False otherwise.
-    @rtype:     bool
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
+    @return:        True if either proton SQ or MQ CPMG data exists, False otherwise.
+    @rtype:         bool
     """
 
     # 1H MMQ data exists.
-    if has_proton_sq_cpmg():
+    if has_proton_sq_cpmg(pipe=pipe):
         return True
-    if has_proton_mq_cpmg():
+    if has_proton_mq_cpmg(pipe=pipe):
         return True
 
     # No 1H MMQ CPMG data.
     return False
 
 
-def has_proton_mq_cpmg():
+def has_proton_mq_cpmg(pipe=None):
     """Determine if the current data pipe contains proton MQ CPMG data.
 
     This is only for the MMQ models.
 
 
-    @return:    True if proton MQ CPMG data exists, False otherwise.
-    @rtype:     bool
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
+    @return:        True if proton MQ CPMG data exists, False otherwise.
+    @rtype:         bool
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # Proton MQ CPMG data is present.
-    if EXP_TYPE_CPMG_PROTON_MQ in cdp.exp_type_list:
+    if EXP_TYPE_CPMG_PROTON_MQ in dp.exp_type_list:
         return True
 
     # No 1H MQ CPMG data.
     return False
 
 
-def has_proton_sq_cpmg():
+def has_proton_sq_cpmg(pipe=None):
     """Determine if the current data pipe contains proton SQ CPMG data.
 
     This is only for the MMQ models.
 
 
-    @return:    True if proton SQ CPMG data exists, False otherwise.
-    @rtype:     bool
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
+    @return:        True if proton SQ CPMG data exists, False otherwise.
+    @rtype:         bool
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # Proton SQ CPMG data is present.
-    if EXP_TYPE_CPMG_PROTON_SQ in cdp.exp_type_list:
+    if EXP_TYPE_CPMG_PROTON_SQ in dp.exp_type_list:
         return True
 
     # No 1H SQ CPMG data.
@@ -821,7 +846,7 @@ def insignificance(level=0.0):
             desel_spin(spin_id)
 
 
-def interpolate_disp(spin=None, spin_id=None, si=None, num_points=None, extend_hz=None, relax_times=None):
+def interpolate_disp(spin=None, spin_id=None, si=None, num_points=None, extend_hz=None, relax_times=None, cluster_ids=None):
     """Interpolate function for 2D Grace plotting function for the dispersion curves.
 
     @keyword spin:          The specific spin data container.
@@ -836,6 +861,8 @@ def interpolate_disp(spin=None, spin_id=None, si=None, num_points=None, extend_h
     @type extend_hz:        float
     @keyword relax_times:   The experiment specific fixed time period for relaxation (in seconds).  The dimensions are {Ei, Mi, Oi, Di, Ti}.
     @type relax_times:      rank-4 list of floats
+    @keyword cluster_ids:   The spin IDs of the cluster of the spin.  If supplied, all spins of the cluster are back-calculated together, and the memoised back-calculation is reused for the other spins of the cluster.
+    @type cluster_ids:      None or list of str
     @return:                The interpolated_flag, list of back calculated R2eff/R1rho values in rad/s {Ei, Si, Mi, Oi, Di}, list of interpolated frequencies for cpmg_frqs in Hz {Ei, Si, Mi, Oi, Di}, interpolated spin-lock offsets in rad/s {Ei, Si, Mi, Oi}, list of interpolated spin-lock field strength frequencies for spin_lock_nu1_new in Hz {Ei, Si, Mi, Oi, Di}, chemical shifts in rad/s {Ei, Si, Mi}, interpolated rotating frame tilt angles theta {Ei, Si, Mi, Oi, Di}, interpolated average resonance offset in the rotating frame Omega in rad/s {Ei, Si, Mi, Oi, Di} and the interpolated effective field in rotating frame w_eff in rad/s {Ei, Si, Mi, Oi, Di}.
     @rtype:                 boolean, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-3 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-2 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays
     """
@@ -1003,13 +1030,38 @@ def interpolate_disp(spin=None, spin_id=None, si=None, num_points=None, extend_h
     if spin.model == MODEL_R2EFF:
         back_calc = None
     else:
-        # Back calculate R2eff data for the second sets of plots.
-        back_calc = specific_analyses.relax_disp.optimisation.back_calc_r2eff(spins=[spin], spin_ids=[spin_id], cpmg_frqs=cpmg_frqs_new, spin_lock_nu1=spin_lock_nu1_new, relax_times_new=relax_times_new)
+        # Back calculate R2eff data for the second sets of plots, for all spins of the cluster.
+        spins, spin_ids, index = interpolate_cluster(spin=spin, spin_id=spin_id, cluster_ids=cluster_ids)
+        back_calc = specific_analyses.relax_disp.optimisation.back_calc_r2eff(spins=spins, spin_ids=spin_ids, cpmg_frqs=cpmg_frqs_new, spin_lock_nu1=spin_lock_nu1_new, relax_times_new=relax_times_new)
+
+        # The data for the spin.
+        back_calc = [[back_calc[ei][index]] for ei in range(len(back_calc))]
 
     return interpolated_flag, back_calc, cpmg_frqs_new, offsets, spin_lock_fields_inter, chemical_shifts, tilt_angles, Delta_omega, w_eff
 
 
-def interpolate_offset(spin=None, spin_id=None, si=None, num_points=None, extend_ppm=None, relax_times=None):
+def interpolate_cluster(spin=None, spin_id=None, cluster_ids=None):
+    """Return the spins of the cluster of the given spin, for the back-calculation of the interpolated dispersion curves.
+
+    @keyword spin:          The specific spin data container.
+    @type spin:             SpinContainer instance.
+    @keyword spin_id:       The spin ID string.
+    @type spin_id:          str
+    @keyword cluster_ids:   The spin IDs of the cluster of the spin.
+    @type cluster_ids:      None or list of str
+    @return:                The spin containers and spin IDs of the cluster, and the index of the given spin in the cluster.
+    @rtype:                 list of SpinContainer instances, list of str, int
+    """
+
+    # The single spin.
+    if cluster_ids is None or spin_id not in cluster_ids:
+        return [spin], [spin_id], 0
+
+    # The cluster.
+    return spin_ids_to_containers(cluster_ids), cluster_ids, cluster_ids.index(spin_id)
+
+
+def interpolate_offset(spin=None, spin_id=None, si=None, num_points=None, extend_ppm=None, relax_times=None, cluster_ids=None):
     """Interpolate function for 2D Grace plotting function for the dispersion curves, interpolating through spin-lock offset in rad/s.
 
     @keyword spin:          The specific spin data container.
@@ -1024,6 +1076,8 @@ def interpolate_offset(spin=None, spin_id=None, si=None, num_points=None, extend
     @type extend_ppm:       float
     @keyword relax_times:   The experiment specific fixed time period for relaxation (in seconds).  The dimensions are {Ei, Mi, Oi, Di, Ti}.
     @type relax_times:      rank-4 list of floats
+    @keyword cluster_ids:   The spin IDs of the cluster of the spin.  If supplied, all spins of the cluster are back-calculated together, and the memoised back-calculation is reused for the other spins of the cluster.
+    @type cluster_ids:      None or list of str
     @return:                The interpolated_flag, list of back calculated R2eff/R1rho values in rad/s {Ei, Si, Mi, Oi, Di}, list of interpolated frequencies for cpmg_frqs in Hz {Ei, Si, Mi, Oi, Di}, interpolated spin-lock offsets in rad/s {Ei, Si, Mi, Oi}, list of interpolated spin-lock field strength frequencies for spin_lock_nu1_new in Hz {Ei, Si, Mi, Oi, Di}, chemical shifts in rad/s {Ei, Si, Mi}, interpolated rotating frame tilt angles theta {Ei, Si, Mi, Oi, Di}, interpolated average resonance offset in the rotating frame Omega in rad/s {Ei, Si, Mi, Oi, Di} and the interpolated effective field in rotating frame w_eff in rad/s {Ei, Si, Mi, Oi, Di}.
     @rtype:                 boolean, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-3 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-2 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays
     """
@@ -1047,26 +1101,30 @@ def interpolate_offset(spin=None, spin_id=None, si=None, num_points=None, extend
         min_offset = min(cdp.spin_lock_offset_list)
         max_offset = max(cdp.spin_lock_offset_list)
 
+    # The spins of the cluster of the spin, which are back-calculated together.
+    spins, spin_ids, index = interpolate_cluster(spin=spin, spin_id=spin_id, cluster_ids=cluster_ids)
+
     if spin_lock_nu1 != None and len(spin_lock_nu1[0][0][0]):
         for ei in range(len(spin_lock_nu1)):
             # Add a new dimension for ei.
             spin_lock_offset_new.append([])
 
-            # Add a new dimension for si.
-            spin_lock_offset_new[ei].append([])
+            # Add a new dimension for each spin of the cluster (the ppm offsets are converted to rad/s for each spin by return_offset_data()).
+            for si in range(len(spins)):
+                spin_lock_offset_new[ei].append([])
 
-            # Then loop over the spectrometer frequencies.
-            for mi in range(len(spin_lock_nu1[ei])):
-                # Add a new dimension for mi.
-                spin_lock_offset_new[ei][0].append([])
+                # Then loop over the spectrometer frequencies.
+                for mi in range(len(spin_lock_nu1[ei])):
+                    # Add a new dimension for mi.
+                    spin_lock_offset_new[ei][si].append([])
 
-                # Interpolate (adding the extended amount to the end).
-                for oi in range(num_points+1):
-                    offset_point = oi * (max_offset+extend_ppm) / num_points
-                    spin_lock_offset_new[ei][0][mi].append(offset_point)
+                    # Interpolate (adding the extended amount to the end).
+                    for oi in range(num_points+1):
+                        offset_point = oi * (max_offset+extend_ppm) / num_points
+                        spin_lock_offset_new[ei][si][mi].append(offset_point)
 
-                # Convert to a numpy array.
-                spin_lock_offset_new[ei][0][mi] = array(spin_lock_offset_new[ei][0][mi], float64)
+                    # Convert to a numpy array.
+                    spin_lock_offset_new[ei][si][mi] = array(spin_lock_offset_new[ei][si][mi], float64)
 
     # Number of spectrometer fields.
     fields = [None]
@@ -1076,7 +1134,8 @@ def interpolate_offset(spin=None, spin_id=None, si=None, num_points=None, extend
         field_count = cdp.spectrometer_frq_count
 
     # The offset data.
-    offsets, spin_lock_fields_inter, chemical_shifts, tilt_angles, Delta_omega, w_eff = return_offset_data(spins=[spin], spin_ids=[spin_id], field_count=field_count, spin_lock_offset=spin_lock_offset_new, fields=spin_lock_nu1)
+    spin_lock_offset_spin = [[spin_lock_offset_new[ei][index]] for ei in range(len(spin_lock_offset_new))]
+    offsets, spin_lock_fields_inter, chemical_shifts, tilt_angles, Delta_omega, w_eff = return_offset_data(spins=[spin], spin_ids=[spin_id], field_count=field_count, spin_lock_offset=spin_lock_offset_spin, fields=spin_lock_nu1)
 
     # Interpolated relaxation time.
     if tilt_angles != None and len(tilt_angles[0][0][0]):
@@ -1112,8 +1171,11 @@ def interpolate_offset(spin=None, spin_id=None, si=None, num_points=None, extend
     if spin.model == MODEL_R2EFF:
         back_calc = None
     else:
-        # Back calculate R2eff data for the second sets of plots.
-        back_calc = specific_analyses.relax_disp.optimisation.back_calc_r2eff(spins=[spin], spin_ids=[spin_id], spin_lock_offset=spin_lock_offset_new, spin_lock_nu1=spin_lock_fields_inter, relax_times_new=relax_times_new)
+        # Back calculate R2eff data for the second sets of plots, for all spins of the cluster.
+        back_calc = specific_analyses.relax_disp.optimisation.back_calc_r2eff(spins=spins, spin_ids=spin_ids, spin_lock_offset=spin_lock_offset_new, spin_lock_nu1=spin_lock_fields_inter, relax_times_new=relax_times_new)
+
+        # The data for the spin.
+        back_calc = [[back_calc[ei][index]] for ei in range(len(back_calc))]
 
     # cpmg_frqs are not interpolated.
     cpmg_frqs_new = None
@@ -1142,31 +1204,59 @@ def is_cpmg_exp_type(id=None):
     return False
 
 
-def is_r1_optimised(model=None):
+def is_newton_batched(model=None):
+    """Should the free spins be optimised together in batches by the Newton algorithm?
+
+    @keyword model: The model to test for.
+    @type model:    str
+    @return:        True if the free spins of the model should be optimised in batches by the lib.optimisation.newton_batch() function, False if each spin should be optimised individually by minfx.
+    @rtype:         bool
+    """
+
+    # Return False for all models without the analytic derivatives.
+    if model not in MODEL_LIST_DERIVS:
+        return False
+
+    # The batched optimisation flag.
+    if hasattr(cdp, 'newton_batch'):
+        return cdp.newton_batch
+
+    # Batching is off by default.
+    return False
+
+
+def is_r1_optimised(model=None, pipe=None):
     """Should R1 values be optimised?
 
     @keyword model: The model to test for.
     @type model:    str
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
     @return:        True if the R1 values should be optimised, False if loaded values should be used instead.
     @rtype:         bool
     """
 
+    # The data pipe.
+    dp = cdp
+    if pipe != None:
+        dp = get_pipe(pipe)
+
     # Return False for all models which do not support R1 optimisation.
     if model not in MODEL_LIST_FIT_R1:
         return False
-    if model == MODEL_NOREX and (cdp != None and hasattr(cdp, 'exp_type_list') and EXP_TYPE_R1RHO not in cdp.exp_type_list):
+    if model == MODEL_NOREX and (dp != None and hasattr(dp, 'exp_type_list') and EXP_TYPE_R1RHO not in dp.exp_type_list):
         return False
 
     # Firstly use the R1 fit flag as an override.
-    if hasattr(cdp, 'r1_fit'):
-        return cdp.r1_fit
+    if hasattr(dp, 'r1_fit'):
+        return dp.r1_fit
 
     # Catch on-resonance models.
     if model in MODEL_LIST_R1RHO_ON_RES:
         return False
 
     # Otherwise, is the R1 data loaded?
-    return check_missing_r1(model=model)
+    return check_missing_r1(model=model, pipe=pipe)
 
 
 def is_r1rho_exp_type(id=None):
@@ -1190,6 +1280,27 @@ def is_r1rho_exp_type(id=None):
     return False
 
 
+def is_r20_profiled(model=None):
+    """Should the R20 parameters be profiled out of the optimisation?
+
+    @keyword model: The model to test for.
+    @type model:    str
+    @return:        True if the R20 parameters should be found by the linear least-squares solution for each parameter vector, False if these should be optimised together with the other parameters.
+    @rtype:         bool
+    """
+
+    # Return False for all models in which the R20 parameters are not linear.
+    if model not in MODEL_LIST_R20_LINEAR:
+        return False
+
+    # The R20 profiling flag.
+    if hasattr(cdp, 'r20_profile'):
+        return cdp.r20_profile
+
+    # Profiling is off by default.
+    return False
+
+
 def loop_cluster(skip_desel=True):
     """Loop over the spin groupings for one model applied to multiple spins.
 
@@ -1250,20 +1361,25 @@ def loop_cluster(skip_desel=True):
             yield [spin_id]
 
 
-def loop_exp(return_indices=False):
+def loop_exp(return_indices=False, pipe=None):
     """Generator method for looping over all experiment types.
 
     @keyword return_indices:    A flag which if True will cause the experiment type index to be returned as well.
     @type return_indices:       bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     @return:                    The experiment type, and the index if asked.
     @rtype:                     str, (int)
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # Initialise the index.
     ei = -1
 
     # Loop over the experiment types.
-    for exp_type in cdp.exp_type_list:
+    for exp_type in dp.exp_type_list:
         # Increment the index.
         ei += 1
 
@@ -1274,7 +1390,7 @@ def loop_exp(return_indices=False):
             yield exp_type
 
 
-def loop_exp_frq(return_indices=False):
+def loop_exp_frq(return_indices=False, pipe=None):
     """Generator method for looping over the exp and frq data.
     
     These are the experiment types and spectrometer frequencies.
@@ -1282,14 +1398,16 @@ def loop_exp_frq(return_indices=False):
 
     @keyword return_indices:    A flag which if True will cause the experiment type and spectrometer frequency indices to be returned as well.
     @type return_indices:       bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     @return:                    The experiment type and spectrometer frequency in Hz, and the indices if asked.
     @rtype:                     str, float, (int, int)
     """
 
     # First loop over the experiment types.
-    for exp_type, ei in loop_exp(return_indices=True):
+    for exp_type, ei in loop_exp(return_indices=True, pipe=pipe):
         # Then loop over the spectrometer frequencies.
-        for frq, mi in loop_frq(return_indices=True):
+        for frq, mi in loop_frq(return_indices=True, pipe=pipe):
             # Yield the data.
             if return_indices:
                 yield exp_type, frq, ei, mi
@@ -1322,7 +1440,7 @@ def loop_exp_frq_offset(return_indices=False):
                     yield exp_type, frq, offset
 
 
-def loop_exp_frq_offset_point(return_indices=False):
+def loop_exp_frq_offset_point(return_indices=False, pipe=None):
     """Generator method for looping over the exp, frq, offset, and point data.
     
     These are the experiment types, spectrometer frequencies, spin-lock offset data,  and dispersion points.
@@ -1330,18 +1448,20 @@ def loop_exp_frq_offset_point(return_indices=False):
 
     @keyword return_indices:    A flag which if True will cause the experiment type, spectrometer frequency, spin-lock offset and dispersion point indices to be returned as well.
     @type return_indices:       bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     @return:                    The experiment type, spectrometer frequency in Hz, spin-lock offset data and dispersion point data (either the spin-lock field strength in Hz or the nu_CPMG frequency in Hz), and the indices if asked.
     @rtype:                     str, float, float, float, (int, int, int, int)
     """
 
     # First loop over the experiment types.
-    for exp_type, ei in loop_exp(return_indices=True):
+    for exp_type, ei in loop_exp(return_indices=True, pipe=pipe):
         # Then loop over the spectrometer frequencies.
-        for frq, mi in loop_frq(return_indices=True):
+        for frq, mi in loop_frq(return_indices=True, pipe=pipe):
             # Then loop over the offset data.
-            for offset, oi in loop_offset(exp_type=exp_type, frq=frq, return_indices=True):
+            for offset, oi in loop_offset(exp_type=exp_type, frq=frq, return_indices=True, pipe=pipe):
                 # And finally the dispersion points.
-                for point, di in loop_point(exp_type=exp_type, frq=frq, offset=offset, return_indices=True):
+                for point, di in loop_point(exp_type=exp_type, frq=frq, offset=offset, return_indices=True, pipe=pipe):
                     # Yield the data.
                     if return_indices:
                         yield exp_type, frq, offset, point, ei, mi, oi, di
@@ -1430,19 +1550,24 @@ def loop_exp_frq_point_time(return_indices=False):
                         yield exp_type, frq, point, time
 
 
-def loop_frq(return_indices=False):
+def loop_frq(return_indices=False, pipe=None):
     """Generator method for looping over all spectrometer frequencies.
 
     @keyword return_indices:    A flag which if True will cause the spectrometer frequency index to be returned as well.
     @type return_indices:       bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     @return:                    The spectrometer frequency in Hz, and the index if asked.
     @rtype:                     float, (int)
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # Handle missing frequency data.
     frqs = [None]
-    if hasattr(cdp, 'spectrometer_frq_list'):
-        frqs = cdp.spectrometer_frq_list
+    if hasattr(dp, 'spectrometer_frq_list'):
+        frqs = dp.spectrometer_frq_list
 
     # Initialise the index.
     mi = -1
@@ -1546,7 +1671,7 @@ def loop_frq_point_time(exp_type=None, return_indices=False):
                     yield frq, point, time
 
 
-def loop_offset(exp_type=None, frq=None, return_indices=False):
+def loop_offset(exp_type=None, frq=None, return_indices=False, pipe=None):
     """Generator method for looping over the spin-lock offset values.
 
     @keyword exp_type:          The experiment type.
@@ -1555,10 +1680,15 @@ def loop_offset(exp_type=None, frq=None, return_indices=False):
     @type frq:                  float
     @keyword return_indices:    A flag which if True will cause the offset index to be returned as well.
     @type return_indices:       bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     @return:                    The spin-lock offset value and the index if asked.
     @rtype:                     float, (int)
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # Checks.
     if exp_type == None:
         raise RelaxError("The experiment type must be supplied.")
@@ -1576,25 +1706,25 @@ def loop_offset(exp_type=None, frq=None, return_indices=False):
     # R1rho-type data.
     if exp_type in EXP_TYPE_LIST_R1RHO:
         # No offsets set.
-        if not hasattr(cdp, 'spin_lock_offset_list'):
+        if not hasattr(dp, 'spin_lock_offset_list'):
             yield 0.0, 0
 
         # Loop over the offset data.
         else:
-            for offset in cdp.spin_lock_offset_list:
+            for offset in dp.spin_lock_offset_list:
                 # Find a matching experiment ID.
                 found = False
-                for id in cdp.exp_type:
+                for id in dp.exp_type:
                     # Skip non-matching experiments.
-                    if cdp.exp_type[id] != exp_type:
+                    if dp.exp_type[id] != exp_type:
                         continue
 
                     # Skip non-matching spectrometer frequencies.
-                    if hasattr(cdp, 'spectrometer_frq') and cdp.spectrometer_frq[id] != frq:
+                    if hasattr(dp, 'spectrometer_frq') and dp.spectrometer_frq[id] != frq:
                         continue
 
                     # Skip non-matching offsets.
-                    if cdp.spin_lock_offset[id] != offset:
+                    if dp.spin_lock_offset[id] != offset:
                         continue
 
                     # Found.
@@ -1641,7 +1771,7 @@ def loop_offset_point(exp_type=None, frq=None, skip_ref=True, return_indices=Fal
                 yield offset, point
 
 
-def loop_point(exp_type=None, frq=None, offset=None, time=None, skip_ref=True, return_indices=False):
+def loop_point(exp_type=None, frq=None, offset=None, time=None, skip_ref=True, return_indices=False, pipe=None):
     """Generator method for looping over the dispersion points.
 
     @keyword exp_type:          The experiment type.
@@ -1656,6 +1786,8 @@ def loop_point(exp_type=None, frq=None, offset=None, time=None, skip_ref=True, r
     @type skip_ref:             bool
     @keyword return_indices:    A flag which if True will cause the experiment type index to be returned as well.
     @type return_indices:       bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     @return:                    Dispersion point data for the given indices (either the spin-lock field strength in Hz or the nu_CPMG frequency in Hz), and the index if asked.
     @rtype:                     float, (int)
     """
@@ -1671,9 +1803,9 @@ def loop_point(exp_type=None, frq=None, offset=None, time=None, skip_ref=True, r
     # Assemble the dispersion data.
     ref_flag = not skip_ref
     if exp_type in EXP_TYPE_LIST_CPMG:
-        fields = return_cpmg_frqs_single(exp_type=exp_type, frq=frq, offset=offset, time=time, ref_flag=ref_flag)
+        fields = return_cpmg_frqs_single(exp_type=exp_type, frq=frq, offset=offset, time=time, ref_flag=ref_flag, pipe=pipe)
     elif exp_type in EXP_TYPE_LIST_R1RHO:
-        fields = return_spin_lock_nu1_single(exp_type=exp_type, frq=frq, offset=offset, ref_flag=ref_flag)
+        fields = return_spin_lock_nu1_single(exp_type=exp_type, frq=frq, offset=offset, ref_flag=ref_flag, pipe=pipe)
     else:
         raise RelaxError("The experiment type '%s' is unknown." % exp_type)
 
@@ -1713,70 +1845,8 @@ def loop_spectrum_ids(exp_type=None, frq=None, offset=None, point=None, time=Non
     @rtype:             str
     """
 
-    # Loop over all spectrum IDs.
-    for id in cdp.spectrum_ids:
-        # Experiment type filter.
-        if exp_type != None:
-            # No experiment type set.
-            if not hasattr(cdp, 'exp_type') or id not in cdp.exp_type:
-                continue
-
-            # No match.
-            if cdp.exp_type[id] != exp_type:
-                continue
-
-        # The frequency filter.
-        if frq != None:
-            # No frequency data set.
-            if not hasattr(cdp, 'spectrometer_frq') or id not in cdp.spectrometer_frq:
-                continue
-
-            # No match.
-            if cdp.spectrometer_frq[id] != frq:
-                continue
-
-        # The dispersion point filter.
-        if point != None:
-            # No experiment type set.
-            if not hasattr(cdp, 'exp_type') or id not in cdp.exp_type:
-                continue
-
-            # The experiment type.
-            exp_type = cdp.exp_type[id]
-
-            # The CPMG dispersion data.
-            if exp_type in EXP_TYPE_LIST_CPMG:
-                # No dispersion point data set.
-                if not hasattr(cdp, 'cpmg_frqs') or id not in cdp.cpmg_frqs:
-                    continue
-
-                # Alias the structure
-                disp_data = cdp.cpmg_frqs
-
-            # The R1rho dispersion data.
-            else:
-                # No dispersion point data set.
-                if not hasattr(cdp, 'spin_lock_nu1') or id not in cdp.spin_lock_nu1:
-                    continue
-
-                # Alias the structure
-                disp_data = cdp.spin_lock_nu1
-
-            # No match.
-            if disp_data[id] != point:
-                continue
-
-        # The time filter.
-        if time != None:
-            # No time data set.
-            if not hasattr(cdp, 'relax_times') or id not in cdp.relax_times:
-                continue
-
-            # No match.
-            if cdp.relax_times[id] != time:
-                continue
-
-        # Yield the Id.
+    # Loop over the matching spectrum IDs of the spectrum index.
+    for id in spectrum_index_ids(exp_type=exp_type, frq=frq, offset=offset, point=point, time=time):
         yield id
 
 
@@ -1802,51 +1872,23 @@ def loop_time(exp_type=None, frq=None, offset=None, point=None, return_indices=F
 
     # Loop over the time points.
     if hasattr(cdp, 'relax_time_list'):
-        for time in cdp.relax_time_list:
-            # Find a matching experiment ID.
-            found = False
-            for id in cdp.exp_type:
-                # Skip non-matching experiments.
-                if exp_type != None and cdp.exp_type[id] != exp_type:
-                    continue
-
-                # Skip non-matching spectrometer frequencies.
-                if frq != None and hasattr(cdp, 'spectrometer_frq') and cdp.spectrometer_frq[id] != frq:
-                    continue
-
-                # Skip non-matching offsets.
-                if offset != None and hasattr(cdp, 'spin_lock_offset') and cdp.spin_lock_offset[id] != offset:
-                    continue
-
-                # The dispersion point filter.
-                if point != None:
-                    # No experiment type set.
-                    if not hasattr(cdp, 'exp_type') or id not in cdp.exp_type:
-                        continue
-
-                    # The experiment type.
-                    exp_type = cdp.exp_type[id]
-
-                    # The CPMG dispersion data.
-                    if exp_type in EXP_TYPE_LIST_CPMG:
-                        # No dispersion point data set.
-                        if hasattr(cdp, 'cpmg_frqs') and cdp.cpmg_frqs[id] != point:
-                            continue
-
-                    # The R1rho data
-                    if exp_type in EXP_TYPE_R1RHO:
-                        if hasattr(cdp, 'spin_lock_nu1') and cdp.spin_lock_nu1[id] != point:
-                            continue
-
-                if time != cdp.relax_times[id]:
-                    continue
+        # The frequency, offset and dispersion point filters only apply if the data is present.
+        if not hasattr(cdp, 'spectrometer_frq'):
+            frq = None
+        if not hasattr(cdp, 'spin_lock_offset'):
+            offset = None
+        if not hasattr(cdp, 'cpmg_frqs') and not hasattr(cdp, 'spin_lock_nu1'):
+            point = None
 
-                # Found.
-                found = True
-                break
+        # The times of the matching spectra, from the spectrum index.
+        index = spectrum_index()
+        times = set()
+        for id in spectrum_index_ids(exp_type=exp_type, frq=frq, offset=offset, point=point):
+            times.add(index['data'][id][4])
 
+        for time in cdp.relax_time_list:
             # No data.
-            if not found:
+            if time not in times:
                 continue
 
             # Increment the index.
@@ -1880,7 +1922,7 @@ def num_exp_types():
     return count
 
 
-def pack_back_calc_r2eff(spin=None, spin_id=None, si=None, back_calc=None, proton_mmq_flag=False):
+def pack_back_calc_r2eff(spin=None, spin_id=None, si=None, back_calc=None, proton_mmq_flag=False, pipe=None):
     """Store the back calculated R2eff data for the given spin.
 
     @keyword spin:              The spin data container to store the data in.
@@ -1893,15 +1935,17 @@ def pack_back_calc_r2eff(spin=None, spin_id=None, si=None, back_calc=None, proto
     @type back_calc:            list of lists of lists of lists of float
     @keyword proton_mmq_flag:   The flag specifying if proton SQ or MQ CPMG data exists for the spin.
     @type proton_mmq_flag:      bool
+    @keyword pipe:              The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:                 str or None
     """
 
     # Get the attached proton.
     proton = None
     if proton_mmq_flag:
-        proton = return_attached_protons(spin_id)[0]
+        proton = return_attached_protons(spin_id, pipe=pipe)[0]
 
     # Loop over the R2eff data.
-    for exp_type, frq, offset, point, ei, mi, oi, di in loop_exp_frq_offset_point(return_indices=True):
+    for exp_type, frq, offset, point, ei, mi, oi, di in loop_exp_frq_offset_point(return_indices=True, pipe=pipe):
         # The R2eff key.
         key = return_param_key_from_data(exp_type=exp_type, frq=frq, offset=offset, point=point)
 
@@ -2016,6 +2060,12 @@ def plot_disp_curves_to_file(file_name_ini=None, dir=None, y_axis=None, x_axis=N
     @type proton_mmq_flag:      bool
     """%(Y_AXIS_R2_EFF, Y_AXIS_R2_R1RHO, X_AXIS_DISP, X_AXIS_W_EFF, X_AXIS_THETA, INTERPOLATE_DISP, INTERPOLATE_OFFSET)
 
+    # The spin clusters, for the back-calculation of all spins of a cluster together.
+    clusters = {}
+    for spin_ids in loop_cluster():
+        for spin_id in spin_ids:
+            clusters[spin_id] = spin_ids
+
     # Loop over each spin. Initialise spin counter.
     si = 0
     for spin, mol_name, res_num, res_name, spin_id in spin_loop(full_info=True, return_id=True, skip_desel=True):
@@ -2057,11 +2107,11 @@ def plot_disp_curves_to_file(file_name_ini=None, dir=None, y_axis=None, x_axis=N
 
         if interpolate == INTERPOLATE_DISP:
             # Interpolate through disp points.
-            interpolated_flag, back_calc, cpmg_frqs_new, offsets_inter, spin_lock_nu1_new, chemical_shifts, tilt_angles_inter, Delta_omega_inter, w_eff_inter = interpolate_disp(spin=spin, spin_id=spin_id, si=si, num_points=num_points, extend_hz=extend_hz, relax_times=relax_times)
+            interpolated_flag, back_calc, cpmg_frqs_new, offsets_inter, spin_lock_nu1_new, chemical_shifts, tilt_angles_inter, Delta_omega_inter, w_eff_inter = interpolate_disp(spin=spin, spin_id=spin_id, si=si, num_points=num_points, extend_hz=extend_hz, relax_times=relax_times, cluster_ids=clusters.get(spin_id))
 
         elif interpolate == INTERPOLATE_OFFSET:
             # Interpolate through disp points.
-            interpolated_flag, back_calc, cpmg_frqs_new, offsets_inter, spin_lock_nu1_new, chemical_shifts, tilt_angles_inter, Delta_omega_inter, w_eff_inter = interpolate_offset(spin=spin, spin_id=spin_id, si=si, num_points=num_points, extend_ppm=extend_ppm, relax_times=relax_times)
+            interpolated_flag, back_calc, cpmg_frqs_new, offsets_inter, spin_lock_nu1_new, chemical_shifts, tilt_angles_inter, Delta_omega_inter, w_eff_inter = interpolate_offset(spin=spin, spin_id=spin_id, si=si, num_points=num_points, extend_ppm=extend_ppm, relax_times=relax_times, cluster_ids=clusters.get(spin_id))
 
         # Do not interpolate, if model is R2eff.
         if spin.model == MODEL_R2EFF:
@@ -2727,6 +2777,9 @@ def relax_time(time=0.0, spectrum_id=None):
     # Update the exponential time point count.
     cdp.num_time_pts = len(cdp.relax_time_list)
 
+    # The spectrum metadata has changed.
+    spectrum_index_reset()
+
     # Printout.
     print("Setting the '%s' spectrum relaxation time period to %s s." % (spectrum_id, cdp.relax_times[spectrum_id]))
 
@@ -2744,6 +2797,11 @@ def return_cpmg_frqs(ref_flag=True):
     if not hasattr(cdp, 'cpmg_frqs_list'):
         return None
 
+    # The data stored in the spectrum index.
+    index = spectrum_index()
+    if ('cpmg_frqs', ref_flag) in index['arrays']:
+        return deepcopy(index['arrays'][('cpmg_frqs', ref_flag)])
+
     # Initialise.
     cpmg_frqs = []
 
@@ -2797,11 +2855,14 @@ def return_cpmg_frqs(ref_flag=True):
                 # Convert to a numpy array.
                 cpmg_frqs[ei][mi][oi] = array(cpmg_frqs[ei][mi][oi], float64)
 
+    # Store a copy in the spectrum index.
+    index['arrays'][('cpmg_frqs', ref_flag)] = deepcopy(cpmg_frqs)
+
     # Return the data.
     return cpmg_frqs
 
 
-def return_cpmg_frqs_single(exp_type=None, frq=None, offset=None, time=None, ref_flag=True):
+def return_cpmg_frqs_single(exp_type=None, frq=None, offset=None, time=None, ref_flag=True, pipe=None):
     """Return the list of nu_CPMG frequencies.
 
     @keyword exp_type:  The experiment type.
@@ -2814,44 +2875,49 @@ def return_cpmg_frqs_single(exp_type=None, frq=None, offset=None, time=None, ref
     @type time:         float
     @keyword ref_flag:  A flag which if False will cause the reference spectrum frequency of None to be removed from the list.
     @type ref_flag:     bool
+    @keyword pipe:      The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:         str or None
     @return:            The list of nu_CPMG frequencies in Hz.
     @rtype:             numpy rank-1 float64 array
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # No data.
-    if not hasattr(cdp, 'cpmg_frqs_list'):
+    if not hasattr(dp, 'cpmg_frqs_list'):
         return None
 
     # Initialise.
     cpmg_frqs = []
 
     # Loop over the points.
-    for point in cdp.cpmg_frqs_list:
+    for point in dp.cpmg_frqs_list:
         # Skip reference points.
         if (not ref_flag) and point == None:
             continue
 
         # Find a matching experiment ID.
         found = False
-        for id in cdp.exp_type:
+        for id in dp.exp_type:
             # Skip non-matching experiments.
-            if cdp.exp_type[id] != exp_type:
+            if dp.exp_type[id] != exp_type:
                 continue
 
             # Skip non-matching spectrometer frequencies.
-            if hasattr(cdp, 'spectrometer_frq') and cdp.spectrometer_frq[id] != frq:
+            if hasattr(dp, 'spectrometer_frq') and dp.spectrometer_frq[id] != frq:
                 continue
 
             # Skip non-matching offsets.
-            if offset != None and hasattr(cdp, 'spin_lock_offset') and cdp.spin_lock_offset[id] != offset:
+            if offset != None and hasattr(dp, 'spin_lock_offset') and dp.spin_lock_offset[id] != offset:
                 continue
 
             # Skip non-matching time points.
-            if time != None and hasattr(cdp, 'relax_times') and cdp.relax_times[id] != time:
+            if time != None and hasattr(dp, 'relax_times') and dp.relax_times[id] != time:
                 continue
 
             # Skip non-matching points.
-            if cdp.cpmg_frqs[id] != point:
+            if dp.cpmg_frqs[id] != point:
                 continue
 
             # Found.
@@ -3798,6 +3864,11 @@ def return_index_from_disp_point(value, exp_type=None):
     if exp_type == None:
         raise RelaxError("The experiment type has not been supplied.")
 
+    # The dispersion point indices stored in the spectrum index.
+    spectrum_data = spectrum_index()
+    if exp_type in spectrum_data['disp_point_index'] and value in spectrum_data['disp_point_index'][exp_type]:
+        return spectrum_data['disp_point_index'][exp_type][value]
+
     # Initialise.
     index = 0
     ref_correction = False
@@ -3820,6 +3891,11 @@ def return_index_from_disp_point(value, exp_type=None):
             index -= 1
             break
 
+    # Store the index.
+    if exp_type not in spectrum_data['disp_point_index']:
+        spectrum_data['disp_point_index'][exp_type] = {}
+    spectrum_data['disp_point_index'][exp_type][value] = index
+
     # Return the index.
     return index
 
@@ -3953,6 +4029,13 @@ def return_offset_data(spins=None, spin_ids=None, field_count=None, spin_lock_of
     @rtype:                     rank-3 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-2 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays, rank-4 list of numpy rank-1 float arrays
     """
 
+    # The data stored in the cluster cache, if the user loaded values are used.
+    cache = None
+    if spin_lock_offset == None and fields == None:
+        cache = cluster_cache(spins=spins, spin_ids=spin_ids)
+        if 'offset_data' in cache:
+            return deepcopy(cache['offset_data'])
+
     # The counts.
     exp_num = num_exp_types()
     spin_num = 0
@@ -4179,6 +4262,10 @@ def return_offset_data(spins=None, spin_ids=None, field_count=None, spin_lock_of
     #        for mi in range(field_count):
     #            theta[ei][si][mi] = array(theta[ei][si][mi], float64)
 
+    # Store a copy in the cluster cache.
+    if cache != None:
+        cache['offset_data'] = deepcopy((offsets, spin_lock_fields_inter, shifts, tilt_angles, Domega, w_e))
+
     # Return the structures.
     return offsets, spin_lock_fields_inter, shifts, tilt_angles, Domega, w_e
 
@@ -4451,6 +4538,9 @@ def return_r1_err_data(spins=None, spin_ids=None, field_count=None, sim_index=No
 def return_r2eff_arrays(spins=None, spin_ids=None, fields=None, field_count=None, sim_index=None):
     """Return numpy arrays of the R2eff/R1rho values and errors.
 
+    The layout of the data structures for the spin cluster is built once and stored in the cluster cache (see the cluster_cache() function), so that only the values, errors and missing data flags are assembled for each call, for example for each Monte Carlo simulation.
+
+
     @keyword spins:         The list of spin containers in the cluster.
     @type spins:            list of SpinContainer instances
     @keyword spin_ids:      The list of spin IDs for the cluster.
@@ -4465,8 +4555,70 @@ def return_r2eff_arrays(spins=None, spin_ids=None, fields=None, field_count=None
     @rtype:                 lists of numpy float arrays, lists of numpy float arrays, lists of numpy float arrays, numpy rank-2 int array
     """
 
+    # The layout of the data structures, from the cluster cache.
+    cache = cluster_cache(spins=spins, spin_ids=spin_ids)
+    if 'r2eff_layout' not in cache:
+        cache['r2eff_layout'] = return_r2eff_layout(spins=spins, spin_ids=spin_ids)
+    keys, frqs, frqs_H, exp_types, relax_times = cache['r2eff_layout']
+
+    # Assemble the R2eff/R1rho data.
+    values = []
+    errors = []
+    missing = []
+    for ei in range(len(keys)):
+        values.append([])
+        errors.append([])
+        missing.append([])
+        for si in range(len(keys[ei])):
+            values[ei].append([])
+            errors[ei].append([])
+            missing[ei].append([])
+            for mi in range(len(keys[ei][si])):
+                values[ei][si].append([])
+                errors[ei][si].append([])
+                missing[ei][si].append([])
+                for oi in range(len(keys[ei][si][mi])):
+                    # Initialise the arrays, with the values for missing data.
+                    num = len(keys[ei][si][mi][oi])
+                    values[ei][si][mi].append(zeros(num, float64))
+                    errors[ei][si][mi].append(ones(num, float64))
+                    missing[ei][si][mi].append(ones(num, int32))
+
+                    # Loop over the data points.
+                    for di in range(num):
+                        # The spin and key.
+                        current_spin, key = keys[ei][si][mi][oi][di]
+
+                        # Missing data.
+                        if key not in current_spin.r2eff:
+                            continue
+                        missing[ei][si][mi][oi][di] = 0
+
+                        # The values.
+                        if sim_index == None:
+                            values[ei][si][mi][oi][di] = current_spin.r2eff[key]
+                        else:
+                            values[ei][si][mi][oi][di] = current_spin.r2eff_sim[sim_index][key]
+
+                        # The errors.
+                        errors[ei][si][mi][oi][di] = current_spin.r2eff_err[key]
+
+    # Return the structures, copying the cached data.
+    return values, errors, missing, deepcopy(frqs), deepcopy(frqs_H), deepcopy(exp_types), deepcopy(relax_times)
+
+
+def return_r2eff_layout(spins=None, spin_ids=None):
+    """Return the layout of the R2eff/R1rho data structures of the spin cluster.
+
+    @keyword spins:         The list of spin containers in the cluster.
+    @type spins:            list of SpinContainer instances
+    @keyword spin_ids:      The list of spin IDs for the cluster.
+    @type spin_ids:         list of str
+    @return:                The spin container (the attached proton for the 1H CPMG experiments) and R2eff/R1rho key for each data point with the dimensions {Ei, Si, Mi, Oi, Di}, the Larmor frequency and proton Larmor frequency structures, the experiment types, and the relaxation times.
+    @rtype:                 rank-5 list of tuples of SpinContainer instance and str, rank-3 list of floats, rank-3 list of floats, list of str, rank-4 list of numpy float arrays
+    """
+
     # The counts.
-    exp_num = num_exp_types()
     spin_num = count_spins(spins)
 
     # 1H MMQ flag.
@@ -4474,41 +4626,31 @@ def return_r2eff_arrays(spins=None, spin_ids=None, fields=None, field_count=None
 
     # Initialise the data structures for the target function.
     exp_types = []
-    values = []
-    errors = []
-    missing = []
+    keys = []
     frqs = []
     frqs_H = []
     relax_times = []
     for exp_type, ei in loop_exp(return_indices=True):
-        values.append([])
-        errors.append([])
-        missing.append([])
+        keys.append([])
         frqs.append([])
         frqs_H.append([])
         relax_times.append([])
         for si in range(spin_num):
-            values[ei].append([])
-            errors[ei].append([])
-            missing[ei].append([])
+            keys[ei].append([])
             frqs[ei].append([])
             frqs_H[ei].append([])
             for frq, mi in loop_frq(return_indices=True):
-                values[ei][si].append([])
-                errors[ei][si].append([])
-                missing[ei][si].append([])
+                keys[ei][si].append([])
                 frqs[ei][si].append(0.0)
                 frqs_H[ei][si].append(0.0)
                 relax_times[ei].append([])
                 for offset, oi in loop_offset(exp_type=exp_type, frq=frq, return_indices=True):
-                    values[ei][si][mi].append([])
-                    errors[ei][si][mi].append([])
-                    missing[ei][si][mi].append([])
+                    keys[ei][si][mi].append([])
                     relax_times[ei][mi].append([])
                     for point, di in loop_point(exp_type=exp_type, frq=frq, offset=offset, return_indices=True):
                         relax_times[ei][mi][oi].append([])
 
-    # Pack the R2eff/R1rho data.
+    # Pack the R2eff/R1rho data point keys.
     data_flag = False
     si = 0
     for spin_index in range(len(spins)):
@@ -4557,13 +4699,6 @@ def return_r2eff_arrays(spins=None, spin_ids=None, fields=None, field_count=None
             if exp_type not in exp_types:
                 exp_types.append(exp_type)
 
-            # The key.
-            key = return_param_key_from_data(exp_type=exp_type, frq=frq, offset=offset, point=point)
-            if mi == 0:
-                fact = 60.83831274541046
-            else:
-                fact = 81.11775032721394
-            
             # The Larmor frequency for this spin (and that of an attached proton for the MMQ models) and field strength (in MHz*2pi to speed up the ppm to rad/s conversion).
             if frq != None:
                 frqs[ei][si][mi] = 2.0 * pi * frq / periodic_table.gyromagnetic_ratio('1H') * periodic_table.gyromagnetic_ratio(spin.isotope) * 1e-6
@@ -4573,23 +4708,8 @@ def return_r2eff_arrays(spins=None, spin_ids=None, fields=None, field_count=None
             for time, ti in loop_time(exp_type=exp_type, frq=frq, offset=offset, point=point, return_indices=True):
                 relax_times[ei][mi][oi][di].append(time)
 
-            # Missing data.
-            if key not in current_spin.r2eff:
-                values[ei][si][mi][oi].append(0.0)
-                errors[ei][si][mi][oi].append(1.0)
-                missing[ei][si][mi][oi].append(1)
-                continue
-            else:
-                missing[ei][si][mi][oi].append(0)
-
-            # The values.
-            if sim_index == None:
-                values[ei][si][mi][oi].append(current_spin.r2eff[key])
-            else:
-                values[ei][si][mi][oi].append(current_spin.r2eff_sim[sim_index][key])
-
-            # The errors.
-            errors[ei][si][mi][oi].append(current_spin.r2eff_err[key])
+            # The spin and key.
+            keys[ei][si][mi][oi].append((current_spin, return_param_key_from_data(exp_type=exp_type, frq=frq, offset=offset, point=point)))
 
         # Increment the spin index.
         si += 1
@@ -4600,17 +4720,13 @@ def return_r2eff_arrays(spins=None, spin_ids=None, fields=None, field_count=None
 
     # Convert to numpy arrays.
     for exp_type, ei in loop_exp(return_indices=True):
-        for si in range(spin_num):
-            for frq, mi in loop_frq(return_indices=True):
-                for offset, oi in loop_offset(exp_type=exp_type, frq=frq, return_indices=True):
-                    values[ei][si][mi][oi] = array(values[ei][si][mi][oi], float64)
-                    errors[ei][si][mi][oi] = array(errors[ei][si][mi][oi], float64)
-                    missing[ei][si][mi][oi] = array(missing[ei][si][mi][oi], int32)
-                    for point, di in loop_point(exp_type=exp_type, frq=frq, offset=offset, return_indices=True):
-                        relax_times[ei][mi][oi][di] = array(relax_times[ei][mi][oi][di], float64)
+        for frq, mi in loop_frq(return_indices=True):
+            for offset, oi in loop_offset(exp_type=exp_type, frq=frq, return_indices=True):
+                for point, di in loop_point(exp_type=exp_type, frq=frq, offset=offset, return_indices=True):
+                    relax_times[ei][mi][oi][di] = array(relax_times[ei][mi][oi][di], float64)
 
     # Return the structures.
-    return values, errors, missing, frqs, frqs_H, exp_types, relax_times
+    return keys, frqs, frqs_H, exp_types, relax_times
 
 
 def return_relax_times():
@@ -4656,6 +4772,11 @@ def return_spin_lock_nu1(ref_flag=True):
     if not hasattr(cdp, 'spin_lock_nu1_list'):
         return None
 
+    # The data stored in the spectrum index.
+    index = spectrum_index()
+    if ('spin_lock_nu1', ref_flag) in index['arrays']:
+        return deepcopy(index['arrays'][('spin_lock_nu1', ref_flag)])
+
     # Initialise.
     nu1 = []
 
@@ -4713,11 +4834,14 @@ def return_spin_lock_nu1(ref_flag=True):
                 # Convert to a numpy array.
                 nu1[ei][mi][oi] = array(nu1[ei][mi][oi], float64)
 
+    # Store a copy in the spectrum index.
+    index['arrays'][('spin_lock_nu1', ref_flag)] = deepcopy(nu1)
+
     # Return the data.
     return nu1
 
 
-def return_spin_lock_nu1_single(exp_type=None, frq=None, offset=None, ref_flag=True):
+def return_spin_lock_nu1_single(exp_type=None, frq=None, offset=None, ref_flag=True, pipe=None):
     """Return the list of spin-lock field strengths.
 
     @keyword exp_type:  The experiment type.
@@ -4728,40 +4852,45 @@ def return_spin_lock_nu1_single(exp_type=None, frq=None, offset=None, ref_flag=T
     @type offset:       None or float
     @keyword ref_flag:  A flag which if False will cause the reference spectrum frequency of None to be removed from the list.
     @type ref_flag:     bool
+    @keyword pipe:      The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:         str or None
     @return:            The list of spin-lock field strengths in Hz.
     @rtype:             numpy rank-1 float64 array
     """
 
+    # The data pipe.
+    dp = get_pipe(pipe)
+
     # No data.
-    if not hasattr(cdp, 'spin_lock_nu1_list'):
+    if not hasattr(dp, 'spin_lock_nu1_list'):
         return None
 
     # Initialise.
     nu1 = []
 
     # Loop over the points.
-    for point in cdp.spin_lock_nu1_list:
+    for point in dp.spin_lock_nu1_list:
         # Skip reference points.
         if (not ref_flag) and point == None:
             continue
 
         # Find a matching experiment ID.
         found = False
-        for id in cdp.exp_type:
+        for id in dp.exp_type:
             # Skip non-matching experiments.
-            if cdp.exp_type[id] != exp_type:
+            if dp.exp_type[id] != exp_type:
                 continue
 
             # Skip non-matching spectrometer frequencies.
-            if hasattr(cdp, 'spectrometer_frq') and cdp.spectrometer_frq[id] != frq:
+            if hasattr(dp, 'spectrometer_frq') and dp.spectrometer_frq[id] != frq:
                 continue
 
             # Skip non-matching offsets.
-            if offset != None and hasattr(cdp, 'spin_lock_offset') and cdp.spin_lock_offset[id] != offset:
+            if offset != None and hasattr(dp, 'spin_lock_offset') and dp.spin_lock_offset[id] != offset:
                 continue
 
             # Skip non-matching points.
-            if cdp.spin_lock_nu1[id] != point:
+            if dp.spin_lock_nu1[id] != point:
                 continue
 
             # Found.
@@ -4897,6 +5026,9 @@ def set_exp_type(spectrum_id=None, exp_type=None):
     if cdp.exp_type[spectrum_id] not in cdp.exp_type_list:
         cdp.exp_type_list.append(cdp.exp_type[spectrum_id])
 
+    # The spectrum metadata has changed.
+    spectrum_index_reset()
+
     # Printout.
     text = "The spectrum ID '%s' is now set to " % spectrum_id
     if exp_type == EXP_TYPE_CPMG_SQ:
@@ -4916,6 +5048,159 @@ def set_exp_type(spectrum_id=None, exp_type=None):
     print(text)
 
 
+def spectrum_index():
+    """Return the multi-key index of the spectrum metadata of the current data pipe, building it if needed.
+
+    The index is stored in the current data pipe as the private (and hence not saved) cdp._spectrum_index object.  It is rebuilt if the metadata structures of the data pipe have been replaced or have changed in size, or if it has been reset by the user functions setting the metadata.  The index dictionary consists of:
+
+        - 'sources':  The metadata structures and their sizes, for the validation of the index.
+        - 'ids':  The spectrum IDs, in the order of cdp.spectrum_ids followed by any IDs only present in cdp.exp_type.
+        - 'data':  The (exp_type, frq, offset, point, time) metadata tuple for each spectrum ID, with None for missing data.
+        - 'maps':  The spectrum IDs for each metadata key, for each combination of the metadata fields used as the key.
+        - 'curve_type':  The curve type of each spectrum ID.
+        - 'disp_point_index':  The dispersion point index of each dispersion point value, for each experiment type.
+        - 'arrays':  The dispersion point structures of the return_cpmg_frqs() and return_spin_lock_nu1() functions.
+
+
+    @return:    The spectrum index.
+    @rtype:     dict
+    """
+
+    # The current metadata structures.
+    sources = []
+    for name in SPECTRUM_INDEX_DATA:
+        obj = getattr(cdp, name, None)
+        if obj == None:
+            sources.append((None, 0))
+        else:
+            sources.append((obj, len(obj)))
+
+    # The existing index is still valid.
+    if hasattr(cdp, '_spectrum_index'):
+        valid = True
+        for i in range(len(sources)):
+            if cdp._spectrum_index['sources'][i][0] is not sources[i][0] or cdp._spectrum_index['sources'][i][1] != sources[i][1]:
+                valid = False
+                break
+        if valid:
+            return cdp._spectrum_index
+
+    # The spectrum IDs.
+    ids = []
+    if hasattr(cdp, 'spectrum_ids'):
+        ids += cdp.spectrum_ids
+    if hasattr(cdp, 'exp_type'):
+        for id in cdp.exp_type:
+            if id not in ids:
+                ids.append(id)
+
+    # The metadata of each spectrum.
+    data = {}
+    for id in ids:
+        # The experiment type.
+        exp_type = None
+        if hasattr(cdp, 'exp_type') and id in cdp.exp_type:
+            exp_type = cdp.exp_type[id]
+
+        # The spectrometer frequency.
+        frq = None
+        if hasattr(cdp, 'spectrometer_frq') and id in cdp.spectrometer_frq:
+            frq = cdp.spectrometer_frq[id]
+
+        # The offset.
+        offset = None
+        if hasattr(cdp, 'spin_lock_offset') and id in cdp.spin_lock_offset:
+            offset = cdp.spin_lock_offset[id]
+
+        # The dispersion point (None for the reference).
+        point = None
+        if exp_type in EXP_TYPE_LIST_CPMG:
+            if hasattr(cdp, 'cpmg_frqs') and id in cdp.cpmg_frqs:
+                point = cdp.cpmg_frqs[id]
+        elif hasattr(cdp, 'spin_lock_nu1') and id in cdp.spin_lock_nu1:
+            point = cdp.spin_lock_nu1[id]
+
+        # The relaxation time.
+        time = None
+        if hasattr(cdp, 'relax_times') and id in cdp.relax_times:
+            time = cdp.relax_times[id]
+
+        # Store the metadata.
+        data[id] = (exp_type, frq, offset, point, time)
+
+    # Store and return the new index.
+    cdp._spectrum_index = {
+        'sources': sources,
+        'ids': ids,
+        'data': data,
+        'maps': {},
+        'curve_type': {},
+        'disp_point_index': {},
+        'arrays': {}
+    }
+    return cdp._spectrum_index
+
+
+def spectrum_index_ids(exp_type=None, frq=None, offset=None, point=None, time=None, ref=False):
+    """Return the spectrum IDs matching the given metadata, via the spectrum index.
+
+    Metadata arguments of None are not used for the matching, and spectra with missing metadata only match if that metadata is not used.
+
+
+    @keyword exp_type:  The experiment type.
+    @type exp_type:     None or str
+    @keyword frq:       The spectrometer frequency.
+    @type frq:          None or float
+    @keyword offset:    For R1rho-type data, the spin-lock offset value in ppm.
+    @type offset:       None or float
+    @keyword point:     The dispersion point data (either the spin-lock field strength in Hz or the nu_CPMG frequency in Hz).
+    @type point:        None or float
+    @keyword time:      The relaxation time period.
+    @type time:         None or float
+    @keyword ref:       A flag which if True will restrict the matches to the reference spectra, i.e. those without a dispersion point.  The point and time arguments are then ignored.
+    @type ref:          bool
+    @return:            The matching spectrum IDs.
+    @rtype:             list of str
+    """
+
+    # The index.
+    index = spectrum_index()
+
+    # The reference spectra.
+    if ref:
+        point = None
+        time = None
+
+    # The metadata fields used as the key, and the key.
+    values = [exp_type, frq, offset, point, time]
+    fields = []
+    for i in range(len(values)):
+        if values[i] != None or (ref and i == 3):
+            fields.append(i)
+    fields = tuple(fields)
+    key = tuple([values[i] for i in fields])
+
+    # Build the map for this combination of metadata fields.
+    if fields not in index['maps']:
+        index['maps'][fields] = {}
+        for id in index['ids']:
+            id_key = tuple([index['data'][id][i] for i in fields])
+            if id_key not in index['maps'][fields]:
+                index['maps'][fields][id_key] = []
+            index['maps'][fields][id_key].append(id)
+
+    # Return a copy of the matching IDs.
+    return list(index['maps'][fields].get(key, []))
+
+
+def spectrum_index_reset():
+    """Delete the spectrum index of the current data pipe, as the spectrum metadata has changed."""
+
+    # Delete the index.
+    if hasattr(cdp, '_spectrum_index'):
+        del cdp._spectrum_index
+
+
 def spin_has_frq_data(spin=None, frq=None):
     """Determine if the spin has intensity data for the given spectrometer frequency.
 
@@ -5000,6 +5285,9 @@ def spin_lock_field(spectrum_id=None, field=None):
     if None in cdp.spin_lock_nu1_list:
         cdp.dispersion_points -= 1
 
+    # The spectrum metadata has changed.
+    spectrum_index_reset()
+
     # Printout.
     if field == None:
         print("The spectrum ID '%s' is set to the reference." % spectrum_id)
@@ -5038,6 +5326,9 @@ def spin_lock_offset(spectrum_id=None, offset=None):
     # Sort the list.
     cdp.spin_lock_offset_list.sort()
 
+    # The spectrum metadata has changed.
+    spectrum_index_reset()
+
     # Printout.
     print("Setting the '%s' spectrum spin-lock offset to %s ppm." % (spectrum_id, cdp.spin_lock_offset[spectrum_id]))
 
@@ -5096,6 +5387,10 @@ def write_disp_curves(dir=None, force=None):
             # Write a header.
             file.write(format_head % wvar[1])
 
+            # The rotating frame parameters of the spin.
+            if wvar[0] in ['disp_theta', 'disp_w_eff']:
+                theta_spin_dic, Domega_spin_dic, w_eff_spin_dic, dic_key_list = calc_rotating_frame_params(spin=spin)
+
             # Loop over the dispersion points.
             for exp_type, frq, offset, point, ei, mi, oi, di in loop_exp_frq_offset_point(return_indices=True):
                 # Alias the correct spin.
@@ -5123,10 +5418,8 @@ def write_disp_curves(dir=None, force=None):
 
                 # Define value to be written.
                 if wvar[0] == 'disp_theta':
-                    theta_spin_dic, Domega_spin_dic, w_eff_spin_dic, dic_key_list = calc_rotating_frame_params(spin=spin)
                     value = theta_spin_dic[key]
                 elif wvar[0] == 'disp_w_eff':
-                    theta_spin_dic, Domega_spin_dic, w_eff_spin_dic, dic_key_list = calc_rotating_frame_params(spin=spin)
                     value = w_eff_spin_dic[key]
                 # Else use the standard dispersion point data.
                 else:
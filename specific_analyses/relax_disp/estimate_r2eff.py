@@ -25,7 +25,7 @@
 
 # Python module imports.
 from copy import deepcopy
-from numpy import array, asarray, diag, exp, log, ones, sqrt, sum, transpose, zeros
+from numpy import any, array, asarray, diag, errstate, exp, float64, inf, log, nonzero, ones, sqrt, sum, transpose, where, zeros
 from minfx.generic import generic_minimise
 import sys
 from warnings import warn
@@ -42,7 +42,7 @@ from specific_analyses.relax_disp.checks import check_model_type
 from specific_analyses.relax_disp.data import average_intensity, loop_exp_frq_offset_point, loop_time, return_param_key_from_data
 from specific_analyses.relax_disp.parameters import disassemble_param_vector
 from target_functions.chi2 import chi2_rankN, dchi2
-from target_functions.relax_fit_wrapper import Relax_fit_opt
+from target_functions.relax_fit_wrapper import Relax_fit_opt, fit_batch
 
 # Scipy installed.
 if scipy_module:
@@ -508,7 +508,7 @@ def estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints
     Then solving initial guess by linear least squares of: ln(Intensity[j]) = ln(i0) - time[j]* r2eff.
 
 
-    @keyword method:            The method to minimise and estimate errors.  Options are: 'minfx' or 'scipy.optimize.leastsq'.
+    @keyword method:            The method to minimise and estimate errors.  Options are: 'minfx', 'scipy.optimize.leastsq', 'batch' for the Levenberg-Marquardt optimisation of all curves in a single C call, or 'numpy' for the vectorised Levenberg-Marquardt optimisation of all curves with numpy.
     @type method:               string
     @keyword min_algor:         The minimisation algorithm
     @type min_algor:            string
@@ -536,7 +536,7 @@ def estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints
     check_model_type(model=MODEL_R2EFF)
 
     # Check that the C modules have been compiled.
-    if not C_module_exp_fn and method == 'minfx':
+    if not C_module_exp_fn and method in ['minfx', 'batch']:
         raise RelaxError("Relaxation curve fitting is not available.  Try compiling the C modules on your platform.")
 
     # Set class scipy setting.
@@ -557,6 +557,12 @@ def estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints
                 precalc = False
                 break
 
+    # Optimise all curves together.
+    if method == 'batch':
+        batch_results = minimise_batch(E=E, spin_id=spin_id)
+    elif method == 'numpy':
+        batch_results = minimise_numpy(E=E, spin_id=spin_id)
+
     # Loop over the spins.
     for cur_spin, mol_name, resi, resn, cur_spin_id in spin_loop(selection=spin_id, full_info=True, return_id=True, skip_desel=True):
         # Generate spin string.
@@ -605,6 +611,11 @@ def estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints
 
                 # Acquire results.
                 results = minimise_minfx(E=E)
+
+            elif method in ['batch', 'numpy']:
+                # The results of the batch optimisation.
+                results = batch_results[cur_spin_id, param_key]
+
             else:
                 raise RelaxError("Method for minimisation not known. Try setting: method='scipy.optimize.leastsq'.")
 
@@ -659,6 +670,140 @@ def estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints
                     print(print_string),
 
 
+def fit_exp_lm(params=None, values=None, errors=None, relax_times=None, mask=None, func_tol=1e-25, max_iterations=10000000):
+    """Levenberg-Marquardt optimisation of a batch of two parameter exponential curves, vectorised with numpy.
+
+    All curves are iterated together, the 2x2 normal equations (J^T.W.J + lambda.diag(J^T.W.J)).dp = J^T.W.r of each curve being stacked and solved in closed form.  Each curve has its own damping factor and terminates independently when the decrease of the chi-squared value is less than or equal to func_tol, when no decrease can be found, or after max_iterations iterations.  This is the same algorithm as the C module fit_batch() function.
+
+
+    @keyword params:            The initial [r2eff, i0] parameters of each curve.
+    @type params:               numpy rank-2 float64 array
+    @keyword values:            The peak intensities of each curve, padded to the largest number of time points.
+    @type values:               numpy rank-2 float64 array
+    @keyword errors:            The peak intensity errors of each curve.
+    @type errors:               numpy rank-2 float64 array
+    @keyword relax_times:       The relaxation times of each curve.
+    @type relax_times:          numpy rank-2 float64 array
+    @keyword mask:              The padding mask, where 1.0 excludes the time point from the fit.  If None, all points are used.
+    @type mask:                 None or numpy rank-2 float64 array
+    @keyword func_tol:          The function tolerance which, when reached, terminates optimisation.
+    @type func_tol:             float
+    @keyword max_iterations:    The maximum number of iterations per curve.
+    @type max_iterations:       int
+    @return:                    The optimised parameters, chi-squared values, iteration counts and the covariance matrices (J^T.W.J)^-1 at the solution (filled with infinity when singular).
+    @rtype:                     numpy rank-2 float64 array, numpy rank-1 float64 array, numpy rank-1 int array, numpy rank-3 float64 array
+    """
+
+    # The weights, with the padding excluded.
+    weights = 1.0 / asarray(errors, float64)**2
+    if mask is not None:
+        weights = weights * (1.0 - asarray(mask, float64))
+    values = asarray(values, float64)
+    times = asarray(relax_times, float64)
+
+    # Initialise.
+    params = array(params, float64)
+    num = len(params)
+    lam = zeros(num) + 1e-3
+    iter_count = zeros(num, int)
+    chi2 = sum(weights * (values - params[:, 1:2] * exp(-params[:, 0:1] * times))**2, axis=1)
+    active = ones(num, bool)
+    if max_iterations < 1:
+        active[:] = False
+
+    # The iterations of all active curves, where overflows of the trial steps are rejected by the NaN comparisons.
+    with errstate(over='ignore', invalid='ignore'):
+        while any(active):
+            # The normal equations at the current positions.
+            curves = nonzero(active)[0]
+            a, b, d, g_r, g_i = normal_equations_exp(params=params[curves], values=values[curves], weights=weights[curves], times=times[curves])
+
+            # Increase the damping until the chi-squared values decrease (the NaN comparisons fail).
+            accepted = zeros(len(curves), bool)
+            chi2_new = zeros(len(curves))
+            trial = params[curves]
+            pending = lam[curves] < 1e16
+            while any(pending):
+                i = nonzero(pending)[0]
+                c = curves[i]
+
+                # The damped normal equations.
+                m_r = a[i] + lam[c] * where(a[i] > 0.0, a[i], 1.0)
+                m_i = d[i] + lam[c] * where(d[i] > 0.0, d[i], 1.0)
+                det = m_r * m_i - b[i]**2
+
+                # The trial steps of the positive definite systems.
+                spd = (m_r > 0.0) & (det > 0.0)
+                det = where(spd, det, 1.0)
+                trial[i, 0] = params[c, 0] + (m_i * g_r[i] - b[i] * g_i[i]) / det
+                trial[i, 1] = params[c, 1] + (m_r * g_i[i] - b[i] * g_r[i]) / det
+                chi2_new[i] = sum(weights[c] * (values[c] - trial[i, 1:2] * exp(-trial[i, 0:1] * times[c]))**2, axis=1)
+
+                # Accept the decreases, otherwise increase the damping.
+                ok = spd & (chi2_new[i] <= chi2[c])
+                accepted[i[ok]] = True
+                lam[c[~ok]] *= 10.0
+                pending[i] = ~ok & (lam[c] < 1e16)
+
+            # No decrease possible, so the curves are finished at the last position.
+            active[curves[~accepted]] = False
+
+            # Take the accepted steps, reduce the damping and test for convergence.
+            c = curves[accepted]
+            params[c] = trial[accepted]
+            lam[c] = where(lam[c] > 1e-12, lam[c] / 10.0, lam[c])
+            iter_count[c] += 1
+            converged = chi2[c] - chi2_new[accepted] <= func_tol
+            chi2[c] = chi2_new[accepted]
+            active[c[converged]] = False
+            active[iter_count >= max_iterations] = False
+
+    # The covariance matrices at the solution.
+    a, b, d, g_r, g_i = normal_equations_exp(params=params, values=values, weights=weights, times=times)
+    det = a * d - b**2
+    spd = (a > 0.0) & (det > 0.0)
+    det = where(spd, det, 1.0)
+    covar = zeros((num, 2, 2))
+    covar[:, 0, 0] = where(spd, d / det, inf)
+    covar[:, 0, 1] = covar[:, 1, 0] = where(spd, -b / det, inf)
+    covar[:, 1, 1] = where(spd, a / det, inf)
+
+    # Return.
+    return params, chi2, iter_count, covar
+
+
+def minimise_batch(E=None, spin_id=None):
+    """Estimate r2eff and errors by the Levenberg-Marquardt optimisation of all exponential curves in a single C call.
+
+    The errors are from the covariance matrix (J^T.W.J)^-1 at the solution.
+
+
+    @keyword E:         The Exponential function class, which contain data and functions.
+    @type E:            class
+    @keyword spin_id:   The spin identification string.
+    @type spin_id:      str
+    @return:            The packed lists with optimised parameter, estimated parameter error, chi2, iter_count, f_count, g_count, h_count, warning, with the spin ID and parameter key tuples as keys.
+    @rtype:             dict of list
+    """
+
+    # Check that the C modules have been compiled.
+    if not C_module_exp_fn:
+        raise RelaxError("Relaxation curve fitting is not available.  Try compiling the C modules on your platform.")
+
+    # Collect the curves.
+    keys, x0, values, errors, times, mask = pack_curves(E=E, spin_id=spin_id)
+
+    # Nothing to do.
+    if not len(keys):
+        return {}
+
+    # Optimise.
+    params, chi2, iter_count, covar = fit_batch(model='exp', params=x0, values=values, errors=errors, relax_times=times, mask=mask)
+
+    # Pack the results.
+    return unpack_curves(keys=keys, params=params, chi2=chi2, iter_count=iter_count, covar=covar)
+
+
 def minimise_leastsq(E=None):
     """Estimate r2eff and errors by exponential curve fitting with scipy.optimize.leastsq.
 
@@ -848,3 +993,135 @@ def minimise_minfx(E=None):
 
     # Return, including errors.
     return results
+
+
+def minimise_numpy(E=None, spin_id=None):
+    """Estimate r2eff and errors by the vectorised Levenberg-Marquardt optimisation of all exponential curves with numpy.
+
+    The errors are from the covariance matrix (J^T.W.J)^-1 at the solution.  This does not require the compiled C modules.
+
+
+    @keyword E:         The Exponential function class, which contain data and functions.
+    @type E:            class
+    @keyword spin_id:   The spin identification string.
+    @type spin_id:      str
+    @return:            The packed lists with optimised parameter, estimated parameter error, chi2, iter_count, f_count, g_count, h_count, warning, with the spin ID and parameter key tuples as keys.
+    @rtype:             dict of list
+    """
+
+    # Collect the curves.
+    keys, x0, values, errors, times, mask = pack_curves(E=E, spin_id=spin_id)
+
+    # Nothing to do.
+    if not len(keys):
+        return {}
+
+    # Optimise.
+    params, chi2, iter_count, covar = fit_exp_lm(params=x0, values=values, errors=errors, relax_times=times, mask=mask)
+
+    # Pack the results.
+    return unpack_curves(keys=keys, params=params, chi2=chi2, iter_count=iter_count, covar=covar)
+
+
+def normal_equations_exp(params=None, values=None, weights=None, times=None):
+    """The J^T.W.J matrix elements and J^T.W.r vectors of a batch of two parameter exponential curves.
+
+    @keyword params:    The [r2eff, i0] parameters of each curve.
+    @type params:       numpy rank-2 float64 array
+    @keyword values:    The peak intensities of each curve.
+    @type values:       numpy rank-2 float64 array
+    @keyword weights:   The weights 1/sigma^2 of each curve.
+    @type weights:      numpy rank-2 float64 array
+    @keyword times:     The relaxation times of each curve.
+    @type times:        numpy rank-2 float64 array
+    @return:            The matrix elements [0, 0], [0, 1] and [1, 1], and the two vector elements.
+    @rtype:             tuple of numpy rank-1 float64 arrays
+    """
+
+    # The back calculated curves and the Jacobians.
+    exp_vals = exp(-params[:, 0:1] * times)
+    back_calc = params[:, 1:2] * exp_vals
+    jac_r2eff = -times * back_calc
+    resid = weights * (values - back_calc)
+
+    # The elements.
+    a = sum(weights * jac_r2eff**2, axis=1)
+    b = sum(weights * jac_r2eff * exp_vals, axis=1)
+    d = sum(weights * exp_vals**2, axis=1)
+    g_r = sum(jac_r2eff * resid, axis=1)
+    g_i = sum(exp_vals * resid, axis=1)
+
+    # Return.
+    return a, b, d, g_r, g_i
+
+
+def pack_curves(E=None, spin_id=None):
+    """Collect all exponential curves into arrays padded to the largest number of time points, with the initial guesses solved by linear least squares.
+
+    @keyword E:         The Exponential function class, which contain data and functions.
+    @type E:            class
+    @keyword spin_id:   The spin identification string.
+    @type spin_id:      str
+    @return:            The spin ID and parameter key tuples, and the initial parameters, peak intensities, errors, relaxation times and padding mask (1.0 for excluded points) of each curve.
+    @rtype:             list of tuple of str, and 5 numpy rank-2 float64 arrays
+    """
+
+    # Collect the curves.
+    keys = []
+    curves = []
+    for cur_spin, cur_spin_id in spin_loop(selection=spin_id, return_id=True, skip_desel=True):
+        for exp_type, frq, offset, point in loop_exp_frq_offset_point():
+            # The peak intensities, errors and times.
+            values = []
+            errors = []
+            times = []
+            for time in loop_time(exp_type=exp_type, frq=frq, offset=offset, point=point):
+                values.append(average_intensity(spin=cur_spin, exp_type=exp_type, frq=frq, offset=offset, point=point, time=time))
+                errors.append(average_intensity(spin=cur_spin, exp_type=exp_type, frq=frq, offset=offset, point=point, time=time, error=True))
+                times.append(time)
+
+            # Store.
+            keys.append((cur_spin_id, return_param_key_from_data(exp_type=exp_type, frq=frq, offset=offset, point=point)))
+            curves.append((asarray(values), asarray(errors), asarray(times)))
+
+    # Pack the curves.
+    num_times = max([len(curve[2]) for curve in curves] + [0])
+    x0 = zeros((len(curves), 2))
+    values = zeros((len(curves), num_times))
+    errors = ones((len(curves), num_times))
+    times = zeros((len(curves), num_times))
+    mask = ones((len(curves), num_times))
+    for i in range(len(curves)):
+        n = len(curves[i][2])
+        values[i, :n], errors[i, :n], times[i, :n] = curves[i]
+        mask[i, :n] = 0.0
+        x0[i] = E.estimate_x0_exp(times=curves[i][2], values=curves[i][0])
+
+    # Return.
+    return keys, x0, values, errors, times, mask
+
+
+def unpack_curves(keys=None, params=None, chi2=None, iter_count=None, covar=None):
+    """Pack the batch optimisation results in the same form as the other minimisation functions.
+
+    @keyword keys:          The spin ID and parameter key tuples of the curves.
+    @type keys:             list of tuple of str
+    @keyword params:        The optimised parameters of each curve.
+    @type params:           numpy rank-2 float64 array
+    @keyword chi2:          The chi-squared value of each curve.
+    @type chi2:             numpy rank-1 float64 array
+    @keyword iter_count:    The number of iterations of each curve.
+    @type iter_count:       numpy rank-1 array
+    @keyword covar:         The covariance matrix of each curve.
+    @type covar:            numpy rank-3 float64 array
+    @return:                The packed lists with optimised parameter, estimated parameter error, chi2, iter_count, f_count, g_count, h_count, warning, with the spin ID and parameter key tuples as keys.
+    @rtype:                 dict of list
+    """
+
+    # Loop over the curves.
+    results = {}
+    for i in range(len(keys)):
+        results[keys[i]] = [params[i], sqrt(diag(covar[i])), chi2[i], iter_count[i], iter_count[i], iter_count[i], 0, None]
+
+    # Return.
+    return results
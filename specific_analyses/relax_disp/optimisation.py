@@ -24,9 +24,11 @@
 """Module for the optimisation of the relaxation dispersion models."""
 
 # Python module imports.
+from collections import OrderedDict
+from copy import deepcopy
 from minfx.generic import generic_minimise
 from minfx.grid import grid
-from numpy import dot, float64, int32, ones, zeros
+from numpy import array, delete, dot, float64, int32, ndarray, ones, zeros
 from numpy.linalg import inv
 from operator import mul
 from re import match, search
@@ -36,19 +38,31 @@ from warnings import warn
 # relax module imports.
 from dep_check import C_module_exp_fn
 from lib.dispersion.two_point import calc_two_point_r2eff, calc_two_point_r2eff_err
-from lib.dispersion.variables import EXP_TYPE_LIST_CPMG, MODEL_CR72, MODEL_CR72_FULL, MODEL_LM63, MODEL_M61, MODEL_MP05, MODEL_TAP03, MODEL_TP02
+from lib.dispersion.variables import EXP_TYPE_LIST_CPMG, MODEL_CR72, MODEL_CR72_FULL, MODEL_LIST_DERIVS, MODEL_LM63, MODEL_M61, MODEL_MP05, MODEL_TAP03, MODEL_TP02, PARAMS_R20
 from lib.errors import RelaxError
+from lib.optimisation import bounds_from_constraints, grid_batch, newton_batch
 from lib.text.sectioning import subsection
 from lib.warnings import RelaxWarning
-from multi import Memo, Result_command, Slave_command
+from multi import Memo, Result_command, Slave_command, cache_data
+from multi.misc import checksum
 from pipe_control.mol_res_spin import generate_spin_string, spin_loop
+from pipe_control.pipes import cdp_name
 from specific_analyses.relax_disp.checks import check_disp_points, check_exp_type, check_exp_type_fixed_time
-from specific_analyses.relax_disp.data import average_intensity, count_spins, find_intensity_keys, has_exponential_exp_type, has_proton_mmq_cpmg, is_r1_optimised, loop_exp, loop_exp_frq_offset_point, loop_exp_frq_offset_point_time, loop_frq, loop_offset, loop_time, pack_back_calc_r2eff, return_cpmg_frqs, return_offset_data, return_param_key_from_data, return_r1_data, return_r2eff_arrays, return_spin_lock_nu1
-from specific_analyses.relax_disp.parameters import assemble_param_vector, disassemble_param_vector, linear_constraints, param_conversion, param_num, r1_setup
+from specific_analyses.relax_disp.data import average_intensity, count_spins, find_intensity_keys, has_exponential_exp_type, has_proton_mmq_cpmg, is_r1_optimised, is_r20_profiled, loop_exp, loop_exp_frq_offset_point, loop_exp_frq_offset_point_time, loop_frq, loop_offset, loop_time, pack_back_calc_r2eff, return_cpmg_frqs, return_offset_data, return_param_key_from_data, return_r1_data, return_r2eff_arrays, return_spin_lock_nu1
+from specific_analyses.relax_disp.parameters import assemble_param_vector, disassemble_param_vector, linear_constraints, loop_parameters, param_conversion, param_num, r1_setup
+from status import Status; status = Status()
 from target_functions.relax_disp import Dispersion
 from target_functions.relax_fit_wrapper import Relax_fit_opt
 
 
+# The memoised back-calculated R2eff/R1rho values, keyed by the data pipe, spins, parameter vector and dispersion point grid, and ordered from the least to the most recently used.
+BACK_CALC_MEMO = OrderedDict()
+BACK_CALC_MEMO_SIZE = 1000
+
+# Empty the memo when the data pipes are created, deleted, switched, reset or loaded from a saved state.
+status.observers.pipe_alteration.register('relax_disp back-calculation memo', BACK_CALC_MEMO.clear, method_name='BACK_CALC_MEMO.clear')
+
+
 def back_calc_peak_intensities(spin=None, spin_id=None, exp_type=None, frq=None, offset=None, point=None):
     """Back-calculation of peak intensity for the given relaxation time.
 
@@ -119,6 +133,8 @@ def back_calc_peak_intensities(spin=None, spin_id=None, exp_type=None, frq=None,
 def back_calc_r2eff(spins=None, spin_ids=None, cpmg_frqs=None, spin_lock_offset=None, spin_lock_nu1=None, relax_times_new=None, store_chi2=False):
     """Back-calculation of R2eff/R1rho values for the given spin.
 
+    The back-calculations are memoised, keyed by the data pipe, model, spins, parameter vector and interpolated dispersion point grid, so that the repeated back-calculation for the same cluster, for example on the interpolated grids of the different dispersion curve plots, is only performed once.  The least recently used back-calculations are dropped once BACK_CALC_MEMO_SIZE is exceeded, and the memo is emptied whenever the data pipes are altered.  As the chi-squared value depends on the R2eff/R1rho data, it is always recalculated if it is to be stored.
+
     @keyword spins:             The list of specific spin data container for cluster.
     @type spins:                List of SpinContainer instances
     @keyword spin_ids:          The list of spin ID strings for the spin containers in cluster.
@@ -140,6 +156,15 @@ def back_calc_r2eff(spins=None, spin_ids=None, cpmg_frqs=None, spin_lock_offset=
     # Create the initial parameter vector.
     param_vector = assemble_param_vector(spins=spins)
 
+    # The memo key.  The spin containers are included as the back-calculation for the attached protons uses the spin ID of the heteronucleus.
+    key = (cdp_name(), spins[0].model, tuple(spin_ids), tuple([id(spin) for spin in spins]), param_vector.tobytes(), memo_key_data([cpmg_frqs, spin_lock_offset, spin_lock_nu1, relax_times_new]))
+
+    # The memoised back-calculation, moving the entry to the end as the most recently used.
+    if not store_chi2 and key in BACK_CALC_MEMO:
+        chi2, back_calc = BACK_CALC_MEMO.pop(key)
+        BACK_CALC_MEMO[key] = chi2, back_calc
+        return deepcopy(back_calc)
+
     # Number of spectrometer fields.
     fields = [None]
     field_count = 1
@@ -221,19 +246,29 @@ def back_calc_r2eff(spins=None, spin_ids=None, cpmg_frqs=None, spin_lock_offset=
                         errors[ei][si][mi].append(ones(num, float64))
                         missing[ei][si][mi].append(zeros(num, int32))
 
+    # The target function arguments.
+    args = dict(model=spins[0].model, num_params=param_num(spins=spins), num_spins=len(spins), num_frq=field_count, exp_types=exp_types, values=values, errors=errors, missing=missing, frqs=frqs, frqs_H=frqs_H, cpmg_frqs=cpmg_frqs, spin_lock_nu1=spin_lock_nu1, chemical_shifts=chemical_shifts, offset=offsets, tilt_angles=tilt_angles, r1=r1, relax_times=relax_times, recalc_tau=recalc_tau, r1_fit=r1_fit)
+
     # Initialise the relaxation dispersion fit functions.
-    model = Dispersion(model=spins[0].model, num_params=param_num(spins=spins), num_spins=len(spins), num_frq=field_count, exp_types=exp_types, values=values, errors=errors, missing=missing, frqs=frqs, frqs_H=frqs_H, cpmg_frqs=cpmg_frqs, spin_lock_nu1=spin_lock_nu1, chemical_shifts=chemical_shifts, offset=offsets, tilt_angles=tilt_angles, r1=r1, relax_times=relax_times, recalc_tau=recalc_tau, r1_fit=r1_fit)
+    model = Dispersion(**args)
 
     # Make a single function call.  This will cause back calculation and the data will be stored in the class instance.
     chi2 = model.func(param_vector)
+    back_calc = model.get_back_calc()
+
+    # Memoise the results, dropping the least recently used.
+    BACK_CALC_MEMO.pop(key, None)
+    BACK_CALC_MEMO[key] = chi2, back_calc
+    if len(BACK_CALC_MEMO) > BACK_CALC_MEMO_SIZE:
+        BACK_CALC_MEMO.popitem(last=False)
 
     # Store the chi-squared value.
     if store_chi2:
         for spin in spins:
             spin.chi2 = chi2
 
-    # Return the structure.
-    return model.get_back_calc()
+    # Return a copy of the structure.
+    return deepcopy(back_calc)
 
 
 def calculate_r2eff():
@@ -310,6 +345,27 @@ def calculate_r2eff():
                 spin.r2eff_err[param_key] = calc_two_point_r2eff_err(relax_time=time, I_ref=ref_intensity, I=intensity, I_ref_err=ref_intensity_err, I_err=intensity_err)
 
 
+def memo_key_data(data):
+    """Convert the nested lists of numpy arrays of the interpolated dispersion point grid into a hashable form for the back-calculation memo key.
+
+    @param data:    The data to convert.
+    @type data:     list, tuple, numpy array, or hashable value
+    @return:        The hashable form of the data, with the numpy arrays converted to byte strings and the lists to tuples.
+    @rtype:         tuple, bytes, or hashable value
+    """
+
+    # Numpy arrays.
+    if isinstance(data, ndarray):
+        return data.tobytes()
+
+    # Recurse into lists and tuples.
+    if isinstance(data, (list, tuple)):
+        return tuple([memo_key_data(element) for element in data])
+
+    # All other values.
+    return data
+
+
 def minimise_r2eff(spins=None, spin_ids=None, min_algor=None, min_options=None, func_tol=None, grad_tol=None, max_iterations=None, constraints=False, scaling_matrix=None, verbosity=0, sim_index=None, lower=None, upper=None, inc=None):
     """Optimise the R2eff model by fitting the 2-parameter exponential curves.
 
@@ -500,6 +556,263 @@ def minimise_r2eff(spins=None, spin_ids=None, min_algor=None, min_options=None,
 
 
 
+class Disp_batch_memo(Memo):
+    """The relaxation dispersion memo class for the batched optimisation of independent spins."""
+
+    def __init__(self, memos=None):
+        """Initialise the relaxation dispersion batch memo class.
+
+        @keyword memos: The individual memo of each spin of the batch.
+        @type memos:    list of Disp_memo instances
+        """
+
+        # Execute the base class __init__() method.
+        super(Disp_batch_memo, self).__init__()
+
+        # Store the arguments.
+        self.memos = memos
+
+
+
+class Disp_batch_minimise_command(Slave_command):
+    """Command class for the batched optimisation of independent spins on the slave processor.
+
+    All spins of the batch must have the same analytic dispersion model.  The spins are stacked along the spin dimension of the Dispersion target function class in its batch mode, and optimised simultaneously using the bound constrained Newton algorithm of the lib.optimisation module.
+    """
+
+    def __init__(self, spins=None, spin_ids=None, sim_index=None, scaling_matrix=None, func_tol=None, grad_tol=None, max_iterations=None, constraints=False, verbosity=0, fields=None, param_names=None):
+        """Initialise the base class, storing all the master data to be sent to the slave processor.
+
+        This method is run on the master processor whereas the run() method is run on the slave processor.
+
+
+        @keyword spins:             The list of spin data containers of the batch, one per free spin.
+        @type spins:                list of SpinContainer instances
+        @keyword spin_ids:          The list of spin ID strings corresponding to the spins argument.
+        @type spin_ids:             list of str
+        @keyword sim_index:         The index of the simulation to optimise.  This should be None if normal optimisation is desired.
+        @type sim_index:            None or int
+        @keyword scaling_matrix:    The diagonal, square scaling matrix, common to all spins.
+        @type scaling_matrix:       numpy diagonal matrix
+        @keyword func_tol:          The function tolerance which, when reached, terminates optimisation.  Setting this to None turns of the check.
+        @type func_tol:             None or float
+        @keyword grad_tol:          The gradient tolerance which, when reached, terminates optimisation.  Setting this to None turns of the check.
+        @type grad_tol:             None or float
+        @keyword max_iterations:    The maximum number of iterations for the algorithm.
+        @type max_iterations:       int
+        @keyword constraints:       If True, the parameter bounds of the linear constraints are used during optimisation.
+        @type constraints:          bool
+        @keyword verbosity:         The amount of information to print.  The higher the value, the greater the verbosity.
+        @type verbosity:            int
+        @keyword fields:            The list of unique of spectrometer field strengths.
+        @type fields:               int
+        @keyword param_names:       The list of parameter names of a single spin to use in printouts.
+        @type param_names:          str
+        """
+
+        # Execute the base class __init__() method.
+        super(Disp_batch_minimise_command, self).__init__()
+
+        # Store the arguments needed by the run() method.
+        self.model = spins[0].model
+        self.num_spins = len(spins)
+        self.spin_ids = spin_ids
+        self.sim_index = sim_index
+        self.scaling_matrix = scaling_matrix
+        self.verbosity = verbosity
+        self.func_tol = func_tol
+        self.grad_tol = grad_tol
+        self.max_iterations = max_iterations
+        self.fields = fields
+        self.param_names = param_names
+
+        # The number of parameters per spin.
+        self.param_num = param_num(spins=[spins[0]])
+
+        # Create the initial parameter vector of each spin, with one spin per row.
+        self.param_vector = array([assemble_param_vector(spins=[spin]) for spin in spins])
+        self.param_vector = dot(self.param_vector, inv(scaling_matrix).T)
+
+        # The parameter bounds from the linear constraints, which are identical for all spins.
+        A, b = None, None
+        if constraints:
+            A, b = linear_constraints(spins=[spins[0]], scaling_matrix=scaling_matrix)
+        bounds = bounds_from_constraints(A=A, b=b, n=self.param_num)
+        if bounds == None:
+            raise RelaxError("The linear constraints of the '%s' model cannot be converted into parameter bounds for the batched optimisation." % self.model)
+        self.lower, self.upper = bounds
+
+        # The R2eff/R1rho data.
+        self.values, errors, missing, frqs, frqs_H, exp_types, relax_times = return_r2eff_arrays(spins=spins, spin_ids=spin_ids, fields=fields, field_count=len(fields), sim_index=sim_index)
+
+        # The offset and R1 data.
+        r1_setup()
+        offsets, spin_lock_fields_inter, chemical_shifts, tilt_angles, Delta_omega, w_eff = return_offset_data(spins=spins, spin_ids=spin_ids, field_count=len(fields))
+        self.r1 = return_r1_data(spins=spins, spin_ids=spin_ids, field_count=len(fields), sim_index=sim_index)
+        self.r1_fit = is_r1_optimised(spins[0].model)
+
+        # The indices of the R20 parameters profiled out of the optimisation, which are identical for all spins.
+        self.r20_profile = is_r20_profiled(spins[0].model)
+        self.r20_index = []
+        if self.r20_profile:
+            for param_name, param_index, spin_index, r20_key in loop_parameters(spins=[spins[0]]):
+                if param_name in PARAMS_R20:
+                    self.r20_index.append(param_index)
+
+        # The number of data points over all spins of the batch, for the cost() hint.
+        self.num_points = 0.0
+        for ei in range(len(missing)):
+            for si in range(len(missing[ei])):
+                for mi in range(len(missing[ei][si])):
+                    for oi in range(len(missing[ei][si][mi])):
+                        self.num_points += len(missing[ei][si][mi][oi]) - missing[ei][si][mi][oi].sum()
+
+        # The static data of the batch which is unchanged between optimisations, including all Monte Carlo simulations.
+        static = {
+            'errors': errors,
+            'missing': missing,
+            'frqs': frqs,
+            'frqs_H': frqs_H,
+            'exp_types': exp_types,
+            'relax_times': relax_times,
+            'offsets': offsets,
+            'chemical_shifts': chemical_shifts,
+            'tilt_angles': tilt_angles,
+            'cpmg_frqs': return_cpmg_frqs(ref_flag=False),
+            'spin_lock_nu1': return_spin_lock_nu1(ref_flag=False)
+        }
+
+        # Place the static data into the versioned data cache, to be sent to each slave together with the first command using it.
+        self.cache_name = "relax_disp_batch_%s_%s" % (cdp_name(), spin_ids)
+        self.cache_version = cache_data(name=self.cache_name, value=static)
+
+
+    def cost(self):
+        """Estimate the computational cost of the optimisation for the scheduling on the master.
+
+        @return:    The number of R2eff/R1rho data points of all spins of the batch.
+        @rtype:     float
+        """
+
+        # The number of data points.
+        return self.num_points
+
+
+    def identity(self):
+        """Return the stable identity of the command for the crash-safe journal."""
+
+        # The inputs, excluding the memo ID and the simulated data.
+        inputs = dict(self.__dict__)
+        inputs.pop('memo_id')
+        if self.sim_index != None:
+            inputs.pop('values')
+            inputs.pop('r1')
+
+        # Return the identity.
+        return "relax_disp batch %s %s %s" % (self.spin_ids, self.sim_index, checksum(sorted(inputs.items())))
+
+
+    def run(self, processor, completed):
+        """Set up and perform the batched optimisation."""
+
+        # Print out.
+        if self.verbosity >= 1:
+            top = 2
+            if self.verbosity >= 2:
+                top += 2
+            subsection(file=sys.stdout, text="Batched fitting of the %s independent spins %s" % (self.num_spins, self.spin_ids), prespace=top)
+
+        # The static data from the slave's data cache.
+        static = processor.fetch_cached_data(name=self.cache_name, version=self.cache_version)
+
+        # Initialise the function to minimise.
+        model = Dispersion(model=self.model, num_params=self.param_num, num_spins=self.num_spins, num_frq=len(self.fields), exp_types=static['exp_types'], values=self.values, errors=static['errors'], missing=static['missing'], frqs=static['frqs'], frqs_H=static['frqs_H'], cpmg_frqs=static['cpmg_frqs'], spin_lock_nu1=static['spin_lock_nu1'], chemical_shifts=static['chemical_shifts'], offset=static['offsets'], tilt_angles=static['tilt_angles'], r1=self.r1, relax_times=static['relax_times'], scaling_matrix=self.scaling_matrix, r1_fit=self.r1_fit, batch=True, r20_profile=self.r20_profile)
+
+        # The optimisation space, removing the profiled R20 parameters and their bounds.
+        x0, lower, upper = self.param_vector, self.lower, self.upper
+        if self.r20_profile:
+            x0 = delete(x0, self.r20_index, axis=1)
+            lower = delete(lower, self.r20_index)
+            upper = delete(upper, self.r20_index)
+
+        # Minimisation.
+        func_tol = self.func_tol
+        if func_tol == None:
+            func_tol = 0.0
+        param_vector, chi2, iter_count, f_count, g_count, h_count, warning = newton_batch(func=model.func_batch, dfunc=model.dfunc_batch, d2func=model.d2func_batch, x0=x0, lower=lower, upper=upper, func_tol=func_tol, grad_tol=self.grad_tol, maxiter=self.max_iterations)
+
+        # Back calculate the R2eff/R1rho values (and the profiled R20 values) at the final positions.
+        model.func_batch(param_vector)
+        back_calc = model.get_back_calc()
+
+        # Restore the profiled R20 parameters.
+        if self.r20_profile:
+            param_vector = model.r20_profile_params(param_vector)
+
+        # The results of each spin.
+        results = []
+        for si in range(self.num_spins):
+            # Optimisation printout.
+            if self.verbosity:
+                print("\nOptimised parameter values for the spin '%s':" % self.spin_ids[si])
+                for i in range(self.param_num):
+                    print("%-20s %25.15f" % (self.param_names[i], param_vector[si, i]*self.scaling_matrix[i, i]))
+
+            # The single spin data structures.
+            missing_si = [[static['missing'][ei][si]] for ei in range(len(static['missing']))]
+            back_calc_si = [[back_calc[ei][si]] for ei in range(len(back_calc))]
+
+            # The result command of the spin.
+            results.append(Disp_result_command(processor=processor, param_vector=param_vector[si], chi2=chi2[si], iter_count=int(iter_count[si]), f_count=int(f_count[si]), g_count=int(g_count[si]), h_count=int(h_count[si]), warning=warning[si], missing=missing_si, back_calc=back_calc_si, completed=False))
+
+        # Create the result command object to send back to the master.
+        processor.return_object(Disp_batch_result_command(processor=processor, memo_id=self.memo_id, results=results, completed=False))
+
+
+
+class Disp_batch_result_command(Result_command):
+    """Class for processing the batched dispersion optimisation results.
+
+    This object will be sent from the slave back to the master to have its run() method executed.
+    """
+
+    def __init__(self, processor=None, memo_id=None, results=None, completed=True):
+        """Set up this class object on the slave, placing the minimisation results here.
+
+        @keyword processor: The processor object.
+        @type processor:    multi.processor.Processor instance
+        @keyword memo_id:   The memo identification string.
+        @type memo_id:      str
+        @keyword results:   The result command of each spin of the batch.
+        @type results:      list of Disp_result_command instances
+        @keyword completed: A flag which if True signals that the optimisation successfully completed.
+        @type completed:    bool
+        """
+
+        # Execute the base class __init__() method.
+        super(Disp_batch_result_command, self).__init__(processor=processor, completed=completed)
+
+        # Store the arguments (to be sent back to the master).
+        self.memo_id = memo_id
+        self.results = results
+        self.completed = completed
+
+
+    def run(self, processor=None, memo=None):
+        """Disassemble the optimisation results of each spin (on the master).
+
+        @param processor:   Unused!
+        @type processor:    None
+        @param memo:        The dispersion batch memo, holding the memo of each spin.
+        @type memo:         Disp_batch_memo instance
+        """
+
+        # Loop over the spins, processing the results as for individual optimisations.
+        for i in range(len(self.results)):
+            self.results[i].run(processor=processor, memo=memo.memos[i])
+
+
+
 class Disp_memo(Memo):
     """The relaxation dispersion memo class."""
 
@@ -531,6 +844,9 @@ class Disp_memo(Memo):
         self.scaling_matrix = scaling_matrix
         self.verbosity = verbosity
 
+        # The data pipe of the spins, as the results may be processed while another data pipe is current.
+        self.pipe_name = cdp_name()
+
 
 
 class Disp_minimise_command(Slave_command):
@@ -580,7 +896,8 @@ class Disp_minimise_command(Slave_command):
         super(Disp_minimise_command, self).__init__()
 
         # Store the arguments needed by the run() method.
-        self.spins = spins
+        self.model = spins[0].model
+        self.num_spins = count_spins(spins)
         self.spin_ids = spin_ids
         self.sim_index = sim_index
         self.scaling_matrix = scaling_matrix
@@ -597,7 +914,7 @@ class Disp_minimise_command(Slave_command):
         self.param_names = param_names
 
         # Create the initial parameter vector.
-        self.param_vector = assemble_param_vector(spins=self.spins)
+        self.param_vector = assemble_param_vector(spins=spins)
         if len(scaling_matrix):
             self.param_vector = dot(inv(scaling_matrix), self.param_vector)
 
@@ -611,21 +928,85 @@ class Disp_minimise_command(Slave_command):
             raise RelaxError("The spectrometer frequency information has not been specified.")
 
         # The R2eff/R1rho data.
-        self.values, self.errors, self.missing, self.frqs, self.frqs_H, self.exp_types, self.relax_times = return_r2eff_arrays(spins=spins, spin_ids=spin_ids, fields=fields, field_count=len(fields), sim_index=sim_index)
+        self.values, errors, missing, frqs, frqs_H, exp_types, relax_times = return_r2eff_arrays(spins=spins, spin_ids=spin_ids, fields=fields, field_count=len(fields), sim_index=sim_index)
 
         # The offset and R1 data.
         r1_setup()
-        self.offsets, spin_lock_fields_inter, self.chemical_shifts, self.tilt_angles, self.Delta_omega, self.w_eff = return_offset_data(spins=spins, spin_ids=spin_ids, field_count=len(fields))
+        offsets, spin_lock_fields_inter, chemical_shifts, tilt_angles, Delta_omega, w_eff = return_offset_data(spins=spins, spin_ids=spin_ids, field_count=len(fields))
         self.r1 = return_r1_data(spins=spins, spin_ids=spin_ids, field_count=len(fields), sim_index=sim_index)
         self.r1_fit = is_r1_optimised(spins[0].model)
 
         # Parameter number.
         self.param_num = param_num(spins=spins)
 
-        # The dispersion data.
-        self.dispersion_points = cdp.dispersion_points
-        self.cpmg_frqs = return_cpmg_frqs(ref_flag=False)
-        self.spin_lock_nu1 = return_spin_lock_nu1(ref_flag=False)
+        # The indices of the R20 parameters profiled out of the optimisation.
+        self.r20_profile = is_r20_profiled(spins[0].model)
+        self.r20_index = []
+        if self.r20_profile:
+            for param_name, param_index, spin_index, r20_key in loop_parameters(spins=spins):
+                if param_name in PARAMS_R20:
+                    self.r20_index.append(param_index)
+
+        # The number of data points over all spins of the cluster, for the cost() hint.
+        self.num_points = 0.0
+        for ei in range(len(missing)):
+            for si in range(len(missing[ei])):
+                for mi in range(len(missing[ei][si])):
+                    for oi in range(len(missing[ei][si][mi])):
+                        self.num_points += len(missing[ei][si][mi][oi]) - missing[ei][si][mi][oi].sum()
+
+        # The static data of the cluster which is unchanged between optimisations, including all Monte Carlo simulations.
+        static = {
+            'errors': errors,
+            'missing': missing,
+            'frqs': frqs,
+            'frqs_H': frqs_H,
+            'exp_types': exp_types,
+            'relax_times': relax_times,
+            'offsets': offsets,
+            'chemical_shifts': chemical_shifts,
+            'tilt_angles': tilt_angles,
+            'cpmg_frqs': return_cpmg_frqs(ref_flag=False),
+            'spin_lock_nu1': return_spin_lock_nu1(ref_flag=False)
+        }
+
+        # Place the static data into the versioned data cache, to be sent to each slave together with the first command using it, so that only the simulated values and starting parameters are sent with each command.
+        self.cache_name = "relax_disp_%s_%s" % (cdp_name(), spin_ids)
+        self.cache_version = cache_data(name=self.cache_name, value=static)
+
+
+    def cost(self):
+        """Estimate the computational cost of the optimisation for the scheduling on the master.
+
+        @return:    The number of R2eff/R1rho data points of the spin block multiplied by the number of grid search points.
+        @rtype:     float
+        """
+
+        # The number of data points over all spins of the cluster.
+        points = self.num_points
+
+        # Grid search (excluding the profiled R20 parameters).
+        if search('^[Gg]rid', self.min_algor):
+            for i in range(len(self.inc)):
+                if i not in self.r20_index:
+                    points *= self.inc[i]
+
+        # Return the estimate.
+        return points
+
+
+    def identity(self):
+        """Return the stable identity of the command for the crash-safe journal."""
+
+        # The inputs, excluding the memo ID and the simulated data.
+        inputs = dict(self.__dict__)
+        inputs.pop('memo_id')
+        if self.sim_index != None:
+            inputs.pop('values')
+            inputs.pop('r1')
+
+        # Return the identity.
+        return "relax_disp %s %s %s" % (self.spin_ids, self.sim_index, checksum(sorted(inputs.items())))
 
 
     def run(self, processor, completed):
@@ -642,16 +1023,36 @@ class Disp_minimise_command(Slave_command):
             # Grid search printout.
             if search('^[Gg]rid', self.min_algor):
                 result = 1
-                for x in self.inc:
-                    result = mul(result, x)
+                for i in range(len(self.inc)):
+                    if i not in self.r20_index:
+                        result = mul(result, self.inc[i])
                 print("Unconstrained grid search size: %s (constraints may decrease this size).\n" % result)
 
-        # Initialise the function to minimise.
-        model = Dispersion(model=self.spins[0].model, num_params=self.param_num, num_spins=count_spins(self.spins), num_frq=len(self.fields), exp_types=self.exp_types, values=self.values, errors=self.errors, missing=self.missing, frqs=self.frqs, frqs_H=self.frqs_H, cpmg_frqs=self.cpmg_frqs, spin_lock_nu1=self.spin_lock_nu1, chemical_shifts=self.chemical_shifts, offset=self.offsets, tilt_angles=self.tilt_angles, r1=self.r1, relax_times=self.relax_times, scaling_matrix=self.scaling_matrix, r1_fit=self.r1_fit)
+        # The static data from the slave's data cache.
+        static = processor.fetch_cached_data(name=self.cache_name, version=self.cache_version)
 
-        # Grid search.
+        # Initialise the function to minimise.
+        model = Dispersion(model=self.model, num_params=self.param_num, num_spins=self.num_spins, num_frq=len(self.fields), exp_types=static['exp_types'], values=self.values, errors=static['errors'], missing=static['missing'], frqs=static['frqs'], frqs_H=static['frqs_H'], cpmg_frqs=static['cpmg_frqs'], spin_lock_nu1=static['spin_lock_nu1'], chemical_shifts=static['chemical_shifts'], offset=static['offsets'], tilt_angles=static['tilt_angles'], r1=self.r1, relax_times=static['relax_times'], scaling_matrix=self.scaling_matrix, r1_fit=self.r1_fit, r20_profile=self.r20_profile)
+
+        # The optimisation space, removing the profiled R20 parameters and their constraints.
+        x0, lower, upper, inc, A, b = self.param_vector, self.lower, self.upper, self.inc, self.A, self.b
+        if self.r20_profile:
+            x0 = delete(x0, self.r20_index)
+            if inc is not None:
+                lower = [lower[i] for i in range(len(inc)) if i not in self.r20_index]
+                upper = [upper[i] for i in range(len(inc)) if i not in self.r20_index]
+                inc = [inc[i] for i in range(len(inc)) if i not in self.r20_index]
+            if A is not None:
+                rows = ~A[:, self.r20_index].any(axis=1)
+                A = delete(A[rows], self.r20_index, axis=1)
+                b = b[rows]
+
+        # Grid search, evaluating whole blocks of grid points at once for the analytic models.
         if search('^[Gg]rid', self.min_algor):
-            results = grid(func=model.func, args=(), num_incs=self.inc, lower=self.lower, upper=self.upper, A=self.A, b=self.b, verbosity=self.verbosity)
+            if self.model in MODEL_LIST_DERIVS:
+                results = grid_batch(func=model.func_grid, lower=lower, upper=upper, inc=inc, A=A, b=b, block_size=max(1, int(1e6 / model.back_calc.size)), verbosity=self.verbosity)
+            else:
+                results = grid(func=model.func, args=(), num_incs=inc, lower=lower, upper=upper, A=A, b=b, verbosity=self.verbosity)
 
             # Unpack the results.
             param_vector, chi2, iter_count, warning = results
@@ -659,15 +1060,27 @@ class Disp_minimise_command(Slave_command):
             g_count = 0.0
             h_count = 0.0
 
+            # Back calculate the R2eff/R1rho values of the grid minimum.
+            if self.model in MODEL_LIST_DERIVS or self.r20_profile:
+                model.func(param_vector)
+
         # Minimisation.
         else:
-            results = generic_minimise(func=model.func, args=(), x0=self.param_vector, min_algor=self.min_algor, min_options=self.min_options, func_tol=self.func_tol, grad_tol=self.grad_tol, maxiter=self.max_iterations, A=self.A, b=self.b, full_output=True, print_flag=self.verbosity)
+            results = generic_minimise(func=model.func, dfunc=model.dfunc, d2func=model.d2func, args=(), x0=x0, min_algor=self.min_algor, min_options=self.min_options, func_tol=self.func_tol, grad_tol=self.grad_tol, maxiter=self.max_iterations, A=A, b=b, full_output=True, print_flag=self.verbosity)
 
             # Unpack the results.
             if results == None:
                 return
             param_vector, chi2, iter_count, f_count, g_count, h_count, warning = results
 
+            # Back calculate the R2eff/R1rho values and profiled R20 values of the minimum.
+            if self.r20_profile:
+                model.func(param_vector)
+
+        # Restore the profiled R20 parameters.
+        if self.r20_profile:
+            param_vector = model.r20_profile_params(param_vector)
+
         # Optimisation printout.
         if self.verbosity:
             print("\nOptimised parameter values:")
@@ -675,7 +1088,7 @@ class Disp_minimise_command(Slave_command):
                 print("%-20s %25.15f" % (self.param_names[i], param_vector[i]*self.scaling_matrix[i, i]))
 
         # Create the result command object to send back to the master.
-        processor.return_object(Disp_result_command(processor=processor, memo_id=self.memo_id, param_vector=param_vector, chi2=chi2, iter_count=iter_count, f_count=f_count, g_count=g_count, h_count=h_count, warning=warning, missing=self.missing, back_calc=model.get_back_calc(), completed=False))
+        processor.return_object(Disp_result_command(processor=processor, memo_id=self.memo_id, param_vector=param_vector, chi2=chi2, iter_count=iter_count, f_count=f_count, g_count=g_count, h_count=h_count, warning=warning, missing=static['missing'], back_calc=model.get_back_calc(), completed=False))
 
 
 
@@ -732,7 +1145,9 @@ class Disp_result_command(Result_command):
 
 
     def run(self, processor=None, memo=None):
-        """Disassemble the model-free optimisation results (on the master).
+        """Disassemble the dispersion optimisation results (on the master).
+
+        The results are stored in the data pipe of the memo rather than the current data pipe, as the commands of the models of different data pipes can be executed from a single processor queue by the auto-analysis, and the results may be processed in a separate thread.
 
         @param processor:   Unused!
         @type processor:    None
@@ -740,6 +1155,19 @@ class Disp_result_command(Result_command):
         @type memo:         memo
         """
 
+        # Process the results in the data pipe of the optimisation.
+        self.store(memo=memo, pipe=memo.pipe_name)
+
+
+    def store(self, memo=None, pipe=None):
+        """Store the optimisation results in the spin containers of the given data pipe.
+
+        @keyword memo:  The dispersion memo.
+        @type memo:     Disp_memo instance
+        @keyword pipe:  The data pipe holding the spins of the memo.
+        @type pipe:     str
+        """
+
         # Printout.
         if memo.sim_index != None:
             print("Simulation %s, cluster %s" % (memo.sim_index+1, memo.spin_ids))
@@ -749,8 +1177,8 @@ class Disp_result_command(Result_command):
             param_vector = dot(memo.scaling_matrix, self.param_vector)
 
         # Disassemble the parameter vector.
-        disassemble_param_vector(param_vector=param_vector, spins=memo.spins, sim_index=memo.sim_index)
-        param_conversion(spins=memo.spins, sim_index=memo.sim_index)
+        disassemble_param_vector(param_vector=param_vector, spins=memo.spins, sim_index=memo.sim_index, pipe=pipe)
+        param_conversion(spins=memo.spins, sim_index=memo.sim_index, pipe=pipe)
 
         # Monte Carlo minimisation statistics.
         if memo.sim_index != None:
@@ -805,7 +1233,7 @@ class Disp_result_command(Result_command):
         # Store the back-calculated values.
         if memo.sim_index == None:
             # 1H MMQ flag.
-            proton_mmq_flag = has_proton_mmq_cpmg()
+            proton_mmq_flag = has_proton_mmq_cpmg(pipe=pipe)
 
             # Loop over each spin, packing the data.
             si = 0
@@ -815,7 +1243,7 @@ class Disp_result_command(Result_command):
                     continue
 
                 # Pack the data.
-                pack_back_calc_r2eff(spin=memo.spins[spin_index], spin_id=memo.spin_ids[spin_index], si=si, back_calc=self.back_calc, proton_mmq_flag=proton_mmq_flag)
+                pack_back_calc_r2eff(spin=memo.spins[spin_index], spin_id=memo.spin_ids[spin_index], si=si, back_calc=self.back_calc, proton_mmq_flag=proton_mmq_flag, pipe=pipe)
 
                 # Increment the spin index.
                 si += 1
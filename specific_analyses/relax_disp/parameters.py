@@ -278,7 +278,7 @@ def copy(pipe_from=None, pipe_to=None):
     pipes.switch(pipe_orig)
 
 
-def disassemble_param_vector(param_vector=None, key=None, spins=None, sim_index=None):
+def disassemble_param_vector(param_vector=None, key=None, spins=None, sim_index=None, pipe=None):
     """Disassemble the parameter vector.
 
     @keyword param_vector:  The parameter vector.
@@ -289,6 +289,8 @@ def disassemble_param_vector(param_vector=None, key=None, spins=None, sim_index=
     @type spins:            list of SpinContainer instances
     @keyword sim_index:     The optional MC simulation index.
     @type sim_index:        int
+    @keyword pipe:          The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:             str or None
     """
 
     # Initialise parameters if needed.
@@ -319,7 +321,7 @@ def disassemble_param_vector(param_vector=None, key=None, spins=None, sim_index=
                 spin.r2b = {}
 
     # Loop over the parameters of the cluster, setting the values.
-    for param_name, param_index, spin_index, r20_key in loop_parameters(spins=spins):
+    for param_name, param_index, spin_index, r20_key in loop_parameters(spins=spins, pipe=pipe):
         set_value(value=param_vector[param_index], key=key, spins=spins, sim_index=sim_index, param_name=param_name, spin_index=spin_index, r20_key=r20_key)
 
 
@@ -656,23 +658,28 @@ def linear_constraints(spins=None, scaling_matrix=None):
     return A, b
 
 
-def loop_parameters(spins=None):
+def loop_parameters(spins=None, pipe=None):
     """Generator function for looping of the parameters of the cluster.
 
     @keyword spins: The list of spin data containers for the block.
     @type spins:    list of SpinContainer instances
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
     @return:        The parameter name, the parameter index (for the parameter vector), the spin index (for the cluster), and the R20 parameter key (for R20, R20A, and R20B parameters stored as dictionaries).
     @rtype:         str, int, int, str
     """
 
+    # The data pipe.
+    dp = pipes.get_pipe(pipe)
+
     # Make sure that the R1 parameter is correctly set up.
-    r1_setup()
+    r1_setup(pipe=pipe)
 
     # The parameter index.
     param_index = -1
 
     # The R2eff model.
-    if cdp.model_type == 'R2eff':
+    if dp.model_type == 'R2eff':
         # Loop over the spins.
         for spin_index in range(len(spins)):
             # Skip deselected spins.
@@ -698,7 +705,7 @@ def loop_parameters(spins=None):
 
             # The R1 parameter.
             if 'r1' in spins[spin_index].params:
-                for exp_type, frq in loop_exp_frq():
+                for exp_type, frq in loop_exp_frq(pipe=pipe):
                     param_index += 1
                     yield 'r1', param_index, spin_index, generate_r20_key(exp_type=exp_type, frq=frq)
 
@@ -710,19 +717,19 @@ def loop_parameters(spins=None):
 
             # The R2 parameter.
             if 'r2' in spins[spin_index].params:
-                for exp_type, frq in loop_exp_frq():
+                for exp_type, frq in loop_exp_frq(pipe=pipe):
                     param_index += 1
                     yield 'r2', param_index, spin_index, generate_r20_key(exp_type=exp_type, frq=frq)
 
             # The R2A parameter.
             if 'r2a' in spins[spin_index].params:
-                for exp_type, frq in loop_exp_frq():
+                for exp_type, frq in loop_exp_frq(pipe=pipe):
                     param_index += 1
                     yield 'r2a', param_index, spin_index, generate_r20_key(exp_type=exp_type, frq=frq)
 
             # The R2B parameter.
             if 'r2b' in spins[spin_index].params:
-                for exp_type, frq in loop_exp_frq():
+                for exp_type, frq in loop_exp_frq(pipe=pipe):
                     param_index += 1
                     yield 'r2b', param_index, spin_index, generate_r20_key(exp_type=exp_type, frq=frq)
 
@@ -784,7 +791,7 @@ def loop_parameters(spins=None):
                 yield param, param_index, None, None
 
 
-def param_conversion(key=None, spins=None, sim_index=None):
+def param_conversion(key=None, spins=None, sim_index=None, pipe=None):
     """Convert Disassemble the parameter vector.
 
     @keyword key:           The key for the R2eff and I0 parameters.
@@ -793,10 +800,12 @@ def param_conversion(key=None, spins=None, sim_index=None):
     @type spins:            list of SpinContainer instances
     @keyword sim_index:     The optional MC simulation index.
     @type sim_index:        int
+    @keyword pipe:          The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:             str or None
     """
 
     # Loop over the parameters of the cluster.
-    for param_name, param_index, spin_index, r20_key in loop_parameters(spins=spins):
+    for param_name, param_index, spin_index, r20_key in loop_parameters(spins=spins, pipe=pipe):
         # Get the value.
         value = get_value(key=key, spins=spins, sim_index=sim_index, param_name=param_name, spin_index=spin_index, r20_key=r20_key)
 
@@ -941,17 +950,21 @@ def param_num(spins=None):
     return num
 
 
-def r1_setup():
-    """Modify the current spin parameter list to either include or exclude the R1 parameter."""
+def r1_setup(pipe=None):
+    """Modify the spin parameter lists to either include or exclude the R1 parameter.
+
+    @keyword pipe:  The data pipe to use.  This defaults to the current data pipe.
+    @type pipe:     str or None
+    """
 
     # Loop over the spins.
-    for spin, spin_id in spin_loop(return_id=True, skip_desel=True):
+    for spin, spin_id in spin_loop(pipe=pipe, return_id=True, skip_desel=True):
         # No model set up.
         if not hasattr(spin, 'params') or not hasattr(spin, 'model'):
             continue
 
         # Should R1 data be optimised?
-        r1_fit = is_r1_optimised(spin.model)
+        r1_fit = is_r1_optimised(spin.model, pipe=pipe)
 
         # Prepend R1 and add it to the spin container.
         if r1_fit and 'r1' not in spin.params:
@@ -127,6 +127,17 @@ def model_setup(model, params):
         api_relax_disp.data_init(spin_id)
 
 
+def newton_batch(batch=True):
+    """Set the batched Newton optimisation flag.
+
+    @keyword batch: The batched optimisation flag.
+    @type batch:    bool
+    """
+
+    # Simply store the value for later use.
+    cdp.newton_batch = batch
+
+
 def r1_fit(fit=True):
     """Set the R1 optimisation flag.
 
@@ -138,6 +149,17 @@ def r1_fit(fit=True):
     cdp.r1_fit = fit
 
 
+def r20_profile(profile=True):
+    """Set the R20 profiling flag.
+
+    @keyword profile:   The R20 profiling flag.
+    @type profile:      bool
+    """
+
+    # Simply store the value for later use.
+    cdp.r20_profile = profile
+
+
 def select_model(model=MODEL_R2EFF):
     """Set up the model for the relaxation dispersion analysis.
 
@@ -24,10 +24,8 @@
 """The R1 and R2 exponential relaxation curve fitting API object."""
 
 # Python module imports.
-from minfx.generic import generic_minimise
-from minfx.grid import grid
-from numpy import asarray, dot, float64, transpose, zeros
-from numpy.linalg import inv
+from math import ceil
+from numpy import asarray, transpose
 from re import match, search
 import sys
 from warnings import warn
@@ -37,13 +35,14 @@ from dep_check import C_module_exp_fn
 from lib.errors import RelaxError, RelaxNoModelError
 from lib.text.sectioning import subsection
 from lib.warnings import RelaxDeselectWarning
+from multi import Processor_box
 from pipe_control.mol_res_spin import check_mol_res_spin_data, return_spin, spin_loop
 from specific_analyses.api_base import API_base
 from specific_analyses.api_common import API_common
 from specific_analyses.relax_fit.checks import check_model_setup
-from specific_analyses.relax_fit.optimisation import back_calc
+from specific_analyses.relax_fit.optimisation import Relax_fit_memo, Relax_fit_minimise_command, back_calc, minimise_lm
 from specific_analyses.relax_fit.parameter_object import Relax_fit_params
-from specific_analyses.relax_fit.parameters import assemble_param_vector, disassemble_param_vector, linear_constraints
+from specific_analyses.relax_fit.parameters import assemble_param_vector
 from target_functions.relax_fit_wrapper import Relax_fit_opt
 
 
@@ -299,7 +298,40 @@ class Relax_fit(API_base, API_common):
         # Checks.
         check_mol_res_spin_data()
 
-        # Loop over the sequence.
+        # Levenberg-Marquardt optimisation of all spins as a batch.
+        algor = min_algor
+        if constraints and not match('^[Gg]rid', min_algor):
+            algor = min_options[0]
+        if match('[Ll][Mm]$', algor) or match('[Ll]evenb[eu]rg-[Mm]arquardt$', algor):
+            # No constraint support.
+            if constraints:
+                raise RelaxError("Constraints are not supported by the Levenberg-Marquardt optimisation, set the constraints flag to False.")
+
+            # The spins with data.
+            spins = []
+            for spin, spin_id in self.model_loop():
+                if spin.select and hasattr(spin, 'peak_intensity'):
+                    spins.append(spin)
+
+            # Optimise, with no tolerances corresponding to no convergence checks.
+            if func_tol == None:
+                func_tol = 0.0
+            if max_iterations == None:
+                max_iterations = 10000000
+            minimise_lm(spins=spins, func_tol=func_tol, max_iterations=int(max_iterations), sim_index=sim_index, verbosity=verbosity)
+            return
+
+        # Get the Processor box singleton (it contains the Processor instance) and alias the Processor.
+        processor_box = Processor_box()
+        processor = processor_box.processor
+
+        # Collect the spins with data, together with their per-model scaling and grid search set up.
+        spins = []
+        spin_ids = []
+        spin_scaling = []
+        spin_lower = []
+        spin_upper = []
+        spin_inc = []
         model_index = 0
         for spin, spin_id in self.model_loop():
             # Skip deselected spins.
@@ -310,158 +342,35 @@ class Relax_fit(API_base, API_common):
             if not hasattr(spin, 'peak_intensity'):
                 continue
 
-            # Create the initial parameter vector.
-            param_vector = assemble_param_vector(spin=spin)
-
-            # Diagonal scaling.
-            if scaling_matrix[model_index] is not None:
-                param_vector = dot(inv(scaling_matrix[model_index]), param_vector)
-
-            # Linear constraints.
-            if constraints:
-                A, b = linear_constraints(spin=spin, scaling_matrix=scaling_matrix[model_index])
-            else:
-                A, b = None, None
-
-            # Print out.
-            if verbosity >= 1:
-                # Individual spin printout.
-                if verbosity >= 2:
-                    print("\n\n")
-
-                string = "Fitting to spin " + repr(spin_id)
-                print("\n\n" + string)
-                print(len(string) * '~')
-
-
-            # Initialise the function to minimise.
-            ######################################
-
-            # The peak intensities and times.
-            values = []
-            errors = []
-            times = []
-            for key in spin.peak_intensity:
-                # The values.
-                if sim_index == None:
-                    values.append(spin.peak_intensity[key])
-                else:
-                    values.append(spin.peak_intensity_sim[sim_index][key])
-
-                # The errors.
-                errors.append(spin.peak_intensity_err[key])
-
-                # The relaxation times.
-                times.append(cdp.relax_times[key])
-
-            # The scaling matrix in a diagonalised list form.
-            scaling_list = []
-            if scaling_matrix[model_index] is None:
-                for i in range(len(param_vector)):
-                    scaling_list.append(1.0)
-            else:
-                for i in range(len(scaling_matrix[model_index])):
-                    scaling_list.append(scaling_matrix[model_index][i, i])
-
-            # Set up the target function.
-            model = Relax_fit_opt(model=spin.model, num_params=len(spin.params), values=values, errors=errors, relax_times=times, scaling_matrix=scaling_list)
-
-
-            # Setup the minimisation algorithm when constraints are present.
-            ################################################################
-
-            if constraints and not match('^[Gg]rid', min_algor):
-                algor = min_options[0]
-            else:
-                algor = min_algor
-
-
-            # Levenberg-Marquardt minimisation.
-            ###################################
-
-            if match('[Ll][Mm]$', algor) or match('[Ll]evenburg-[Mm]arquardt$', algor):
-                # Reconstruct the error data structure.
-                lm_error = zeros(len(spin.relax_times), float64)
-                index = 0
-                for k in range(len(spin.relax_times)):
-                    lm_error[index:index+len(relax_error[k])] = relax_error[k]
-                    index = index + len(relax_error[k])
-
-                min_options = min_options + (self.relax_fit.lm_dri, lm_error)
-
-
-            # Minimisation.
-            ###############
-
-            # Grid search.
+            # Store the spin.
+            spins.append(spin)
+            spin_ids.append(spin_id)
+            spin_scaling.append(scaling_matrix[model_index])
             if search('^[Gg]rid', min_algor):
-                results = grid(func=model.func, args=(), num_incs=inc[model_index], lower=lower[model_index], upper=upper[model_index], A=A, b=b, verbosity=verbosity)
-
-                # Unpack the results.
-                param_vector, chi2, iter_count, warning = results
-                f_count = iter_count
-                g_count = 0.0
-                h_count = 0.0
-
-            # Minimisation.
-            else:
-                results = generic_minimise(func=model.func, dfunc=model.dfunc, d2func=model.d2func, args=(), x0=param_vector, min_algor=min_algor, min_options=min_options, func_tol=func_tol, grad_tol=grad_tol, maxiter=max_iterations, A=A, b=b, full_output=True, print_flag=verbosity)
-
-                # Unpack the results.
-                if results == None:
-                    return
-                param_vector, chi2, iter_count, f_count, g_count, h_count, warning = results
-
-            # Scaling.
-            if scaling_matrix[model_index] is not None:
-                param_vector = dot(scaling_matrix[model_index], param_vector)
-
-            # Disassemble the parameter vector.
-            disassemble_param_vector(param_vector=param_vector, spin=spin, sim_index=sim_index)
-
-            # Monte Carlo minimisation statistics.
-            if sim_index != None:
-                # Chi-squared statistic.
-                spin.chi2_sim[sim_index] = chi2
-
-                # Iterations.
-                spin.iter_sim[sim_index] = iter_count
-
-                # Function evaluations.
-                spin.f_count_sim[sim_index] = f_count
-
-                # Gradient evaluations.
-                spin.g_count_sim[sim_index] = g_count
-
-                # Hessian evaluations.
-                spin.h_count_sim[sim_index] = h_count
-
-                # Warning.
-                spin.warning_sim[sim_index] = warning
-
-
-            # Normal statistics.
+                spin_lower.append(lower[model_index])
+                spin_upper.append(upper[model_index])
+                spin_inc.append(inc[model_index])
             else:
-                # Chi-squared statistic.
-                spin.chi2 = chi2
-
-                # Iterations.
-                spin.iter = iter_count
-
-                # Function evaluations.
-                spin.f_count = f_count
+                spin_lower.append(None)
+                spin_upper.append(None)
+                spin_inc.append(None)
 
-                # Gradient evaluations.
-                spin.g_count = g_count
+            # Increment the model index.
+            model_index += 1
 
-                # Hessian evaluations.
-                spin.h_count = h_count
+        # No spins.
+        if not len(spins):
+            return
 
-                # Warning.
-                spin.warning = warning
+        # The optimisation of the spins in batches, split evenly over the slave processors.
+        size = int(ceil(len(spins) / float(processor.processor_size())))
+        for i in range(0, len(spins), size):
+            # Initialise the slave command and memo.
+            command = Relax_fit_minimise_command(spins=spins[i:i+size], spin_ids=spin_ids[i:i+size], sim_index=sim_index, scaling_matrix=spin_scaling[i:i+size], min_algor=min_algor, min_options=min_options, func_tol=func_tol, grad_tol=grad_tol, max_iterations=max_iterations, constraints=constraints, verbosity=verbosity, lower=spin_lower[i:i+size], upper=spin_upper[i:i+size], inc=spin_inc[i:i+size])
+            memo = Relax_fit_memo(spins=spins[i:i+size], spin_ids=spin_ids[i:i+size], sim_index=sim_index, scaling_matrix=spin_scaling[i:i+size])
 
-            # Increment the model index.
-            model_index += 1
+            # Add the slave command and memo to the processor queue.
+            processor.add_to_queue(command, memo)
 
 
     def overfit_deselect(self, data_check=True, verbose=True):
@@ -23,9 +23,19 @@
 # Module docstring.
 """The R1 and R2 exponential relaxation curve fitting optimisation functions."""
 
+# Python module imports.
+from minfx.generic import generic_minimise
+from minfx.grid import grid
+from numpy import dot, float64, ones, zeros
+from numpy.linalg import inv
+from re import search
+
 # relax module imports.
-from specific_analyses.relax_fit.parameters import assemble_param_vector
-from target_functions.relax_fit_wrapper import Relax_fit_opt
+from multi import Memo, Result_command, Slave_command, cache_data
+from multi.misc import checksum
+from pipe_control.pipes import cdp_name
+from specific_analyses.relax_fit.parameters import assemble_param_vector, disassemble_param_vector, linear_constraints
+from target_functions.relax_fit_wrapper import Relax_fit_opt, fit_batch
 
 
 def back_calc(spin=None, relax_time_id=None):
@@ -70,3 +80,371 @@ def back_calc(spin=None, relax_time_id=None):
 
     # Return the correct peak height.
     return results[keys.index(relax_time_id)]
+
+
+def minimise_lm(spins=None, func_tol=1e-25, max_iterations=10000000, sim_index=None, verbosity=0):
+    """Levenberg-Marquardt optimisation of the curves of all spins, batched per exponential curve type.
+
+    @keyword spins:             The spin containers to optimise.
+    @type spins:                list of SpinContainer instances
+    @keyword func_tol:          The function tolerance which, when reached, terminates optimisation.
+    @type func_tol:             float
+    @keyword max_iterations:    The maximum number of iterations per curve.
+    @type max_iterations:       int
+    @keyword sim_index:         The index of the simulation to optimise.  This should be None if normal optimisation is desired.
+    @type sim_index:            None or int
+    @keyword verbosity:         The amount of information to print.  The higher the value, the greater the verbosity.
+    @type verbosity:            int
+    """
+
+    # Group the spins by curve type.
+    groups = {}
+    for spin in spins:
+        if spin.model not in groups:
+            groups[spin.model] = []
+        groups[spin.model].append(spin)
+
+    # Loop over the curve types.
+    for model in sorted(groups):
+        spins = groups[model]
+
+        # Print out.
+        if verbosity >= 1:
+            print("\nLevenberg-Marquardt optimisation of %i '%s' curves." % (len(spins), model))
+
+        # The data structures, padded to the largest number of time points.
+        num_times = max([len(spin.peak_intensity) for spin in spins])
+        params = zeros((len(spins), len(spins[0].params)), float64)
+        values = zeros((len(spins), num_times), float64)
+        errors = ones((len(spins), num_times), float64)
+        times = zeros((len(spins), num_times), float64)
+        mask = ones((len(spins), num_times), float64)
+
+        # Pack the data.
+        for i in range(len(spins)):
+            params[i] = assemble_param_vector(spin=spins[i])
+            for j, key in enumerate(spins[i].peak_intensity):
+                # The values.
+                if sim_index == None:
+                    values[i, j] = spins[i].peak_intensity[key]
+                else:
+                    values[i, j] = spins[i].peak_intensity_sim[sim_index][key]
+
+                # The errors and relaxation times.
+                errors[i, j] = spins[i].peak_intensity_err[key]
+                times[i, j] = cdp.relax_times[key]
+                mask[i, j] = 0.0
+
+        # Optimise.
+        params, chi2, iter_count, covar = fit_batch(model=model, params=params, values=values, errors=errors, relax_times=times, mask=mask, func_tol=func_tol, max_iterations=max_iterations)
+
+        # Unpack the results.
+        for i in range(len(spins)):
+            # The parameters.
+            disassemble_param_vector(param_vector=params[i], spin=spins[i], sim_index=sim_index)
+
+            # Monte Carlo minimisation statistics.
+            if sim_index != None:
+                spins[i].chi2_sim[sim_index] = float(chi2[i])
+                spins[i].iter_sim[sim_index] = int(iter_count[i])
+                spins[i].f_count_sim[sim_index] = int(iter_count[i])
+                spins[i].g_count_sim[sim_index] = int(iter_count[i])
+                spins[i].h_count_sim[sim_index] = 0
+                spins[i].warning_sim[sim_index] = None
+
+            # Normal statistics.
+            else:
+                spins[i].chi2 = float(chi2[i])
+                spins[i].iter = int(iter_count[i])
+                spins[i].f_count = int(iter_count[i])
+                spins[i].g_count = int(iter_count[i])
+                spins[i].h_count = 0
+                spins[i].warning = None
+
+
+
+class Relax_fit_memo(Memo):
+    """The relaxation curve-fitting memo class for a batch of spins."""
+
+    def __init__(self, spins=None, spin_ids=None, sim_index=None, scaling_matrix=None):
+        """Initialise the relaxation curve-fitting memo class.
+
+        This is used for handling the optimisation results returned from a slave processor.  It runs on the master processor and is used to store data which is passed to the slave processor and then passed back to the master via the results command.
+
+
+        @keyword spins:             The spin containers of the batch.
+        @type spins:                list of SpinContainer instances
+        @keyword spin_ids:          The spin ID strings of the batch.
+        @type spin_ids:             list of str
+        @keyword sim_index:         The optional MC simulation index.
+        @type sim_index:            None or int
+        @keyword scaling_matrix:    The diagonal, square scaling matrix of each spin.
+        @type scaling_matrix:       list of numpy rank-2, float64 array or list of None
+        """
+
+        # Execute the base class __init__() method.
+        super(Relax_fit_memo, self).__init__()
+
+        # Store the arguments.
+        self.spins = spins
+        self.spin_ids = spin_ids
+        self.sim_index = sim_index
+        self.scaling_matrix = scaling_matrix
+
+
+
+class Relax_fit_minimise_command(Slave_command):
+    """Command class for the relaxation curve-fitting optimisation of a batch of spins on the slave processor.
+
+    The curves of the spins are independent and are optimised one after the other.  Grouping several spins per command reduces the number of inter-processor communications.
+    """
+
+    def __init__(self, spins=None, spin_ids=None, sim_index=None, scaling_matrix=None, min_algor=None, min_options=None, func_tol=None, grad_tol=None, max_iterations=None, constraints=False, verbosity=0, lower=None, upper=None, inc=None):
+        """Initialise the base class, storing all the master data to be sent to the slave processor.
+
+        This method is run on the master processor whereas the run() method is run on the slave processor.
+
+
+        @keyword spins:             The spin containers of the batch.
+        @type spins:                list of SpinContainer instances
+        @keyword spin_ids:          The spin ID strings of the batch.
+        @type spin_ids:             list of str
+        @keyword sim_index:         The index of the simulation to optimise.  This should be None if normal optimisation is desired.
+        @type sim_index:            None or int
+        @keyword scaling_matrix:    The diagonal, square scaling matrix of each spin.
+        @type scaling_matrix:       list of numpy rank-2, float64 array or list of None
+        @keyword min_algor:         The minimisation algorithm to use.
+        @type min_algor:            str
+        @keyword min_options:       An array of options to be used by the minimisation algorithm.
+        @type min_options:          array of str
+        @keyword func_tol:          The function tolerance which, when reached, terminates optimisation.  Setting this to None turns of the check.
+        @type func_tol:             None or float
+        @keyword grad_tol:          The gradient tolerance which, when reached, terminates optimisation.  Setting this to None turns of the check.
+        @type grad_tol:             None or float
+        @keyword max_iterations:    The maximum number of iterations for the algorithm.
+        @type max_iterations:       int
+        @keyword constraints:       If True, constraints are used during optimisation.
+        @type constraints:          bool
+        @keyword verbosity:         The amount of information to print.  The higher the value, the greater the verbosity.
+        @type verbosity:            int
+        @keyword lower:             The lower bounds of the grid search of each spin.  This is only used when doing a grid search.
+        @type lower:                None or list of lists of numbers
+        @keyword upper:             The upper bounds of the grid search of each spin.  This is only used when doing a grid search.
+        @type upper:                None or list of lists of numbers
+        @keyword inc:               The grid search increments of each spin.  This is only used when doing a grid search.
+        @type inc:                  None or list of lists of int
+        """
+
+        # Execute the base class __init__() method.
+        super(Relax_fit_minimise_command, self).__init__()
+
+        # Store the arguments needed by the run() method.
+        self.spin_ids = spin_ids
+        self.sim_index = sim_index
+        self.min_algor = min_algor
+        self.min_options = min_options
+        self.func_tol = func_tol
+        self.grad_tol = grad_tol
+        self.max_iterations = max_iterations
+        self.verbosity = verbosity
+        self.lower = lower
+        self.upper = upper
+        self.inc = inc
+
+        # The per-spin data.
+        self.param_vector = []
+        self.A = []
+        self.b = []
+        self.values = []
+        static = []
+        for i in range(len(spins)):
+            # Create the initial parameter vector, with diagonal scaling.
+            param_vector = assemble_param_vector(spin=spins[i])
+            if scaling_matrix[i] is not None:
+                param_vector = dot(inv(scaling_matrix[i]), param_vector)
+            self.param_vector.append(param_vector)
+
+            # Linear constraints.
+            A, b = None, None
+            if constraints:
+                A, b = linear_constraints(spin=spins[i], scaling_matrix=scaling_matrix[i])
+            self.A.append(A)
+            self.b.append(b)
+
+            # The peak intensities, errors and times.
+            values = []
+            errors = []
+            times = []
+            for key in spins[i].peak_intensity:
+                # The values.
+                if sim_index == None:
+                    values.append(spins[i].peak_intensity[key])
+                else:
+                    values.append(spins[i].peak_intensity_sim[sim_index][key])
+
+                # The errors and relaxation times.
+                errors.append(spins[i].peak_intensity_err[key])
+                times.append(cdp.relax_times[key])
+            self.values.append(values)
+
+            # The scaling matrix in a diagonalised list form.
+            if scaling_matrix[i] is None:
+                scaling_list = [1.0] * len(param_vector)
+            else:
+                scaling_list = [scaling_matrix[i][j, j] for j in range(len(scaling_matrix[i]))]
+
+            # The data unchanged between the Monte Carlo simulations.
+            static.append([spins[i].model, len(spins[i].params), errors, times, scaling_list])
+
+        # Place the static data into the versioned data cache, to be sent to each slave together with the first command using it, so that only the simulated values and starting parameters are sent with the commands of the Monte Carlo simulations.
+        self.cache_name = "relax_fit_%s_%s" % (cdp_name(), spin_ids)
+        self.cache_version = cache_data(name=self.cache_name, value=static)
+
+
+    def cost(self):
+        """Estimate the computational cost of the optimisation for the scheduling on the master.
+
+        @return:    The number of peak intensities of all spins of the batch, multiplied by the number of grid search points.
+        @rtype:     float
+        """
+
+        # Loop over the spins.
+        points = 0.0
+        for i in range(len(self.values)):
+            # The number of data points.
+            num = float(len(self.values[i]))
+
+            # Grid search.
+            if search('^[Gg]rid', self.min_algor):
+                for num_inc in self.inc[i]:
+                    num *= num_inc
+
+            # Sum.
+            points += num
+
+        # Return the estimate.
+        return points
+
+
+    def identity(self):
+        """Return the stable identity of the command for the crash-safe journal."""
+
+        # The inputs, excluding the memo ID and the simulated data.
+        inputs = dict(self.__dict__)
+        inputs.pop('memo_id')
+        if self.sim_index != None:
+            inputs.pop('values')
+
+        # Return the identity.
+        return "relax_fit %s %s %s" % (self.spin_ids, self.sim_index, checksum(sorted(inputs.items())))
+
+
+    def run(self, processor, completed):
+        """Set up and perform the optimisation of each spin of the batch."""
+
+        # The static data from the slave's data cache.
+        static = processor.fetch_cached_data(name=self.cache_name, version=self.cache_version)
+
+        # Loop over the spins.
+        results = []
+        for i in range(len(self.spin_ids)):
+            model_name, num_params, errors, times, scaling_list = static[i]
+
+            # Print out.
+            if self.verbosity >= 1:
+                # Individual spin printout.
+                if self.verbosity >= 2:
+                    print("\n\n")
+
+                string = "Fitting to spin " + repr(self.spin_ids[i])
+                print("\n\n" + string)
+                print(len(string) * '~')
+
+            # Set up the target function.
+            model = Relax_fit_opt(model=model_name, num_params=num_params, values=self.values[i], errors=errors, relax_times=times, scaling_matrix=scaling_list)
+
+            # Grid search.
+            if search('^[Gg]rid', self.min_algor):
+                param_vector, chi2, iter_count, warning = grid(func=model.func, args=(), num_incs=self.inc[i], lower=self.lower[i], upper=self.upper[i], A=self.A[i], b=self.b[i], verbosity=self.verbosity)
+                results.append([param_vector, chi2, iter_count, iter_count, 0.0, 0.0, warning])
+
+            # Minimisation.
+            else:
+                results.append(generic_minimise(func=model.func, dfunc=model.dfunc, d2func=model.d2func, args=(), x0=self.param_vector[i], min_algor=self.min_algor, min_options=self.min_options, func_tol=self.func_tol, grad_tol=self.grad_tol, maxiter=self.max_iterations, A=self.A[i], b=self.b[i], full_output=True, print_flag=self.verbosity))
+
+        # Create the result command object to send back to the master.
+        processor.return_object(Relax_fit_result_command(processor=processor, memo_id=self.memo_id, results=results, completed=False))
+
+
+
+class Relax_fit_result_command(Result_command):
+    """Class for processing the relaxation curve-fitting optimisation results of a batch of spins.
+
+    This object will be sent from the slave back to the master to have its run() method executed.
+    """
+
+    def __init__(self, processor=None, memo_id=None, results=None, completed=True):
+        """Set up this class object on the slave, placing the minimisation results here.
+
+        @keyword processor: The processor object.
+        @type processor:    multi.processor.Processor instance
+        @keyword memo_id:   The memo identification string.
+        @type memo_id:      str
+        @keyword results:   The optimisation results of each spin, either None if optimisation failed or the list of the parameter vector, chi2, iter_count, f_count, g_count, h_count and warning.
+        @type results:      list of list or None
+        @keyword completed: A flag which if True signals that the optimisation successfully completed.
+        @type completed:    bool
+        """
+
+        # Execute the base class __init__() method.
+        super(Relax_fit_result_command, self).__init__(processor=processor, completed=completed)
+
+        # Store the arguments (to be sent back to the master).
+        self.memo_id = memo_id
+        self.results = results
+        self.completed = completed
+
+
+    def run(self, processor=None, memo=None):
+        """Disassemble the optimisation results of each spin (on the master).
+
+        @param processor:   Unused!
+        @type processor:    None
+        @param memo:        The relaxation curve-fitting memo.
+        @type memo:         Relax_fit_memo instance
+        """
+
+        # Loop over the spins.
+        for i in range(len(self.results)):
+            # Failed optimisation.
+            if self.results[i] == None:
+                continue
+
+            # Unpack the results.
+            param_vector, chi2, iter_count, f_count, g_count, h_count, warning = self.results[i]
+            spin = memo.spins[i]
+
+            # Scaling.
+            if memo.scaling_matrix[i] is not None:
+                param_vector = dot(memo.scaling_matrix[i], param_vector)
+
+            # Disassemble the parameter vector.
+            disassemble_param_vector(param_vector=param_vector, spin=spin, sim_index=memo.sim_index)
+
+            # Monte Carlo minimisation statistics.
+            if memo.sim_index != None:
+                spin.chi2_sim[memo.sim_index] = chi2
+                spin.iter_sim[memo.sim_index] = iter_count
+                spin.f_count_sim[memo.sim_index] = f_count
+                spin.g_count_sim[memo.sim_index] = g_count
+                spin.h_count_sim[memo.sim_index] = h_count
+                spin.warning_sim[memo.sim_index] = warning
+
+            # Normal statistics.
+            else:
+                spin.chi2 = chi2
+                spin.iter = iter_count
+                spin.f_count = f_count
+                spin.g_count = g_count
+                spin.h_count = h_count
+                spin.warning = warning
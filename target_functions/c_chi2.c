@@ -17,11 +17,11 @@
  * along with this program.  If not, see <http://www.gnu.org/licenses/>.
  */
 
-/* Include the c_chi2 header file to access the square() function and the maximum dimensions. */
+/* Include the c_chi2 header file to access the square() function and the array indexing macros. */
 #include "c_chi2.h"
 
 
-double chi2(double values[MAX_DATA], double variance[MAX_DATA], double back_calc[MAX_DATA], int num_times) {
+double chi2(double *values, double *variance, double *back_calc, int num_times) {
     /* Function to calculate the chi-squared value.
 
     The chi-sqared equation
@@ -57,7 +57,7 @@ double chi2(double values[MAX_DATA], double variance[MAX_DATA], double back_calc
 }
 
 
-void dchi2(double dchi2[MAX_PARAMS], double data[MAX_DATA], double back_calc_vals[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], double variance[MAX_DATA], int num_points, int num_params) {
+void dchi2(double *dchi2, double *data, double *back_calc_vals, double *back_calc_grad, double *variance, int num_points, int num_params) {
     /* Calculate the full chi-squared gradient.
 
     The chi-squared gradient
@@ -105,13 +105,13 @@ void dchi2(double dchi2[MAX_PARAMS], double data[MAX_DATA], double back_calc_val
     for (j = 0; j < num_params; ++j) {
         dchi2[j] = 0.0;
         for (i = 0; i < num_points; ++i) {
-            dchi2[j] += -2.0 / variance[i] * (data[i] - back_calc_vals[i]) * back_calc_grad[j][i];
+            dchi2[j] += -2.0 / variance[i] * (data[i] - back_calc_vals[i]) * back_calc_grad[GRAD_INDEX(j, i, num_points)];
         }
     }
 }
 
 
-void d2chi2(double d2chi2[MAX_PARAMS][MAX_PARAMS], double data[MAX_DATA], double back_calc_vals[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], double variance[MAX_DATA], int num_points, int num_params) {
+void d2chi2(double *d2chi2, double *data, double *back_calc_vals, double *back_calc_grad, double *back_calc_hess, double *variance, int num_points, int num_params) {
     /* Calculate the full chi-squared Hessian.
 
     The chi-squared Hessian
@@ -162,9 +162,9 @@ void d2chi2(double d2chi2[MAX_PARAMS][MAX_PARAMS], double data[MAX_DATA], double
     /* Calculate the chi-squared Hessian. */
     for (j = 0; j < num_params; ++j) {
         for (k = 0; k < num_params; ++k) {
-            d2chi2[j][k] = 0.0;
+            d2chi2[j*num_params + k] = 0.0;
             for (i = 0; i < num_points; ++i) {
-                d2chi2[j][k] += 2.0 / variance[i] * (back_calc_grad[j][i] * back_calc_grad[k][i] - (data[i] - back_calc_vals[i]) * back_calc_hess[j][k][i]);
+                d2chi2[j*num_params + k] += 2.0 / variance[i] * (back_calc_grad[GRAD_INDEX(j, i, num_points)] * back_calc_grad[GRAD_INDEX(k, i, num_points)] - (data[i] - back_calc_vals[i]) * back_calc_hess[HESS_INDEX(j, k, i, num_params, num_points)]);
             }
         }
     }
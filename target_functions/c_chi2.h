@@ -19,16 +19,16 @@
  * along with this program.  If not, see <http://www.gnu.org/licenses/>.
  */
 
-/* Get the maximum dimensions. */
+/* Get the array indexing macros. */
 #include "dimensions.h"
 
 #ifndef RELAX_C_CHI2 
 #define RELAX_C_CHI2
 
 /* Define all of the functions. */
-double chi2(double values[MAX_DATA], double variance[MAX_DATA], double back_calc[MAX_DATA], int num_times);
-void dchi2(double dchi2[MAX_PARAMS], double data[MAX_DATA], double back_calc_vals[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], double variance[MAX_DATA], int num_times, int M);
-void d2chi2(double d2chi2[MAX_PARAMS][MAX_PARAMS], double data[MAX_DATA], double back_calc_vals[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], double variance[MAX_DATA], int num_times, int M);
+double chi2(double *values, double *variance, double *back_calc, int num_times);
+void dchi2(double *dchi2, double *data, double *back_calc_vals, double *back_calc_grad, double *variance, int num_times, int M);
+void d2chi2(double *d2chi2, double *data, double *back_calc_vals, double *back_calc_grad, double *back_calc_hess, double *variance, int num_times, int M);
 
 /* Define the function for calculating the square of a number. */
 #define square(x) ((x)*(x))
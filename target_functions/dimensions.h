@@ -1,5 +1,5 @@
 /*
- * Copyright (C) 2014 Edward d'Auvergne
+ * Copyright (C) 2014-2016 Edward d'Auvergne
  *
  * This file is part of the program relax (http://www.nmr-relax.com).
  *
@@ -21,10 +21,15 @@
 #ifndef RELAX_DIMENSIONS
 #define RELAX_DIMENSIONS
 
-/* The maximum number of parameters. */
-#define MAX_PARAMS 20
+/* The arrays are dynamically sized and stored contiguously in row-major order.  The gradient
+ * arrays have the dimensions {num_params, num_times} and the Hessian arrays the dimensions
+ * {num_params, num_params, num_times}.
+ */
+
+/* The index of the gradient element for parameter j and time point i. */
+#define GRAD_INDEX(j, i, num_times) ((j)*(num_times) + (i))
 
-/* The maximum number of data points. */
-#define MAX_DATA 5000
+/* The index of the Hessian element for parameters j and k and time point i. */
+#define HESS_INDEX(j, k, i, num_params, num_times) (((j)*(num_params) + (k))*(num_times) + (i))
 
 #endif
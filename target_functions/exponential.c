@@ -21,11 +21,11 @@
 /* The exponential function is needed. */
 #include <math.h>
 
-/* Include the exponential header file to access the square() function and the maximum dimensions. */
+/* Include the exponential header file to access the square() function and the array indexing macros. */
 #include "exponential.h"
 
 
-void exponential(double I0, double R, double relax_times[MAX_DATA], double back_calc[MAX_DATA], int num_times) {
+void exponential(double I0, double R, double *relax_times, double *back_calc, int num_times) {
     /* Function to back calculate the intensity values from an exponential.
      *
      * The function used is::
@@ -50,7 +50,7 @@ void exponential(double I0, double R, double relax_times[MAX_DATA], double back_
 }
 
 
-void exponential_dI0(double I0, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_dI0(double I0, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dI0 partial derivate of the 2-parameter exponential curve.
     */
 
@@ -61,16 +61,16 @@ void exponential_dI0(double I0, double R, int param_index, double relax_times[MA
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = 1.0;
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = 1.0;
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = exp(-relax_times[i] * R);
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = exp(-relax_times[i] * R);
     }
 }
 
 
-void exponential_dR(double I0, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_dR(double I0, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dR partial derivate of the 2-parameter exponential curve.
     */
 
@@ -81,16 +81,16 @@ void exponential_dR(double I0, double R, int param_index, double relax_times[MAX
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = -I0 * relax_times[i];
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = -I0 * relax_times[i];
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = -I0 * relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = -I0 * relax_times[i] * exp(-relax_times[i] * R);
     }
 }
 
 
-void exponential_dI02(double I0, double R, int I0_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_dI02(double I0, double R, int I0_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dI0 double partial derivate of the 2-parameter exponential curve.
     */
 
@@ -100,12 +100,12 @@ void exponential_dI02(double I0, double R, int I0_index, double relax_times[MAX_
     /* Loop over the time points. */
     for (i = 0; i < num_times; i++) {
         /* Everything is zero! */
-        back_calc_hess[I0_index][I0_index][i] = 0.0;
+        back_calc_hess[HESS_INDEX(I0_index, I0_index, i, num_params, num_times)] = 0.0;
     }
 }
 
 
-void exponential_dR_dI0(double I0, double R, int R_index, int IO_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_dR_dI0(double I0, double R, int R_index, int IO_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR, dI0 second partial derivate of the 2-parameter exponential curve.
     */
 
@@ -116,19 +116,19 @@ void exponential_dR_dI0(double I0, double R, int R_index, int IO_index, double r
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[IO_index][R_index][i] = -relax_times[i];
+            back_calc_hess[HESS_INDEX(IO_index, R_index, i, num_params, num_times)] = -relax_times[i];
 
         /* The second partial derivate. */
         else
-            back_calc_hess[IO_index][R_index][i] = -relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(IO_index, R_index, i, num_params, num_times)] = -relax_times[i] * exp(-relax_times[i] * R);
 
         /* Hessian symmetry. */
-        back_calc_hess[R_index][IO_index][i] = back_calc_hess[IO_index][R_index][i];
+        back_calc_hess[HESS_INDEX(R_index, IO_index, i, num_params, num_times)] = back_calc_hess[HESS_INDEX(IO_index, R_index, i, num_params, num_times)];
     }
 }
 
 
-void exponential_dR2(double I0, double R, int R_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_dR2(double I0, double R, int R_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR second partial derivate of the 2-parameter exponential curve.
     */
 
@@ -139,10 +139,10 @@ void exponential_dR2(double I0, double R, int R_index, double relax_times[MAX_DA
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[R_index][R_index][i] = I0 * square(relax_times[i]);
+            back_calc_hess[HESS_INDEX(R_index, R_index, i, num_params, num_times)] = I0 * square(relax_times[i]);
 
         /* The partial derivate. */
         else
-            back_calc_hess[R_index][R_index][i] = I0 * square(relax_times[i]) * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(R_index, R_index, i, num_params, num_times)] = I0 * square(relax_times[i]) * exp(-relax_times[i] * R);
     }
 }
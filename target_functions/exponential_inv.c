@@ -21,11 +21,11 @@
 /* The exponential function is needed. */
 #include <math.h>
 
-/* Include the exponential header file to access the square() function and the maximum dimensions. */
+/* Include the exponential header file to access the square() function and the array indexing macros. */
 #include "exponential.h"
 
 
-void exponential_inv(double I0, double Iinf, double R, double relax_times[MAX_DATA], double back_calc[MAX_DATA], int num_times) {
+void exponential_inv(double I0, double Iinf, double R, double *relax_times, double *back_calc, int num_times) {
     /* Calculate the intensity values for the inversion recovery exponential curve.
      *
      * The function used is::
@@ -50,7 +50,7 @@ void exponential_inv(double I0, double Iinf, double R, double relax_times[MAX_DA
 }
 
 
-void exponential_inv_dI0(double I0, double Iinf, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dI0(double I0, double Iinf, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dI0 partial derivate of the inversion recovery exponential curve.
     */
 
@@ -61,16 +61,16 @@ void exponential_inv_dI0(double I0, double Iinf, double R, int param_index, doub
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = 1.0;
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = 1.0;
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = exp(-relax_times[i] * R);
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = exp(-relax_times[i] * R);
     }
 }
 
 
-void exponential_inv_dIinf(double I0, double Iinf, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dIinf(double I0, double Iinf, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dIinf partial derivate of the inversion recovery exponential curve.
     */
 
@@ -81,16 +81,16 @@ void exponential_inv_dIinf(double I0, double Iinf, double R, int param_index, do
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = 0.0;
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = 0.0;
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = 1.0 - exp(-relax_times[i] * R);
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = 1.0 - exp(-relax_times[i] * R);
     }
 }
 
 
-void exponential_inv_dR(double I0, double Iinf, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dR(double I0, double Iinf, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dR partial derivate of the inversion recovery exponential curve.
     */
 
@@ -101,16 +101,16 @@ void exponential_inv_dR(double I0, double Iinf, double R, int param_index, doubl
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = (Iinf - I0) * relax_times[i];
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = (Iinf - I0) * relax_times[i];
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = (Iinf - I0) * relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = (Iinf - I0) * relax_times[i] * exp(-relax_times[i] * R);
     }
 }
 
 
-void exponential_inv_dI02(double I0, double Iinf, double R, int I0_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dI02(double I0, double Iinf, double R, int I0_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dI0 double partial derivate of the inversion recovery exponential curve.
     */
 
@@ -119,12 +119,12 @@ void exponential_inv_dI02(double I0, double Iinf, double R, int I0_index, double
 
     /* Everything is zero. */
     for (i = 0; i < num_times; i++) {
-        back_calc_hess[I0_index][I0_index][i] = 0.0;
+        back_calc_hess[HESS_INDEX(I0_index, I0_index, i, num_params, num_times)] = 0.0;
     }
 }
 
 
-void exponential_inv_dI0_dIinf(double I0, double Iinf, double R, int I0_index, int Iinf_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dI0_dIinf(double I0, double Iinf, double R, int I0_index, int Iinf_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dI0, dIinf second partial derivate of the inversion recovery exponential curve.
     */
 
@@ -133,13 +133,13 @@ void exponential_inv_dI0_dIinf(double I0, double Iinf, double R, int I0_index, i
 
     /* Everything is zero. */
     for (i = 0; i < num_times; i++) {
-        back_calc_hess[I0_index][Iinf_index][i] = 0.0;
-        back_calc_hess[Iinf_index][I0_index][i] = 0.0;
+        back_calc_hess[HESS_INDEX(I0_index, Iinf_index, i, num_params, num_times)] = 0.0;
+        back_calc_hess[HESS_INDEX(Iinf_index, I0_index, i, num_params, num_times)] = 0.0;
     }
 }
 
 
-void exponential_inv_dIinf2(double I0, double Iinf, double R, int Iinf_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dIinf2(double I0, double Iinf, double R, int Iinf_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dIinf double partial derivate of the inversion recovery exponential curve.
     */
 
@@ -148,12 +148,12 @@ void exponential_inv_dIinf2(double I0, double Iinf, double R, int Iinf_index, do
 
     /* Everything is zero. */
     for (i = 0; i < num_times; i++) {
-        back_calc_hess[Iinf_index][Iinf_index][i] = 0.0;
+        back_calc_hess[HESS_INDEX(Iinf_index, Iinf_index, i, num_params, num_times)] = 0.0;
     }
 }
 
 
-void exponential_inv_dR_dI0(double I0, double Iinf, double R, int R_index, int I0_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dR_dI0(double I0, double Iinf, double R, int R_index, int I0_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR, dI0 second partial derivate of the inversion recovery exponential curve.
     */
 
@@ -164,19 +164,19 @@ void exponential_inv_dR_dI0(double I0, double Iinf, double R, int R_index, int I
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[I0_index][R_index][i] = -relax_times[i];
+            back_calc_hess[HESS_INDEX(I0_index, R_index, i, num_params, num_times)] = -relax_times[i];
 
         /* The second partial derivate. */
         else
-            back_calc_hess[I0_index][R_index][i] = -relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(I0_index, R_index, i, num_params, num_times)] = -relax_times[i] * exp(-relax_times[i] * R);
 
         /* Hessian symmetry. */
-        back_calc_hess[R_index][I0_index][i] = back_calc_hess[I0_index][R_index][i];
+        back_calc_hess[HESS_INDEX(R_index, I0_index, i, num_params, num_times)] = back_calc_hess[HESS_INDEX(I0_index, R_index, i, num_params, num_times)];
     }
 }
 
 
-void exponential_inv_dR_dIinf(double I0, double Iinf, double R, int R_index, int Iinf_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dR_dIinf(double I0, double Iinf, double R, int R_index, int Iinf_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR, dIinf second partial derivate of the inversion recovery exponential curve.
     */
 
@@ -187,19 +187,19 @@ void exponential_inv_dR_dIinf(double I0, double Iinf, double R, int R_index, int
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[Iinf_index][R_index][i] = relax_times[i];
+            back_calc_hess[HESS_INDEX(Iinf_index, R_index, i, num_params, num_times)] = relax_times[i];
 
         /* The second partial derivate. */
         else
-            back_calc_hess[Iinf_index][R_index][i] = relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(Iinf_index, R_index, i, num_params, num_times)] = relax_times[i] * exp(-relax_times[i] * R);
 
         /* Hessian symmetry. */
-        back_calc_hess[R_index][Iinf_index][i] = back_calc_hess[Iinf_index][R_index][i];
+        back_calc_hess[HESS_INDEX(R_index, Iinf_index, i, num_params, num_times)] = back_calc_hess[HESS_INDEX(Iinf_index, R_index, i, num_params, num_times)];
     }
 }
 
 
-void exponential_inv_dR2(double I0, double Iinf, double R, int R_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_inv_dR2(double I0, double Iinf, double R, int R_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR second partial derivate of the inversion recovery exponential curve.
     */
 
@@ -210,10 +210,10 @@ void exponential_inv_dR2(double I0, double Iinf, double R, int R_index, double r
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[R_index][R_index][i] = -(Iinf - I0) * square(relax_times[i]);
+            back_calc_hess[HESS_INDEX(R_index, R_index, i, num_params, num_times)] = -(Iinf - I0) * square(relax_times[i]);
 
         /* The partial derivate. */
         else
-            back_calc_hess[R_index][R_index][i] = -(Iinf - I0) * square(relax_times[i]) * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(R_index, R_index, i, num_params, num_times)] = -(Iinf - I0) * square(relax_times[i]) * exp(-relax_times[i] * R);
     }
 }
@@ -21,11 +21,11 @@
 /* The exponential function is needed. */
 #include <math.h>
 
-/* Include the exponential header file to access the square() function and the maximum dimensions. */
+/* Include the exponential header file to access the square() function and the array indexing macros. */
 #include "exponential.h"
 
 
-void exponential_sat(double Iinf, double R, double relax_times[MAX_DATA], double back_calc[MAX_DATA], int num_times) {
+void exponential_sat(double Iinf, double R, double *relax_times, double *back_calc, int num_times) {
     /* Back calculate the intensity values from the exponential of the saturation recovery experiment.
      *
      * The function used is::
@@ -50,7 +50,7 @@ void exponential_sat(double Iinf, double R, double relax_times[MAX_DATA], double
 }
 
 
-void exponential_sat_dIinf(double Iinf, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_sat_dIinf(double Iinf, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dIinf partial derivate of the saturation recovery exponential curve.
     */
 
@@ -61,16 +61,16 @@ void exponential_sat_dIinf(double Iinf, double R, int param_index, double relax_
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = 0.0;
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = 0.0;
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = (1.0 - exp(-relax_times[i] * R));
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = (1.0 - exp(-relax_times[i] * R));
     }
 }
 
 
-void exponential_sat_dR(double Iinf, double R, int param_index, double relax_times[MAX_DATA], double back_calc_grad[MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_sat_dR(double Iinf, double R, int param_index, double *relax_times, double *back_calc_grad, int num_times) {
     /* Calculate the dR partial derivate of the 2-parameter exponential curve.
     */
 
@@ -81,16 +81,16 @@ void exponential_sat_dR(double Iinf, double R, int param_index, double relax_tim
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_grad[param_index][i] = Iinf * relax_times[i];
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = Iinf * relax_times[i];
 
         /* The partial derivate. */
         else
-            back_calc_grad[param_index][i] = Iinf * relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_grad[GRAD_INDEX(param_index, i, num_times)] = Iinf * relax_times[i] * exp(-relax_times[i] * R);
     }
 }
 
 
-void exponential_sat_dIinf2(double Iinf, double R, int Iinf_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_sat_dIinf2(double Iinf, double R, int Iinf_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dIinf double partial derivate of the saturation recovery experiment.
     */
 
@@ -100,12 +100,12 @@ void exponential_sat_dIinf2(double Iinf, double R, int Iinf_index, double relax_
     /* Loop over the time points. */
     for (i = 0; i < num_times; i++) {
         /* Everything is zero! */
-        back_calc_hess[Iinf_index][Iinf_index][i] = 0.0;
+        back_calc_hess[HESS_INDEX(Iinf_index, Iinf_index, i, num_params, num_times)] = 0.0;
     }
 }
 
 
-void exponential_sat_dR_dIinf(double Iinf, double R, int R_index, int Iinf_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_sat_dR_dIinf(double Iinf, double R, int R_index, int Iinf_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR, dIinf second partial derivate of the 2-parameter exponential curve.
     */
 
@@ -116,19 +116,19 @@ void exponential_sat_dR_dIinf(double Iinf, double R, int R_index, int Iinf_index
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[Iinf_index][R_index][i] = relax_times[i];
+            back_calc_hess[HESS_INDEX(Iinf_index, R_index, i, num_params, num_times)] = relax_times[i];
 
         /* The second partial derivate. */
         else
-            back_calc_hess[Iinf_index][R_index][i] = relax_times[i] * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(Iinf_index, R_index, i, num_params, num_times)] = relax_times[i] * exp(-relax_times[i] * R);
 
         /* Hessian symmetry. */
-        back_calc_hess[R_index][Iinf_index][i] = back_calc_hess[Iinf_index][R_index][i];
+        back_calc_hess[HESS_INDEX(R_index, Iinf_index, i, num_params, num_times)] = back_calc_hess[HESS_INDEX(Iinf_index, R_index, i, num_params, num_times)];
     }
 }
 
 
-void exponential_sat_dR2(double Iinf, double R, int R_index, double relax_times[MAX_DATA], double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA], int num_times) {
+void exponential_sat_dR2(double Iinf, double R, int R_index, double *relax_times, double *back_calc_hess, int num_params, int num_times) {
     /* Calculate the dR second partial derivate of the saturation recovery experiment.
     */
 
@@ -139,10 +139,10 @@ void exponential_sat_dR2(double Iinf, double R, int R_index, double relax_times[
     for (i = 0; i < num_times; i++) {
         /* Zero Rx value. */
         if (R == 0.0)
-            back_calc_hess[R_index][R_index][i] = -Iinf * square(relax_times[i]);
+            back_calc_hess[HESS_INDEX(R_index, R_index, i, num_params, num_times)] = -Iinf * square(relax_times[i]);
 
         /* The partial derivate. */
         else
-            back_calc_hess[R_index][R_index][i] = -Iinf * square(relax_times[i]) * exp(-relax_times[i] * R);
+            back_calc_hess[HESS_INDEX(R_index, R_index, i, num_params, num_times)] = -Iinf * square(relax_times[i]) * exp(-relax_times[i] * R);
     }
 }
@@ -205,7 +205,7 @@ class Frame_order:
                     if not isNaN(pcs_errors[i, j]):
                         err = True
             if err:
-                self.pcs_error = pcs_errors
+                self.pcs_error = deepcopy(pcs_errors)
             else:
                 # Missing errors (default to 0.1 ppm errors).
                 self.pcs_error = 0.1 * 1e-6 * ones((self.num_align, self.num_spins), float64)
@@ -218,7 +218,7 @@ class Frame_order:
                     if not isNaN(rdc_errors[i, j]):
                         err = True
             if err:
-                self.rdc_error = rdc_errors
+                self.rdc_error = deepcopy(rdc_errors)
             else:
                 # Missing errors (default to 1 Hz errors).
                 self.rdc_error = ones((self.num_align, self.num_interatom), float64)
@@ -248,11 +248,11 @@ class Frame_order:
                             self.rdc_error[align_index, j] = 1.0
 
                             # Change the weight to one.
-                            rdc_weights[align_index, j] = 1.0
+                            self.rdc_weights[align_index, j] = 1.0
 
                     # The RDC weights.
                     if self.rdc_flag:
-                        self.rdc_error[align_index, j] = self.rdc_error[align_index, j] / sqrt(rdc_weights[align_index, j])
+                        self.rdc_error[align_index, j] = self.rdc_error[align_index, j] / sqrt(self.rdc_weights[align_index, j])
 
                 # Loop over the PCSs.
                 if self.pcs_flag:
@@ -268,11 +268,11 @@ class Frame_order:
                             self.pcs_error[align_index, j] = 1.0
 
                             # Change the weight to one.
-                            pcs_weights[align_index, j] = 1.0
+                            self.pcs_weights[align_index, j] = 1.0
 
                     # The PCS weights.
                     if self.pcs_flag:
-                        self.pcs_error[align_index, j] = self.pcs_error[align_index, j] / sqrt(pcs_weights[align_index, j])
+                        self.pcs_error[align_index, j] = self.pcs_error[align_index, j] / sqrt(self.pcs_weights[align_index, j])
 
         # The paramagnetic centre vectors and distances.
         if self.pcs_flag:
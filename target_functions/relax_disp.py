@@ -25,13 +25,15 @@
 """Target functions for relaxation dispersion."""
 
 # Python module imports.
-from copy import deepcopy
-from numpy import all, arctan2, cos, dot, float64, int16, isfinite, max, multiply, ones, rollaxis, pi, sin, sum, zeros
+from copy import copy, deepcopy
+from numpy import all, arange, arctan2, bincount, clip, concatenate, cos, dot, errstate, float64, indices, inf, insert, int16, isfinite, ix_, max, multiply, ndarray, ndim, newaxis, ones, rollaxis, pi, sin, sum, where, zeros
+from numpy.linalg import solve
 from numpy.ma import masked_equal
 
 # relax module imports.
 from lib.dispersion.b14 import r2eff_B14
 from lib.dispersion.cr72 import r2eff_CR72
+from lib.dispersion.derivatives import jet_r1rho_DPL94, jet_r1rho_M61, jet_r1rho_MP05, jet_r1rho_TAP03, jet_r1rho_TP02, jet_r2eff_B14, jet_r2eff_CR72, jet_r2eff_IT99, jet_r2eff_LM63, jet_r2eff_TSMFK01, jet_variables
 from lib.dispersion.dpl94 import r1rho_DPL94
 from lib.dispersion.it99 import r2eff_IT99
 from lib.dispersion.lm63 import r2eff_LM63
@@ -51,14 +53,14 @@ from lib.dispersion.ns_matrices import r180x_3d
 from lib.dispersion.tp02 import r1rho_TP02
 from lib.dispersion.tap03 import r1rho_TAP03
 from lib.dispersion.tsmfk01 import r2eff_TSMFK01
-from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, EXP_TYPE_CPMG_SQ, EXP_TYPE_CPMG_ZQ, EXP_TYPE_LIST_CPMG, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_CR72, MODEL_CR72_FULL, MODEL_DPL94, MODEL_IT99, MODEL_LIST_CPMG, MODEL_LIST_FULL, MODEL_LIST_DW_MIX_DOUBLE, MODEL_LIST_DW_MIX_QUADRUPLE, MODEL_LIST_INV_RELAX_TIMES, MODEL_LIST_R20B, MODEL_LIST_MMQ, MODEL_LIST_MQ_CPMG, MODEL_LIST_R1RHO, MODEL_LIST_R1RHO_OFF_RES, MODEL_LM63, MODEL_LM63_3SITE, MODEL_M61, MODEL_M61B, MODEL_MP05, MODEL_MMQ_CR72, MODEL_NOREX, MODEL_NS_CPMG_2SITE_3D, MODEL_NS_CPMG_2SITE_3D_FULL, MODEL_NS_CPMG_2SITE_EXPANDED, MODEL_NS_CPMG_2SITE_STAR, MODEL_NS_CPMG_2SITE_STAR_FULL, MODEL_NS_MMQ_2SITE, MODEL_NS_MMQ_3SITE, MODEL_NS_MMQ_3SITE_LINEAR, MODEL_NS_R1RHO_2SITE, MODEL_NS_R1RHO_3SITE, MODEL_NS_R1RHO_3SITE_LINEAR, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01
+from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, EXP_TYPE_CPMG_SQ, EXP_TYPE_CPMG_ZQ, EXP_TYPE_LIST_CPMG, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_CR72, MODEL_CR72_FULL, MODEL_DPL94, MODEL_IT99, MODEL_LIST_CPMG, MODEL_LIST_DERIVS, MODEL_LIST_FULL, MODEL_LIST_DW_MIX_DOUBLE, MODEL_LIST_DW_MIX_QUADRUPLE, MODEL_LIST_INV_RELAX_TIMES, MODEL_LIST_R20B, MODEL_LIST_MMQ, MODEL_LIST_MQ_CPMG, MODEL_LIST_R1RHO, MODEL_LIST_R1RHO_OFF_RES, MODEL_LIST_R20_LINEAR, MODEL_LM63, MODEL_LM63_3SITE, MODEL_M61, MODEL_M61B, MODEL_MP05, MODEL_MMQ_CR72, MODEL_NOREX, MODEL_NS_CPMG_2SITE_3D, MODEL_NS_CPMG_2SITE_3D_FULL, MODEL_NS_CPMG_2SITE_EXPANDED, MODEL_NS_CPMG_2SITE_STAR, MODEL_NS_CPMG_2SITE_STAR_FULL, MODEL_NS_MMQ_2SITE, MODEL_NS_MMQ_3SITE, MODEL_NS_MMQ_3SITE_LINEAR, MODEL_NS_R1RHO_2SITE, MODEL_NS_R1RHO_3SITE, MODEL_NS_R1RHO_3SITE_LINEAR, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01
 from lib.errors import RelaxError
 from lib.float import isNaN
 from target_functions.chi2 import chi2_rankN
 
 
 class Dispersion:
-    def __init__(self, model=None, num_params=None, num_spins=None, num_frq=None, exp_types=None, values=None, errors=None, missing=None, frqs=None, frqs_H=None, cpmg_frqs=None, spin_lock_nu1=None, chemical_shifts=None, offset=None, tilt_angles=None, r1=None, relax_times=None, scaling_matrix=None, recalc_tau=True, r1_fit=False):
+    def __init__(self, model=None, num_params=None, num_spins=None, num_frq=None, exp_types=None, values=None, errors=None, missing=None, frqs=None, frqs_H=None, cpmg_frqs=None, spin_lock_nu1=None, chemical_shifts=None, offset=None, tilt_angles=None, r1=None, relax_times=None, scaling_matrix=None, recalc_tau=True, r1_fit=False, batch=False, r20_profile=False):
         """Relaxation dispersion target functions for optimisation.
 
         Models
@@ -163,6 +165,10 @@ class Dispersion:
         @type recalc_tau:           bool
         @keyword r1_fit:            A flag which if True will allow R1 values to be optimised.  If False, preloaded R1 values will be used instead.
         @type r1_fit:               bool
+        @keyword batch:             A flag which if True will treat the spins as a batch of independent spins, each with its own parameter vector, rather than a cluster.  The batched target functions func_batch(), dfunc_batch() and d2func_batch() then return the values for each spin.  This is only supported for the models with analytic derivatives.
+        @type batch:                bool
+        @keyword r20_profile:       A flag which if True will profile the R20 (or R1rho') parameters out of the optimisation.  The parameter vector then excludes these parameters, and for each parameter vector the R20 values are found by the exact linear least-squares solution for each experiment, spin and field, bounded by the R20 constraints.  This is only supported for the models in which the R20 parameters enter linearly.  In the batch mode, the R20 parameters are excluded from the parameter vector of each spin.
+        @type r20_profile:          bool
         """
 
         # Check the args.
@@ -179,6 +185,10 @@ class Dispersion:
                 raise RelaxError("Chemical shifts must be supplied for the '%s' R1rho off-resonance dispersion model." % model)
             if not r1_fit and r1 is None:
                 raise RelaxError("R1 relaxation rates must be supplied for the '%s' R1rho off-resonance dispersion model when not fitting the values." % model)
+        if batch and model not in MODEL_LIST_DERIVS:
+            raise RelaxError("The batched optimisation of independent spins is not supported for the '%s' dispersion model." % model)
+        if r20_profile and model not in MODEL_LIST_R20_LINEAR:
+            raise RelaxError("The profiling of the R20 parameters is not supported for the '%s' dispersion model." % model)
 
         # Store the arguments.
         self.model = model
@@ -188,6 +198,9 @@ class Dispersion:
         self.values_orig = values
         self.cpmg_frqs_orig = cpmg_frqs
         self.spin_lock_nu1_orig = spin_lock_nu1
+        self.r1_fit = r1_fit
+        self.batch = batch
+        self.r20_profile = r20_profile
 
         # Initialise higher order numpy structures.
         # Define the shape of all the numpy arrays.
@@ -399,6 +412,9 @@ class Dispersion:
         # This is to make sure, that the chi2 values is not affected by missing values.
         self.mask_replace_blank = masked_equal(self.missing, 1.0)
 
+        # The mask of the data points contributing to the chi-squared derivatives, excluding the padding at the end of the arrays and the missing data.
+        self.deriv_mask = self.disp_struct * (1.0 - self.missing)
+
         # Check the experiment types, simplifying the data structures as needed.
         self.experiment_type_setup()
 
@@ -410,32 +426,44 @@ class Dispersion:
         # Initialise the post spin parameter indices.
         self.end_index = []
 
+        # The number of spins per parameter vector (in the batch mode, each spin has its own parameter vector).
+        ns = self.NS
+        if batch:
+            ns = 1
+
         # The spin and frequency dependent R1 and R2 parameters, for models which fit R1.
         if r1_fit:
             # The spin and frequency dependent R1 parameters.
-            self.end_index.append(self.NE * self.NS * self.NM)
+            self.end_index.append(self.NE * ns * self.NM)
             # The spin and frequency dependent R2 parameters.
-            self.end_index.append(self.end_index[-1] + self.NE * self.NS * self.NM)
+            self.end_index.append(self.end_index[-1] + self.NE * ns * self.NM)
 
         # For all other models.
         else:
             # The spin and frequency dependent R2 parameters.
-            self.end_index.append(self.NE * self.NS * self.NM)
+            self.end_index.append(self.NE * ns * self.NM)
 
         if model in MODEL_LIST_R20B:
-            self.end_index.append(2 * self.NE * self.NS * self.NM)
+            self.end_index.append(2 * self.NE * ns * self.NM)
 
         # The spin and dependent parameters (phi_ex, dw, padw2).
-        self.end_index.append(self.end_index[-1] + self.NS)
+        self.end_index.append(self.end_index[-1] + ns)
 
         # For models with both dw and dwH or dw_AB and dw_BC or phi_ex_B and phi_ex_C.
         if model in MODEL_LIST_DW_MIX_DOUBLE:
-            self.end_index.append(self.end_index[-1] + self.NS)
+            self.end_index.append(self.end_index[-1] + ns)
 
         elif model in MODEL_LIST_DW_MIX_QUADRUPLE:
-            self.end_index.append(self.end_index[-1] + self.NS)
-            self.end_index.append(self.end_index[-1] + self.NS)
-            self.end_index.append(self.end_index[-1] + self.NS)
+            self.end_index.append(self.end_index[-1] + ns)
+            self.end_index.append(self.end_index[-1] + ns)
+            self.end_index.append(self.end_index[-1] + ns)
+
+        # The parameter indices of each dispersion point for the analytic derivatives.
+        self.index_setup()
+
+        # The target function of the last spin subset of the batch mode.
+        self.batch_subset_index = None
+        self.batch_subset_model = None
 
         # Pi-pulse propagators.
         if model in [MODEL_NS_CPMG_2SITE_3D, MODEL_NS_CPMG_2SITE_3D_FULL]:
@@ -574,6 +602,65 @@ class Dispersion:
         if model == MODEL_NS_MMQ_3SITE_LINEAR:
             self.func = self.func_ns_mmq_3site_linear
 
+        # Set up the analytic chi-squared gradient and Hessian.
+        self.dfunc = None
+        self.d2func = None
+        if model == MODEL_B14:
+            self.deriv = self.deriv_B14
+        if model == MODEL_B14_FULL:
+            self.deriv = self.deriv_B14_full
+        if model == MODEL_CR72:
+            self.deriv = self.deriv_CR72
+        if model == MODEL_CR72_FULL:
+            self.deriv = self.deriv_CR72_full
+        if model == MODEL_DPL94:
+            self.deriv = self.deriv_DPL94
+        if model == MODEL_IT99:
+            self.deriv = self.deriv_IT99
+        if model == MODEL_LM63:
+            self.deriv = self.deriv_LM63
+        if model == MODEL_M61:
+            self.deriv = self.deriv_M61
+        if model == MODEL_MP05:
+            self.deriv = self.deriv_MP05
+        if model == MODEL_TAP03:
+            self.deriv = self.deriv_TAP03
+        if model == MODEL_TP02:
+            self.deriv = self.deriv_TP02
+        if model == MODEL_TSMFK01:
+            self.deriv = self.deriv_TSMFK01
+        if model in MODEL_LIST_DERIVS:
+            self.dfunc = self.dfunc_analytic
+            self.d2func = self.d2func_analytic
+
+        # The target function of the model for the full parameter vector.
+        self.func_model = self.func
+
+        # Profile the R20 parameters out of the optimisation.
+        if r20_profile:
+            self.r20_profile_setup()
+
+
+    def batch_subset(self, index):
+        """Return the target function for a subset of the spins of the batch mode.
+
+        The target function instance of the last subset is kept, as the subset only changes when spins are dropped from the batched optimisation.
+
+
+        @param index:   The indices of the spins of the subset.
+        @type index:    numpy rank-1 int array
+        @return:        The target function instance for the spin subset.
+        @rtype:         Dispersion instance
+        """
+
+        # Create a new target function for the subset.
+        if self.batch_subset_index is None or len(self.batch_subset_index) != len(index) or (self.batch_subset_index != index).any():
+            self.batch_subset_index = index.copy()
+            self.batch_subset_model = self.select_spins(index)
+
+        # Return the target function.
+        return self.batch_subset_model
+
 
     def calc_B14_chi2(self, R20A=None, R20B=None, dw=None, pA=None, kex=None):
         """Calculate the chi-squared value of the Baldwin (2014) 2-site exact solution model for all time scales.
@@ -654,6 +741,113 @@ class Dispersion:
         return chi2_rankN(self.values, self.back_calc, self.errors)
 
 
+    def calc_derivs(self, params, order=2):
+        """Calculate the chi-squared gradient and Hessian from the analytic partial derivatives of the model.
+
+        The equations are::
+
+                                 _n_
+            dchi^2(theta)        \   / yi - yi(theta)     dyi(theta) \ 
+            -------------  =  -2  >  | --------------  .  ---------- |
+               dthetaj           /__ \   sigma_i**2        dthetaj   /
+                                 i=1
+
+                                  _n_
+            d2chi^2(theta)        \       1      / dyi(theta)   dyi(theta)                        d2yi(theta)   \ 
+            ---------------  =  2  >  ---------- | ---------- . ----------  -  (yi-yi(theta)) . --------------- |
+            dthetaj.dthetak       /__ sigma_i**2 \  dthetaj      dthetak                        dthetaj.dthetak /
+                                  i=1
+
+        where the sum is over all dispersion points, excluding the missing data.  The partial derivatives of each back-calculated value yi(theta) are only calculated for the few jet variables of the model (for example R20A, R20B, dw in rad/s, pA and kex).  These are mapped to the full parameter vector via the parameter index and the conversion factor of each jet variable at each dispersion point.
+
+
+        In the batch mode, the parameter vectors of all spins are stacked into a matrix and the gradient and Hessian of each spin is returned.
+
+
+        @param params:  The vector of parameter values, or the matrix of parameter vectors of each spin in the batch mode.
+        @type params:   numpy rank-1 float array or numpy rank-2 float array
+        @keyword order: The derivative order, 1 for the gradient only and 2 for both the gradient and Hessian.
+        @type order:    int
+        @return:        The chi-squared gradient and the chi-squared Hessian (None for order 1), with an additional first dimension for the spin in the batch mode.
+        @rtype:         numpy rank-1 float array, numpy rank-2 float array or None
+        """
+
+        # Back calculate the values via the target function, so that the residuals match the chi-squared value (including the missing data handling).
+        if not self.batch:
+            self.func_model(params)
+
+        # Scaling.
+        if self.scaling_flag:
+            params = dot(params, self.scaling_matrix)
+
+        # The back-calculated values with the partial derivatives, and the parameter index and conversion factor of each jet variable (the batch mode parameter matrix is transposed so that each parameter type is a row).
+        if self.batch:
+            jet, maps = self.deriv(params.T, order=order)
+            back_calc = jet.val
+        else:
+            jet, maps = self.deriv(params, order=order)
+            back_calc = self.back_calc
+
+        # The chi-squared weights and residuals.
+        weights = self.deriv_mask / self.errors**2
+        resid = -2.0 * weights * (self.values - back_calc)
+        resid[~isfinite(resid)] = 0.0
+
+        # Map the first partial derivatives to the parameters, removing non-finite values at the parameter values undefined for the model (e.g. dw = 0.0).
+        jacobian = {}
+        for i in jet.d1:
+            jacobian[i] = jet.d1[i] * maps[i][1] * self.deriv_mask
+            jacobian[i][~isfinite(jacobian[i])] = 0.0
+
+        # The chi-squared gradient (the total number of parameters and the number per parameter vector differ in the batch mode).
+        n = params.size
+        p = params.shape[-1]
+        grad = zeros(n, float64)
+        for i in jacobian:
+            grad += bincount(maps[i][0].ravel(), weights=(resid * jacobian[i]).ravel(), minlength=n)
+        grad = grad.reshape(params.shape)
+
+        # The chi-squared Hessian.
+        hess = None
+        if order == 2:
+            # Map the second partial derivatives to the parameters.
+            hessian = {}
+            for i, j in jet.d2:
+                hessian[i, j] = jet.d2[i, j] * maps[i][1] * maps[j][1] * self.deriv_mask
+                hessian[i, j][~isfinite(hessian[i, j])] = 0.0
+
+            # Sum over all jet variable pairs (the Hessian element index is the same as the parameter vector index, as the parameters of different spins are not coupled in the batch mode).
+            hess = zeros(n*p, float64)
+            for i in range(len(maps)):
+                for j in range(len(maps)):
+                    # The elements for each dispersion point.
+                    elements = None
+                    if i in jacobian and j in jacobian:
+                        elements = 2.0 * weights * jacobian[i] * jacobian[j]
+                    key = (i, j)
+                    if i > j:
+                        key = (j, i)
+                    if key in hessian:
+                        if elements is None:
+                            elements = resid * hessian[key]
+                        else:
+                            elements += resid * hessian[key]
+
+                    # Add the elements to the corresponding Hessian elements.
+                    if elements is not None:
+                        hess += bincount((maps[i][0]*p + maps[j][0] % p).ravel(), weights=elements.ravel(), minlength=n*p)
+            hess = hess.reshape(params.shape + (p,))
+
+        # Scaling (the scaling matrix and Hessian are symmetric).
+        if self.scaling_flag:
+            grad = dot(grad, self.scaling_matrix)
+            if hess is not None:
+                hess = dot(dot(hess, self.scaling_matrix).swapaxes(-1, -2), self.scaling_matrix)
+
+        # Return the gradient and Hessian.
+        return grad, hess
+
+
     def calc_DPL94(self, R1=None, r1rho_prime=None, phi_ex=None, kex=None):
         """Calculation function for the Davis, Perlman and London (1994) fast 2-site off-resonance exchange model for R1rho-type experiments.
 
@@ -1083,6 +1277,447 @@ class Dispersion:
         return chi2_rankN(self.values, self.back_calc, self.errors)
 
 
+    def d2func_analytic(self, params):
+        """The chi-squared Hessian function for the models with analytic partial derivatives.
+
+        @param params:  The vector of parameter values.
+        @type params:   numpy rank-1 float array
+        @return:        The chi-squared Hessian.
+        @rtype:         numpy rank-2 float array
+        """
+
+        # Calculate and return the Hessian.
+        return self.calc_derivs(params, order=2)[1]
+
+
+    def d2func_batch(self, params, index=None):
+        """The chi-squared Hessian function of the batch mode, returning the Hessian of each spin.
+
+        @param params:  The matrix of parameter values, with one row per spin.
+        @type params:   numpy rank-2 float array
+        @keyword index: The indices of the spins in the batch, if only a subset of the spins are to be calculated.
+        @type index:    None or numpy rank-1 int array
+        @return:        The chi-squared Hessian of each spin.
+        @rtype:         numpy rank-3 float array
+        """
+
+        # The spin subset.
+        if index is not None and len(index) != self.NS:
+            return self.batch_subset(index).d2func_batch(params)
+
+        # The profiled R20 parameters.
+        if self.r20_profile:
+            return self.d2func_batch_r20_profile(params)
+
+        # Calculate and return the Hessians.
+        return self.calc_derivs(params, order=2)[1]
+
+
+    def d2func_batch_r20_profile(self, params):
+        """The chi-squared Hessian function of the batch mode for the parameter vectors excluding the profiled R20 parameters.
+
+        This is the batch mode equivalent of the d2func_r20_profile() method, returning the Schur complement of the Hessian of each spin.
+
+
+        @param params:  The matrix of parameter values excluding the R20 parameters, with one row per spin.
+        @type params:   numpy rank-2 float array
+        @return:        The chi-squared Hessian of each spin.
+        @rtype:         numpy rank-3 float array
+        """
+
+        # Profile the R20 parameters, and calculate the full Hessians.
+        self.func_batch_r20_profile(params)
+        hess = self.calc_derivs(self.r20_profile_params(params), order=2)[1]
+
+        # The indices of the remaining parameters, and the flags for the R20 parameters which are not at their bounds with one row per spin.
+        index = arange(hess.shape[-1])
+        outer = concatenate([index[:self.r20_start], index[self.r20_start+self.r20_num:]])
+        r20_free = self.r20_free.swapaxes(0, 1).reshape(self.NS, self.r20_num)
+
+        # The Schur complement of each spin.
+        hess_outer = hess[:, outer][:, :, outer]
+        for si in range(self.NS):
+            free = self.r20_start + r20_free[si].nonzero()[0]
+            if len(free):
+                hess_cross = hess[si][ix_(outer, free)]
+                hess_outer[si] -= dot(hess_cross, solve(hess[si][ix_(free, free)], hess_cross.T))
+
+        # Return the Hessians.
+        return hess_outer
+
+
+    def d2func_r20_profile(self, params):
+        """The chi-squared Hessian function for the parameter vector excluding the profiled R20 parameters.
+
+        The Hessian of the profiled chi-squared function is the Schur complement of the R20 block of the full Hessian, for the R20 parameters which are not at their bounds.
+
+
+        @param params:  The vector of parameter values, excluding the R20 parameters.
+        @type params:   numpy rank-1 float array
+        @return:        The chi-squared Hessian.
+        @rtype:         numpy rank-2 float array
+        """
+
+        # Profile the R20 parameters, and calculate the full Hessian.
+        self.func(params)
+        hess = self.calc_derivs(self.r20_profile_params(params), order=2)[1]
+
+        # The indices of the remaining parameters and of the R20 parameters which are not at their bounds.
+        index = arange(len(hess))
+        outer = concatenate([index[:self.r20_start], index[self.r20_start+self.r20_num:]])
+        free = self.r20_start + self.r20_free.ravel().nonzero()[0]
+
+        # The Schur complement.
+        hess_outer = hess[ix_(outer, outer)]
+        if len(free):
+            hess_cross = hess[ix_(outer, free)]
+            hess_outer -= dot(hess_cross, solve(hess[ix_(free, free)], hess_cross.T))
+
+        # Return the Hessian.
+        return hess_outer
+
+
+    def deriv_B14(self, params, order=2):
+        """The R2eff values and partial derivatives of the Baldwin (2014) 2-site exact solution model for all time scales, whereby the simplification R20A = R20B is assumed.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = [
+            self.jet_var_esm(params[:self.end_index[0]], 0),
+            self.jet_var_spin(params[self.end_index[0]:self.end_index[1]], self.end_index[0], self.frqs),
+            self.jet_var_global(params[self.end_index[1]], self.end_index[1]),
+            self.jet_var_global(params[self.end_index[1]+1], self.end_index[1]+1)
+        ]
+        (r20, dw, pA, kex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_B14(r20a=r20, r20b=r20, pA=pA, dw=dw, kex=kex, ncyc=self.power, inv_tcpmg=self.inv_relax_times, tcp=self.tau_cpmg), maps
+
+
+    def deriv_B14_full(self, params, order=2):
+        """The R2eff values and partial derivatives of the Baldwin (2014) 2-site exact solution model for all time scales.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = self.jet_var_r20_full(params[:self.end_index[1]]) + [
+            self.jet_var_spin(params[self.end_index[1]:self.end_index[2]], self.end_index[1], self.frqs),
+            self.jet_var_global(params[self.end_index[2]], self.end_index[2]),
+            self.jet_var_global(params[self.end_index[2]+1], self.end_index[2]+1)
+        ]
+        (r20a, r20b, dw, pA, kex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_B14(r20a=r20a, r20b=r20b, pA=pA, dw=dw, kex=kex, ncyc=self.power, inv_tcpmg=self.inv_relax_times, tcp=self.tau_cpmg), maps
+
+
+    def deriv_CR72(self, params, order=2):
+        """The R2eff values and partial derivatives of the reduced Carver and Richards (1972) 2-site exchange model on all time scales, whereby the simplification R20A = R20B is assumed.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = [
+            self.jet_var_esm(params[:self.end_index[0]], 0),
+            self.jet_var_spin(params[self.end_index[0]:self.end_index[1]], self.end_index[0], self.frqs),
+            self.jet_var_global(params[self.end_index[1]], self.end_index[1]),
+            self.jet_var_global(params[self.end_index[1]+1], self.end_index[1]+1)
+        ]
+        (r20, dw, pA, kex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_CR72(r20a=r20, r20b=r20, pA=pA, dw=dw, kex=kex, cpmg_frqs=self.cpmg_frqs), maps
+
+
+    def deriv_CR72_full(self, params, order=2):
+        """The R2eff values and partial derivatives of the full Carver and Richards (1972) 2-site exchange model on all time scales.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = self.jet_var_r20_full(params[:self.end_index[1]]) + [
+            self.jet_var_spin(params[self.end_index[1]:self.end_index[2]], self.end_index[1], self.frqs),
+            self.jet_var_global(params[self.end_index[2]], self.end_index[2]),
+            self.jet_var_global(params[self.end_index[2]+1], self.end_index[2]+1)
+        ]
+        (r20a, r20b, dw, pA, kex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_CR72(r20a=r20a, r20b=r20b, pA=pA, dw=dw, kex=kex, cpmg_frqs=self.cpmg_frqs), maps
+
+
+    def deriv_DPL94(self, params, order=2):
+        """The R1rho values and partial derivatives of the Davis, Perlman and London (1994) fast 2-site off-resonance exchange model, with R1 either fixed or fitted.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R1rho values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables, i = self.jet_var_r1rho(params)
+        variables += [
+            self.jet_var_spin(params[self.end_index[i]:self.end_index[i+1]], self.end_index[i], self.frqs_squared),
+            self.jet_var_global(params[self.end_index[i+1]], self.end_index[i+1])
+        ]
+        jets, maps = self.jet_setup(variables, order=order)
+        R1 = self.r1
+        if self.r1_fit:
+            R1 = jets.pop(0)
+        r1rho_prime, phi_ex, kex = jets
+
+        # Back calculate the R1rho values and partial derivatives.
+        return jet_r1rho_DPL94(r1rho_prime=r1rho_prime, phi_ex=phi_ex, kex=kex, theta=self.tilt_angles, R1=R1, spin_lock_fields2=self.spin_lock_omega1_squared), maps
+
+
+    def deriv_IT99(self, params, order=2):
+        """The R2eff values and partial derivatives of the Ishima and Torchia (1999) 2-site model for all timescales with pA >> pB.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = [
+            self.jet_var_esm(params[:self.end_index[0]], 0),
+            self.jet_var_spin(params[self.end_index[0]:self.end_index[1]], self.end_index[0], self.frqs),
+            self.jet_var_global(params[self.end_index[1]], self.end_index[1]),
+            self.jet_var_global(params[self.end_index[1]+1], self.end_index[1]+1)
+        ]
+        (r20, dw, pA, tex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_IT99(r20=r20, pA=pA, dw=dw, tex=tex, cpmg_frqs=self.cpmg_frqs), maps
+
+
+    def deriv_LM63(self, params, order=2):
+        """The R2eff values and partial derivatives of the Luz and Meiboom (1963) fast 2-site exchange model.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = [
+            self.jet_var_esm(params[:self.end_index[0]], 0),
+            self.jet_var_spin(params[self.end_index[0]:self.end_index[1]], self.end_index[0], self.frqs_squared),
+            self.jet_var_global(params[self.end_index[1]], self.end_index[1])
+        ]
+        (r20, phi_ex, kex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_LM63(r20=r20, phi_ex=phi_ex, kex=kex, cpmg_frqs=self.cpmg_frqs), maps
+
+
+    def deriv_M61(self, params, order=2):
+        """The R1rho values and partial derivatives of the Meiboom (1961) fast 2-site exchange model for R1rho-type experiments.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R1rho values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = [
+            self.jet_var_esm(params[:self.end_index[0]], 0),
+            self.jet_var_spin(params[self.end_index[0]:self.end_index[1]], self.end_index[0], self.frqs_squared),
+            self.jet_var_global(params[self.end_index[1]], self.end_index[1])
+        ]
+        (r1rho_prime, phi_ex, kex), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R1rho values and partial derivatives.
+        return jet_r1rho_M61(r1rho_prime=r1rho_prime, phi_ex=phi_ex, kex=kex, spin_lock_fields2=self.spin_lock_omega1_squared), maps
+
+
+    def deriv_MP05(self, params, order=2):
+        """The R1rho values and partial derivatives of the Miloushev and Palmer (2005) R1rho off-resonance 2-site model, with R1 either fixed or fitted.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R1rho values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        R1, (r1rho_prime, dw, pA, kex), maps = self.jet_setup_r1rho_2site(params, order=order)
+
+        # Back calculate the R1rho values and partial derivatives.
+        return jet_r1rho_MP05(r1rho_prime=r1rho_prime, omega=self.chemical_shifts, offset=self.offset, pA=pA, dw=dw, kex=kex, R1=R1, spin_lock_fields=self.spin_lock_omega1, spin_lock_fields2=self.spin_lock_omega1_squared), maps
+
+
+    def deriv_TAP03(self, params, order=2):
+        """The R1rho values and partial derivatives of the Trott, Abergel and Palmer (2003) R1rho off-resonance 2-site model, with R1 either fixed or fitted.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R1rho values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        R1, (r1rho_prime, dw, pA, kex), maps = self.jet_setup_r1rho_2site(params, order=order)
+
+        # Back calculate the R1rho values and partial derivatives.
+        return jet_r1rho_TAP03(r1rho_prime=r1rho_prime, omega=self.chemical_shifts, offset=self.offset, pA=pA, dw=dw, kex=kex, R1=R1, spin_lock_fields=self.spin_lock_omega1, spin_lock_fields2=self.spin_lock_omega1_squared), maps
+
+
+    def deriv_TP02(self, params, order=2):
+        """The R1rho values and partial derivatives of the Trott and Palmer (2002) R1rho off-resonance 2-site model, with R1 either fixed or fitted.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R1rho values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        R1, (r1rho_prime, dw, pA, kex), maps = self.jet_setup_r1rho_2site(params, order=order)
+
+        # Back calculate the R1rho values and partial derivatives.
+        return jet_r1rho_TP02(r1rho_prime=r1rho_prime, omega=self.chemical_shifts, offset=self.offset, pA=pA, dw=dw, kex=kex, R1=R1, spin_lock_fields=self.spin_lock_omega1, spin_lock_fields2=self.spin_lock_omega1_squared), maps
+
+
+    def deriv_TSMFK01(self, params, order=2):
+        """The R2eff values and partial derivatives of the Tollinger et al. (2001) 2-site very-slow exchange model.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R2eff values with the partial derivatives, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables = [
+            self.jet_var_esm(params[:self.end_index[0]], 0),
+            self.jet_var_spin(params[self.end_index[0]:self.end_index[1]], self.end_index[0], self.frqs),
+            self.jet_var_global(params[self.end_index[1]], self.end_index[1])
+        ]
+        (r20a, dw, k_AB), maps = self.jet_setup(variables, order=order)
+
+        # Back calculate the R2eff values and partial derivatives.
+        return jet_r2eff_TSMFK01(r20a=r20a, dw=dw, k_AB=k_AB, tcp=self.tau_cpmg), maps
+
+
+    def dfunc_analytic(self, params):
+        """The chi-squared gradient function for the models with analytic partial derivatives.
+
+        @param params:  The vector of parameter values.
+        @type params:   numpy rank-1 float array
+        @return:        The chi-squared gradient.
+        @rtype:         numpy rank-1 float array
+        """
+
+        # Calculate and return the gradient.
+        return self.calc_derivs(params, order=1)[0]
+
+
+    def dfunc_batch(self, params, index=None):
+        """The chi-squared gradient function of the batch mode, returning the gradient of each spin.
+
+        @param params:  The matrix of parameter values, with one row per spin.
+        @type params:   numpy rank-2 float array
+        @keyword index: The indices of the spins in the batch, if only a subset of the spins are to be calculated.
+        @type index:    None or numpy rank-1 int array
+        @return:        The chi-squared gradient of each spin.
+        @rtype:         numpy rank-2 float array
+        """
+
+        # The spin subset.
+        if index is not None and len(index) != self.NS:
+            return self.batch_subset(index).dfunc_batch(params)
+
+        # The profiled R20 parameters.
+        if self.r20_profile:
+            return self.dfunc_batch_r20_profile(params)
+
+        # Calculate and return the gradients.
+        return self.calc_derivs(params, order=1)[0]
+
+
+    def dfunc_batch_r20_profile(self, params):
+        """The chi-squared gradient function of the batch mode for the parameter vectors excluding the profiled R20 parameters.
+
+        @param params:  The matrix of parameter values excluding the R20 parameters, with one row per spin.
+        @type params:   numpy rank-2 float array
+        @return:        The chi-squared gradient of each spin.
+        @rtype:         numpy rank-2 float array
+        """
+
+        # Profile the R20 parameters, and calculate the full gradients.
+        self.func_batch_r20_profile(params)
+        grad = self.calc_derivs(self.r20_profile_params(params), order=1)[0]
+
+        # Return the gradients of the remaining parameters.
+        return concatenate([grad[:, :self.r20_start], grad[:, self.r20_start+self.r20_num:]], axis=1)
+
+
+    def dfunc_r20_profile(self, params):
+        """The chi-squared gradient function for the parameter vector excluding the profiled R20 parameters.
+
+        As the R20 values minimise the chi-squared value, the gradient of the profiled chi-squared function is simply the gradient of the full function with respect to the remaining parameters.
+
+
+        @param params:  The vector of parameter values, excluding the R20 parameters.
+        @type params:   numpy rank-1 float array
+        @return:        The chi-squared gradient.
+        @rtype:         numpy rank-1 float array
+        """
+
+        # Profile the R20 parameters, and calculate the full gradient.
+        self.func(params)
+        grad = self.calc_derivs(self.r20_profile_params(params), order=1)[0]
+
+        # Return the gradient of the remaining parameters.
+        return concatenate([grad[:self.r20_start], grad[self.r20_start+self.r20_num:]])
+
+
     def experiment_type_setup(self):
         """Check the experiment types and simplify data structures.
 
@@ -1175,6 +1810,81 @@ class Dispersion:
         return self.calc_B14_chi2(R20A=R20A, R20B=R20B, dw=dw, pA=pA, kex=kex)
 
 
+    def func_batch(self, params, index=None):
+        """Target function of the batch mode, returning the chi-squared value of each spin.
+
+        The back-calculation uses the model equations of the lib.dispersion.derivatives module, which accept different parameter values for each spin.  Parameter values for which these equations are undefined (for example dw = 0.0 or kex = 0.0 for certain models) result in a chi-squared value of infinity.
+
+
+        @param params:  The matrix of parameter values, with one row per spin.
+        @type params:   numpy rank-2 float array
+        @keyword index: The indices of the spins in the batch, if only a subset of the spins are to be calculated.
+        @type index:    None or numpy rank-1 int array
+        @return:        The chi-squared value of each spin.
+        @rtype:         numpy rank-1 float array
+        """
+
+        # The spin subset.
+        if index is not None and len(index) != self.NS:
+            return self.batch_subset(index).func_batch(params)
+
+        # The profiled R20 parameters.
+        if self.r20_profile:
+            return self.func_batch_r20_profile(params)
+
+        # Scaling.
+        if self.scaling_flag:
+            params = dot(params, self.scaling_matrix)
+
+        # Back calculate the R2eff/R1rho values (the parameter matrix is transposed so that each parameter type is a row).
+        self.back_calc = self.deriv(params.T, order=0)[0] * self.disp_struct
+
+        # The chi-squared value of each spin, excluding the padding and the missing data.
+        chi2 = sum(where(self.deriv_mask, ((self.values - self.back_calc) / self.errors)**2, 0.0), axis=(0, 2, 3, 4))
+
+        # Undefined parameter values.
+        chi2[~isfinite(chi2)] = inf
+
+        # Return the chi-squared values.
+        return chi2
+
+
+    def func_batch_r20_profile(self, params):
+        """Target function of the batch mode for the parameter vectors excluding the profiled R20 parameters, returning the chi-squared value of each spin.
+
+        @param params:  The matrix of parameter values excluding the R20 parameters, with one row per spin.
+        @type params:   numpy rank-2 float array
+        @return:        The chi-squared value of each spin.
+        @rtype:         numpy rank-1 float array
+        """
+
+        # The full parameter vectors for R20 values of zero and one.
+        params_zero = self.r20_profile_params(params, r20=zeros(self.r20_num, float64))
+        params_unit = self.r20_profile_params(params, r20=ones(self.r20_num, float64))
+
+        # Scaling.
+        if self.scaling_flag:
+            params_zero = dot(params_zero, self.scaling_matrix)
+            params_unit = dot(params_unit, self.scaling_matrix)
+
+        # Back calculate the R2eff/R1rho values and profile the R20 parameters, ignoring the floating point errors of the undefined parameter values.
+        with errstate(all='ignore'):
+            back_calc_zero = self.deriv(params_zero.T, order=0)[0] * self.disp_struct
+            back_calc_unit = self.deriv(params_unit.T, order=0)[0] * self.disp_struct
+            self.r20_values, self.r20_free, self.back_calc = self.r20_profile_solve(back_calc_zero, back_calc_unit)[:3]
+
+            # The chi-squared value of each spin, excluding the padding and the missing data.
+            chi2 = sum(where(self.deriv_mask, ((self.values - self.back_calc) / self.errors)**2, 0.0), axis=(0, 2, 3, 4))
+
+        # Undefined parameter values.
+        undefined = ~isfinite(chi2)
+        chi2[undefined] = inf
+        self.r20_values[:, undefined] = self.r20_lower
+
+        # Return the chi-squared values.
+        return chi2
+
+
     def func_CR72(self, params):
         """Target function for the reduced Carver and Richards (1972) 2-site exchange model on all time scales.
 
@@ -1277,6 +1987,76 @@ class Dispersion:
         return self.calc_DPL94(R1=self.r1_struct, r1rho_prime=r1rho_prime, phi_ex=phi_ex, kex=kex)
 
 
+    def func_grid(self, points):
+        """Target function for a block of grid search points, returning the chi-squared value of each point.
+
+        The back-calculation of all points is performed at once using the model equations of the lib.dispersion.derivatives module, with the grid points broadcast along an additional leading dimension.  For the points at which these equations are undefined, and for the parameter values of exactly zero or one at which the model equations of the lib.dispersion package have special cases (for example dw = 0.0, kex = 0.0 or pA = 1.0), the chi-squared value is calculated by the standard target function of the model.
+
+
+        @param points:  The matrix of parameter vectors, with one row per grid point.
+        @type points:   numpy rank-2 float array
+        @return:        The chi-squared value of each grid point.
+        @rtype:         numpy rank-1 float array
+        """
+
+        # Scaling.
+        params = points
+        if self.scaling_flag:
+            params = dot(points, self.scaling_matrix)
+
+        # Back calculate the R2eff/R1rho values (the parameter matrix is transposed so that each parameter is a row), ignoring the floating point errors of the undefined points.
+        with errstate(all='ignore'):
+            back_calc = self.deriv(params.T, order=0)[0] * self.disp_struct
+
+            # The chi-squared value of each grid point, excluding the padding and the missing data.
+            chi2 = sum(where(self.deriv_mask, ((self.values - back_calc) / self.errors)**2, 0.0), axis=(1, 2, 3, 4, 5))
+
+        # The undefined points and special cases.
+        special = ~isfinite(chi2) | (params == 0.0).any(axis=1) | (params == 1.0).any(axis=1)
+        for i in special.nonzero()[0]:
+            chi2[i] = self.func_model(points[i])
+
+        # Return the chi-squared values.
+        return chi2
+
+
+    def func_grid_r20_profile(self, points):
+        """Target function for a block of grid search points excluding the profiled R20 parameters, returning the chi-squared value of each point.
+
+        This is the profiled equivalent of the func_grid() method, with the R20 values of each grid point found from the back-calculated values for R20 values of zero and one.
+
+
+        @param points:  The matrix of parameter vectors excluding the R20 parameters, with one row per grid point.
+        @type points:   numpy rank-2 float array
+        @return:        The chi-squared value of each grid point.
+        @rtype:         numpy rank-1 float array
+        """
+
+        # The full parameter vectors for R20 values of zero and one.
+        params_zero = self.r20_profile_params(points, r20=zeros(self.r20_num, float64))
+        params_unit = self.r20_profile_params(points, r20=ones(self.r20_num, float64))
+
+        # Scaling.
+        if self.scaling_flag:
+            params_zero = dot(params_zero, self.scaling_matrix)
+            params_unit = dot(params_unit, self.scaling_matrix)
+
+        # Back calculate the R2eff/R1rho values and profile the R20 parameters, ignoring the floating point errors of the undefined points.
+        with errstate(all='ignore'):
+            back_calc_zero = self.deriv(params_zero.T, order=0)[0] * self.disp_struct
+            back_calc_unit = self.deriv(params_unit.T, order=0)[0] * self.disp_struct
+            chi2 = self.r20_profile_solve(back_calc_zero, back_calc_unit)[3]
+
+        # The undefined points and special cases (excluding the R20 parameters).
+        params = concatenate([params_zero[:, :self.r20_start], params_zero[:, self.r20_start+self.r20_num:]], axis=1)
+        special = ~isfinite(chi2) | (params == 0.0).any(axis=1) | (params == 1.0).any(axis=1)
+        for i in special.nonzero()[0]:
+            chi2[i] = self.func(points[i])
+
+        # Return the chi-squared values.
+        return chi2
+
+
     def func_IT99(self, params):
         """Target function for the Ishima and Torchia (1999) 2-site model for all timescales with pA >> pB.
 
@@ -2030,6 +2810,30 @@ class Dispersion:
         return self.calc_ns_r1rho_3site_chi2(r1rho_prime=r1rho_prime, dw_AB=dw_AB, dw_BC=dw_BC, pA=pA, pB=pB, kex_AB=kex_AB, kex_BC=kex_BC, kex_AC=0.0)
 
 
+    def func_r20_profile(self, params):
+        """Target function for the parameter vector excluding the profiled R20 parameters.
+
+        The model is back-calculated for R20 values of zero and one, and the R20 values minimising the chi-squared value are then found by the r20_profile_solve() method.
+
+
+        @param params:  The vector of parameter values, excluding the R20 parameters.
+        @type params:   numpy rank-1 float array
+        @return:        The chi-squared value.
+        @rtype:         float
+        """
+
+        # Back calculate the R2eff/R1rho values for R20 values of zero and one (copying the values, as the structure is updated in place).
+        self.func_model(self.r20_profile_params(params, r20=zeros(self.r20_num, float64)))
+        back_calc_zero = self.back_calc.copy()
+        self.func_model(self.r20_profile_params(params, r20=ones(self.r20_num, float64)))
+
+        # Profile the R20 parameters.
+        self.r20_values, self.r20_free, self.back_calc, chi2 = self.r20_profile_solve(back_calc_zero, self.back_calc)
+
+        # Return the chi-squared value.
+        return chi2
+
+
     def func_TAP03(self, params):
         """Target function for the Trott, Abergel and Palmer (2003) R1rho off-resonance 2-site model.
 
@@ -2192,3 +2996,341 @@ class Dispersion:
 
         return back_calc_return
 
+
+    def index_setup(self):
+        """Set up the parameter vector indices of each dispersion point, for mapping the jet variables of the analytic derivatives to the parameter vector.
+
+        In the batch mode, the indices are for the concatenation of the parameter vectors of all spins.
+        """
+
+        # The experiment, spin and frequency indices of each dispersion point.
+        ei_index, si_index, mi_index = indices(self.numpy_array_shape)[:3]
+
+        # The index of the start of the parameter vector and the spin index within the vector.
+        if self.batch:
+            self.index_zero = si_index * self.num_params
+            self.index_s = zeros(self.numpy_array_shape, int)
+            ns = 1
+        else:
+            self.index_zero = zeros(self.numpy_array_shape, int)
+            self.index_s = si_index
+            ns = self.NS
+
+        # The indices for the experiment, spin and frequency dependent parameters.
+        self.index_esm = self.index_zero + (ei_index*ns + self.index_s)*self.NM + mi_index
+        self.index_m = mi_index
+
+
+    def jet_setup(self, variables, order=2):
+        """Convert the parameter values into the jet variables of the analytic partial derivatives.
+
+        @param variables:   The values and maps of the jet variables, as returned by the jet_var_*() methods.
+        @type variables:    list of tuples
+        @keyword order:     The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:        int
+        @return:            The jet variables, and the parameter index and conversion factor of each jet variable.
+        @rtype:             list of lib.dispersion.derivatives.Jet instances (or the plain values for order 0), list of tuples of numpy int array and float or numpy float array
+        """
+
+        # No derivatives.
+        if order == 0:
+            return [var[0] for var in variables], [var[1] for var in variables]
+
+        # Split up the values and maps.
+        return jet_variables([var[0] for var in variables], order=order), [var[1] for var in variables]
+
+
+    def jet_setup_r1rho_2site(self, params, order=2):
+        """Set up the jet variables of the analytic off-resonance R1rho 2-site models with the parameters R1rho', dw, pA and kex.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @keyword order: The derivative order, 0 for the values only, 1 for the first partial derivatives and 2 for both the first and second partial derivatives.
+        @type order:    int
+        @return:        The R1 values (a jet variable if fitted), the R1rho', dw, pA and kex jet variables, and the parameter index and conversion factor of each jet variable.
+        @rtype:         lib.dispersion.derivatives.Jet instance or numpy float array, list of lib.dispersion.derivatives.Jet instances, list of tuples of numpy int array and float or numpy float array
+        """
+
+        # The jet variables.
+        variables, i = self.jet_var_r1rho(params)
+        variables += [
+            self.jet_var_spin(params[self.end_index[i]:self.end_index[i+1]], self.end_index[i], self.frqs),
+            self.jet_var_global(params[self.end_index[i+1]], self.end_index[i+1]),
+            self.jet_var_global(params[self.end_index[i+1]+1], self.end_index[i+1]+1)
+        ]
+        jets, maps = self.jet_setup(variables, order=order)
+
+        # The fixed or fitted R1 values.
+        R1 = self.r1
+        if self.r1_fit:
+            R1 = jets.pop(0)
+
+        # Return the variables.
+        return R1, jets, maps
+
+
+    def jet_var_esm(self, values, start):
+        """Set up a per experiment, spin and frequency parameter (such as R20) as a jet variable.
+
+        @param values:  The parameter values.  In the batch mode, this is a matrix with one column per spin, and for the grid search a matrix with one column per grid point.
+        @type values:   numpy rank-1 or rank-2 float array
+        @param start:   The index of the first parameter in the parameter vector.
+        @type start:    int
+        @return:        The values in the {Ei, Si, Mi, Oi, Di} layout (with a leading grid point dimension for the grid search), and the parameter index and conversion factor.
+        @rtype:         numpy float array, tuple of numpy int array and float
+        """
+
+        # Reorder the values of the batch mode.
+        if self.batch:
+            values = values.reshape(self.NE, self.NM, self.NS).swapaxes(1, 2)
+
+        # The grid points as the leading dimension.
+        elif values.ndim == 2:
+            return multiply.outer(values.T.reshape(-1, self.NE, self.NS, self.NM), self.no_nd_ones), (start + self.index_esm, 1.0)
+
+        # Expand the values.
+        return multiply.outer(values.reshape(self.NE, self.NS, self.NM), self.no_nd_ones), (start + self.index_esm, 1.0)
+
+
+    def jet_var_global(self, value, index):
+        """Set up a global parameter of the cluster (such as pA or kex) as a jet variable.
+
+        @param value:   The parameter value.  In the batch mode, this is the array of values of all spins, and for the grid search the array of values of all grid points.
+        @type value:    float or numpy rank-1 float array
+        @param index:   The index of the parameter in the parameter vector.
+        @type index:    int
+        @return:        The value, and the parameter index and conversion factor.
+        @rtype:         float or numpy float array, tuple of numpy int array and float
+        """
+
+        # The values of the batch mode, for broadcasting along the spin dimension.
+        if self.batch:
+            value = value.reshape(1, self.NS, 1, 1, 1)
+
+        # The values of the grid points, for broadcasting along the leading grid point dimension.
+        elif ndim(value) == 1:
+            value = value.reshape(-1, 1, 1, 1, 1, 1)
+
+        # The index for all dispersion points.
+        return value, (index + self.index_zero, 1.0)
+
+
+    def jet_var_r1rho(self, params):
+        """Set up the R1 (if fitted) and R1rho' parameters of the analytic off-resonance R1rho models as jet variables.
+
+        @param params:  The vector of unscaled parameter values.
+        @type params:   numpy rank-1 float array
+        @return:        The values and maps of the jet variables, and the index of the end_index list at which the spin specific parameters start.
+        @rtype:         list of tuples, int
+        """
+
+        # R1 and R1rho'.
+        if self.r1_fit:
+            return [self.jet_var_esm(params[:self.end_index[0]], 0), self.jet_var_esm(params[self.end_index[0]:self.end_index[1]], self.end_index[0])], 1
+
+        # Only R1rho'.
+        return [self.jet_var_esm(params[:self.end_index[0]], 0)], 0
+
+
+    def jet_var_r20_full(self, values):
+        """Set up the interleaved R20A and R20B parameters of the full models as jet variables.
+
+        @param values:  The R20A and R20B parameter values.  In the batch mode, this is a matrix with one column per spin, and for the grid search a matrix with one column per grid point.
+        @type values:   numpy rank-1 or rank-2 float array
+        @return:        The values and maps of the R20A and R20B jet variables.
+        @rtype:         list of tuples
+        """
+
+        # The R20A and R20B values of the batch mode (a matrix with one column per spin).
+        if self.batch:
+            R20 = values.reshape(2, self.NM, self.NS).swapaxes(1, 2)
+            R20A, R20B = R20[0], R20[1]
+
+        # The R20A and R20B values of the grid points (a matrix with one column per grid point).
+        elif values.ndim == 2:
+            R20 = values.T.reshape(-1, self.NS*2, self.NM)
+            R20A, R20B = R20[:, ::2], R20[:, 1::2]
+
+        # The R20A and R20B values.
+        else:
+            R20 = values.reshape(self.NS*2, self.NM)
+            R20A, R20B = R20[::2], R20[1::2]
+
+        # Expand the values (with a leading grid point dimension for the grid search).
+        shape = R20A.shape[:-2] + (self.NE, self.NS, self.NM)
+        r20a = multiply.outer(R20A.reshape(shape), self.no_nd_ones)
+        r20b = multiply.outer(R20B.reshape(shape), self.no_nd_ones)
+
+        # The parameter indices.
+        index = self.index_zero + 2*self.NM*self.index_s + self.index_m
+
+        # Return the variables.
+        return [(r20a, (index, 1.0)), (r20b, (index + self.NM, 1.0))]
+
+
+    def jet_var_spin(self, values, start, conversion):
+        """Set up a spin specific parameter (such as dw or phi_ex) as a jet variable.
+
+        @param values:      The parameter values.  In the batch mode, this is a matrix with a single row, and for the grid search a matrix with one column per grid point.
+        @type values:       numpy rank-1 or rank-2 float array
+        @param start:       The index of the first parameter in the parameter vector.
+        @type start:        int
+        @param conversion:  The factor converting the parameter into the model units, for example the spin Larmor frequencies for the ppm to rad/s conversion.
+        @type conversion:   numpy float array of rank [NE][NS][NM][NO][ND]
+        @return:            The converted values in the {Ei, Si, Mi, Oi, Di} layout (with a leading grid point dimension for the grid search), and the parameter index and conversion factor.
+        @rtype:             numpy float array, tuple of numpy int array and numpy float array
+        """
+
+        # The grid points as the leading dimension.
+        if not self.batch and values.ndim == 2:
+            values = values.T.reshape(-1, 1, self.NS)
+
+        # The values of a single parameter vector or of the batch mode.
+        else:
+            values = values.reshape(1, self.NS)
+
+        # Expand and convert the values.
+        return multiply.outer(values, self.nm_no_nd_ones) * conversion, (start + self.index_zero + self.index_s, conversion)
+
+
+    def r20_profile_params(self, params, r20=None):
+        """Convert parameter vectors excluding the R20 parameters to the full parameter vectors of the model.
+
+        @param params:  The vector of parameter values excluding the R20 parameters, or the matrix of these vectors with one row per vector.
+        @type params:   numpy rank-1 or rank-2 float array
+        @keyword r20:   The R20 values to insert.  If not supplied, the R20 values of the last target function call will be used.
+        @type r20:      None or numpy float array
+        @return:        The full parameter vector or vectors, scaled in the same way as the params argument.
+        @rtype:         numpy rank-1 or rank-2 float array
+        """
+
+        # The R20 values of the last call (with one row per spin in the batch mode).
+        if r20 is None:
+            if self.batch:
+                r20 = self.r20_values.swapaxes(0, 1).reshape(self.NS, self.r20_num)
+            else:
+                r20 = self.r20_values.ravel()
+
+        # Scaling.
+        if self.scaling_flag:
+            r20 = r20 / self.r20_scaling
+
+        # Insert the different R20 values of each spin of the batch mode.
+        if r20.ndim == 2:
+            return concatenate([params[:, :self.r20_start], r20, params[:, self.r20_start:]], axis=1)
+
+        # Insert the R20 values.
+        return insert(params, [self.r20_start]*self.r20_num, r20, axis=-1)
+
+
+    def r20_profile_setup(self):
+        """Set up the profiling of the R20 parameters out of the optimisation, replacing the target functions.
+
+        The R20 parameters of each experiment, spin and field are removed from the parameter vector.  These follow the R1 parameters when these are optimised.
+        """
+
+        # The position and number of the R20 parameters in the full parameter vector (of each spin in the batch mode).
+        self.r20_start = 0
+        if self.r1_fit:
+            self.r20_start = self.end_index[0]
+        self.r20_num = self.NE * self.NS * self.NM
+        if self.batch:
+            self.r20_num = self.NE * self.NM
+
+        # The scaling of the R20 parameters.
+        if self.scaling_flag:
+            self.r20_scaling = self.scaling_matrix.diagonal()[self.r20_start:self.r20_start+self.r20_num]
+
+        # The R20 bounds, matching the linear constraints of the relaxation dispersion analysis.
+        self.r20_lower = 0.0
+        self.r20_upper = 200.0
+
+        # The R20 values of the last target function call, and the flags for the values not at the bounds.
+        self.r20_values = zeros((self.NE, self.NS, self.NM), float64)
+        self.r20_free = zeros((self.NE, self.NS, self.NM), bool)
+
+        # Replace the target functions.
+        self.func = self.func_r20_profile
+        if self.model in MODEL_LIST_DERIVS:
+            self.dfunc = self.dfunc_r20_profile
+            self.d2func = self.d2func_r20_profile
+            self.func_grid = self.func_grid_r20_profile
+
+
+    def r20_profile_solve(self, back_calc_zero, back_calc_unit):
+        """Find the R20 values minimising the chi-squared value, from the back-calculated values for R20 values of zero and one.
+
+        As the back-calculated values are linear in R20, these are of the form yi(R20) = ai + R20.ci, where ai are the values for R20 = 0 and ci the change for R20 = 1.  For each experiment, spin and field, the chi-squared value is minimised by::
+
+                   sum_i (yi - ai) . ci / sigma_i**2
+            R20 =  ---------------------------------,
+                       sum_i ci**2 / sigma_i**2
+
+        where the sums are over all dispersion points of the experiment, spin and field, excluding the missing data.  As the chi-squared value is a separate quadratic function of each R20 parameter, clipping this solution to the R20 bounds gives the exact bounded minimum.
+
+
+        @param back_calc_zero:  The back-calculated values for R20 values of zero.  The dimensions are {..., Ei, Si, Mi, Oi, Di}, with optional leading dimensions.
+        @type back_calc_zero:   numpy float array
+        @param back_calc_unit:  The back-calculated values for R20 values of one, with the same dimensions.
+        @type back_calc_unit:   numpy float array
+        @return:                The R20 values, the flags for the R20 values not at the bounds, the back-calculated values, and the chi-squared value.  The dimensions of the R20 values and flags are {..., Ei, Si, Mi}.
+        @rtype:                 numpy float array, numpy bool array, numpy float array, float or numpy float array
+        """
+
+        # The R20 coefficients and the residuals of the R20 independent part, excluding the padding and the missing data.
+        weights = self.deriv_mask / self.errors**2
+        coeff = where(self.deriv_mask, back_calc_unit - back_calc_zero, 0.0)
+        resid = where(self.deriv_mask, self.values - back_calc_zero, 0.0)
+
+        # The weighted sums over the offsets and dispersion points.
+        numer = sum(weights * coeff * resid, axis=(-2, -1))
+        denom = sum(weights * coeff**2, axis=(-2, -1))
+
+        # The unbounded solution (with zero for the experiments, spins and fields without data).
+        defined = denom > 0.0
+        r20 = zeros(denom.shape, float64)
+        r20[defined] = numer[defined] / denom[defined]
+
+        # Apply the bounds.
+        free = defined & (r20 > self.r20_lower) & (r20 < self.r20_upper)
+        r20 = clip(r20, self.r20_lower, self.r20_upper)
+
+        # The back-calculated values and chi-squared value.
+        back_calc = back_calc_zero + r20[..., newaxis, newaxis] * coeff
+        chi2 = sum(weights * (resid - r20[..., newaxis, newaxis] * coeff)**2, axis=(-5, -4, -3, -2, -1))
+
+        # Return the results.
+        return r20, free, back_calc, chi2
+
+
+    def select_spins(self, index):
+        """Create the target function for a subset of the spins of the batch mode.
+
+        @param index:   The indices of the spins of the subset.
+        @type index:    numpy rank-1 int array
+        @return:        The target function instance for the spin subset.
+        @rtype:         Dispersion instance
+        """
+
+        # A shallow copy, sharing all data which is not spin specific.
+        model = copy(self)
+
+        # Extract the spins from all spin dependent structures (those with the {Ei, Si, ...} dimensions), and rebind the model specific target function methods to the copy.
+        for name, value in vars(self).items():
+            if isinstance(value, ndarray) and value.ndim >= 3 and value.shape[:2] == (self.NE, self.NS):
+                setattr(model, name, value[:, index])
+            elif getattr(value, '__self__', None) is self:
+                setattr(model, name, getattr(model, value.__name__))
+        model.values_orig = [[self.values_orig[ei][si] for si in index] for ei in range(self.NE)]
+
+        # The new dimensions and parameter indices.
+        model.NS = len(index)
+        model.numpy_array_shape = [self.NE, model.NS, self.NM, self.NO, self.ND]
+        model.index_setup()
+
+        # No subsets of the subset.
+        model.batch_subset_index = None
+        model.batch_subset_model = None
+
+        # Return the target function.
+        return model
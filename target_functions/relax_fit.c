@@ -1,5 +1,5 @@
 /*
- * Copyright (C) 2006-2014 Edward d'Auvergne
+ * Copyright (C) 2006-2016 Edward d'Auvergne
  *
  * This file is part of the program relax (http://www.nmr-relax.com).
  *
@@ -19,7 +19,9 @@
 
 /* This include must come first. */
 #include <Python.h>
+#include <math.h>
 #include <stdio.h>
+#include <string.h>
 
 /* Include all of the variable definitions. */
 #include "relax_fit.h"
@@ -29,759 +31,1204 @@
 #include "exponential.h"
 
 
-static PyObject *
-setup(PyObject *self, PyObject *args, PyObject *keywords) {
-    /* Set up the module in preparation for calls to the target function. */
+/* The context of the last setup() call, used by the module level target functions. */
+static PyObject *default_context = NULL;
 
-    /* Python object declarations. */
-    PyObject *values_arg, *sd_arg, *relax_times_arg, *scaling_matrix_arg;
-    PyObject *element;
 
-    /* Normal declarations. */
-    int i;
+/*********************************************************/
+/* The back-calculation functions for each curve type.   */
+/*********************************************************/
 
-    /* The keyword list. */
-    static char *keyword_list[] = {"num_params", "num_times", "values", "sd", "relax_times", "scaling_matrix", NULL};
+static void
+back_calc_exp(Relax_fit_context *context) {
+    /* Back calculate the peak intensities for the two parameter exponential. */
 
-    /* Parse the function arguments. */
-    if (!PyArg_ParseTupleAndKeywords(args, keywords, "iiOOOO", keyword_list, &num_params, &num_times, &values_arg, &sd_arg, &relax_times_arg, &scaling_matrix_arg))
-        return NULL;
+    exponential(context->params[index_I0], context->params[index_R], context->relax_times, context->back_calc, context->num_times);
+}
 
-    /* Place the parameter related arguments into C arrays. */
-    for (i = 0; i < num_params; i++) {
-        /* The diagonalised scaling matrix list argument element. */
-        element = PySequence_GetItem(scaling_matrix_arg, i);
-        scaling_matrix[i] = PyFloat_AsDouble(element);
-        Py_CLEAR(element);
-    }
 
-    /* Place the time related arguments into C arrays. */
-    for (i = 0; i < num_times; i++) {
-        /* The value argument element. */
-        element = PySequence_GetItem(values_arg, i);
-        values[i] = PyFloat_AsDouble(element);
-        Py_CLEAR(element);
+static void
+grad_exp(Relax_fit_context *context) {
+    /* The partial derivatives of the two parameter exponential. */
 
-        /* The sd argument element. */
-        element = PySequence_GetItem(sd_arg, i);
-        sd[i] = PyFloat_AsDouble(element);
-        Py_CLEAR(element);
+    exponential_dR(context->params[index_I0], context->params[index_R], index_R, context->relax_times, context->back_calc_grad, context->num_times);
+    exponential_dI0(context->params[index_I0], context->params[index_R], index_I0, context->relax_times, context->back_calc_grad, context->num_times);
+}
 
-        /* Convert the errors to variances to avoid duplicated maths operations for faster calculations. */
-        variance[i] = square(sd[i]);
 
-        /* The relax_times argument element. */
-        element = PySequence_GetItem(relax_times_arg, i);
-        relax_times[i] = PyFloat_AsDouble(element);
-        Py_CLEAR(element);
-    }
+static void
+hess_exp(Relax_fit_context *context) {
+    /* The second partial derivatives of the two parameter exponential. */
 
-    /* The macro for returning the Python None object. */
-    Py_RETURN_NONE;
+    exponential_dR2(context->params[index_I0], context->params[index_R], index_R, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_dI02(context->params[index_I0], context->params[index_R], index_I0, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_dR_dI0(context->params[index_I0], context->params[index_R], index_R, index_I0, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
 }
 
 
-void param_to_c(PyObject *params_arg) {
-    /* Convert the Python parameter list to a C array. */
+static void
+back_calc_inv(Relax_fit_context *context) {
+    /* Back calculate the peak intensities for the inversion recovery experiment. */
 
-    /* Declarations. */
-    PyObject *element;
-    int i;
+    exponential_inv(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], context->relax_times, context->back_calc, context->num_times);
+}
 
-    /* Place the parameter array elements into the C array. */
-    for (i = 0; i < num_params; i++) {
-        /* Get the element. */
-        element = PySequence_GetItem(params_arg, i);
 
-        /* Convert to a C double, then free the memory. */
-        params[i] = PyFloat_AsDouble(element);
-        Py_CLEAR(element);
+static void
+grad_inv(Relax_fit_context *context) {
+    /* The partial derivatives of the inversion recovery experiment. */
 
-        /* Scale the parameter. */
-        params[i] = params[i] * scaling_matrix[i];
-    }
+    exponential_inv_dR(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_R, context->relax_times, context->back_calc_grad, context->num_times);
+    exponential_inv_dI0(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_I0, context->relax_times, context->back_calc_grad, context->num_times);
+    exponential_inv_dIinf(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_inv_Iinf, context->relax_times, context->back_calc_grad, context->num_times);
 }
 
-static PyObject *
-func_exp(PyObject *self, PyObject *args) {
-    /* Target function for the two parameter exponential for calculating and returning the chi-squared value.
-     *
-     * Firstly the back calculated intensities are generated, then the chi-squared statistic is
-     * calculated.
-     */
 
-    /* Declarations. */
-    PyObject *params_arg;
+static void
+hess_inv(Relax_fit_context *context) {
+    /* The second partial derivatives of the inversion recovery experiment. */
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+    exponential_inv_dR2(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_R, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_inv_dI02(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_I0, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_inv_dIinf2(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_inv_Iinf, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_inv_dR_dI0(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_R, index_I0, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_inv_dR_dIinf(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_R, index_inv_Iinf, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_inv_dI0_dIinf(context->params[index_I0], context->params[index_inv_Iinf], context->params[index_R], index_I0, index_inv_Iinf, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+}
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
 
-    /* Back calculated the peak intensities. */
-    exponential(params[index_I0], params[index_R], relax_times, back_calc, num_times);
+static void
+back_calc_sat(Relax_fit_context *context) {
+    /* Back calculate the peak intensities for the saturation recovery experiment. */
 
-    /* Calculate and return the chi-squared value. */
-    return PyFloat_FromDouble(chi2(values, variance, back_calc, num_times));
+    exponential_sat(context->params[index_Iinf], context->params[index_R], context->relax_times, context->back_calc, context->num_times);
 }
 
 
-static PyObject *
-func_inv(PyObject *self, PyObject *args) {
-    /* Inversion recovery experiment target function for calculating and returning the chi-squared value.
-     *
-     * Firstly the back calculated intensities are generated, then the chi-squared statistic is
-     * calculated.
-     */
+static void
+grad_sat(Relax_fit_context *context) {
+    /* The partial derivatives of the saturation recovery experiment. */
 
-    /* Declarations. */
-    PyObject *params_arg;
+    exponential_sat_dR(context->params[index_Iinf], context->params[index_R], index_R, context->relax_times, context->back_calc_grad, context->num_times);
+    exponential_sat_dIinf(context->params[index_Iinf], context->params[index_R], index_Iinf, context->relax_times, context->back_calc_grad, context->num_times);
+}
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+static void
+hess_sat(Relax_fit_context *context) {
+    /* The second partial derivatives of the saturation recovery experiment. */
 
-    /* Back calculated the peak intensities. */
-    exponential_inv(params[index_I0], params[index_inv_Iinf], params[index_R], relax_times, back_calc, num_times);
-
-    /* Calculate and return the chi-squared value. */
-    return PyFloat_FromDouble(chi2(values, variance, back_calc, num_times));
+    exponential_sat_dR2(context->params[index_Iinf], context->params[index_R], index_R, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_sat_dIinf2(context->params[index_Iinf], context->params[index_R], index_Iinf, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
+    exponential_sat_dR_dIinf(context->params[index_Iinf], context->params[index_R], index_R, index_Iinf, context->relax_times, context->back_calc_hess, context->num_params, context->num_times);
 }
 
 
-static PyObject *
-func_sat(PyObject *self, PyObject *args) {
-    /* Saturation recovery experiment target function for calculating and returning the chi-squared value.
+/* The curve types. */
+static Relax_fit_curve curve_exp = {"exp", 2, back_calc_exp, grad_exp, hess_exp};
+static Relax_fit_curve curve_inv = {"inv", 3, back_calc_inv, grad_inv, hess_inv};
+static Relax_fit_curve curve_sat = {"sat", 2, back_calc_sat, grad_sat, hess_sat};
+
+/* The table of all curve types. */
+static Relax_fit_curve *curve_types[] = {&curve_exp, &curve_inv, &curve_sat};
+#define NUM_CURVE_TYPES (sizeof(curve_types) / sizeof(curve_types[0]))
+
+
+/*********************************************************/
+/* The target functions, operating on a context.         */
+/*********************************************************/
+
+static int
+param_to_c(Relax_fit_context *context, PyObject *args, Relax_fit_curve *curve) {
+    /* Convert the Python parameter list argument to the C array of the context, returning -1 on failure.
      *
-     * Firstly the back calculated intensities are generated, then the chi-squared statistic is
-     * calculated.
+     * The number of parameters of the curve type and the length of the parameter list are checked against the context, as the curve functions index the parameter, gradient and Hessian arrays directly.
      */
 
     /* Declarations. */
     PyObject *params_arg;
+    PyObject *element;
+    Py_ssize_t size;
+    int i;
 
     /* Parse the function arguments, the only argument should be the parameter array. */
     if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+        return -1;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* Check the number of parameters. */
+    if (curve->num_params != context->num_params) {
+        PyErr_Format(PyExc_ValueError, "The '%s' curve requires %d parameters, but the context has been set up for %d.", curve->name, curve->num_params, context->num_params);
+        return -1;
+    }
+    size = PySequence_Size(params_arg);
+    if (size < 0)
+        return -1;
+    if (size != context->num_params) {
+        PyErr_Format(PyExc_ValueError, "The parameter vector must have %d elements, not %ld.", context->num_params, (long) size);
+        return -1;
+    }
 
-    /* Back calculated the peak intensities. */
-    exponential_sat(params[index_Iinf], params[index_R], relax_times, back_calc, num_times);
+    /* Place the parameter array elements into the C array. */
+    for (i = 0; i < context->num_params; i++) {
+        /* Get the element. */
+        element = PySequence_GetItem(params_arg, i);
+        if (element == NULL)
+            return -1;
 
+        /* Convert to a C double, then free the memory. */
+        context->params[i] = PyFloat_AsDouble(element);
+        Py_CLEAR(element);
+
+        /* Scale the parameter. */
+        context->params[i] = context->params[i] * context->scaling_matrix[i];
+    }
 
-    /* Calculate and return the chi-squared value. */
-    return PyFloat_FromDouble(chi2(values, variance, back_calc, num_times));
+    /* Conversion failures. */
+    if (PyErr_Occurred())
+        return -1;
+
+    /* Success. */
+    return 0;
 }
 
 
 static PyObject *
-dfunc_exp(PyObject *self, PyObject *args) {
-    /* Target function for the two parameter exponential for calculating and returning the chi-squared gradient.
-     * 
-     */
+vector_to_py(double *vector, int size) {
+    /* Convert a C vector into a Python list. */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list;
+    PyObject *list, *element;
     int i;
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
+    /* Copy the values out of the C array into the Python list. */
+    list = PyList_New(size);
+    if (list == NULL)
         return NULL;
+    for (i = 0; i < size; i++) {
+        element = PyFloat_FromDouble(vector[i]);
+        if (element == NULL) {
+            Py_DECREF(list);
+            return NULL;
+        }
+        PyList_SET_ITEM(list, i, element);
+    }
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* Return the list. */
+    return list;
+}
 
-    /* Back calculated the peak intensities. */
-    exponential(params[index_I0], params[index_R], relax_times, back_calc, num_times);
 
-    /* The partial derivates. */
-    exponential_dR(params[index_I0], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_dI0(params[index_I0], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
+static PyObject *
+matrix_to_py(double *matrix, int rows, int cols) {
+    /* Convert a contiguous C matrix into a Python list of lists. */
 
-    /* The chi-squared gradient. */
-    dchi2(dchi2_vals, values, back_calc, back_calc_grad, variance, num_times, num_params);
+    /* Declarations. */
+    PyObject *list, *row;
+    int i;
 
-    /* Convert to a Python list, and scale the values. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        PyList_Append(list, PyFloat_FromDouble(dchi2_vals[i] * scaling_matrix[i]));
+    /* Loop over the rows. */
+    list = PyList_New(rows);
+    if (list == NULL)
+        return NULL;
+    for (i = 0; i < rows; i++) {
+        row = vector_to_py(matrix + i*cols, cols);
+        if (row == NULL) {
+            Py_DECREF(list);
+            return NULL;
+        }
+        PyList_SET_ITEM(list, i, row);
     }
 
-    /* Return the gradient. */
+    /* Return the list of lists. */
     return list;
 }
 
 
 static PyObject *
-dfunc_inv(PyObject *self, PyObject *args) {
-    /* Inversion recovery experiment target function for the two parameter exponential for calculating and returning the chi-squared gradient. */
+calc_func(Relax_fit_context *context, PyObject *args, Relax_fit_curve *curve) {
+    /* Calculate and return the chi-squared value.
+     *
+     * Firstly the back calculated intensities are generated, then the chi-squared statistic is
+     * calculated.  The global interpreter lock is released during the calculation.
+     */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list;
-    int i;
+    double chi2_val;
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
+    /* Convert the parameters Python list to a C array. */
+    if (param_to_c(context, args, curve) < 0)
         return NULL;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* The calculation. */
+    Py_BEGIN_ALLOW_THREADS
 
     /* Back calculated the peak intensities. */
-    exponential_inv(params[index_I0], params[index_inv_Iinf], params[index_R], relax_times, back_calc, num_times);
-
-    /* The partial derivates. */
-    exponential_inv_dR(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_inv_dI0(params[index_I0], params[index_inv_Iinf], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
-    exponential_inv_dIinf(params[index_I0], params[index_inv_Iinf], params[index_R], index_inv_Iinf, relax_times, back_calc_grad, num_times);
+    curve->back_calc(context);
 
-    /* The chi-squared gradient. */
-    dchi2(dchi2_vals, values, back_calc, back_calc_grad, variance, num_times, num_params);
+    /* Calculate the chi-squared value. */
+    chi2_val = chi2(context->values, context->variance, context->back_calc, context->num_times);
 
-    /* Convert to a Python list, and scale the values. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        PyList_Append(list, PyFloat_FromDouble(dchi2_vals[i] * scaling_matrix[i]));
-    }
+    Py_END_ALLOW_THREADS
 
-    /* Return the gradient. */
-    return list;
+    /* Return the chi-squared value. */
+    return PyFloat_FromDouble(chi2_val);
 }
 
 
 static PyObject *
-dfunc_sat(PyObject *self, PyObject *args) {
-    /* Saturation recovery experiment target function for the two parameter exponential for calculating and returning the chi-squared gradient.
-     * 
-     */
+calc_dfunc(Relax_fit_context *context, PyObject *args, Relax_fit_curve *curve) {
+    /* Calculate and return the chi-squared gradient, releasing the global interpreter lock during the calculation. */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list;
     int i;
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
+    /* Convert the parameters Python list to a C array. */
+    if (param_to_c(context, args, curve) < 0)
         return NULL;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* The calculation. */
+    Py_BEGIN_ALLOW_THREADS
 
     /* Back calculated the peak intensities. */
-    exponential_sat(params[index_Iinf], params[index_R], relax_times, back_calc, num_times);
+    curve->back_calc(context);
 
     /* The partial derivates. */
-    exponential_sat_dR(params[index_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_sat_dIinf(params[index_Iinf], params[index_R], index_Iinf, relax_times, back_calc_grad, num_times);
+    curve->grad(context);
 
     /* The chi-squared gradient. */
-    dchi2(dchi2_vals, values, back_calc, back_calc_grad, variance, num_times, num_params);
+    dchi2(context->dchi2_vals, context->values, context->back_calc, context->back_calc_grad, context->variance, context->num_times, context->num_params);
 
-    /* Convert to a Python list, and scale the values. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        PyList_Append(list, PyFloat_FromDouble(dchi2_vals[i] * scaling_matrix[i]));
-    }
+    /* Scale the values. */
+    for (i = 0; i < context->num_params; i++)
+        context->dchi2_vals[i] = context->dchi2_vals[i] * context->scaling_matrix[i];
 
-    /* Return the gradient. */
-    return list;
+    Py_END_ALLOW_THREADS
+
+    /* Return the gradient as a Python list. */
+    return vector_to_py(context->dchi2_vals, context->num_params);
 }
 
 
 static PyObject *
-d2func_exp(PyObject *self, PyObject *args) {
-    /* Target function for the two parameter exponential for calculating and returning the chi-squared Hessian.
-     * 
-     */
+calc_d2func(Relax_fit_context *context, PyObject *args, Relax_fit_curve *curve) {
+    /* Calculate and return the chi-squared Hessian, releasing the global interpreter lock during the calculation. */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
     int j, k;
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
+    /* Convert the parameters Python list to a C array. */
+    if (param_to_c(context, args, curve) < 0)
         return NULL;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* The calculation. */
+    Py_BEGIN_ALLOW_THREADS
 
     /* Back calculated the peak intensities. */
-    exponential(params[index_I0], params[index_R], relax_times, back_calc, num_times);
+    curve->back_calc(context);
 
     /* The partial derivatives. */
-    exponential_dR(params[index_I0], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_dI0(params[index_I0], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
+    curve->grad(context);
 
     /* The second partial derivatives. */
-    exponential_dR2(params[index_I0], params[index_R], index_R, relax_times, back_calc_hess, num_times);
-    exponential_dI02(params[index_I0], params[index_R], index_I0, relax_times, back_calc_hess, num_times);
-    exponential_dR_dI0(params[index_I0], params[index_R], index_R, index_I0, relax_times, back_calc_hess, num_times);
+    curve->hess(context);
 
     /* The chi-squared Hessian. */
-    d2chi2(d2chi2_vals, values, back_calc, back_calc_grad, back_calc_hess, variance, num_times, num_params);
-
-    /* Convert to a Python list, and scale the values. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (j = 0; j < num_params; j++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (k = 0; k < num_params; k++) {
-            PyList_Append(list2, PyFloat_FromDouble(d2chi2_vals[j][k] * scaling_matrix[j] * scaling_matrix[k]));
-        }
-        PyList_Append(list, list2);
+    d2chi2(context->d2chi2_vals, context->values, context->back_calc, context->back_calc_grad, context->back_calc_hess, context->variance, context->num_times, context->num_params);
+
+    /* Scale the values. */
+    for (j = 0; j < context->num_params; j++) {
+        for (k = 0; k < context->num_params; k++)
+            context->d2chi2_vals[j*context->num_params + k] = context->d2chi2_vals[j*context->num_params + k] * context->scaling_matrix[j] * context->scaling_matrix[k];
     }
 
-    /* Return the Hessian. */
-    return list;
+    Py_END_ALLOW_THREADS
+
+    /* Return the Hessian as a Python list of lists. */
+    return matrix_to_py(context->d2chi2_vals, context->num_params, context->num_params);
 }
 
 
-static PyObject *
-d2func_inv(PyObject *self, PyObject *args) {
-    /* Target function for the two parameter exponential for calculating and returning the chi-squared Hessian.
-     * 
+static int
+calc_jacobian(Relax_fit_context *context, PyObject *args, Relax_fit_curve *curve) {
+    /* Calculate the Jacobian of the curve, releasing the global interpreter lock during the calculation and returning -1 on failure. */
+
+    /* Convert the parameters Python list to a C array. */
+    if (param_to_c(context, args, curve) < 0)
+        return -1;
+
+    /* The partial derivatives. */
+    Py_BEGIN_ALLOW_THREADS
+    curve->grad(context);
+    Py_END_ALLOW_THREADS
+
+    /* Success. */
+    return 0;
+}
+
+
+static int
+calc_jacobian_chi2(Relax_fit_context *context, PyObject *args, Relax_fit_curve *curve) {
+    /* Calculate the Jacobian of the chi-squared function, returning -1 on failure.
+
+    The Jacobian
+    ============
+
+    The equation is::
+
+                     / yi - yi(theta)     dyi(theta) \
+        J_ji  =  -2  | --------------  .  ---------- |
+                     \   sigma_i**2        dthetaj   /
+
+    where
+        - i is the index over data sets.
+        - j is the parameter index.
+        - theta is the parameter vector.
+        - yi are the values of the measured data set.
+        - yi(theta) are the values of the back calculated data set.
+        - dyi(theta)/dthetaj are the values of the back calculated gradient for parameter j.
+        - sigma_i are the values of the error set.
+
+    The global interpreter lock is released during the calculation.
      */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int j, k;
-
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+    int i, j;
 
     /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    if (param_to_c(context, args, curve) < 0)
+        return -1;
+
+    /* The calculation. */
+    Py_BEGIN_ALLOW_THREADS
 
     /* Back calculated the peak intensities. */
-    exponential_inv(params[index_I0], params[index_inv_Iinf], params[index_R], relax_times, back_calc, num_times);
+    curve->back_calc(context);
 
     /* The partial derivatives. */
-    exponential_inv_dR(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_inv_dI0(params[index_I0], params[index_inv_Iinf], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
-    exponential_inv_dIinf(params[index_I0], params[index_inv_Iinf], params[index_R], index_inv_Iinf, relax_times, back_calc_grad, num_times);
+    curve->grad(context);
 
-    /* The second partial derivatives. */
-    exponential_inv_dR2(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, relax_times, back_calc_hess, num_times);
-    exponential_inv_dI02(params[index_I0], params[index_inv_Iinf], params[index_R], index_I0, relax_times, back_calc_hess, num_times);
-    exponential_inv_dIinf2(params[index_I0], params[index_inv_Iinf], params[index_R], index_inv_Iinf, relax_times, back_calc_hess, num_times);
-    exponential_inv_dR_dI0(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, index_I0, relax_times, back_calc_hess, num_times);
-    exponential_inv_dR_dIinf(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, index_inv_Iinf, relax_times, back_calc_hess, num_times);
-    exponential_inv_dI0_dIinf(params[index_I0], params[index_inv_Iinf], params[index_R], index_I0, index_inv_Iinf, relax_times, back_calc_hess, num_times);
-
-    /* The chi-squared Hessian. */
-    d2chi2(d2chi2_vals, values, back_calc, back_calc_grad, back_calc_hess, variance, num_times, num_params);
-
-    /* Convert to a Python list, and scale the values. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (j = 0; j < num_params; j++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (k = 0; k < num_params; k++) {
-            PyList_Append(list2, PyFloat_FromDouble(d2chi2_vals[j][k] * scaling_matrix[j] * scaling_matrix[k]));
+    /* Assemble the chi-squared Jacobian. */
+    for (j = 0; j < context->num_params; ++j) {
+        for (i = 0; i < context->num_times; ++i) {
+            context->jacobian_matrix[GRAD_INDEX(j, i, context->num_times)] = -2.0 / context->variance[i] * (context->values[i] - context->back_calc[i]) * context->back_calc_grad[GRAD_INDEX(j, i, context->num_times)];
         }
-        PyList_Append(list, list2);
     }
 
-    /* Return the Hessian. */
-    return list;
+    Py_END_ALLOW_THREADS
+
+    /* Success. */
+    return 0;
+}
+
+
+/*********************************************************/
+/* The relaxation curve-fitting context type.            */
+/*********************************************************/
+
+static void
+Context_dealloc(Relax_fit_context *self) {
+    /* Free the buffers of the context. */
+
+    PyMem_Free(self->relax_times);
+    PyMem_Free(self->values);
+    PyMem_Free(self->variance);
+    PyMem_Free(self->exported);
+    PyMem_Free(self->back_calc_hess);
+    PyMem_Free(self->dchi2_vals);
+    PyMem_Free(self->d2chi2_vals);
+    PyMem_Free(self->params);
+    PyMem_Free(self->scaling_matrix);
+    Py_TYPE(self)->tp_free((PyObject *)self);
 }
 
 
 static PyObject *
-d2func_sat(PyObject *self, PyObject *args) {
-    /* Saturation recovery experiment target function for the two parameter exponential for calculating and returning the chi-squared Hessian.
-     * 
-     */
+Context_back_calc_I(Relax_fit_context *self, PyObject *args) {
+    /* Return the back calculated peak intensities as a Python list. */
 
-    /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int j, k;
+    return vector_to_py(self->back_calc, self->num_times);
+}
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+static PyObject *
+Context_func_exp(Relax_fit_context *self, PyObject *args) {
+    return calc_func(self, args, &curve_exp);
+}
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+static PyObject *
+Context_func_inv(Relax_fit_context *self, PyObject *args) {
+    return calc_func(self, args, &curve_inv);
+}
 
-    /* Back calculated the peak intensities. */
-    exponential_sat(params[index_Iinf], params[index_R], relax_times, back_calc, num_times);
+static PyObject *
+Context_func_sat(Relax_fit_context *self, PyObject *args) {
+    return calc_func(self, args, &curve_sat);
+}
 
-    /* The partial derivatives. */
-    exponential_sat_dR(params[index_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_sat_dIinf(params[index_Iinf], params[index_R], index_Iinf, relax_times, back_calc_grad, num_times);
+static PyObject *
+Context_dfunc_exp(Relax_fit_context *self, PyObject *args) {
+    return calc_dfunc(self, args, &curve_exp);
+}
 
-    /* The second partial derivatives. */
-    exponential_sat_dR2(params[index_Iinf], params[index_R], index_R, relax_times, back_calc_hess, num_times);
-    exponential_sat_dIinf2(params[index_Iinf], params[index_R], index_Iinf, relax_times, back_calc_hess, num_times);
-    exponential_sat_dR_dIinf(params[index_Iinf], params[index_R], index_R, index_Iinf, relax_times, back_calc_hess, num_times);
+static PyObject *
+Context_dfunc_inv(Relax_fit_context *self, PyObject *args) {
+    return calc_dfunc(self, args, &curve_inv);
+}
 
-    /* The chi-squared Hessian. */
-    d2chi2(d2chi2_vals, values, back_calc, back_calc_grad, back_calc_hess, variance, num_times, num_params);
-
-    /* Convert to a Python list, and scale the values. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (j = 0; j < num_params; j++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (k = 0; k < num_params; k++) {
-            PyList_Append(list2, PyFloat_FromDouble(d2chi2_vals[j][k] * scaling_matrix[j] * scaling_matrix[k]));
-        }
-        PyList_Append(list, list2);
-    }
+static PyObject *
+Context_dfunc_sat(Relax_fit_context *self, PyObject *args) {
+    return calc_dfunc(self, args, &curve_sat);
+}
 
-    /* Return the Hessian. */
-    return list;
+static PyObject *
+Context_d2func_exp(Relax_fit_context *self, PyObject *args) {
+    return calc_d2func(self, args, &curve_exp);
 }
 
+static PyObject *
+Context_d2func_inv(Relax_fit_context *self, PyObject *args) {
+    return calc_d2func(self, args, &curve_inv);
+}
 
 static PyObject *
-back_calc_I(PyObject *self, PyObject *args) {
-    /* Return the back calculated peak intensities as a Python list. */
+Context_d2func_sat(Relax_fit_context *self, PyObject *args) {
+    return calc_d2func(self, args, &curve_sat);
+}
 
-    /* Declarations. */
-    PyObject *back_calc_py = PyList_New(num_times);
-    int i;
+static PyObject *
+Context_jacobian_exp(Relax_fit_context *self, PyObject *args) {
+    if (calc_jacobian(self, args, &curve_exp) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
 
-    /* Copy the values out of the C array into the Python array. */
-    for (i = 0; i < num_times; i++)
-        PyList_SetItem(back_calc_py, i, PyFloat_FromDouble(back_calc[i]));
+static PyObject *
+Context_jacobian_inv(Relax_fit_context *self, PyObject *args) {
+    if (calc_jacobian(self, args, &curve_inv) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
 
-    /* Return the Python list. */
-    return back_calc_py;
+static PyObject *
+Context_jacobian_sat(Relax_fit_context *self, PyObject *args) {
+    if (calc_jacobian(self, args, &curve_sat) < 0)
+        return NULL;
+    Py_RETURN_NONE;
 }
 
+static PyObject *
+Context_jacobian_chi2_exp(Relax_fit_context *self, PyObject *args) {
+    if (calc_jacobian_chi2(self, args, &curve_exp) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
 
 static PyObject *
-jacobian_exp(PyObject *self, PyObject *args) {
-    /* Return the Jacobian for the two parameter exponential as a Python list of lists. */
+Context_jacobian_chi2_inv(Relax_fit_context *self, PyObject *args) {
+    if (calc_jacobian_chi2(self, args, &curve_inv) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Context_jacobian_chi2_sat(Relax_fit_context *self, PyObject *args) {
+    if (calc_jacobian_chi2(self, args, &curve_sat) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+
+static int
+Context_getbuffer(Relax_fit_context *self, Py_buffer *view, int flags) {
+    /* Export the back calculated values, the Jacobian and the chi-squared Jacobian as a read-only {1 + 2*num_params, num_times} float64 array. */
+
+    /* No writing. */
+    if (flags & PyBUF_WRITABLE) {
+        PyErr_SetString(PyExc_BufferError, "The relax_fit context buffer is read-only.");
+        view->obj = NULL;
+        return -1;
+    }
+
+    /* Fill in the buffer structure. */
+    view->buf = self->exported;
+    view->obj = (PyObject *)self;
+    Py_INCREF(self);
+    view->len = self->shape[0] * self->shape[1] * sizeof(double);
+    view->readonly = 1;
+    view->itemsize = sizeof(double);
+    view->format = (flags & PyBUF_FORMAT) ? "d" : NULL;
+    view->ndim = 2;
+    view->shape = (flags & PyBUF_ND) ? self->shape : NULL;
+    view->strides = ((flags & PyBUF_STRIDES) == PyBUF_STRIDES) ? self->strides : NULL;
+    view->suboffsets = NULL;
+    view->internal = NULL;
+
+    /* Success. */
+    return 0;
+}
+
+
+/* The buffer protocol of the context type. */
+static PyBufferProcs Context_as_buffer = {
+#if PY_MAJOR_VERSION < 3
+    0,                                          /* bf_getreadbuffer */
+    0,                                          /* bf_getwritebuffer */
+    0,                                          /* bf_getsegcount */
+    0,                                          /* bf_getcharbuffer */
+#endif
+    (getbufferproc)Context_getbuffer,           /* bf_getbuffer */
+    0,                                          /* bf_releasebuffer */
+};
+
+
+/* The method table of the context type. */
+static PyMethodDef Context_methods[] = {
+    {"func_exp", (PyCFunction)Context_func_exp, METH_VARARGS, "Target function for the two parameter exponential for calculating and returning the chi-squared value."},
+    {"func_inv", (PyCFunction)Context_func_inv, METH_VARARGS, "Target function for the inversion recovery experiment for calculating and returning the chi-squared value."},
+    {"func_sat", (PyCFunction)Context_func_sat, METH_VARARGS, "Target function for the saturation recovery experiment for calculating and returning the chi-squared value."},
+    {"dfunc_exp", (PyCFunction)Context_dfunc_exp, METH_VARARGS, "Target function for the two parameter exponential for calculating and returning the chi-squared gradient."},
+    {"dfunc_inv", (PyCFunction)Context_dfunc_inv, METH_VARARGS, "Target function for the inversion recovery experiment for calculating and returning the chi-squared gradient."},
+    {"dfunc_sat", (PyCFunction)Context_dfunc_sat, METH_VARARGS, "Target function for the saturation recovery experiment for calculating and returning the chi-squared gradient."},
+    {"d2func_exp", (PyCFunction)Context_d2func_exp, METH_VARARGS, "Target function for the two parameter exponential for calculating and returning the chi-squared Hessian."},
+    {"d2func_inv", (PyCFunction)Context_d2func_inv, METH_VARARGS, "Target function for the inversion recovery experiment for calculating and returning the chi-squared Hessian."},
+    {"d2func_sat", (PyCFunction)Context_d2func_sat, METH_VARARGS, "Target function for the saturation recovery experiment for calculating and returning the chi-squared Hessian."},
+    {"back_calc_I", (PyCFunction)Context_back_calc_I, METH_NOARGS, "Return the back calculated peak intensities as a Python list."},
+    {"jacobian_exp", (PyCFunction)Context_jacobian_exp, METH_VARARGS, "Calculate the Jacobian matrix for the two parameter exponential, stored in rows 1 to num_params of the context buffer."},
+    {"jacobian_inv", (PyCFunction)Context_jacobian_inv, METH_VARARGS, "Calculate the Jacobian matrix for the inversion recovery experiment, stored in rows 1 to num_params of the context buffer."},
+    {"jacobian_sat", (PyCFunction)Context_jacobian_sat, METH_VARARGS, "Calculate the Jacobian matrix for the saturation recovery experiment, stored in rows 1 to num_params of the context buffer."},
+    {"jacobian_chi2_exp", (PyCFunction)Context_jacobian_chi2_exp, METH_VARARGS, "Calculate the Jacobian matrix of the chi-squared function for the two parameter exponential, stored in the last num_params rows of the context buffer."},
+    {"jacobian_chi2_inv", (PyCFunction)Context_jacobian_chi2_inv, METH_VARARGS, "Calculate the Jacobian matrix of the chi-squared function for the inversion recovery experiment, stored in the last num_params rows of the context buffer."},
+    {"jacobian_chi2_sat", (PyCFunction)Context_jacobian_chi2_sat, METH_VARARGS, "Calculate the Jacobian matrix of the chi-squared function for the saturation recovery experiment, stored in the last num_params rows of the context buffer."},
+    {NULL, NULL, 0, NULL}        /* Sentinel. */
+};
+
+
+/* The context type. */
+static PyTypeObject Relax_fit_context_type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "relax_fit.Context",                        /* tp_name */
+    sizeof(Relax_fit_context),                  /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    (destructor)Context_dealloc,                /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_compare */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    &Context_as_buffer,                         /* tp_as_buffer */
+#if PY_MAJOR_VERSION < 3
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER,     /* tp_flags */
+#else
+    Py_TPFLAGS_DEFAULT,                         /* tp_flags */
+#endif
+    "The relaxation curve-fitting context, holding the data and buffers of one curve.\n\nThe target functions release the global interpreter lock, so that different contexts can be used in parallel threads.  A single context must not be used by more than one thread at a time.\n\nThe context supports the buffer protocol, exporting a read-only {1 + 2*num_params, num_times} float64 array.  The first row holds the back calculated peak intensities, the next num_params rows the Jacobian, and the last num_params rows the chi-squared Jacobian.  Wrapping the context with numpy.asarray() therefore gives views of the results of the last target function calls without copying.",    /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    Context_methods,                            /* tp_methods */
+};
+
+
+/*********************************************************/
+/* Batched Levenberg-Marquardt curve-fitting.            */
+/*********************************************************/
+
+static int
+solve_spd(double A[MAX_CURVE_PARAMS][MAX_CURVE_PARAMS], double b[MAX_CURVE_PARAMS], double x[MAX_CURVE_PARAMS], int n) {
+    /* Solve the symmetric positive definite system A.x = b by Cholesky decomposition, returning -1 if A is not positive definite. */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int i, j;
+    double L[MAX_CURVE_PARAMS][MAX_CURVE_PARAMS];
+    double sum;
+    int i, j, k;
+
+    /* The Cholesky decomposition A = L.L^T. */
+    for (i = 0; i < n; i++) {
+        for (j = 0; j <= i; j++) {
+            sum = A[i][j];
+            for (k = 0; k < j; k++)
+                sum -= L[i][k] * L[j][k];
+            if (i == j) {
+                if (!(sum > 0.0))
+                    return -1;
+                L[i][i] = sqrt(sum);
+            } else
+                L[i][j] = sum / L[j][j];
+        }
+    }
+
+    /* Forward substitution. */
+    for (i = 0; i < n; i++) {
+        sum = b[i];
+        for (k = 0; k < i; k++)
+            sum -= L[i][k] * x[k];
+        x[i] = sum / L[i][i];
+    }
+
+    /* Back substitution. */
+    for (i = n-1; i >= 0; i--) {
+        sum = x[i];
+        for (k = i+1; k < n; k++)
+            sum -= L[k][i] * x[k];
+        x[i] = sum / L[i][i];
+    }
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+    /* Success. */
+    return 0;
+}
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
 
-    /* The partial derivatives. */
-    exponential_dR(params[index_I0], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_dI0(params[index_I0], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
+static void
+normal_equations(Relax_fit_context *context, double A[MAX_CURVE_PARAMS][MAX_CURVE_PARAMS], double g[MAX_CURVE_PARAMS]) {
+    /* Assemble the normal equations J^T.W.J and J^T.W.(y - y(theta)) from the back calculated values and gradients of the context. */
 
-    /* Convert to a Python list of lists. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (j = 0; j < num_times; j++) {
-            PyList_Append(list2, PyFloat_FromDouble(back_calc_grad[i][j]));
+    /* Declarations. */
+    int i, j, k;
+
+    /* Loop over the parameters. */
+    for (j = 0; j < context->num_params; j++) {
+        g[j] = 0.0;
+        for (i = 0; i < context->num_times; i++)
+            g[j] += context->back_calc_grad[GRAD_INDEX(j, i, context->num_times)] * (context->values[i] - context->back_calc[i]) / context->variance[i];
+        for (k = 0; k <= j; k++) {
+            A[j][k] = 0.0;
+            for (i = 0; i < context->num_times; i++)
+                A[j][k] += context->back_calc_grad[GRAD_INDEX(j, i, context->num_times)] * context->back_calc_grad[GRAD_INDEX(k, i, context->num_times)] / context->variance[i];
+            A[k][j] = A[j][k];
         }
-        PyList_Append(list, list2);
     }
-
-    /* Return the Jacobian. */
-    return list;
 }
 
 
-static PyObject *
-jacobian_inv(PyObject *self, PyObject *args) {
-    /* Return the Jacobian for the two parameter exponential as a Python list of lists. */
+static void
+fit_lm(Relax_fit_context *context, Relax_fit_curve *curve, double func_tol, int max_iterations, double *chi2_out, double *iter_out, double *covar) {
+    /* Levenberg-Marquardt optimisation of a single curve, starting from the parameters of the context.
 
-    /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int i, j;
+    The optimisation terminates when the decrease of the chi-squared value is less than or equal to func_tol, when no decrease can be found, or after max_iterations iterations.  The covariance matrix (J^T.W.J)^-1 at the solution is stored in covar, or filled with infinity if the matrix is singular.
+     */
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+    /* Declarations. */
+    double A[MAX_CURVE_PARAMS][MAX_CURVE_PARAMS], M[MAX_CURVE_PARAMS][MAX_CURVE_PARAMS];
+    double g[MAX_CURVE_PARAMS], dp[MAX_CURVE_PARAMS], p[MAX_CURVE_PARAMS], e[MAX_CURVE_PARAMS];
+    double lambda = 1e-3, chi2_val, chi2_new = 0.0;
+    int n = context->num_params;
+    int i, j, k, iter, accepted, converged;
+
+    /* The initial chi-squared value. */
+    curve->back_calc(context);
+    chi2_val = chi2(context->values, context->variance, context->back_calc, context->num_times);
+
+    /* The iterations. */
+    for (iter = 0; iter < max_iterations; iter++) {
+        /* The normal equations at the current position. */
+        curve->grad(context);
+        normal_equations(context, A, g);
+
+        /* Store the current position. */
+        for (j = 0; j < n; j++)
+            p[j] = context->params[j];
+
+        /* Increase the damping until the chi-squared value decreases (the NaN comparisons fail). */
+        accepted = 0;
+        while (lambda < 1e16) {
+            /* The damped normal equations. */
+            for (j = 0; j < n; j++) {
+                for (k = 0; k < n; k++)
+                    M[j][k] = A[j][k];
+                if (A[j][j] > 0.0)
+                    M[j][j] += lambda * A[j][j];
+                else
+                    M[j][j] += lambda;
+            }
+
+            /* The trial step. */
+            if (solve_spd(M, g, dp, n) == 0) {
+                for (j = 0; j < n; j++)
+                    context->params[j] = p[j] + dp[j];
+                curve->back_calc(context);
+                chi2_new = chi2(context->values, context->variance, context->back_calc, context->num_times);
+                if (chi2_new <= chi2_val) {
+                    accepted = 1;
+                    break;
+                }
+            }
+
+            /* Increase the damping. */
+            lambda *= 10.0;
+        }
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+        /* No decrease possible, so restore the last position. */
+        if (!accepted) {
+            for (j = 0; j < n; j++)
+                context->params[j] = p[j];
+            curve->back_calc(context);
+            break;
+        }
 
-    /* The partial derivatives. */
-    exponential_inv_dR(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_inv_dI0(params[index_I0], params[index_inv_Iinf], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
-    exponential_inv_dIinf(params[index_I0], params[index_inv_Iinf], params[index_R], index_inv_Iinf, relax_times, back_calc_grad, num_times);
+        /* Reduce the damping and test for convergence. */
+        if (lambda > 1e-12)
+            lambda /= 10.0;
+        converged = (chi2_val - chi2_new <= func_tol);
+        chi2_val = chi2_new;
+        if (converged) {
+            iter++;
+            break;
+        }
+    }
 
-    /* Convert to a Python list of lists. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (j = 0; j < num_times; j++) {
-            PyList_Append(list2, PyFloat_FromDouble(back_calc_grad[i][j]));
+    /* Store the statistics. */
+    *chi2_out = chi2_val;
+    *iter_out = (double) iter;
+
+    /* The covariance matrix at the solution, column by column. */
+    curve->grad(context);
+    normal_equations(context, A, g);
+    for (k = 0; k < n; k++) {
+        for (j = 0; j < n; j++)
+            e[j] = (j == k) ? 1.0 : 0.0;
+        if (solve_spd(A, e, dp, n) < 0) {
+            for (i = 0; i < n*n; i++)
+                covar[i] = Py_HUGE_VAL;
+            return;
         }
-        PyList_Append(list, list2);
+        for (j = 0; j < n; j++)
+            covar[j*n + k] = dp[j];
     }
+}
 
-    /* Return the Jacobian. */
-    return list;
+
+static int
+get_double_buffer(PyObject *obj, Py_buffer *view, Py_ssize_t size, int writable, const char *name) {
+    /* Obtain a C contiguous float64 buffer of the given number of elements (any number if negative) from the object, returning -1 on failure. */
+
+    /* The buffer. */
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | (writable ? PyBUF_WRITABLE : 0)) < 0)
+        return -1;
+
+    /* Checks. */
+    if (view->itemsize != sizeof(double) || view->format == NULL || view->format[0] == '\0' || view->format[strlen(view->format)-1] != 'd' || (size >= 0 && view->len != size * (Py_ssize_t) sizeof(double))) {
+        if (size >= 0)
+            PyErr_Format(PyExc_ValueError, "The '%s' argument must be a contiguous float64 array of %ld elements.", name, (long) size);
+        else
+            PyErr_Format(PyExc_ValueError, "The '%s' argument must be a contiguous float64 array.", name);
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    /* Success. */
+    return 0;
 }
 
 
 static PyObject *
-jacobian_sat(PyObject *self, PyObject *args) {
-    /* Return the Jacobian for the two parameter exponential as a Python list of lists. */
+fit_batch(PyObject *self, PyObject *args, PyObject *keywords) {
+    /* Levenberg-Marquardt optimisation of a batch of independent curves of the same type.
+
+    All arrays are C contiguous float64 arrays.  The params argument of shape (N, M) holds the starting parameters of the N curves and is overwritten with the optimised values.  The values, errors, relax_times and mask arguments have the shape (N, T), where the time points of each curve with a non-zero mask value are excluded.  The chi2, iter_count and covar arguments of shape (N), (N) and (N, M, M) are filled with the results.  The global interpreter lock is released during the optimisation.
+     */
 
     /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int i, j;
+    PyObject *obj[8];
+    Py_buffer view[8];
+    Py_ssize_t size;
+    Relax_fit_context work;
+    Relax_fit_curve *curve;
+    double *params, *values, *errors, *relax_times, *mask, *chi2_vals, *iter_count, *covar;
+    double func_tol = 1e-25;
+    char *model;
+    int max_iterations = 10000000;
+    int num_params, num_curves, num_times, count, status = 0;
+    int c, i, j, n;
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
+    /* The keyword list. */
+    static char *keyword_list[] = {"model", "params", "values", "errors", "relax_times", "mask", "chi2", "iter_count", "covar", "func_tol", "max_iterations", NULL};
+
+    /* The argument names. */
+    static const char *names[] = {"params", "values", "errors", "relax_times", "mask", "chi2", "iter_count", "covar"};
+
+    /* Parse the function arguments. */
+    if (!PyArg_ParseTupleAndKeywords(args, keywords, "sOOOOOOOO|di", keyword_list, &model, &obj[0], &obj[1], &obj[2], &obj[3], &obj[4], &obj[5], &obj[6], &obj[7], &func_tol, &max_iterations))
         return NULL;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* The curve type. */
+    curve = NULL;
+    for (i = 0; i < (int) NUM_CURVE_TYPES; i++) {
+        if (strcmp(model, curve_types[i]->name) == 0)
+            curve = curve_types[i];
+    }
+    if (curve == NULL) {
+        PyErr_Format(PyExc_ValueError, "The curve type '%s' is unknown.", model);
+        return NULL;
+    }
+    num_params = curve->num_params;
 
-    /* The partial derivatives. */
-    exponential_sat_dR(params[index_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_sat_dIinf(params[index_Iinf], params[index_R], index_Iinf, relax_times, back_calc_grad, num_times);
+    /* The number of curves, from the chi2 argument. */
+    if (get_double_buffer(obj[5], &view[0], -1, 0, names[5]) < 0)
+        return NULL;
+    num_curves = (int) (view[0].len / (Py_ssize_t) sizeof(double));
+    PyBuffer_Release(&view[0]);
+
+    /* The number of time points, from the values argument. */
+    num_times = 0;
+    if (num_curves > 0) {
+        if (get_double_buffer(obj[1], &view[0], -1, 0, names[1]) < 0)
+            return NULL;
+        num_times = (int) (view[0].len / (Py_ssize_t) sizeof(double) / num_curves);
+        PyBuffer_Release(&view[0]);
+    }
 
-    /* Convert to a Python list of lists. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (j = 0; j < num_times; j++) {
-            PyList_Append(list2, PyFloat_FromDouble(back_calc_grad[i][j]));
-        }
-        PyList_Append(list, list2);
+    /* The buffers, with the sizes checked. */
+    for (i = 0; i < 8; i++) {
+        if (i == 0)
+            size = (Py_ssize_t) num_curves * num_params;
+        else if (i < 5)
+            size = (Py_ssize_t) num_curves * num_times;
+        else if (i < 7)
+            size = num_curves;
+        else
+            size = (Py_ssize_t) num_curves * num_params * num_params;
+        if (get_double_buffer(obj[i], &view[i], size, (i == 0 || i > 4), names[i]) < 0)
+            goto release;
+        status = i + 1;
     }
 
-    /* Return the Jacobian. */
-    return list;
-}
+    /* Aliases. */
+    params = (double *) view[0].buf;
+    values = (double *) view[1].buf;
+    errors = (double *) view[2].buf;
+    relax_times = (double *) view[3].buf;
+    mask = (double *) view[4].buf;
+    chi2_vals = (double *) view[5].buf;
+    iter_count = (double *) view[6].buf;
+    covar = (double *) view[7].buf;
+
+    /* The work context. */
+    work.num_params = num_params;
+    work.relax_times = PyMem_New(double, num_times+1);
+    work.values = PyMem_New(double, num_times+1);
+    work.variance = PyMem_New(double, num_times+1);
+    work.back_calc = PyMem_New(double, num_times+1);
+    work.back_calc_grad = PyMem_New(double, num_params * num_times + 1);
+    work.params = PyMem_New(double, num_params);
+    work.scaling_matrix = PyMem_New(double, num_params);
+    if (!work.relax_times || !work.values || !work.variance || !work.back_calc || !work.back_calc_grad || !work.params || !work.scaling_matrix) {
+        PyErr_NoMemory();
+        goto free;
+    }
+    for (j = 0; j < num_params; j++)
+        work.scaling_matrix[j] = 1.0;
+
+    /* The optimisation. */
+    Py_BEGIN_ALLOW_THREADS
+    for (c = 0; c < num_curves; c++) {
+        /* Pack the data of the curve, skipping the masked time points. */
+        count = 0;
+        for (i = 0; i < num_times; i++) {
+            n = c*num_times + i;
+            if (mask[n] != 0.0)
+                continue;
+            work.values[count] = values[n];
+            work.variance[count] = square(errors[n]);
+            work.relax_times[count] = relax_times[n];
+            count++;
+        }
+        work.num_times = count;
 
+        /* The starting position. */
+        for (j = 0; j < num_params; j++)
+            work.params[j] = params[c*num_params + j];
 
-static PyObject *
-jacobian_chi2_exp(PyObject *self, PyObject *args) {
-    /* Return the Jacobian for the two parameter exponential as a Python list of lists.
+        /* Optimise. */
+        fit_lm(&work, curve, func_tol, max_iterations, &chi2_vals[c], &iter_count[c], &covar[c*num_params*num_params]);
 
-    The Jacobian
-    ============
+        /* Store the parameters. */
+        for (j = 0; j < num_params; j++)
+            params[c*num_params + j] = work.params[j];
+    }
+    Py_END_ALLOW_THREADS
+
+    /* Clean up. */
+free:
+    PyMem_Free(work.relax_times);
+    PyMem_Free(work.values);
+    PyMem_Free(work.variance);
+    PyMem_Free(work.back_calc);
+    PyMem_Free(work.back_calc_grad);
+    PyMem_Free(work.params);
+    PyMem_Free(work.scaling_matrix);
+release:
+    for (i = 0; i < status; i++)
+        PyBuffer_Release(&view[i]);
+
+    /* Failure. */
+    if (PyErr_Occurred())
+        return NULL;
 
-    The equation is::
+    /* The macro for returning the Python None object. */
+    Py_RETURN_NONE;
+}
 
-                     / yi - yi(theta)     dyi(theta) \
-        J_ji  =  -2  | --------------  .  ---------- |
-                     \   sigma_i**2        dthetaj   /
 
-    where
-        - i is the index over data sets.
-        - j is the parameter index.
-        - theta is the parameter vector.
-        - yi are the values of the measured data set.
-        - yi(theta) are the values of the back calculated data set.
-        - dyi(theta)/dthetaj are the values of the back calculated gradient for parameter j.
-        - sigma_i are the values of the error set.
+/*********************************************************/
+/* The module level functions.                           */
+/*********************************************************/
 
+static PyObject *
+setup(PyObject *self, PyObject *args, PyObject *keywords) {
+    /* Create a new context in preparation for calls to the target function.
+     *
+     * The context is returned, and is also stored for use by the module level target functions.
      */
 
-    /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int i, j;
+    /* Python object declarations. */
+    PyObject *values_arg, *sd_arg, *relax_times_arg, *scaling_matrix_arg;
+    PyObject *element;
+    Relax_fit_context *context;
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
+    /* Normal declarations. */
+    int i, num_params, num_times;
+    double sd;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+    /* The keyword list. */
+    static char *keyword_list[] = {"num_params", "num_times", "values", "sd", "relax_times", "scaling_matrix", NULL};
 
-    /* Back calculated the peak intensities. */
-    exponential(params[index_I0], params[index_R], relax_times, back_calc, num_times);
+    /* Parse the function arguments. */
+    if (!PyArg_ParseTupleAndKeywords(args, keywords, "iiOOOO", keyword_list, &num_params, &num_times, &values_arg, &sd_arg, &relax_times_arg, &scaling_matrix_arg))
+        return NULL;
 
-    /* The partial derivatives. */
-    exponential_dR(params[index_I0], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_dI0(params[index_I0], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
+    /* Check the dimensions, the number of parameters matching one of the curve types. */
+    for (i = 0; i < (int) NUM_CURVE_TYPES; i++) {
+        if (curve_types[i]->num_params == num_params)
+            break;
+    }
+    if (i == (int) NUM_CURVE_TYPES) {
+        PyErr_Format(PyExc_ValueError, "The number of parameters %d does not match any of the curve types.", num_params);
+        return NULL;
+    }
+    if (num_times < 0) {
+        PyErr_Format(PyExc_ValueError, "The number of time points %d must not be negative.", num_times);
+        return NULL;
+    }
 
-    /* Assemble the chi-squared Jacobian. */
-    for (j = 0; j < num_params; ++j) {
-        for (i = 0; i < num_times; ++i) {
-            jacobian_matrix[j][i] = -2.0 / variance[i] * (values[i] - back_calc[i]) * back_calc_grad[j][i];
-        }
+    /* Create the context. */
+    context = PyObject_New(Relax_fit_context, &Relax_fit_context_type);
+    if (context == NULL)
+        return NULL;
+    context->num_params = num_params;
+    context->num_times = num_times;
+
+    /* Allocate the buffers from the dimensions (at least one element each, as a zero sized allocation may return NULL). */
+    context->relax_times = PyMem_New(double, num_times+1);
+    context->values = PyMem_New(double, num_times+1);
+    context->variance = PyMem_New(double, num_times+1);
+    context->exported = PyMem_New(double, (1 + 2*num_params) * num_times + 1);
+    context->back_calc_hess = PyMem_New(double, num_params * num_params * num_times + 1);
+    context->dchi2_vals = PyMem_New(double, num_params);
+    context->d2chi2_vals = PyMem_New(double, num_params * num_params);
+    context->params = PyMem_New(double, num_params);
+    context->scaling_matrix = PyMem_New(double, num_params);
+    if (!context->relax_times || !context->values || !context->variance || !context->exported || !context->back_calc_hess || !context->dchi2_vals || !context->d2chi2_vals || !context->params || !context->scaling_matrix) {
+        Py_DECREF(context);
+        return PyErr_NoMemory();
     }
 
-    /* Convert to a Python list of lists. */
-    list = PyList_New(0);
-    Py_INCREF(list);
+    /* The exported block of the back calculated values and the Jacobians. */
+    context->back_calc = context->exported;
+    context->back_calc_grad = context->exported + num_times;
+    context->jacobian_matrix = context->exported + (1 + num_params) * num_times;
+    context->shape[0] = 1 + 2*num_params;
+    context->shape[1] = num_times;
+    context->strides[0] = num_times * sizeof(double);
+    context->strides[1] = sizeof(double);
+
+    /* Place the parameter related arguments into C arrays. */
     for (i = 0; i < num_params; i++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (j = 0; j < num_times; j++) {
-            PyList_Append(list2, PyFloat_FromDouble(jacobian_matrix[i][j]));
-        }
-        PyList_Append(list, list2);
+        /* The diagonalised scaling matrix list argument element. */
+        element = PySequence_GetItem(scaling_matrix_arg, i);
+        if (element == NULL)
+            goto fail;
+        context->scaling_matrix[i] = PyFloat_AsDouble(element);
+        Py_CLEAR(element);
     }
 
-    /* Return the Jacobian. */
-    return list;
-}
+    /* Place the time related arguments into C arrays. */
+    for (i = 0; i < num_times; i++) {
+        /* The value argument element. */
+        element = PySequence_GetItem(values_arg, i);
+        if (element == NULL)
+            goto fail;
+        context->values[i] = PyFloat_AsDouble(element);
+        Py_CLEAR(element);
 
+        /* The sd argument element. */
+        element = PySequence_GetItem(sd_arg, i);
+        if (element == NULL)
+            goto fail;
+        sd = PyFloat_AsDouble(element);
+        Py_CLEAR(element);
 
-static PyObject *
-jacobian_chi2_inv(PyObject *self, PyObject *args) {
-    /* Return the Jacobian for the inversion recovery experiment as a Python list of lists.
+        /* Convert the errors to variances to avoid duplicated maths operations for faster calculations. */
+        context->variance[i] = square(sd);
 
-    The Jacobian
-    ============
+        /* The relax_times argument element. */
+        element = PySequence_GetItem(relax_times_arg, i);
+        if (element == NULL)
+            goto fail;
+        context->relax_times[i] = PyFloat_AsDouble(element);
+        Py_CLEAR(element);
+    }
 
-    The equation is::
+    /* Conversion failures. */
+    if (PyErr_Occurred())
+        goto fail;
 
-                     / yi - yi(theta)     dyi(theta) \
-        J_ji  =  -2  | --------------  .  ---------- |
-                     \   sigma_i**2        dthetaj   /
+    /* Initialise the exported values. */
+    for (i = 0; i < (1 + 2*num_params) * num_times; i++)
+        context->exported[i] = 0.0;
 
-    where
-        - i is the index over data sets.
-        - j is the parameter index.
-        - theta is the parameter vector.
-        - yi are the values of the measured data set.
-        - yi(theta) are the values of the back calculated data set.
-        - dyi(theta)/dthetaj are the values of the back calculated gradient for parameter j.
-        - sigma_i are the values of the error set.
+    /* Store the context for the module level functions. */
+    Py_XDECREF(default_context);
+    Py_INCREF(context);
+    default_context = (PyObject *)context;
 
-     */
+    /* Return the context. */
+    return (PyObject *)context;
 
-    /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int i, j;
+    /* Clean up on failure. */
+fail:
+    Py_DECREF(context);
+    return NULL;
+}
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
-        return NULL;
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
+static Relax_fit_context *
+get_default_context(void) {
+    /* Return the context of the last setup() call, setting an exception if there is none. */
 
-    /* Back calculated the peak intensities. */
-    exponential_inv(params[index_I0], params[index_inv_Iinf], params[index_R], relax_times, back_calc, num_times);
+    if (default_context == NULL)
+        PyErr_SetString(PyExc_RuntimeError, "The relax_fit C module has not been set up.");
+    return (Relax_fit_context *)default_context;
+}
 
-    /* The partial derivatives. */
-    exponential_inv_dR(params[index_I0], params[index_inv_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_inv_dI0(params[index_I0], params[index_inv_Iinf], params[index_R], index_I0, relax_times, back_calc_grad, num_times);
-    exponential_inv_dIinf(params[index_I0], params[index_inv_Iinf], params[index_R], index_inv_Iinf, relax_times, back_calc_grad, num_times);
 
-    /* Assemble the chi-squared Jacobian. */
-    for (j = 0; j < num_params; ++j) {
-        for (i = 0; i < num_times; ++i) {
-            jacobian_matrix[j][i] = -2.0 / variance[i] * (values[i] - back_calc[i]) * back_calc_grad[j][i];
-        }
-    }
+static PyObject *
+back_calc_I(PyObject *self, PyObject *args) {
+    /* Return the back calculated peak intensities as a Python list. */
 
-    /* Convert to a Python list of lists. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (j = 0; j < num_times; j++) {
-            PyList_Append(list2, PyFloat_FromDouble(jacobian_matrix[i][j]));
-        }
-        PyList_Append(list, list2);
-    }
+    Relax_fit_context *context = get_default_context();
+    return context ? Context_back_calc_I(context, args) : NULL;
+}
 
-    /* Return the Jacobian. */
-    return list;
+static PyObject *
+func_exp(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_func(context, args, &curve_exp) : NULL;
 }
 
+static PyObject *
+func_inv(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_func(context, args, &curve_inv) : NULL;
+}
 
 static PyObject *
-jacobian_chi2_sat(PyObject *self, PyObject *args) {
-    /* Return the Jacobian for the saturation recovery experiment as a Python list of lists.
+func_sat(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_func(context, args, &curve_sat) : NULL;
+}
 
-    The Jacobian
-    ============
+static PyObject *
+dfunc_exp(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_dfunc(context, args, &curve_exp) : NULL;
+}
 
-    The equation is::
+static PyObject *
+dfunc_inv(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_dfunc(context, args, &curve_inv) : NULL;
+}
 
-                     / yi - yi(theta)     dyi(theta) \
-        J_ji  =  -2  | --------------  .  ---------- |
-                     \   sigma_i**2        dthetaj   /
+static PyObject *
+dfunc_sat(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_dfunc(context, args, &curve_sat) : NULL;
+}
 
-    where
-        - i is the index over data sets.
-        - j is the parameter index.
-        - theta is the parameter vector.
-        - yi are the values of the measured data set.
-        - yi(theta) are the values of the back calculated data set.
-        - dyi(theta)/dthetaj are the values of the back calculated gradient for parameter j.
-        - sigma_i are the values of the error set.
+static PyObject *
+d2func_exp(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_d2func(context, args, &curve_exp) : NULL;
+}
 
-     */
+static PyObject *
+d2func_inv(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_d2func(context, args, &curve_inv) : NULL;
+}
 
-    /* Declarations. */
-    PyObject *params_arg;
-    PyObject *list, *list2;
-    int i, j;
+static PyObject *
+d2func_sat(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    return context ? calc_d2func(context, args, &curve_sat) : NULL;
+}
 
-    /* Parse the function arguments, the only argument should be the parameter array. */
-    if (!PyArg_ParseTuple(args, "O", &params_arg))
+static PyObject *
+jacobian_exp(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    if (!context || calc_jacobian(context, args, &curve_exp) < 0)
         return NULL;
+    return matrix_to_py(context->back_calc_grad, context->num_params, context->num_times);
+}
 
-    /* Convert the parameters Python list to a C array. */
-    param_to_c(params_arg);
-
-    /* Back calculated the peak intensities. */
-    exponential_sat(params[index_Iinf], params[index_R], relax_times, back_calc, num_times);
+static PyObject *
+jacobian_inv(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    if (!context || calc_jacobian(context, args, &curve_inv) < 0)
+        return NULL;
+    return matrix_to_py(context->back_calc_grad, context->num_params, context->num_times);
+}
 
-    /* The partial derivatives. */
-    exponential_sat_dR(params[index_Iinf], params[index_R], index_R, relax_times, back_calc_grad, num_times);
-    exponential_sat_dIinf(params[index_Iinf], params[index_R], index_Iinf, relax_times, back_calc_grad, num_times);
+static PyObject *
+jacobian_sat(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    if (!context || calc_jacobian(context, args, &curve_sat) < 0)
+        return NULL;
+    return matrix_to_py(context->back_calc_grad, context->num_params, context->num_times);
+}
 
-    /* Assemble the chi-squared Jacobian. */
-    for (j = 0; j < num_params; ++j) {
-        for (i = 0; i < num_times; ++i) {
-            jacobian_matrix[j][i] = -2.0 / variance[i] * (values[i] - back_calc[i]) * back_calc_grad[j][i];
-        }
-    }
+static PyObject *
+jacobian_chi2_exp(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    if (!context || calc_jacobian_chi2(context, args, &curve_exp) < 0)
+        return NULL;
+    return matrix_to_py(context->jacobian_matrix, context->num_params, context->num_times);
+}
 
-    /* Convert to a Python list of lists. */
-    list = PyList_New(0);
-    Py_INCREF(list);
-    for (i = 0; i < num_params; i++) {
-        list2 = PyList_New(0);
-        Py_INCREF(list2);
-        for (j = 0; j < num_times; j++) {
-            PyList_Append(list2, PyFloat_FromDouble(jacobian_matrix[i][j]));
-        }
-        PyList_Append(list, list2);
-    }
+static PyObject *
+jacobian_chi2_inv(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    if (!context || calc_jacobian_chi2(context, args, &curve_inv) < 0)
+        return NULL;
+    return matrix_to_py(context->jacobian_matrix, context->num_params, context->num_times);
+}
 
-    /* Return the Jacobian. */
-    return list;
+static PyObject *
+jacobian_chi2_sat(PyObject *self, PyObject *args) {
+    Relax_fit_context *context = get_default_context();
+    if (!context || calc_jacobian_chi2(context, args, &curve_sat) < 0)
+        return NULL;
+    return matrix_to_py(context->jacobian_matrix, context->num_params, context->num_times);
 }
 
 
@@ -791,7 +1238,12 @@ static PyMethodDef relax_fit_methods[] = {
         "setup",
         (PyCFunction)setup,
         METH_VARARGS | METH_KEYWORDS,
-        "Set up the module in preparation for calls to the target function."
+        "Create and return a new context in preparation for calls to the target function.\n\nThe context is also stored for use by the module level target functions, which always operate on the context of the last setup() call."
+    }, {
+        "fit_batch",
+        (PyCFunction)fit_batch,
+        METH_VARARGS | METH_KEYWORDS,
+        "Levenberg-Marquardt optimisation of a batch of independent curves of the same type.\n\nThe params (N, M), values, errors, relax_times and mask (N, T) arguments are C contiguous float64 arrays, with time points with a non-zero mask value being excluded.  The params array is overwritten with the optimised values, and the chi2 (N), iter_count (N) and covar (N, M, M) arrays are filled with the results."
     }, {
         "func_exp",
         func_exp,
@@ -897,11 +1349,38 @@ PyMODINIT_FUNC
 #if PY_MAJOR_VERSION >= 3
     PyInit_relax_fit(void)
     {
-        return PyModule_Create(&moduledef);
+        PyObject *module;
+
+        /* The context type. */
+        if (PyType_Ready(&Relax_fit_context_type) < 0)
+            return NULL;
+
+        /* Create the module. */
+        module = PyModule_Create(&moduledef);
+        if (module == NULL)
+            return NULL;
+
+        /* Add the context type. */
+        Py_INCREF(&Relax_fit_context_type);
+        PyModule_AddObject(module, "Context", (PyObject *)&Relax_fit_context_type);
+        return module;
     }
 #else
     initrelax_fit(void)
     {
-        (void) Py_InitModule("relax_fit", relax_fit_methods);
+        PyObject *module;
+
+        /* The context type. */
+        if (PyType_Ready(&Relax_fit_context_type) < 0)
+            return;
+
+        /* Create the module. */
+        module = Py_InitModule("relax_fit", relax_fit_methods);
+        if (module == NULL)
+            return;
+
+        /* Add the context type. */
+        Py_INCREF(&Relax_fit_context_type);
+        PyModule_AddObject(module, "Context", (PyObject *)&Relax_fit_context_type);
     }
 #endif
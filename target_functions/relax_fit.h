@@ -1,5 +1,5 @@
 /*
- * Copyright (C) 2006-2014 Edward d'Auvergne
+ * Copyright (C) 2006-2016 Edward d'Auvergne
  *
  * This file is part of the program relax (http://www.nmr-relax.com).
  *
@@ -18,7 +18,7 @@
  */
 
 
-/* Get the maximum dimensions. */
+/* Get the array indexing macros. */
 #include "dimensions.h"
 
 /* Python 2.2 and earlier support for Python C modules. */
@@ -30,12 +30,8 @@
 #define square(x) ((x)*(x))
 
 
-/****************************************/
-/* External, hence permanent, variables. */
-/*****************************************/
-
-/* Variables sent to the setup function to be stored for later use. */
-static int num_params, num_times;
+/* The maximum number of parameters of the curve types. */
+#define MAX_CURVE_PARAMS 3
 
 /* Hardcoded parameter indices. */
 static int index_R = 0;
@@ -43,16 +39,44 @@ static int index_I0 = 1;
 static int index_Iinf = 1;
 static int index_inv_Iinf = 2;
 
-/* Variables used for storage during the function calls of optimisation. */
-static double back_calc[MAX_DATA];
-static double back_calc_grad[MAX_PARAMS][MAX_DATA];
-static double back_calc_hess[MAX_PARAMS][MAX_PARAMS][MAX_DATA];
-static double dchi2_vals[MAX_PARAMS];
-static double d2chi2_vals[MAX_PARAMS][MAX_PARAMS];
-static double jacobian_matrix[MAX_PARAMS][MAX_DATA];
-static double params[MAX_PARAMS];
-static double relax_times[MAX_DATA];
-static double scaling_matrix[MAX_PARAMS];
-static double sd[MAX_DATA];
-static double values[MAX_DATA];
-static double variance[MAX_DATA];
+
+/* The relaxation curve-fitting context.
+ *
+ * Each context holds its own copy of the data and its own buffers for the function calls of optimisation, so that different curves can be optimised in parallel threads with one context per curve.  All arrays are allocated from the actual dimensions.
+ */
+typedef struct {
+    PyObject_HEAD
+
+    /* Variables sent to the setup function to be stored for later use. */
+    int num_params, num_times;
+
+    /* The data, of size num_times. */
+    double *relax_times;
+    double *values;
+    double *variance;
+
+    /* The back calculated values, the Jacobian {num_params, num_times} and the chi-squared Jacobian {num_params, num_times}, contiguous in one block exported by the buffer protocol. */
+    double *exported;
+    double *back_calc;
+    double *back_calc_grad;
+    double *jacobian_matrix;
+    Py_ssize_t shape[2];
+    Py_ssize_t strides[2];
+
+    /* Variables used for storage during the function calls of optimisation. */
+    double *back_calc_hess;
+    double *dchi2_vals;
+    double *d2chi2_vals;
+    double *params;
+    double *scaling_matrix;
+} Relax_fit_context;
+
+
+/* The name, number of parameters, and back-calculation, gradient and Hessian functions for one curve type. */
+typedef struct {
+    const char *name;
+    int num_params;
+    void (*back_calc)(Relax_fit_context *context);
+    void (*grad)(Relax_fit_context *context);
+    void (*hess)(Relax_fit_context *context);
+} Relax_fit_curve;
@@ -24,18 +24,70 @@
 """The R1 and R2 exponential relaxation curve fitting optimisation functions."""
 
 # Python module imports.
-from numpy import array, float64, ndarray, nan_to_num
+from numpy import array, asarray, ascontiguousarray, broadcast_to, float64, ndarray, nan_to_num, zeros
 
 # relax module imports.
 from dep_check import C_module_exp_fn
 
 # C modules.
 if C_module_exp_fn:
-    from target_functions.relax_fit import back_calc_I, d2func_exp, d2func_inv, d2func_sat, dfunc_exp, dfunc_inv, dfunc_sat, func_exp, func_inv, func_sat, jacobian_chi2_exp, jacobian_chi2_inv, jacobian_chi2_sat, jacobian_exp, jacobian_inv, jacobian_sat, setup 
+    from target_functions.relax_fit import fit_batch as fit_batch_c, setup
+
+
+def fit_batch(model=None, params=None, values=None, errors=None, relax_times=None, mask=None, func_tol=1e-25, max_iterations=10000000):
+    """Levenberg-Marquardt optimisation of a batch of independent exponential curves in a single C call.
+
+    The curves are stacked along the first axis, with the time points of each curve along the second.  Curves with fewer time points can be padded, with the padding excluded via the mask.  The global interpreter lock is released for the entire batch.
+
+
+    @keyword model:             The exponential curve type.  This can be 'exp', 'inv', or 'sat'.
+    @type model:                str
+    @keyword params:            The starting parameter values of each curve, in the order of the model parameters.
+    @type params:               numpy rank-2 array
+    @keyword values:            The peak intensities.
+    @type values:               numpy rank-2 array
+    @keyword errors:            The peak intensity errors.
+    @type errors:               numpy rank-2 array
+    @keyword relax_times:       The relaxation times, either per curve or a rank-1 array shared by all curves.
+    @type relax_times:          numpy rank-1 or rank-2 array
+    @keyword mask:              The flags for excluding time points, with True or non-zero values for points to skip.  If not supplied, all points are used.
+    @type mask:                 None or numpy rank-2 array
+    @keyword func_tol:          The function tolerance.  The optimisation of a curve terminates when the decrease of the chi-squared value is less than or equal to this value.
+    @type func_tol:             float
+    @keyword max_iterations:    The maximum number of iterations per curve.
+    @type max_iterations:       int
+    @return:                    The optimised parameters, the chi-squared values, the iteration counts, and the covariance matrices (J^T.W.J)^-1 of the curves.  The covariance matrices of curves with a singular matrix are filled with infinity.
+    @rtype:                     numpy rank-2 float64 array, numpy rank-1 float64 array, numpy rank-1 int array, numpy rank-3 float64 array
+    """
+
+    # Convert the data into C contiguous float64 arrays, copying the parameters as these are overwritten.
+    params = array(params, float64, ndmin=2)
+    values = ascontiguousarray(values, float64)
+    errors = ascontiguousarray(errors, float64)
+    relax_times = ascontiguousarray(broadcast_to(array(relax_times, float64), values.shape))
+    if mask is None:
+        mask = zeros(values.shape, float64)
+    else:
+        mask = ascontiguousarray(mask, float64)
+
+    # The result structures.
+    num_curves, num_params = params.shape
+    chi2 = zeros(num_curves, float64)
+    iter_count = zeros(num_curves, float64)
+    covar = zeros((num_curves, num_params, num_params), float64)
+
+    # Optimise.
+    fit_batch_c(model=model, params=params, values=values, errors=errors, relax_times=relax_times, mask=mask, chi2=chi2, iter_count=iter_count, covar=covar, func_tol=func_tol, max_iterations=max_iterations)
+
+    # Return the results.
+    return params, chi2, iter_count.astype(int), covar
 
 
 class Relax_fit_opt:
-    """The exponential curve-fitting Python to C wrapper target function class."""
+    """The exponential curve-fitting Python to C wrapper target function class.
+
+    Each instance holds its own C module context, so that multiple curves can be optimised simultaneously, for example in different threads as the C target functions release the global interpreter lock.
+    """
 
     def __init__(self, model=None, num_params=None, values=None, errors=None, relax_times=None, scaling_matrix=None):
         """Set up the target function class and alias the target functions.
@@ -57,8 +109,14 @@ class Relax_fit_opt:
         # Store the args.
         self.model = model
 
-        # Initialise the C code.
-        setup(num_params=num_params, num_times=len(relax_times), values=values, sd=errors, relax_times=relax_times, scaling_matrix=scaling_matrix)
+        # Initialise the C code, creating the context holding the data for this curve.
+        self.context = setup(num_params=num_params, num_times=len(relax_times), values=values, sd=errors, relax_times=relax_times, scaling_matrix=scaling_matrix)
+
+        # Views of the back calculated values and Jacobians held by the context, without copying.
+        data = asarray(self.context)
+        self.back_calc = data[0]
+        self.jacobian_matrix = data[1:num_params+1]
+        self.jacobian_chi2_matrix = data[num_params+1:]
 
         # Alias the target functions.
         if model == 'exp':
@@ -76,25 +134,25 @@ class Relax_fit_opt:
 
         # Alias the Jacobian C functions.
         if model == 'exp':
-            self.jacobian = jacobian_exp
-            self.jacobian_chi2 = jacobian_chi2_exp
+            self.calc_jacobian = self.context.jacobian_exp
+            self.calc_jacobian_chi2 = self.context.jacobian_chi2_exp
         elif model == 'inv':
-            self.jacobian = jacobian_inv
-            self.jacobian_chi2 = jacobian_chi2_inv
+            self.calc_jacobian = self.context.jacobian_inv
+            self.calc_jacobian_chi2 = self.context.jacobian_chi2_inv
         elif model == 'sat':
-            self.jacobian = jacobian_sat
-            self.jacobian_chi2 = jacobian_chi2_sat
+            self.calc_jacobian = self.context.jacobian_sat
+            self.calc_jacobian_chi2 = self.context.jacobian_chi2_sat
 
 
     def back_calc_data(self):
         """Return the back-calculated data from the C code.
 
-        @return:    The back-calculated peak intensities.
-        @rtype:     list of float
+        @return:    The back-calculated peak intensities of the last target function call, as a read-only view which is updated by subsequent calls.
+        @rtype:     numpy rank-1 float64 array
         """
 
         # Return the data.
-        return back_calc_I()
+        return self.back_calc
 
 
     def func_exp(self, params):
@@ -111,7 +169,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        chi2 = func_exp(params)
+        chi2 = self.context.func_exp(params)
 
         # Return the chi2 value.
         return nan_to_num(chi2)
@@ -131,7 +189,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        chi2 = func_inv(params)
+        chi2 = self.context.func_inv(params)
 
         # Return the chi2 value.
         return nan_to_num(chi2)
@@ -151,7 +209,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        chi2 = func_sat(params)
+        chi2 = self.context.func_sat(params)
 
         # Return the chi2 value.
         return nan_to_num(chi2)
@@ -171,7 +229,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        dchi2 = dfunc_exp(params)
+        dchi2 = self.context.dfunc_exp(params)
 
         # Return the chi2 gradient as a numpy array.
         return array(dchi2, float64)
@@ -191,7 +249,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        dchi2 = dfunc_inv(params)
+        dchi2 = self.context.dfunc_inv(params)
 
         # Return the chi2 gradient as a numpy array.
         return array(dchi2, float64)
@@ -211,7 +269,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        dchi2 = dfunc_sat(params)
+        dchi2 = self.context.dfunc_sat(params)
 
         # Return the chi2 gradient as a numpy array.
         return array(dchi2, float64)
@@ -231,7 +289,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        d2chi2 = d2func_exp(params)
+        d2chi2 = self.context.d2func_exp(params)
 
         # Return the chi2 Hessian as a numpy array.
         return array(d2chi2, float64)
@@ -251,7 +309,7 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        d2chi2 = d2func_inv(params)
+        d2chi2 = self.context.d2func_inv(params)
 
         # Return the chi2 Hessian as a numpy array.
         return array(d2chi2, float64)
@@ -271,7 +329,39 @@ class Relax_fit_opt:
             params = params.tolist()
 
         # Call the C code.
-        d2chi2 = d2func_sat(params)
+        d2chi2 = self.context.d2func_sat(params)
 
         # Return the chi2 Hessian as a numpy array.
         return array(d2chi2, float64)
+
+
+    def jacobian(self, params):
+        """Calculate the Jacobian of the curve in the C module.
+
+        @param params:  The parameter array from the minimisation code.
+        @type params:   numpy array
+        @return:        The Jacobian matrix with the parameters in the first dimension, as a read-only view which is updated by subsequent calls.
+        @rtype:         numpy rank-2 float64 array
+        """
+
+        # Call the C code.
+        self.calc_jacobian(params)
+
+        # Return the view.
+        return self.jacobian_matrix
+
+
+    def jacobian_chi2(self, params):
+        """Calculate the Jacobian of the chi-squared function in the C module.
+
+        @param params:  The parameter array from the minimisation code.
+        @type params:   numpy array
+        @return:        The chi-squared Jacobian matrix with the parameters in the first dimension, as a read-only view which is updated by subsequent calls.
+        @rtype:         numpy rank-2 float64 array
+        """
+
+        # Call the C code.
+        self.calc_jacobian_chi2(params)
+
+        # Return the view.
+        return self.jacobian_chi2_matrix
@@ -40,6 +40,7 @@ from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYP
 from lib.errors import RelaxError
 from lib.io import extract_data, get_file_path
 from lib.spectrum.nmrpipe import show_apod_extract, show_apod_rmsd, show_apod_rmsd_dir_to_files, show_apod_rmsd_to_file
+from multi import Processor_box
 from pipe_control.mol_res_spin import generate_spin_string, return_spin, spin_loop
 from pipe_control.minimise import assemble_scaling_matrix
 from specific_analyses.relax_disp.checks import check_missing_r1
@@ -3786,6 +3787,8 @@ class Relax_disp(SystemTestCase):
 
         # Now do it manually.
         estimate_r2eff(method='scipy.optimize.leastsq')
+        estimate_r2eff(method='batch')
+        estimate_r2eff(method='numpy')
 
         estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints=False, chi2_jacobian=False)
         estimate_r2eff(method='minfx', min_algor='simplex', c_code=True, constraints=False, chi2_jacobian=True)
@@ -4388,6 +4391,61 @@ class Relax_disp(SystemTestCase):
         self.assertEqual(spin71.k_BA, spin71.kex * spin71.pA)
 
 
+    def test_hansen_cpmg_data_to_cr72_newton_batch(self):
+        """Comparison of the batched and individual Newton optimisation of Dr. Flemming Hansen's CPMG data to the CR72 dispersion model.
+
+        This uses the data from Dr. Flemming Hansen's paper at http://dx.doi.org/10.1021/jp074793o.  The free spins are optimised individually by the minfx Newton algorithm and together by the batched Newton algorithm turned on via the relax_disp.newton_batch user function, both with the R20 parameters optimised and profiled out of the optimisation.
+        """
+
+        # Base data setup.
+        self.setup_hansen_cpmg_data(model='CR72')
+
+        # Alias the spins.
+        spins = [return_spin(":70"), return_spin(":71")]
+
+        # The R20 keys.
+        r20_key1 = generate_r20_key(exp_type=EXP_TYPE_CPMG_SQ, frq=500e6)
+        r20_key2 = generate_r20_key(exp_type=EXP_TYPE_CPMG_SQ, frq=800e6)
+
+        # Loop over the R20 profiling.
+        for profile in [False, True]:
+            self.interpreter.relax_disp.r20_profile(profile=profile)
+
+            # Optimise individually, then as a batch.
+            results = []
+            for batch in [False, True]:
+                # Set the batching flag.
+                self.interpreter.relax_disp.newton_batch(batch=batch)
+
+                # Set the initial parameter values.
+                spins[0].r2 = {r20_key1: 7.0, r20_key2: 9.0}
+                spins[0].pA = 0.98
+                spins[0].dw = 5.5
+                spins[0].kex = 1800.0
+                spins[1].r2 = {r20_key1: 5.0, r20_key2: 9.0}
+                spins[1].pA = 0.98
+                spins[1].dw = 2.0
+                spins[1].kex = 2400.0
+
+                # Optimisation.
+                self.interpreter.minimise.execute(min_algor='Newton', func_tol=1e-25, max_iter=1000, constraints=False, scaling=True, verbosity=1)
+
+                # Store the results.
+                results.append([[spin.r2[r20_key1], spin.r2[r20_key2], spin.pA, spin.dw, spin.kex/1000, spin.chi2] for spin in spins])
+
+            # Printout.
+            print("\n\nOptimised parameters (R20 profiling %s):\n" % profile)
+            print("%-20s %-20s %-20s %-20s %-20s" % ("Parameter", "Individual (:70)", "Batched (:70)", "Individual (:71)", "Batched (:71)"))
+            names = ["R2 (500 MHz)", "R2 (800 MHz)", "pA", "dw", "kex/1000", "chi2"]
+            for i in range(len(names)):
+                print("%-20s %20.15g %20.15g %20.15g %20.15g" % (names[i], results[0][0][i], results[1][0][i], results[0][1][i], results[1][1][i]))
+
+            # The batched optimisation must find the same minima.
+            for si in range(len(spins)):
+                for i in range(len(names)):
+                    self.assertAlmostEqual(results[1][si][i], results[0][si][i], 3)
+
+
     def test_hansen_cpmg_data_to_cr72_full(self):
         """Optimisation of Dr. Flemming Hansen's CPMG data to the CR72 full dispersion model.
 
@@ -5725,6 +5783,68 @@ class Relax_disp(SystemTestCase):
         self.assertAlmostEqual(spin.chi2/1000, 162.511988511609/1000, 3)
 
 
+    def test_korzhnev_2005_concurrent_models(self):
+        """Compare the concurrent and serial optimisation of independent models using the Korzhnev et al., 2005 CPMG data.
+
+        This uses the data from Dmitry Korzhnev's paper at U{DOI: 10.1021/ja054550e<http://dx.doi.org/10.1021/ja054550e>}.  The 'NS MMQ 3-site linear' and 'MMQ CR72' models are independent, as the 'MMQ CR72' model is not nested in the 3-site models, and are optimised together from a single processor queue as in the dispersion auto-analysis.  The results, including the back-calculated R2eff values of the attached proton, must be stored in the data pipe of each model.
+        """
+
+        # Base data setup.
+        self.setup_korzhnev_2005_data(data_list=['SQ', '1H SQ', 'DQ', 'ZQ', 'MQ', '1H MQ'])
+
+        # Get the Processor box singleton (it contains the Processor instance) and alias the Processor.
+        processor = Processor_box().processor
+
+        # The data pipes of the models, for the concurrent and serial optimisation, starting from the default parameter values.
+        models = ['NS MMQ 3-site linear', 'MMQ CR72']
+        for model in models:
+            for type in ['concurrent', 'serial']:
+                pipe_name = "%s - %s" % (model, type)
+                self.interpreter.pipe.copy(pipe_from='Korzhnev et al., 2005', pipe_to=pipe_name)
+                self.interpreter.pipe.switch(pipe_name)
+                self.interpreter.relax_disp.select_model(model)
+                for param in MODEL_PARAMS[model]:
+                    self.interpreter.value.set(param=param, index=None)
+
+        # Low precision serial optimisation.
+        for model in models:
+            self.interpreter.pipe.switch("%s - serial" % model)
+            self.interpreter.minimise.execute(min_algor='simplex', func_tol=1e-05, max_iter=100)
+
+        # Low precision concurrent optimisation, holding the processor queue until the commands of both models have been queued.
+        processor.hold_queue()
+        try:
+            for model in models:
+                self.interpreter.pipe.switch("%s - concurrent" % model)
+                self.interpreter.minimise.execute(min_algor='simplex', func_tol=1e-05, max_iter=100)
+        finally:
+            processor.release_queue()
+
+        # Check the results of each model, for both the 15N spin and its attached proton.
+        for model in models:
+            for spin_id in [':9@N', ':9@H']:
+                spin_conc = return_spin(spin_id=spin_id, pipe="%s - concurrent" % model)
+                spin_serial = return_spin(spin_id=spin_id, pipe="%s - serial" % model)
+
+                # The back-calculated R2eff values.
+                print("Model '%s', spin '%s'." % (model, spin_id))
+                self.assertTrue(hasattr(spin_serial, 'r2eff_bc'))
+                self.assertTrue(hasattr(spin_conc, 'r2eff_bc'))
+                self.assertEqual(sorted(spin_conc.r2eff_bc.keys()), sorted(spin_serial.r2eff_bc.keys()))
+                for key in spin_serial.r2eff_bc:
+                    self.assertAlmostEqual(spin_conc.r2eff_bc[key], spin_serial.r2eff_bc[key])
+
+            # The optimised parameters.
+            spin_conc = return_spin(spin_id=':9@N', pipe="%s - concurrent" % model)
+            spin_serial = return_spin(spin_id=':9@N', pipe="%s - serial" % model)
+            self.assertAlmostEqual(spin_conc.chi2, spin_serial.chi2)
+            for key in spin_serial.r2:
+                self.assertAlmostEqual(spin_conc.r2[key], spin_serial.r2[key])
+            for param in MODEL_PARAMS[model]:
+                if param != 'r2':
+                    self.assertAlmostEqual(getattr(spin_conc, param), getattr(spin_serial, param))
+
+
     def test_kteilum_fmpoulsen_makke_check_graphs(self):
         """Check of all possible dispersion graphs from optimisation of Kaare Teilum, Flemming M Poulsen, Mikael Akke 2006 "acyl-CoA binding protein" CPMG data to the CR72 dispersion model.
 
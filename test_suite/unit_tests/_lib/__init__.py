@@ -40,6 +40,7 @@ __all__ = [
     'test_float',
     'test_io',
     'test_mathematics',
+    'test_optimisation',
     'test_periodic_table',
     'test_regex',
     'test_selection',
@@ -27,6 +27,7 @@ __all__ = [
     'test_cr72',
     'test_cr72_full_cluster_one_field',
     'test_cr72_full_cluster_three_fields',
+    'test_derivatives',
     'test_dpl94',
     'test_it99',
     'test_lm63',
@@ -35,6 +36,7 @@ __all__ = [
     'test_m61',
     'test_m61b',
     'test_matrix_exponential',
+    'test_matrix_power',
     'test_mmq_cr72',
     'mp05',
     'tap03',
@@ -0,0 +1,170 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import array, float64, max, ones, pi, zeros
+from unittest import TestCase
+
+# relax module imports.
+from lib.dispersion.b14 import r2eff_B14
+from lib.dispersion.cr72 import r2eff_CR72
+from lib.dispersion.derivatives import jet_r1rho_TP02, jet_r2eff_B14, jet_r2eff_CR72, jet_variables, log, sqrt
+from lib.dispersion.tp02 import r1rho_TP02
+
+
+class Test_derivatives(TestCase):
+    """Unit tests for the lib.dispersion.derivatives relax module."""
+
+    def setUp(self):
+        """Set up for all unit tests."""
+
+        # Default parameter values.
+        self.r20a = 2.0
+        self.r20b = 3.0
+        self.pA = 0.95
+        self.dw = 500.0
+        self.kex = 1000.0
+
+        # Required data structures.
+        self.num_points = 7
+        self.ncyc = array([2, 4, 8, 10, 20, 40, 500])
+        relax_times = 0.04
+        self.cpmg_frqs = self.ncyc / relax_times
+        self.inv_relax_times = 1.0 / relax_times
+        self.tau_cpmg = 0.25 / self.cpmg_frqs
+
+
+    def check_derivs(self, func, values, h=1e-4):
+        """Compare the first and second partial derivatives of the jet function to central finite differences.
+
+        @param func:    The function of the jet variables returning a jet.
+        @type func:     function
+        @param values:  The parameter values.
+        @type values:   list of float
+        @keyword h:     The relative finite difference step size.
+        @type h:        float
+        """
+
+        # The jet derivatives.
+        jet = func(*jet_variables(values))
+        n = len(jet.val)
+
+        # Loop over the variables.
+        for i in range(len(values)):
+            # The step.
+            step = h * abs(values[i])
+            upper = list(values)
+            lower = list(values)
+            upper[i] += step
+            lower[i] -= step
+
+            # The finite difference first partial derivatives.
+            jet_upper = func(*jet_variables(upper))
+            jet_lower = func(*jet_variables(lower))
+            d1 = (jet_upper.val - jet_lower.val) / (2.0 * step)
+            self.assertLess(max(abs(jet.d1.get(i, 0.0) - d1)), 1e-4 * max(abs(d1)) + 1e-6)
+
+            # The finite difference second partial derivatives.
+            for j in range(i, len(values)):
+                d2 = (jet_upper.d1.get(j, 0.0) - jet_lower.d1.get(j, 0.0)) / (2.0 * step) * ones(n)
+                self.assertLess(max(abs(jet.d2.get((i, j), 0.0) - d2)), 1e-4 * max(abs(d2)) + 1e-6)
+
+
+    def test_jet_arithmetic(self):
+        """Test the derivatives of the jet arithmetic and mathematical functions."""
+
+        # The jet variables.
+        x, y = jet_variables([2.0, 3.0])
+
+        # A test function.
+        f = x**2 * y / (x + y) - log(x) * sqrt(y) + 1.0 / y
+
+        # The values and first partial derivatives.
+        self.assertAlmostEqual(f.val, 12.0/5.0 - 0.69314718055994529*1.7320508075688772 + 1.0/3.0)
+        self.assertAlmostEqual(f.d1[0], (2.0*2.0*3.0*5.0 - 4.0*3.0)/25.0 - 0.5*1.7320508075688772)
+        self.assertAlmostEqual(f.d1[1], (4.0*5.0 - 12.0)/25.0 - 0.69314718055994529/(2.0*1.7320508075688772) - 1.0/9.0)
+
+        # The finite difference check of all derivatives.
+        self.check_derivs(lambda x, y: x**2 * y / (x + y) - log(x) * sqrt(y) + 1.0 / y + 0.0*ones(1), [2.0, 3.0])
+
+
+    def test_jet_r1rho_TP02(self):
+        """Test the jet_r1rho_TP02() function against the lib.dispersion.tp02 module and finite differences."""
+
+        # The data.
+        frq = 2.0 * pi * 599.8908617
+        spin_lock_fields = 2.0 * pi * array([1000.0, 1500.0, 2000.0, 2500.0, 3000.0])
+        omega = frq * 1.5
+        offset = frq * 1.0
+        R1 = 1.5
+
+        # The function.
+        func = lambda r1rho_prime, dw, pA, kex: jet_r1rho_TP02(r1rho_prime=r1rho_prime, omega=omega, offset=offset, pA=pA, dw=dw, kex=kex, R1=R1, spin_lock_fields=spin_lock_fields, spin_lock_fields2=spin_lock_fields**2)
+        values = [self.r20a, 1.5*frq, self.pA, self.kex]
+
+        # The values.
+        back_calc = zeros(5, float64)
+        a = ones(5)
+        r1rho_TP02(r1rho_prime=self.r20a*a, omega=omega*a, offset=offset*a, pA=self.pA, dw=1.5*frq*a, kex=self.kex, R1=R1*a, spin_lock_fields=spin_lock_fields, spin_lock_fields2=spin_lock_fields**2, back_calc=back_calc)
+        jet = func(*jet_variables(values))
+        for i in range(5):
+            self.assertAlmostEqual(jet.val[i], back_calc[i])
+
+        # The derivatives.
+        self.check_derivs(func, values)
+
+
+    def test_jet_r2eff_B14(self):
+        """Test the jet_r2eff_B14() function against the lib.dispersion.b14 module and finite differences."""
+
+        # The function.
+        func = lambda r20a, r20b, dw, pA, kex: jet_r2eff_B14(r20a=r20a, r20b=r20b, pA=pA, dw=dw, kex=kex, ncyc=self.ncyc, inv_tcpmg=self.inv_relax_times, tcp=self.tau_cpmg)
+        values = [self.r20a, self.r20b, self.dw, self.pA, self.kex]
+
+        # The values.
+        back_calc = zeros(self.num_points, float64)
+        a = ones(self.num_points)
+        r2eff_B14(r20a=self.r20a*a, r20b=self.r20b*a, pA=self.pA, dw=self.dw*a, dw_orig=self.dw*a, kex=self.kex, ncyc=self.ncyc, inv_tcpmg=self.inv_relax_times, tcp=self.tau_cpmg, back_calc=back_calc)
+        jet = func(*jet_variables(values))
+        for i in range(self.num_points):
+            self.assertAlmostEqual(jet.val[i], back_calc[i])
+
+        # The derivatives.
+        self.check_derivs(func, values)
+
+
+    def test_jet_r2eff_CR72(self):
+        """Test the jet_r2eff_CR72() function against the lib.dispersion.cr72 module and finite differences."""
+
+        # The function.
+        func = lambda r20a, r20b, dw, pA, kex: jet_r2eff_CR72(r20a=r20a, r20b=r20b, pA=pA, dw=dw, kex=kex, cpmg_frqs=self.cpmg_frqs)
+        values = [self.r20a, self.r20b, self.dw, self.pA, self.kex]
+
+        # The values.
+        back_calc = zeros(self.num_points, float64)
+        a = ones(self.num_points)
+        r2eff_CR72(r20a=self.r20a*a, r20a_orig=self.r20a, r20b=self.r20b*a, r20b_orig=self.r20b, pA=self.pA, dw=self.dw*a, dw_orig=self.dw*a, kex=self.kex, cpmg_frqs=self.cpmg_frqs, back_calc=back_calc)
+        jet = func(*jet_variables(values))
+        for i in range(self.num_points):
+            self.assertAlmostEqual(jet.val[i], back_calc[i])
+
+        # The derivatives.
+        self.check_derivs(func, values)
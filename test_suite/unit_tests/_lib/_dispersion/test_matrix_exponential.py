@@ -22,14 +22,15 @@
 
 # Python module imports.
 from os import sep
-from numpy import complex64, load, sum
+from numpy import array, complex64, complex128, exp, load, sum, zeros
 from unittest import TestCase
 
 # relax module imports.
+import dep_check
 from lib.dispersion.ns_cpmg_2site_3d import rcpmg_3d_rankN
 from lib.dispersion.ns_mmq_2site import rmmq_2site_rankN
 from lib.linear_algebra.matrix_exponential import matrix_exponential as np_matrix_exponential
-from lib.dispersion.matrix_exponential import matrix_exponential
+from lib.dispersion.matrix_exponential import matrix_exponential, matrix_exponential_2x2, matrix_exponential_pade
 from status import Status; status = Status()
 
 
@@ -243,3 +244,88 @@ class Test_matrix_exponential(TestCase):
                         self.assertAlmostEqual(diff_A_pos_imag_sum, 0.0)
                         self.assertAlmostEqual(diff_A_neg_real_sum, 0.0)
                         self.assertAlmostEqual(diff_A_neg_imag_sum, 0.0)
+
+
+    def test_matrix_exponential_2x2(self):
+        """Test the closed form matrix exponential of 2x2 matrices, including a defective matrix."""
+
+        # The matrices, of dimension [NS][NM][NO][ND][2][2].
+        A = zeros((1, 1, 1, 3, 2, 2), complex64)
+        A[0, 0, 0, 0] = [[-0.5, 1.0], [0.0, -0.5]]
+        A[0, 0, 0, 1] = [[-1.0+2.0j, 0.3], [0.7, -2.0-1.0j]]
+        A[0, 0, 0, 2] = [[0.0, 0.0], [0.0, 0.0]]
+
+        # The exponentials.
+        eA = matrix_exponential_2x2(A)
+
+        # The defective matrix, exp(A) = exp(-0.5) [[1, 1], [0, 1]].
+        self.assertAlmostEqual(eA[0, 0, 0, 0, 0, 0], exp(-0.5))
+        self.assertAlmostEqual(eA[0, 0, 0, 0, 0, 1], exp(-0.5))
+        self.assertAlmostEqual(eA[0, 0, 0, 0, 1, 0], 0.0)
+        self.assertAlmostEqual(eA[0, 0, 0, 0, 1, 1], exp(-0.5))
+
+        # The complex matrix compared to the eigenvalue decomposition.
+        expected = np_matrix_exponential(A[0, 0, 0, 1])
+        for i in range(2):
+            for j in range(2):
+                self.assertAlmostEqual(eA[0, 0, 0, 1, i, j].real, expected[i, j].real, 6)
+                self.assertAlmostEqual(eA[0, 0, 0, 1, i, j].imag, expected[i, j].imag, 6)
+
+        # The zero matrix.
+        self.assertAlmostEqual(eA[0, 0, 0, 2, 0, 0], 1.0)
+        self.assertAlmostEqual(eA[0, 0, 0, 2, 0, 1], 0.0)
+        self.assertAlmostEqual(eA[0, 0, 0, 2, 1, 1], 1.0)
+
+
+    def test_matrix_exponential_2x2_large_kex(self):
+        """Test the closed form matrix exponential of 2x2 exchange matrices with large exchange rates against scipy.linalg.expm."""
+
+        # Skip the test if scipy is not installed.
+        if not dep_check.scipy_module:
+            status.skipped_tests.append(['test_matrix_exponential_2x2_large_kex', 'Scipy', 'unit'])
+            return
+        from scipy.linalg import expm
+
+        # The Bloch-McConnell evolution matrices over tau_CPMG, for exchange rates up to where |Re(delta)| is far above 710.
+        pA = 0.9
+        tcp = 0.0075
+        kex = [800.0, 1e4, 1e5, 3e5, 1e6]
+        A = zeros((1, 1, 1, len(kex), 2, 2), complex128)
+        for di in range(len(kex)):
+            k_AB = (1.0 - pA) * kex[di]
+            k_BA = pA * kex[di]
+            A[0, 0, 0, di] = array([[-10.0 - k_AB, k_BA], [k_AB, -12.0 - k_BA + 3000.0j]]) * tcp
+
+        # The exponentials.
+        eA = matrix_exponential_2x2(A)
+
+        # Compare to scipy.
+        for di in range(len(kex)):
+            expected = expm(A[0, 0, 0, di])
+            for i in range(2):
+                for j in range(2):
+                    self.assertAlmostEqual(eA[0, 0, 0, di, i, j].real, expected[i, j].real, 10)
+                    self.assertAlmostEqual(eA[0, 0, 0, di, i, j].imag, expected[i, j].imag, 10)
+
+
+    def test_matrix_exponential_pade(self):
+        """Test the scaling and squaring Pade matrix exponential for matrices of small and large norm."""
+
+        # A [NE][NS][NM][NO][ND][3][3] stack, with norms spanning the unscaled low degree and the scaled degree 13 approximants.
+        B = array([[-1.0, 0.5, 0.1], [0.2, -2.0, 0.3], [0.0, 0.4, -0.5]])
+        A = zeros((1, 1, 1, 1, 4, 3, 3))
+        for di in range(4):
+            A[0, 0, 0, 0, di] = B * [0.001, 0.1, 1.0, 30.0][di]
+
+        # The exponentials, for the stack and for the first matrix alone.
+        eA = matrix_exponential_pade(A)
+        eA_small = matrix_exponential_pade(A[:, :, :, :, :1])
+
+        # Compare to the eigenvalue decomposition.
+        for di in range(4):
+            expected = np_matrix_exponential(A[0, 0, 0, 0, di])
+            for i in range(3):
+                for j in range(3):
+                    self.assertAlmostEqual(eA[0, 0, 0, 0, di, i, j], expected[i, j])
+                    if di == 0:
+                        self.assertAlmostEqual(eA_small[0, 0, 0, 0, 0, i, j], expected[i, j])
@@ -0,0 +1,76 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import array, complex128, float64, zeros
+from numpy.linalg import matrix_power
+from unittest import TestCase
+
+# relax module imports.
+from lib.dispersion.matrix_power import matrix_power_rankN
+
+
+class Test_matrix_power(TestCase):
+    """Unit tests for the lib.dispersion.matrix_power relax module."""
+
+    def test_matrix_power_rankN(self):
+        """Test the batched matrix power of real matrices against the numpy matrix_power() function."""
+
+        # A [NE][NS][NM][NO][ND][3][3] stack of matrices, with different powers for each dispersion point.
+        data = zeros((1, 2, 2, 1, 4, 3, 3), float64)
+        power = zeros((1, 2, 2, 1, 4), int)
+        for si in range(2):
+            for mi in range(2):
+                for di in range(4):
+                    data[0, si, mi, 0, di] = array([[0.9, 0.1*si, 0.0], [0.05*mi, 0.8, 0.1], [0.02*di, 0.0, 0.7]])
+                    power[0, si, mi, 0, di] = [0, 1, 7, 40][di] + si + 3*mi
+
+        # The matrix powers.
+        calc = matrix_power_rankN(data, power)
+
+        # Check the shape and values.
+        self.assertEqual(calc.shape, data.shape)
+        for si in range(2):
+            for mi in range(2):
+                for di in range(4):
+                    expected = matrix_power(data[0, si, mi, 0, di], int(power[0, si, mi, 0, di]))
+                    for i in range(3):
+                        for j in range(3):
+                            self.assertAlmostEqual(calc[0, si, mi, 0, di, i, j], expected[i, j])
+
+
+    def test_matrix_power_rankN_complex(self):
+        """Test the batched matrix power of complex matrices, including the zeroth power."""
+
+        # A [NS][NM][NO][ND][2][2] stack of complex matrices.
+        data = array([[[[[[0.5+0.5j, 0.1], [0.2j, 0.9]], [[1.0, 0.0], [0.3, 0.5-0.2j]]]]]], complex128)
+        power = array([[[[0, 5]]]])
+
+        # The matrix powers.
+        calc = matrix_power_rankN(data, power)
+
+        # Check the values.
+        self.assertEqual(calc.dtype, complex128)
+        for di in range(2):
+            expected = matrix_power(data[0, 0, 0, di], int(power[0, 0, 0, di]))
+            for i in range(2):
+                for j in range(2):
+                    self.assertAlmostEqual(calc[0, 0, 0, di, i, j], expected[i, j])
@@ -0,0 +1,221 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import array, float64, inf, zeros
+from unittest import TestCase
+
+# relax module imports.
+from lib.optimisation import bounds_from_constraints, grid_batch, newton_batch
+
+
+class Test_optimisation(TestCase):
+    """Unit tests for the functions of the 'lib.optimisation' module."""
+
+    def setUp(self):
+        """Set up a batch of shifted Rosenbrock functions, f = (a - x)^2 + 100(y - x^2)^2, with the minima at [a, a^2]."""
+
+        # The shifts of the problems.
+        self.a = array([1.0, 0.5, -0.8, 2.0], float64)
+
+
+    def func(self, x, index):
+        """The batch of Rosenbrock functions."""
+
+        # The function values.
+        a = self.a[index]
+        return (a - x[:, 0])**2 + 100.0 * (x[:, 1] - x[:, 0]**2)**2
+
+
+    def dfunc(self, x, index):
+        """The gradients of the batch of Rosenbrock functions."""
+
+        # The gradients.
+        a = self.a[index]
+        grad = zeros(x.shape, float64)
+        grad[:, 0] = -2.0 * (a - x[:, 0]) - 400.0 * x[:, 0] * (x[:, 1] - x[:, 0]**2)
+        grad[:, 1] = 200.0 * (x[:, 1] - x[:, 0]**2)
+        return grad
+
+
+    def d2func(self, x, index):
+        """The Hessians of the batch of Rosenbrock functions."""
+
+        # The Hessians.
+        hess = zeros(x.shape + (2,), float64)
+        hess[:, 0, 0] = 2.0 - 400.0 * x[:, 1] + 1200.0 * x[:, 0]**2
+        hess[:, 0, 1] = hess[:, 1, 0] = -400.0 * x[:, 0]
+        hess[:, 1, 1] = 200.0
+        return hess
+
+
+    def test_bounds_from_constraints(self):
+        """Test the conversion of simple linear constraints into parameter bounds."""
+
+        # The constraints 0 <= x0 <= 1 and x1 >= 2.
+        A = array([[1.0, 0.0], [-1.0, 0.0], [0.0, 1.0]])
+        b = array([0.0, -1.0, 2.0])
+        lower, upper = bounds_from_constraints(A=A, b=b, n=2)
+
+        # Check the bounds.
+        self.assertEqual(list(lower), [0.0, 2.0])
+        self.assertEqual(list(upper), [1.0, inf])
+
+
+    def test_bounds_from_constraints_none(self):
+        """Test the conversion of no constraints and of non-simple linear constraints."""
+
+        # No constraints.
+        lower, upper = bounds_from_constraints(n=2)
+        self.assertEqual(list(lower), [-inf, -inf])
+        self.assertEqual(list(upper), [inf, inf])
+
+        # The constraint x0 - x1 >= 0.
+        self.assertEqual(bounds_from_constraints(A=array([[1.0, -1.0]]), b=array([0.0]), n=2), None)
+
+
+    def test_grid_batch(self):
+        """Test the grid search of a Rosenbrock function, evaluated in blocks of grid points."""
+
+        # The vectorised function, recording the number of points per call.
+        sizes = []
+        def func(points):
+            sizes.append(len(points))
+            return self.func(points, 0)
+
+        # The grid search, with the minimum [1, 1] on the grid.
+        x, f, f_count, warning = grid_batch(func=func, lower=[-2.0, -1.0], upper=[2.0, 3.0], inc=[21, 21], block_size=100)
+
+        # Check the results.
+        self.assertAlmostEqual(x[0], 1.0)
+        self.assertAlmostEqual(x[1], 1.0)
+        self.assertAlmostEqual(f, 0.0)
+        self.assertEqual(f_count, 441)
+        self.assertEqual(warning, None)
+        self.assertEqual(sizes, [100, 100, 100, 100, 41])
+
+
+    def test_grid_batch_constraints(self):
+        """Test the grid search with linear constraints and a single increment dimension."""
+
+        # The function, with the minimum at the lowest x value and equal along y.
+        func = lambda points: points[:, 0]**2
+
+        # The grid search with the constraints x >= 0.5 and y <= 2.0.
+        A = array([[1.0, 0.0], [0.0, -1.0]])
+        b = array([0.5, -2.0])
+        x, f, f_count, warning = grid_batch(func=func, lower=[0.0, 1.0], upper=[1.0, 3.0], inc=[5, 3], A=A, b=b, block_size=4)
+
+        # The first point in the grid order (x varying the fastest) is returned.
+        self.assertEqual(list(x), [0.5, 1.0])
+        self.assertEqual(f, 0.25)
+        self.assertEqual(f_count, 6)
+
+        # A single increment dimension uses the lower bound.
+        x, f, f_count, warning = grid_batch(func=func, lower=[0.2, 1.0], upper=[1.0, 3.0], inc=[1, 3])
+        self.assertEqual(list(x), [0.2, 1.0])
+        self.assertEqual(f_count, 3)
+
+
+    def test_newton_batch(self):
+        """Test the unconstrained optimisation of a batch of Rosenbrock functions."""
+
+        # Optimisation from the same starting position.
+        x0 = array([[-1.2, 1.0]] * 4)
+        x, f, iter_count, f_count, g_count, h_count, warnings = newton_batch(func=self.func, dfunc=self.dfunc, d2func=self.d2func, x0=x0, func_tol=1e-25, maxiter=1000)
+
+        # Check the minima of all problems.
+        for i in range(4):
+            self.assertAlmostEqual(x[i, 0], self.a[i], 6)
+            self.assertAlmostEqual(x[i, 1], self.a[i]**2, 6)
+            self.assertAlmostEqual(f[i], 0.0)
+            self.assertEqual(warnings[i], None)
+
+        # The converged problems must have been dropped from the batch.
+        self.assertEqual(list(f_count), list(iter_count + 1))
+        self.assertEqual(list(g_count), list(h_count))
+        self.assertTrue(min(iter_count) < max(iter_count))
+
+
+    def test_newton_batch_derivs(self):
+        """Test that the gradients and Hessians are only recalculated for the new positions after accepted steps."""
+
+        # The positions of the gradient and Hessian calls of each problem.
+        positions = {'dfunc': [[] for i in range(4)], 'd2func': [[] for i in range(4)]}
+        def dfunc(x, index):
+            for i in range(len(index)):
+                positions['dfunc'][index[i]].append(tuple(x[i]))
+            return self.dfunc(x, index)
+        def d2func(x, index):
+            for i in range(len(index)):
+                positions['d2func'][index[i]].append(tuple(x[i]))
+            return self.d2func(x, index)
+
+        # Optimisation.
+        x0 = array([[-1.2, 1.0]] * 4)
+        x, f, iter_count, f_count, g_count, h_count, warnings = newton_batch(func=self.func, dfunc=dfunc, d2func=d2func, x0=x0, func_tol=1e-25, maxiter=1000)
+
+        # The derivatives are never recalculated for the same position.
+        for i in range(4):
+            self.assertEqual(positions['dfunc'][i], positions['d2func'][i])
+            self.assertEqual(len(set(positions['dfunc'][i])), len(positions['dfunc'][i]))
+            self.assertEqual(g_count[i], len(positions['dfunc'][i]))
+            self.assertEqual(h_count[i], len(positions['d2func'][i]))
+
+        # Steps have been rejected, so that fewer derivatives than iterations were needed.
+        self.assertTrue(sum(g_count) < sum(iter_count))
+
+
+    def test_newton_batch_bounds(self):
+        """Test the bound constrained optimisation of a batch of Rosenbrock functions."""
+
+        # Optimisation within x <= 0.6.
+        x0 = array([[0.0, 0.0]] * 4)
+        lower = array([-inf, -inf])
+        upper = array([0.6, inf])
+        x, f, iter_count, f_count, g_count, h_count, warnings = newton_batch(func=self.func, dfunc=self.dfunc, d2func=self.d2func, x0=x0, lower=lower, upper=upper, maxiter=1000)
+
+        # The problems with the minimum outside of the bounds should end on the bound.
+        for i in range(4):
+            a = min(self.a[i], 0.6)
+            self.assertAlmostEqual(x[i, 0], a, 6)
+            self.assertAlmostEqual(x[i, 1], a**2, 6)
+
+
+    def test_newton_batch_maxiter(self):
+        """Test the maximum iteration warning and an undefined starting position."""
+
+        # The target function, infinite for the last problem.
+        def func(x, index):
+            f = self.func(x, index)
+            f[index == 3] = inf
+            return f
+
+        # Optimisation.
+        x0 = array([[-1.2, 1.0]] * 4)
+        x, f, iter_count, f_count, g_count, h_count, warnings = newton_batch(func=func, dfunc=self.dfunc, d2func=self.d2func, x0=x0, maxiter=2)
+
+        # Check the warnings.
+        for i in range(3):
+            self.assertEqual(warnings[i], "Maximum number of iterations reached")
+            self.assertEqual(iter_count[i], 2)
+        self.assertEqual(warnings[3], "Infinite function value encountered.")
+        self.assertEqual(iter_count[3], 0)
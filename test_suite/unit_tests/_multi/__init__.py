@@ -20,5 +20,10 @@
 ###############################################################################
 
 
-__all__ = ['test___init__'
+__all__ = ['test___init__',
+           'test_journal',
+           'test_multi_processor_base',
+           'test_result_queue',
+           'test_shared_data',
+           'test_telemetry'
 ]
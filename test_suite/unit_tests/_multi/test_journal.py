@@ -0,0 +1,95 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+
+# Python module imports.
+from os import close
+from tempfile import mkstemp
+from unittest import TestCase
+
+# relax module imports.
+from multi.journal import Job_journal
+from test_suite.clean_up import deletion
+
+
+class Test_journal(TestCase):
+    """Unit tests for the functions of the 'multi.journal' module."""
+
+    def setUp(self):
+        """Set up for all unit tests."""
+
+        # A temporary file.
+        fd, self.tmpfile = mkstemp(suffix='.journal')
+        close(fd)
+
+
+    def tearDown(self):
+        """Remove the temporary file."""
+
+        # Remove the temporary file and variable.
+        deletion(obj=self, name='tmpfile', dir=False)
+
+
+    def test_record(self):
+        """Test the recording and reloading of results with the multi.journal.Job_journal class."""
+
+        # Record two commands.
+        journal = Job_journal(file_name=self.tmpfile)
+        journal.record('a', ['result a'])
+        journal.record('b', ['result b1', 'result b2'])
+        journal.close()
+
+        # Reload.
+        journal = Job_journal(file_name=self.tmpfile)
+        self.assert_(journal.has('a'))
+        self.assert_(journal.has('b'))
+        self.assert_(not journal.has('c'))
+        self.assertEqual(journal.results('b'), ['result b1', 'result b2'])
+        journal.close()
+
+
+    def test_truncated(self):
+        """Test the recovery of a journal truncated by a crash with the multi.journal.Job_journal class."""
+
+        # Record two commands.
+        journal = Job_journal(file_name=self.tmpfile)
+        journal.record('a', ['result a'])
+        journal.record('b', ['result b'])
+        journal.close()
+
+        # Truncate the last record.
+        file = open(self.tmpfile, 'r+b')
+        file.seek(-5, 2)
+        file.truncate()
+        file.close()
+
+        # Reload, and append a new record.
+        journal = Job_journal(file_name=self.tmpfile)
+        self.assert_(journal.has('a'))
+        self.assert_(not journal.has('b'))
+        journal.record('c', ['result c'])
+        journal.close()
+
+        # The new record is readable.
+        journal = Job_journal(file_name=self.tmpfile)
+        self.assert_(journal.has('a'))
+        self.assert_(journal.has('c'))
+        journal.close()
@@ -0,0 +1,299 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from unittest import TestCase
+
+# relax module imports.
+from multi.memo import Memo
+from multi.multi_processor_base import Multi_processor
+from multi.result_commands import Null_result_command
+from multi.slave_commands import Data_cache_clear_command, Slave_command
+
+
+class Cache_command(Slave_command):
+    """A slave command using cached data."""
+
+    def __init__(self, name=None, version=None):
+        """Store the name and version of the cached data."""
+
+        super(Cache_command, self).__init__()
+        self.cache_name = name
+        self.cache_version = version
+
+
+
+class Dummy_command(Slave_command):
+    """A slave command with a cost hint."""
+
+    def __init__(self, cost=None):
+        """Store the cost hint."""
+
+        super(Dummy_command, self).__init__()
+        self._cost = cost
+
+
+    def cost(self):
+        """Return the cost hint."""
+
+        return self._cost
+
+
+
+class Dummy_processor(Multi_processor):
+    """A master processor without any inter-processor communication."""
+
+    def assert_on_master(self):
+        """Always the master."""
+
+
+    def rank(self):
+        """Always the master."""
+
+        return 0
+
+
+    def run_command_globally(self, command):
+        """Record the command rather than sending it to the slaves."""
+
+        if not hasattr(self, 'global_commands'):
+            self.global_commands = []
+        self.global_commands.append(command)
+
+
+
+class Serial_processor(Dummy_processor):
+    """A master processor executing the commands sent to the slaves in turn, as they are received."""
+
+    def master_queue_command(self, command, dest):
+        """Store the command for the given slave, together with a copy of what would be transferred."""
+
+        if not hasattr(self, 'sent'):
+            self.sent = []
+            self.transferred = []
+        self.sent.append((command, dest))
+        self.transferred.append((dest, getattr(command, 'cache_value', None), getattr(command, 'cache_evict', [])))
+
+
+    def master_receive_result(self):
+        """Record the number of memos held, then return the null result of the oldest command."""
+
+        if not hasattr(self, 'memo_counts'):
+            self.memo_counts = []
+        self.memo_counts.append(len(self.memo_map))
+        command, dest = self.sent.pop(0)
+        result = Null_result_command(processor=self, completed=True)
+        result.rank = dest
+        return result
+
+
+
+class Test_multi_processor_base(TestCase):
+    """Unit tests for the functions of the 'multi.multi_processor_base' module."""
+
+    def setUp(self):
+        """Set up for all unit tests."""
+
+        # A processor with 4 slaves.
+        self.processor = Dummy_processor(processor_size=4, callback=None)
+
+
+    def test_cache_data(self):
+        """Test the versioned data cache of the multi.processor.Processor.cache_data() method on the master."""
+
+        # Cache the data, then cache it again unchanged.
+        version = self.processor.cache_data(name='a', value={'x': [1, 2, 3]})
+        self.assertEqual(self.processor.cache_data(name='a', value={'x': [1, 2, 3]}), version)
+        self.assertEqual(self.processor.fetch_cached_data(name='a', version=version), {'x': [1, 2, 3]})
+
+        # Nothing is sent to the slaves.
+        self.assert_(not hasattr(self.processor, 'global_commands'))
+
+        # Changed data is stored as a new version, and the old version remains available for the commands already created.
+        version2 = self.processor.cache_data(name='a', value={'x': [1, 2, 4]})
+        self.assertNotEqual(version2, version)
+        self.assertEqual(self.processor.fetch_cached_data(name='a', version=version2), {'x': [1, 2, 4]})
+        self.assertEqual(self.processor.fetch_cached_data(name='a', version=version), {'x': [1, 2, 3]})
+
+        # Eviction of a single version.
+        self.processor.evict_cached_data(name='a', version=version)
+        self.assertRaises(Exception, self.processor.fetch_cached_data, name='a', version=version)
+        self.assertEqual(self.processor.fetch_cached_data(name='a', version=version2), {'x': [1, 2, 4]})
+
+        # Discarding a held queue clears the cache.
+        self.processor.hold_queue()
+        self.processor.release_queue(run=False)
+        self.assertRaises(Exception, self.processor.fetch_cached_data, name='a', version=version2)
+
+
+    def test_cache_data_dispatch(self):
+        """Test the sending of the cached data with the first command using it on each slave, and its eviction, by the multi.processor.Processor.run_command_queue() method."""
+
+        # A processor with two slaves.
+        processor = Serial_processor(processor_size=2, callback=None)
+        processor.threaded_result_processing = False
+
+        # Cache the data for four commands, dispatched in the reverse order.
+        version_a = processor.cache_data(name='a', value=[1, 2, 3])
+        version_b = processor.cache_data(name='b', value=[4])
+        queue = [Cache_command('a', version_a), Cache_command('a', version_a), Cache_command('a', version_a), Cache_command('b', version_b)]
+        processor.run_command_queue(queue)
+
+        # The data is sent to each slave only once, and the eviction of the data 'b' after its only command has completed is sent with the next command to the same slave.
+        dest_b = processor.transferred[0][0]
+        dest_a = processor.transferred[1][0]
+        self.assertNotEqual(dest_a, dest_b)
+        self.assertEqual(processor.transferred, [
+            (dest_b, [4], []),
+            (dest_a, [1, 2, 3], []),
+            (dest_b, [1, 2, 3], ['b']),
+            (dest_a, None, [])
+        ])
+
+        # All data has been evicted from the master after the last command using it, with the eviction of 'a' pending for both slaves.
+        self.assertEqual(processor._data_cache, {})
+        self.assertEqual(processor._data_cache_users, {})
+        self.assertEqual(processor._slave_data_evict, {dest_a: ['a'], dest_b: ['a']})
+
+        # The end of the queue clears the cache of the slaves.
+        processor.flush_cached_data()
+        self.assertEqual(len(processor.global_commands), 1)
+        self.assert_(isinstance(processor.global_commands[0], Data_cache_clear_command))
+        self.assertEqual(processor._slave_data_cache, {})
+        self.assertEqual(processor._slave_data_evict, {})
+
+        # Nothing is sent when the slaves hold no data.
+        processor.flush_cached_data()
+        self.assertEqual(len(processor.global_commands), 1)
+
+
+    def test_receive_cached_data(self):
+        """Test the storage and eviction of the data sent with the commands by the multi.processor.Processor.receive_cached_data() method on the slaves."""
+
+        # The data sent with the command.
+        command = Cache_command('a', 'v1')
+        command.cache_value = [1, 2, 3]
+        self.processor.receive_cached_data(command)
+        self.assertEqual(self.processor.fetch_cached_data(name='a', version='v1'), [1, 2, 3])
+        self.assert_(not hasattr(command, 'cache_value'))
+
+        # A command without data leaves the cache unchanged.
+        command = Cache_command('b', 'v1')
+        command.cache_value = [4]
+        self.processor.receive_cached_data(command)
+        self.processor.receive_cached_data(Cache_command('b', 'v1'))
+        self.assertEqual(self.processor.fetch_cached_data(name='b', version='v1'), [4])
+
+        # A new version replaces the old one, together with an eviction.
+        command = Cache_command('a', 'v2')
+        command.cache_value = [1, 2, 4]
+        command.cache_evict = ['b']
+        self.processor.receive_cached_data(command)
+        self.assertEqual(self.processor._data_cache, {'a': {'v2': [1, 2, 4]}})
+        self.assert_(not hasattr(command, 'cache_evict'))
+
+        # Clearing of the cache.
+        command = Data_cache_clear_command()
+        command.run(self.processor, True)
+        self.assertEqual(self.processor._data_cache, {})
+
+
+    def test_chunk_queue(self):
+        """Test the guided self-scheduling of the multi.multi_processor_base.Multi_processor.chunk_queue() method."""
+
+        # A queue of many cheap commands and a few expensive ones.
+        queue = []
+        for i in range(100):
+            queue.append(Dummy_command(cost=1.0))
+        for i in range(3):
+            queue.append(Dummy_command(cost=50.0))
+
+        # Chunk.
+        chunks = self.processor.chunk_queue(queue)
+
+        # All commands are present only once.
+        commands = []
+        for chunk in chunks:
+            commands += chunk
+        self.assertEqual(len(commands), len(queue))
+        for command in queue:
+            self.assert_(command in commands)
+
+        # The first dispatched chunk (the last element) is a single expensive command.
+        self.assertEqual(len(chunks[-1]), 1)
+        self.assertEqual(chunks[-1][0].cost(), 50.0)
+
+        # The chunks shrink towards the end of the queue, but only the remainder is smaller than the minimum.
+        costs = [self.processor.command_cost(chunk) for chunk in chunks]
+        self.assertEqual(costs, [8.0, 16.0, 16.0, 16.0, 19.0, 25.0, 50.0, 50.0, 50.0])
+        for cost in costs[1:]:
+            self.assert_(cost >= 0.25 * 250.0 / 4.0)
+
+
+    def test_chunk_queue_no_cost(self):
+        """Test the multi.multi_processor_base.Multi_processor.chunk_queue() method for commands without cost hints."""
+
+        # A queue of 10 commands without cost hints.
+        queue = [Dummy_command() for i in range(10)]
+
+        # Chunk.
+        chunks = self.processor.chunk_queue(queue)
+
+        # Equal count chunks.
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 2, 2])
+
+
+    def test_hold_queue(self):
+        """Test the holding of the queue by the multi.processor.Processor.hold_queue() method."""
+
+        # Hold the queue, and queue some commands.
+        self.processor.hold_queue()
+        for i in range(3):
+            self.processor.add_to_queue(Dummy_command())
+            self.processor.run_queue()
+
+        # The commands have accumulated.
+        self.assert_(self.processor.is_queued())
+        self.assertEqual(len(self.processor.command_queue), 3)
+
+        # Release the queue, discarding the commands.
+        self.processor.release_queue(run=False)
+        self.assert_(not self.processor.queue_held)
+        self.assert_(not self.processor.is_queued())
+
+
+    def test_release_memos(self):
+        """Test the release of the memos of commands returning only the null result by the multi.processor.Processor.run_queue() method."""
+
+        # A processor with a single slave, and one command per chunk.
+        processor = Serial_processor(processor_size=1, callback=None)
+        processor.chunk_queue = lambda queue: [[command] for command in queue]
+        processor.threaded_result_processing = False
+
+        # Queue commands with memos.
+        for i in range(3):
+            processor.add_to_queue(Dummy_command(), Memo())
+        self.assertEqual(len(processor.memo_map), 3)
+
+        # Each memo is released as soon as its command has completed.
+        processor.run_queue()
+        self.assertEqual(processor.memo_counts, [3, 2, 1])
+        self.assertEqual(len(processor.memo_map), 0)
@@ -0,0 +1,62 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+
+# Python module imports.
+from os.path import exists
+from unittest import TestCase
+
+# relax module imports.
+from multi.result_queue import Spilled_result
+
+
+class Dummy_result(object):
+    """A picklable result object."""
+
+    def __init__(self):
+        """Set up some data."""
+
+        self.data = list(range(10))
+
+
+
+class Test_result_queue(TestCase):
+    """Unit tests for the functions of the 'multi.result_queue' module."""
+
+    def test_spilled_result(self):
+        """Test the spilling of results to disk by the multi.result_queue.Spilled_result class."""
+
+        # A result with a telemetry record.
+        result = Dummy_result()
+        record = {'processing_time': None}
+        result.telemetry_record = record
+
+        # Spill the result.
+        spilled = Spilled_result(result)
+        self.assert_(exists(spilled.file_name))
+
+        # Load the result back.
+        loaded = spilled.load()
+        self.assertEqual(loaded.data, result.data)
+        self.assert_(loaded.telemetry_record is record)
+
+        # The temporary file has been removed.
+        self.assert_(not exists(spilled.file_name))
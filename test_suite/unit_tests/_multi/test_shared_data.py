@@ -0,0 +1,54 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+
+# Python module imports.
+from numpy import arange, float64, int32, zeros
+from unittest import TestCase
+
+# relax module imports.
+from multi.shared_data import Shared_array, create_handle, fetch_shared
+
+
+class Test_shared_data(TestCase):
+    """Unit tests for the functions of the 'multi.shared_data' module."""
+
+    def test_create_handle(self):
+        """Test the multi.shared_data.create_handle() function."""
+
+        # Create the handle.
+        handle = create_handle(name='test', value=zeros((10, 3, 3), float64))
+
+        # Check the handle.
+        self.assert_(isinstance(handle, Shared_array))
+        self.assertEqual(handle.name, 'test')
+        self.assertEqual(handle.shape, (10, 3, 3))
+        self.assertEqual(handle.nbytes(), 10*3*3*8)
+        self.assertEqual(handle.key, None)
+
+
+    def test_fetch_shared(self):
+        """Test the pass through of non-handle objects by the multi.shared_data.fetch_shared() function."""
+
+        # Non-handles.
+        array = arange(5, dtype=int32)
+        self.assert_(fetch_shared(array) is array)
+        self.assertEqual(fetch_shared(None), None)
@@ -0,0 +1,94 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+
+# Python module imports.
+import json
+from os import close
+from tempfile import mkstemp
+from unittest import TestCase
+
+# relax module imports.
+from multi.slave_commands import Slave_command
+from multi.telemetry import Telemetry
+from test_suite.clean_up import deletion
+
+
+class Dummy_result(object):
+    """A result object holding the slave metrics."""
+
+    def __init__(self):
+        """Set up the slave metrics."""
+
+        self.timing = {'exec_time': 1.0, 'result_size': 100}
+
+
+
+class Test_telemetry(TestCase):
+    """Unit tests for the functions of the 'multi.telemetry' module."""
+
+    def setUp(self):
+        """Set up for all unit tests."""
+
+        # A temporary file.
+        fd, self.tmpfile = mkstemp(suffix='.json')
+        close(fd)
+
+
+    def tearDown(self):
+        """Remove the temporary file."""
+
+        # Remove the temporary file and variable.
+        deletion(obj=self, name='tmpfile', dir=False)
+
+
+    def test_records(self):
+        """Test the collection and export of the metrics by the multi.telemetry.Telemetry class."""
+
+        # Dispatch a chunk of two commands to rank 2, and receive the result.
+        telemetry = Telemetry()
+        telemetry.start_queue()
+        record = telemetry.dispatch([Slave_command(), Slave_command()], 2)
+        result = Dummy_result()
+        telemetry.receive(record, result)
+        telemetry.end_queue()
+
+        # Check the record.
+        self.assert_(result.telemetry_record is record)
+        self.assertEqual(record['queue'], 0)
+        self.assertEqual(record['item'], 0)
+        self.assertEqual(record['rank'], 2)
+        self.assertEqual(record['commands'], 2)
+        self.assertEqual(record['name'], 'Slave_command')
+        self.assertEqual(record['exec_time'], 1.0)
+        self.assertEqual(record['result_size'], 100)
+        self.assert_(record['command_size'] > 0)
+
+        # The summary.
+        self.assert_('Utilisation' in telemetry.summary())
+
+        # Export to JSON and read the file back.
+        telemetry.write(file_name=self.tmpfile)
+        file = open(self.tmpfile)
+        data = json.load(file)
+        file.close()
+        self.assertEqual(len(data['records']), 1)
+        self.assertEqual(sorted(data['records'][0].keys()), sorted(Telemetry.fields))
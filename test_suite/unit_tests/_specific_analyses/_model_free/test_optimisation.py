@@ -0,0 +1,68 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import array
+from unittest import TestCase
+
+# relax module imports.
+from specific_analyses.model_free.optimisation import MF_minimise_command
+
+
+class Data:
+    """A minimal model-free data container."""
+
+    def __init__(self, ri_data=None):
+        self.model_type = 'mf'
+        self.spin_id = ':1@N'
+        self.ri_data = [array(ri_data)]
+        self.ri_data_err = [array([0.1, 0.1, 0.1])]
+
+
+
+class Test_optimisation(TestCase):
+    """Unit tests for the functions of the 'specific_analyses.model_free.optimisation' module."""
+
+    def command(self, ri_data=None, sim_index=None):
+        """Return a model-free minimisation command with the given relaxation data."""
+
+        command = MF_minimise_command()
+        command.store_data(Data(ri_data=ri_data), {'min_algor': 'newton'}, sim_index=sim_index)
+        return command
+
+
+    def test_identity(self):
+        """Test the journal identity of the MF_minimise_command class for normal optimisation."""
+
+        # The identity depends on the relaxation data.
+        self.assertEqual(self.command(ri_data=[1.0, 2.0, 0.8]).identity(), self.command(ri_data=[1.0, 2.0, 0.8]).identity())
+        self.assertNotEqual(self.command(ri_data=[1.0, 2.0, 0.8]).identity(), self.command(ri_data=[1.1, 2.0, 0.8]).identity())
+
+
+    def test_identity_sim(self):
+        """Test the journal identity of the MF_minimise_command class for Monte Carlo simulations."""
+
+        # The randomised relaxation data of the simulations, regenerated in each run, is excluded.
+        self.assertEqual(self.command(ri_data=[1.0, 2.0, 0.8], sim_index=3).identity(), self.command(ri_data=[1.1, 1.9, 0.7], sim_index=3).identity())
+
+        # The simulations are distinguished by their index.
+        self.assertNotEqual(self.command(ri_data=[1.0, 2.0, 0.8], sim_index=3).identity(), self.command(ri_data=[1.0, 2.0, 0.8], sim_index=4).identity())
+        self.assertNotEqual(self.command(ri_data=[1.0, 2.0, 0.8], sim_index=3).identity(), self.command(ri_data=[1.0, 2.0, 0.8]).identity())
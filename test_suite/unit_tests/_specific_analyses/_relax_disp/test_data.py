@@ -27,8 +27,8 @@ from os import sep
 from data_store import Relax_data_store; ds = Relax_data_store()
 from math import atan, pi
 from pipe_control import state
-from pipe_control.mol_res_spin import get_spin_ids, return_spin
-from specific_analyses.relax_disp.data import calc_rotating_frame_params, count_relax_times, find_intensity_keys, get_curve_type, has_exponential_exp_type, loop_exp_frq, loop_exp_frq_offset, loop_exp_frq_offset_point, loop_exp_frq_offset_point_time, loop_time, return_offset_data, return_spin_lock_nu1
+from pipe_control.mol_res_spin import get_spin_ids, return_spin, spin_loop
+from specific_analyses.relax_disp.data import calc_rotating_frame_params, count_relax_times, find_intensity_keys, get_curve_type, has_exponential_exp_type, loop_exp_frq, loop_exp_frq_offset, loop_exp_frq_offset_point, loop_exp_frq_offset_point_time, loop_time, relax_time, return_offset_data, return_param_key_from_data, return_r2eff_arrays, return_spin_lock_nu1, spectrum_index_ids
 from status import Status; status = Status()
 from test_suite.unit_tests.base_classes import UnitTestCase
 
@@ -745,4 +745,74 @@ class Test_data(UnitTestCase):
                     self.assertAlmostEqual(tilt_angles[ei][si][mi][oi][di], c_theta, 15)
 
 
+    def test_return_r2eff_arrays_cpmg(self):
+        """Unit test of the return_r2eff_arrays() function and its use of the cluster cache.
 
+        This uses the data of the saved state attached to U{bug #21665<https://gna.org/bugs/?21665>}.
+        """
+
+        # Load the state.
+        statefile = status.install_path + sep+'test_suite'+sep+'shared_data'+sep+'dispersion'+sep+'bug_21665.bz2'
+        state.load_state(statefile, force=True)
+
+        # The spin cluster.
+        spins = []
+        spin_ids = []
+        for spin, spin_id in spin_loop(return_id=True):
+            spins.append(spin)
+            spin_ids.append(spin_id)
+        fields = cdp.spectrometer_frq_list
+
+        # No R2eff data is present.
+        values, errors, missing, frqs, frqs_H, exp_types, relax_times = return_r2eff_arrays(spins=spins, spin_ids=spin_ids, fields=fields, field_count=len(fields))
+        self.assertEqual(len(values[0]), 5)
+        self.assertEqual(missing[0][0][0][0][0], 1)
+
+        # Add the first data point, which is picked up with the cached layout.
+        for exp_type, frq, offset, point in loop_exp_frq_offset_point():
+            key = return_param_key_from_data(exp_type=exp_type, frq=frq, offset=offset, point=point)
+            break
+        spins[0].r2eff[key] = 10.0
+        if not hasattr(spins[0], 'r2eff_err'):
+            spins[0].r2eff_err = {}
+        spins[0].r2eff_err[key] = 0.5
+        values, errors, missing, frqs, frqs_H, exp_types, relax_times = return_r2eff_arrays(spins=spins, spin_ids=spin_ids, fields=fields, field_count=len(fields))
+        self.assertEqual(values[0][0][0][0][0], 10.0)
+        self.assertEqual(errors[0][0][0][0][0], 0.5)
+        self.assertEqual(missing[0][0][0][0][0], 0)
+        self.assertEqual(missing[0][1][0][0][0], 1)
+
+        # Deselecting a spin changes the layout.
+        spins[1].select = False
+        values, errors, missing, frqs, frqs_H, exp_types, relax_times = return_r2eff_arrays(spins=spins, spin_ids=spin_ids, fields=fields, field_count=len(fields))
+        self.assertEqual(len(values[0]), 4)
+
+
+    def test_spectrum_index_ids_r1rho(self):
+        """Unit test of the spectrum_index_ids() function for R1rho setup.
+
+        This uses the data of the saved state attached to U{bug #21344<https://gna.org/bugs/?21344>}.
+        """
+
+        # Load the state.
+        statefile = status.install_path + sep+'test_suite'+sep+'shared_data'+sep+'dispersion'+sep+'bug_21344_trunc.bz2'
+        state.load_state(statefile, force=True)
+
+        # Compare the index look ups to a scan over all spectrum IDs.
+        for id in cdp.spectrum_ids:
+            exp_type = cdp.exp_type[id]
+            frq = cdp.spectrometer_frq[id]
+            offset = cdp.spin_lock_offset[id]
+            point = cdp.spin_lock_nu1[id]
+            time = cdp.relax_times[id]
+            ids = []
+            for id2 in cdp.spectrum_ids:
+                if cdp.exp_type[id2] == exp_type and cdp.spectrometer_frq[id2] == frq and cdp.spin_lock_offset[id2] == offset and cdp.spin_lock_nu1[id2] == point and cdp.relax_times[id2] == time:
+                    ids.append(id2)
+            self.assertEqual(spectrum_index_ids(exp_type=exp_type, frq=frq, offset=offset, point=point, time=time), ids)
+            self.assertTrue(id in spectrum_index_ids(exp_type=exp_type, point=point))
+
+        # The index is updated by the relax_disp.relax_time user function.
+        id = cdp.spectrum_ids[0]
+        relax_time(time=10.0, spectrum_id=id)
+        self.assertEqual(spectrum_index_ids(time=10.0), [id])
@@ -0,0 +1,79 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import array, exp, isinf, linspace, ones, zeros
+from numpy.linalg import inv
+
+# relax module imports.
+from specific_analyses.relax_disp.estimate_r2eff import fit_exp_lm
+from test_suite.unit_tests.base_classes import UnitTestCase
+
+
+class Test_estimate_r2eff(UnitTestCase):
+    """Unit tests for the functions of the specific_analyses.relax_disp.estimate_r2eff module."""
+
+
+    def test_fit_exp_lm(self):
+        """Unit test of the vectorised Levenberg-Marquardt optimisation of the fit_exp_lm() function."""
+
+        # Three noise free curves, the last padded from 6 to 4 time points.
+        r2eff = array([5.0, 12.0, 25.0])
+        i0 = array([1000.0, 50000.0, 2000.0])
+        times = zeros((3, 6))
+        times[:] = linspace(0.0, 0.2, 6)
+        values = i0[:, None] * exp(-r2eff[:, None] * times)
+        errors = ones((3, 6)) * 10.0
+        mask = zeros((3, 6))
+        mask[2, 4:] = 1.0
+        values[2, 4:] = 0.0
+
+        # Optimise from poor starting positions.
+        x0 = array([[1.0, 500.0], [20.0, 60000.0], [15.0, 1000.0]])
+        params, chi2, iter_count, covar = fit_exp_lm(params=x0, values=values, errors=errors, relax_times=times, mask=mask)
+
+        # Check the solution.
+        for i in range(3):
+            self.assertAlmostEqual(params[i, 0], r2eff[i], 6)
+            self.assertAlmostEqual(params[i, 1] / i0[i], 1.0, 6)
+            self.assertAlmostEqual(chi2[i], 0.0, 6)
+            self.assertTrue(iter_count[i] > 0)
+
+        # The covariance matrix of the padded curve, (J^T.W.J)^-1 from the 4 unmasked time points.
+        t = times[2, :4]
+        e = exp(-r2eff[2] * t)
+        jac = array([-t * i0[2] * e, e]).T
+        cov = inv(jac.T.dot(jac) / 100.0)
+        for j in range(2):
+            for k in range(2):
+                self.assertAlmostEqual(covar[2, j, k] / cov[j, k], 1.0, 5)
+
+
+    def test_fit_exp_lm_singular(self):
+        """Unit test of the fit_exp_lm() function for a curve with a singular covariance matrix."""
+
+        # All time points at zero, so the r2eff parameter is undetermined.
+        params, chi2, iter_count, covar = fit_exp_lm(params=array([[1.0, 1.0]]), values=array([[2.0, 2.0]]), errors=ones((1, 2)), relax_times=zeros((1, 2)))
+
+        # Checks.
+        self.assertAlmostEqual(params[0, 1], 2.0)
+        self.assertAlmostEqual(chi2[0], 0.0)
+        self.assertTrue(isinf(covar[0]).all())
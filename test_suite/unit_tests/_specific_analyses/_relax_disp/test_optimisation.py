@@ -0,0 +1,271 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import eye
+from os import sep
+
+# relax module imports.
+from data_store import Relax_data_store; ds = Relax_data_store()
+from lib.dispersion.variables import EXP_TYPE_R1RHO, MODEL_PARAMS_TP02, MODEL_TP02
+from multi.uni_processor import Uni_processor
+from pipe_control import pipes, state
+from pipe_control.mol_res_spin import return_spin
+from pipe_control.pipes import cdp_name
+from specific_analyses.relax_disp import optimisation
+from specific_analyses.relax_disp.data import generate_r20_key, interpolate_offset, loop_exp_frq_offset_point, return_param_key_from_data, return_r2eff_arrays
+from specific_analyses.relax_disp.optimisation import BACK_CALC_MEMO, Disp_memo, Disp_result_command, back_calc_r2eff
+from specific_analyses.relax_disp.parameters import assemble_param_vector
+from status import Status; status = Status()
+from test_suite.unit_tests.base_classes import UnitTestCase
+
+
+class Test_optimisation(UnitTestCase):
+    """Unit tests for the functions of the specific_analyses.relax_disp.optimisation module."""
+
+    def setUp(self):
+        """Set up a cluster of two spins with the TP02 model, using the R1rho setup of the saved state attached to U{bug #21344<https://gna.org/bugs/?21344>}."""
+
+        # Create a dispersion data pipe.
+        ds.add(pipe_name='orig', pipe_type='relax_disp')
+
+        # Load the state.
+        statefile = status.install_path + sep+'test_suite'+sep+'shared_data'+sep+'dispersion'+sep+'bug_21344_trunc.bz2'
+        state.load_state(statefile, force=True)
+
+        # The model setup.
+        cdp.model_type = 'disp'
+        cdp.r1_fit = True
+        r20_key = generate_r20_key(exp_type=EXP_TYPE_R1RHO, frq=cdp.spectrometer_frq_list[0])
+
+        # The spins of the cluster, with some R1rho data.
+        self.spin_ids = [':5@N', ':6@N']
+        self.spins = []
+        for i in range(len(self.spin_ids)):
+            spin = return_spin(self.spin_ids[i])
+            spin.model = MODEL_TP02
+            spin.params = ['r1'] + MODEL_PARAMS_TP02
+            spin.r1 = {r20_key: 1.5}
+            spin.r2 = {r20_key: 10.0 + i}
+            spin.pA = 0.9
+            spin.dw = 2.0 + i
+            spin.kex = 1000.0
+            spin.r2eff = {}
+            spin.r2eff_err = {}
+            for exp_type, frq, offset, point in loop_exp_frq_offset_point():
+                key = return_param_key_from_data(exp_type=exp_type, frq=frq, offset=offset, point=point)
+                spin.r2eff[key] = 10.0
+                spin.r2eff_err[key] = 0.1
+            self.spins.append(spin)
+
+        # Empty the back-calculation memo.
+        BACK_CALC_MEMO.clear()
+
+
+    def tearDown(self):
+        """Empty the back-calculation memo and reset the relax data storage object."""
+
+        # Empty the memo.
+        BACK_CALC_MEMO.clear()
+
+        # Reset.
+        super(Test_optimisation, self).tearDown()
+
+
+    def assert_back_calc_equal(self, back_calc1, back_calc2):
+        """Check that two back-calculated R2eff/R1rho data structures {Ei, Si, Mi, Oi, Di} are the same.
+
+        @param back_calc1:  The first back-calculated R2eff/R1rho values.
+        @type back_calc1:   rank-4 list of numpy rank-1 float arrays
+        @param back_calc2:  The second back-calculated R2eff/R1rho values.
+        @type back_calc2:   rank-4 list of numpy rank-1 float arrays
+        """
+
+        # Compare the structures.
+        self.assertEqual(len(back_calc1), len(back_calc2))
+        for ei in range(len(back_calc1)):
+            self.assertEqual(len(back_calc1[ei]), len(back_calc2[ei]))
+            for si in range(len(back_calc1[ei])):
+                self.assertEqual(len(back_calc1[ei][si]), len(back_calc2[ei][si]))
+                for mi in range(len(back_calc1[ei][si])):
+                    self.assertEqual(len(back_calc1[ei][si][mi]), len(back_calc2[ei][si][mi]))
+                    for oi in range(len(back_calc1[ei][si][mi])):
+                        self.assertEqual(len(back_calc1[ei][si][mi][oi]), len(back_calc2[ei][si][mi][oi]))
+                        for di in range(len(back_calc1[ei][si][mi][oi])):
+                            self.assertAlmostEqual(back_calc1[ei][si][mi][oi][di], back_calc2[ei][si][mi][oi][di])
+
+
+    def test_back_calc_r2eff_cluster(self):
+        """Test that the back-calculation of a spin cluster matches the back-calculation of the individual spins."""
+
+        # The cluster and individual back-calculations.
+        back_calc = back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+        for si in range(len(self.spins)):
+            back_calc_spin = back_calc_r2eff(spins=[self.spins[si]], spin_ids=[self.spin_ids[si]])
+            self.assert_back_calc_equal([[back_calc[ei][si]] for ei in range(len(back_calc))], back_calc_spin)
+
+        # The spins differ.
+        self.assertNotAlmostEqual(back_calc[0][0][0][0][0], back_calc[0][1][0][0][0])
+
+
+    def test_back_calc_r2eff_memo(self):
+        """Test the memoisation of the back_calc_r2eff() function."""
+
+        # The first back-calculation is memoised.
+        back_calc = back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+        self.assertEqual(len(BACK_CALC_MEMO), 1)
+
+        # A memo hit, returning a copy.
+        back_calc[0][0][0][0][0] = 0.0
+        back_calc_hit = back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+        self.assertEqual(len(BACK_CALC_MEMO), 1)
+        self.assertNotEqual(back_calc_hit[0][0][0][0][0], 0.0)
+
+        # A parameter change invalidates the memoised values.
+        self.spins[1].dw = 5.0
+        back_calc_new = back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+        self.assertEqual(len(BACK_CALC_MEMO), 2)
+        self.assert_back_calc_equal([[back_calc_new[ei][0]] for ei in range(len(back_calc_new))], [[back_calc_hit[ei][0]] for ei in range(len(back_calc_hit))])
+        self.assertNotAlmostEqual(back_calc_new[0][1][0][0][0], back_calc_hit[0][1][0][0][0])
+
+        # A different set of spins is memoised separately.
+        back_calc_r2eff(spins=[self.spins[0]], spin_ids=[self.spin_ids[0]])
+        self.assertEqual(len(BACK_CALC_MEMO), 3)
+
+
+    def test_back_calc_r2eff_memo_chi2(self):
+        """Test that the chi-squared value stored by the back_calc_r2eff() function is recalculated when the R2eff/R1rho data changes."""
+
+        # The initial chi-squared value.
+        back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids, store_chi2=True)
+        chi2 = self.spins[0].chi2
+
+        # Change the data, leaving the parameters unchanged.
+        for spin in self.spins:
+            for key in spin.r2eff:
+                spin.r2eff[key] = 20.0
+
+        # The chi-squared value is recalculated.
+        back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids, store_chi2=True)
+        self.assertEqual(len(BACK_CALC_MEMO), 1)
+        self.assertNotAlmostEqual(self.spins[0].chi2, chi2)
+        self.assertEqual(self.spins[0].chi2, self.spins[1].chi2)
+
+
+    def test_back_calc_r2eff_memo_pipe_alteration(self):
+        """Test that the back-calculation memo is emptied when the data pipes are altered."""
+
+        # Fill the memo.
+        back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+        self.assertEqual(len(BACK_CALC_MEMO), 1)
+
+        # Create a new data pipe.
+        pipe_name = cdp_name()
+        ds.add(pipe_name='new', pipe_type='relax_disp')
+        self.assertEqual(len(BACK_CALC_MEMO), 0)
+
+        # Fill the memo again and delete the new data pipe.
+        pipes.switch(pipe_name)
+        back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+        self.assertEqual(len(BACK_CALC_MEMO), 1)
+        pipes.delete('new')
+        self.assertEqual(len(BACK_CALC_MEMO), 0)
+
+
+    def test_back_calc_r2eff_memo_lru(self):
+        """Test that the least recently used back-calculations are dropped from the memo."""
+
+        # Reduce the memo size.
+        orig_size = optimisation.BACK_CALC_MEMO_SIZE
+        optimisation.BACK_CALC_MEMO_SIZE = 2
+        try:
+            # Fill the memo.
+            back_calc_r2eff(spins=[self.spins[0]], spin_ids=[self.spin_ids[0]])
+            back_calc_r2eff(spins=[self.spins[1]], spin_ids=[self.spin_ids[1]])
+            keys = list(BACK_CALC_MEMO.keys())
+
+            # A hit moves the first spin to the end.
+            back_calc_r2eff(spins=[self.spins[0]], spin_ids=[self.spin_ids[0]])
+            self.assertEqual(list(BACK_CALC_MEMO.keys()), [keys[1], keys[0]])
+
+            # The second spin is dropped.
+            back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+            self.assertEqual(len(BACK_CALC_MEMO), 2)
+            self.assert_(keys[0] in BACK_CALC_MEMO)
+            self.assert_(keys[1] not in BACK_CALC_MEMO)
+
+        # Restore the memo size.
+        finally:
+            optimisation.BACK_CALC_MEMO_SIZE = orig_size
+
+
+    def test_interpolate_offset_cluster(self):
+        """Test that the cluster back-calculation of the interpolate_offset() function matches that of the individual spins."""
+
+        # Loop over the spins.
+        for si in range(len(self.spins)):
+            # The relaxation times.
+            relax_times = return_r2eff_arrays(spins=[self.spins[si]], spin_ids=[self.spin_ids[si]], fields=cdp.spectrometer_frq_list, field_count=cdp.spectrometer_frq_count)[-1]
+
+            # The interpolated curves for the cluster, and for the single spin.
+            back_calc = interpolate_offset(spin=self.spins[si], spin_id=self.spin_ids[si], si=si, num_points=5, extend_ppm=1.0, relax_times=relax_times, cluster_ids=self.spin_ids)[1]
+            back_calc_spin = interpolate_offset(spin=self.spins[si], spin_id=self.spin_ids[si], si=si, num_points=5, extend_ppm=1.0, relax_times=relax_times)[1]
+            self.assert_back_calc_equal(back_calc, back_calc_spin)
+
+        # The cluster was back-calculated once.
+        self.assertEqual(len(BACK_CALC_MEMO), 3)
+
+        # A different interpolation grid is back-calculated anew.
+        interpolate_offset(spin=self.spins[0], spin_id=self.spin_ids[0], si=0, num_points=7, extend_ppm=1.0, relax_times=relax_times, cluster_ids=self.spin_ids)
+        self.assertEqual(len(BACK_CALC_MEMO), 4)
+
+
+    def test_result_command_pipe(self):
+        """Test that the Disp_result_command stores the results in the data pipe of the memo, without changing the current data pipe."""
+
+        # The optimised parameters and back-calculated data.
+        param_vector = assemble_param_vector(spins=self.spins)
+        param_vector[-1] = 2000.0
+        back_calc = back_calc_r2eff(spins=self.spins, spin_ids=self.spin_ids)
+
+        # The memo of the optimisation.
+        memo = Disp_memo(spins=self.spins, spin_ids=self.spin_ids, sim_index=None, scaling_matrix=eye(len(param_vector)), verbosity=0)
+
+        # Switch to a new data pipe without any dispersion data, and process the results.
+        ds.add(pipe_name='new', pipe_type='relax_disp')
+        command = Disp_result_command(processor=Uni_processor(processor_size=1, callback=None), memo_id=memo.memo_id(), param_vector=param_vector, chi2=10.0, iter_count=1, f_count=2, g_count=3, h_count=4, back_calc=back_calc)
+        alterations = []
+        status.observers.pipe_alteration.register('unit test', lambda: alterations.append(cdp_name()))
+        try:
+            command.run(memo=memo)
+        finally:
+            status.observers.pipe_alteration.unregister('unit test')
+
+        # The current data pipe has not been changed, not even temporarily.
+        self.assertEqual(cdp_name(), 'new')
+        self.assertEqual(alterations, [])
+
+        # The results have been stored in the spins of the original data pipe.
+        for spin in self.spins:
+            self.assertEqual(spin.kex, 2000.0)
+            self.assertEqual(spin.chi2, 10.0)
+            self.assertEqual(spin.iter, 1)
+            self.assertEqual(len(spin.r2eff_bc), len(spin.r2eff))
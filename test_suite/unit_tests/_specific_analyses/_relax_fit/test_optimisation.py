@@ -0,0 +1,126 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from math import exp
+import pickle
+
+# relax module imports.
+from data_store import Relax_data_store; ds = Relax_data_store()
+from multi import Processor_box
+from multi.uni_processor import Uni_processor
+from pipe_control.mol_res_spin import create_spin, spin_loop
+from specific_analyses.relax_fit.optimisation import Relax_fit_minimise_command
+from test_suite.unit_tests.base_classes import UnitTestCase
+
+
+class Test_optimisation(UnitTestCase):
+    """Unit tests for the functions of the specific_analyses.relax_fit.optimisation module."""
+
+    def setUp(self):
+        """Set up a relaxation curve-fitting data pipe with two spins and Monte Carlo simulation data."""
+
+        # Create the data pipe.
+        ds.add(pipe_name='orig', pipe_type='relax_fit')
+
+        # The relaxation times.
+        times = [0.0, 0.1, 0.2, 0.4, 0.8]
+        cdp.relax_times = {}
+        for i in range(len(times)):
+            cdp.relax_times['T%i' % i] = times[i]
+
+        # The spins.
+        for i in range(2):
+            spin = create_spin(spin_num=i+1, spin_name='N', res_num=i+1, res_name='Gly')
+            spin.model = 'exp'
+            spin.params = ['rx', 'i0']
+            spin.rx = 1.0
+            spin.i0 = 100.0
+            spin.peak_intensity = {}
+            spin.peak_intensity_err = {}
+            for j in range(len(times)):
+                spin.peak_intensity['T%i' % j] = 100.0 * exp(-(i+1.0)*times[j])
+                spin.peak_intensity_err['T%i' % j] = 1.0
+            spin.peak_intensity_sim = []
+            for sim_index in range(3):
+                spin.peak_intensity_sim.append(dict([(key, spin.peak_intensity[key] + sim_index) for key in spin.peak_intensity]))
+
+        # Store the current processor, and replace it by a fresh uni-processor.
+        processor_box = Processor_box()
+        self.orig_processor = getattr(processor_box, 'processor', None)
+        processor_box.processor = Uni_processor(processor_size=1, callback=None)
+        self.processor = processor_box.processor
+
+
+    def tearDown(self):
+        """Restore the processor and reset the relax data storage object."""
+
+        # Restore the processor.
+        Processor_box().processor = self.orig_processor
+
+        # Reset.
+        super(Test_optimisation, self).tearDown()
+
+
+    def test_minimise_command_cached_data(self):
+        """Test the sending of the static data of the Relax_fit_minimise_command for the Monte Carlo simulations."""
+
+        # The slave commands of the Monte Carlo simulations.
+        spins = []
+        spin_ids = []
+        for spin, spin_id in spin_loop(return_id=True):
+            spins.append(spin)
+            spin_ids.append(spin_id)
+        commands = []
+        for sim_index in range(3):
+            commands.append(Relax_fit_minimise_command(spins=spins, spin_ids=spin_ids, sim_index=sim_index, scaling_matrix=[None, None], min_algor='simplex', min_options=(), func_tol=1e-25, grad_tol=None, max_iterations=1000, constraints=False, verbosity=0, lower=[None, None], upper=[None, None], inc=[None, None]))
+
+        # The static data is cached only once for all simulations.
+        self.assertEqual(len(self.processor._data_cache), 1)
+        keys = [self.processor.cached_data_keys(command) for command in commands]
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[2])
+
+        # Only the first command sent to a slave carries the static data, and only the simulated values differ in the others.
+        sizes = []
+        for command in commands:
+            self.processor.attach_cached_data(command, 1)
+            sizes.append(len(pickle.dumps(command)))
+        self.assert_(hasattr(commands[0], 'cache_value'))
+        self.assert_(not hasattr(commands[1], 'cache_value'))
+        self.assert_(not hasattr(commands[2], 'cache_value'))
+        self.assert_(sizes[0] > sizes[1])
+        self.assertEqual(sizes[1], sizes[2])
+
+        # The slave obtains the static data.
+        slave = Uni_processor(processor_size=1, callback=None)
+        slave.receive_cached_data(commands[0])
+        static = slave.fetch_cached_data(name=commands[0].cache_name, version=commands[0].cache_version)
+        self.assertEqual(len(static), 2)
+        self.assertEqual(static[0][0], 'exp')
+        self.assertEqual(sorted(static[0][3]), [0.0, 0.1, 0.2, 0.4, 0.8])
+
+        # The data is evicted from the master once all simulations have completed.
+        self.processor._data_cache_users[keys[0][0]] = 3
+        for key in keys:
+            self.processor.release_cached_data(key)
+        self.assertEqual(self.processor._data_cache, {})
+        self.assertEqual(self.processor._slave_data_evict, {1: [keys[0][0][0]]})
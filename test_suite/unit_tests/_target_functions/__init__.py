@@ -21,5 +21,7 @@
 
 
 __all__ = [
+    'test_frame_order',
+    'test_relax_disp',
     'test_relax_fit'
 ]
@@ -0,0 +1,103 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+
+# Python module imports.
+from numpy import array, float64, zeros
+from unittest import TestCase
+
+# relax module imports.
+from lib.frame_order.variables import MODEL_RIGID
+from target_functions.frame_order import Frame_order
+
+
+class Test_frame_order(TestCase):
+    """Unit tests for the target_functions.frame_order relax module."""
+
+    def read_only(self, data):
+        """Convert the data into a read-only numpy array, as for the arrays shared with the slaves.
+
+        @param data:    The data to convert.
+        @type data:     list
+        @return:        The read-only numpy array.
+        @rtype:         numpy float64 array
+        """
+
+        # Convert and lock.
+        data = array(data, float64)
+        data.flags.writeable = False
+
+        # Return the array.
+        return data
+
+
+    def test_init_read_only(self):
+        """Test the set up of the target function using read-only data arrays."""
+
+        # The read-only RDC and PCS data, with a missing RDC and weights.
+        nan = float('nan')
+        rdc_errors = self.read_only([[1.0, 1.0, 2.0]])
+        rdc_weights = self.read_only([[1.0, 1.0, 4.0]])
+        pcs_errors = self.read_only([[0.1e-6, 0.1e-6]])
+        pcs_weights = self.read_only([[1.0, 4.0]])
+        args = {
+            'model': MODEL_RIGID,
+            'init_params': zeros(6, float64),
+            'full_tensors': self.read_only([1e-4, 2e-4, 0.0, 0.5e-4, 0.0]),
+            'full_in_ref_frame': self.read_only([1]),
+            'rdcs': self.read_only([[10.0, nan, -5.0]]),
+            'rdc_errors': rdc_errors,
+            'rdc_weights': rdc_weights,
+            'rdc_vect': self.read_only([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]),
+            'dip_const': self.read_only([-7e4, -7e4, -7e4]),
+            'pcs': self.read_only([[0.1e-6, 0.2e-6]]),
+            'pcs_errors': pcs_errors,
+            'pcs_weights': pcs_weights,
+            'atomic_pos': self.read_only([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]),
+            'temp': self.read_only([298.0]),
+            'frq': self.read_only([600e6]),
+            'paramag_centre': self.read_only([0.0, 0.0, 0.0]),
+            'pivot': self.read_only([0.0, 0.0, 0.0]),
+            'com': self.read_only([0.0, 0.0, 0.0])
+        }
+
+        # Set up the target function twice from the same arrays, as for two commands on the same slave.
+        chi2 = []
+        for i in range(2):
+            model = Frame_order(**args)
+
+            # The weights are placed into private copies of the errors.
+            self.assertEqual(list(model.rdc_error[0]), [1.0, 1.0, 1.0])
+            self.assertAlmostEqual(model.pcs_error[0, 0], 0.1e-6)
+            self.assertAlmostEqual(model.pcs_error[0, 1], 0.05e-6)
+            self.assertEqual(list(model.missing_rdc[0]), [0, 1, 0])
+
+            # The target function.
+            chi2.append(model.func(zeros(6, float64)))
+
+        # The original arrays are unchanged.
+        self.assertEqual(list(rdc_errors[0]), [1.0, 1.0, 2.0])
+        self.assertEqual(list(rdc_weights[0]), [1.0, 1.0, 4.0])
+        self.assertEqual(list(pcs_errors[0]), [0.1e-6, 0.1e-6])
+        self.assertEqual(list(pcs_weights[0]), [1.0, 4.0])
+
+        # The chi-squared value is the same for both set ups.
+        self.assertEqual(chi2[0], chi2[1])
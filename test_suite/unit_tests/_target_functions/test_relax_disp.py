@@ -0,0 +1,276 @@
+###############################################################################
+#                                                                             #
+# Copyright (C) 2016 Edward d'Auvergne                                        #
+#                                                                             #
+# This file is part of the program relax (http://www.nmr-relax.com).          #
+#                                                                             #
+# This program is free software: you can redistribute it and/or modify        #
+# it under the terms of the GNU General Public License as published by        #
+# the Free Software Foundation, either version 3 of the License, or           #
+# (at your option) any later version.                                         #
+#                                                                             #
+# This program is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the               #
+# GNU General Public License for more details.                                #
+#                                                                             #
+# You should have received a copy of the GNU General Public License           #
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.       #
+#                                                                             #
+###############################################################################
+
+# Python module imports.
+from numpy import arctan2, array, diag, eye, float64, ones, pi, zeros
+from unittest import TestCase
+
+# relax module imports.
+from lib.dispersion.variables import EXP_TYPE_CPMG_SQ, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_CR72, MODEL_CR72_FULL, MODEL_DPL94, MODEL_IT99, MODEL_LIST_DERIVS, MODEL_LIST_R1RHO, MODEL_LM63, MODEL_M61, MODEL_MP05, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01
+from lib.errors import RelaxError
+from target_functions.relax_disp import Dispersion
+
+
+# The parameter values of a single spin at a single field for each model with analytic derivatives, in the parameter vector order.
+DERIV_PARAMS = {
+    MODEL_B14:          [10.0, 2.0, 0.9, 1000.0],
+    MODEL_B14_FULL:     [10.0, 12.0, 2.0, 0.9, 1000.0],
+    MODEL_CR72:         [10.0, 2.0, 0.9, 1000.0],
+    MODEL_CR72_FULL:    [10.0, 12.0, 2.0, 0.9, 1000.0],
+    MODEL_DPL94:        [10.0, 0.2, 1000.0],
+    MODEL_IT99:         [10.0, 2.0, 0.9, 5e-4],
+    MODEL_LM63:         [10.0, 0.2, 1000.0],
+    MODEL_M61:          [10.0, 0.2, 1000.0],
+    MODEL_MP05:         [10.0, 2.0, 0.9, 1000.0],
+    MODEL_TAP03:        [10.0, 2.0, 0.9, 1000.0],
+    MODEL_TP02:         [10.0, 2.0, 0.9, 1000.0],
+    MODEL_TSMFK01:      [10.0, 2.0, 500.0]
+}
+
+
+class Test_relax_disp(TestCase):
+    """Unit tests for the target_functions.relax_disp module."""
+
+    def setUp(self):
+        """Set up a CR72 data set of two spins at two fields, back-calculated from known parameter values."""
+
+        # The parameter values {R20 x 4, dw x 2, pA, kex} and the scaling matrix.
+        self.params = array([10.0, 12.0, 15.0, 18.0, 2.0, 1.5, 0.9, 1000.0], float64)
+        self.scaling_matrix = diag(array([10.0, 10.0, 10.0, 10.0, 1.0, 1.0, 1.0, 1000.0]))
+
+        # The dispersion point and spin structures.
+        cpmg_frqs = array([50.0, 100.0, 200.0, 400.0, 800.0, 1000.0])
+        frqs = [[[2.0*pi*60.8, 2.0*pi*81.1] for si in range(2)]]
+        self.kargs = {
+            'model': MODEL_CR72,
+            'num_spins': 2,
+            'num_frq': 2,
+            'exp_types': [EXP_TYPE_CPMG_SQ],
+            'errors': [[[[0.5*ones(6)] for mi in range(2)] for si in range(2)]],
+            'missing': [[[[zeros(6)] for mi in range(2)] for si in range(2)]],
+            'frqs': frqs,
+            'frqs_H': frqs,
+            'cpmg_frqs': [[[cpmg_frqs] for mi in range(2)]],
+            'offset': [[[[0.0] for mi in range(2)] for si in range(2)]],
+            'relax_times': [[[0.04*ones(6)] for mi in range(2)]],
+            'scaling_matrix': self.scaling_matrix
+        }
+
+        # Back calculate the R2eff values.
+        model = Dispersion(num_params=8, values=[[[[ones(6)] for mi in range(2)] for si in range(2)]], **self.kargs)
+        model.func(self.params / self.scaling_matrix.diagonal())
+        self.values = model.get_back_calc()
+
+        # A missing data point.
+        self.kargs['missing'][0][1][0][0][2] = 1.0
+
+
+    def setup_single_spin(self, model):
+        """Set up the target function for a single spin at a single field, with data not matching the model.
+
+        @param model:   The dispersion model.
+        @type model:    str
+        @return:        The target function instance.
+        @rtype:         target_functions.relax_disp.Dispersion instance
+        """
+
+        # The structures common to all models.
+        kargs = {
+            'model': model,
+            'num_params': len(DERIV_PARAMS[model]),
+            'num_spins': 1,
+            'num_frq': 1,
+            'values': [[[[array([19.0, 17.5, 16.0, 14.0, 12.5, 11.0])]]]],
+            'errors': [[[[0.5*ones(6)]]]],
+            'missing': [[[[zeros(6)]]]],
+            'frqs': [[[2.0*pi*81.1]]],
+            'frqs_H': [[[2.0*pi*800.0]]],
+            'relax_times': [[[0.04*ones(6)]]],
+            'scaling_matrix': eye(len(DERIV_PARAMS[model]))
+        }
+
+        # The R1rho spin-lock data, with the tilt angles for an offset of 1000 rad/s from the chemical shift.
+        if model in MODEL_LIST_R1RHO:
+            spin_lock_nu1 = array([500.0, 1000.0, 1500.0, 2000.0, 3000.0, 4000.0])
+            kargs['exp_types'] = [EXP_TYPE_R1RHO]
+            kargs['spin_lock_nu1'] = [[[spin_lock_nu1]]]
+            kargs['chemical_shifts'] = [[[1000.0]]]
+            kargs['offset'] = [[[[0.0]]]]
+            kargs['tilt_angles'] = [[[[arctan2(2.0*pi*spin_lock_nu1, 1000.0)]]]]
+            kargs['r1'] = [[1.5]]
+
+        # The CPMG data.
+        else:
+            kargs['exp_types'] = [EXP_TYPE_CPMG_SQ]
+            kargs['cpmg_frqs'] = [[[array([50.0, 100.0, 200.0, 400.0, 800.0, 1000.0])]]]
+            kargs['offset'] = [[[[0.0]]]]
+
+        # Return the target function.
+        return Dispersion(**kargs)
+
+
+    def test_derivs(self):
+        """Test the dispatch of the gradient and Hessian of all models with analytic derivatives against numeric derivatives."""
+
+        # Loop over the models.
+        for model in MODEL_LIST_DERIVS:
+            # The target function, which must use the analytic derivatives.
+            target = self.setup_single_spin(model)
+            self.assertEqual(target.dfunc, target.dfunc_analytic, msg=model)
+            self.assertEqual(target.d2func, target.d2func_analytic, msg=model)
+
+            # Numeric derivatives, with steps relative to the parameter values.
+            x = array(DERIV_PARAMS[model], float64)
+            n = len(x)
+            h = 1e-6 * x
+            grad = array([(target.func(x + h[i]*e) - target.func(x - h[i]*e)) / (2*h[i]) for i, e in enumerate(eye(n))])
+            hess = array([(target.dfunc(x + h[i]*e) - target.dfunc(x - h[i]*e)) / (2*h[i]) for i, e in enumerate(eye(n))])
+
+            # Check, scaling each element by the parameter values to make them comparable.
+            dfunc = target.dfunc(x)
+            d2func = target.d2func(x)
+            for i in range(n):
+                self.assertAlmostEqual(dfunc[i] * x[i] / abs(grad * x).max(), grad[i] * x[i] / abs(grad * x).max(), 5, msg=model)
+                for j in range(n):
+                    norm = abs(hess * x * x[:, None]).max()
+                    self.assertAlmostEqual(d2func[i, j] * x[i] * x[j] / norm, hess[i, j] * x[i] * x[j] / norm, 5, msg=model)
+
+
+    def test_r20_profile(self):
+        """Test the profiling of the R20 parameters of the CR72 model."""
+
+        # The target function.
+        model = Dispersion(num_params=8, values=self.values, r20_profile=True, **self.kargs)
+
+        # The chi-squared value is zero for the exchange parameters, and the R20 values are recovered.
+        x = self.params[4:] / self.scaling_matrix.diagonal()[4:]
+        self.assertAlmostEqual(model.func(x), 0.0)
+        for i in range(4):
+            self.assertAlmostEqual(model.r20_values.ravel()[i], self.params[i])
+            self.assertAlmostEqual(model.r20_profile_params(x)[i], self.params[i] / 10.0)
+
+        # Bounded solutions.
+        model.values[0, 0] += 30.0
+        model.values[0, 1] -= 50.0
+        model.func(x)
+        self.assertAlmostEqual(model.r20_values[0, 0, 0], 40.0)
+        self.assertAlmostEqual(model.r20_values[0, 1, 0], 0.0)
+        self.assertEqual(list(model.r20_free.ravel()), [True, True, False, False])
+
+
+    def test_r20_profile_derivs(self):
+        """Test the gradient and Hessian of the CR72 model with profiled R20 parameters against numeric derivatives."""
+
+        # The target function, with perturbed data.
+        model = Dispersion(num_params=8, values=self.values, r20_profile=True, **self.kargs)
+        model.values[:, :, :, :, ::2] += 0.3
+        x = array([1.9, 1.6, 0.92, 1.2], float64)
+
+        # The profiled chi-squared value is the minimum over the R20 values.
+        full = Dispersion(num_params=8, values=self.values, **self.kargs)
+        full.values = model.values
+        chi2 = model.func(x)
+        params = model.r20_profile_params(x)
+        self.assertAlmostEqual(full.func(params), chi2)
+        for i in range(4):
+            self.assertTrue(full.func(params + 1e-3*eye(8)[i]) > chi2)
+            self.assertTrue(full.func(params - 1e-3*eye(8)[i]) > chi2)
+
+        # Numeric derivatives.
+        h = 1e-6
+        grad = array([(model.func(x + h*e) - model.func(x - h*e)) / (2*h) for e in eye(4)])
+        hess = array([(model.dfunc(x + h*e) - model.dfunc(x - h*e)) / (2*h) for e in eye(4)])
+
+        # Check.
+        for i in range(4):
+            self.assertAlmostEqual(model.dfunc(x)[i] / abs(grad).max(), grad[i] / abs(grad).max(), 5)
+            for j in range(4):
+                self.assertAlmostEqual(model.d2func(x)[i, j] / abs(hess).max(), hess[i, j] / abs(hess).max(), 5)
+
+
+    def test_r20_profile_batch(self):
+        """Test the profiling of the R20 parameters of the CR72 model in the batch mode."""
+
+        # The target functions for the two spins as a batch, with the scaling matrix of a single spin.
+        self.kargs['scaling_matrix'] = diag(array([10.0, 10.0, 1.0, 1.0, 1000.0]))
+        model = Dispersion(num_params=5, values=self.values, batch=True, r20_profile=True, **self.kargs)
+        full = Dispersion(num_params=5, values=self.values, batch=True, **self.kargs)
+
+        # The chi-squared values are zero for the exchange parameters of each spin, and the R20 values of each spin are recovered.
+        x = array([[2.0, 0.9, 1.0], [1.5, 0.9, 1.0]], float64)
+        chi2 = model.func_batch(x)
+        params = model.r20_profile_params(x)
+        for si in range(2):
+            self.assertAlmostEqual(chi2[si], 0.0)
+            self.assertAlmostEqual(params[si, 0], self.params[2*si] / 10.0)
+            self.assertAlmostEqual(params[si, 1], self.params[2*si+1] / 10.0)
+            self.assertEqual(list(params[si, 2:]), list(x[si]))
+
+        # Perturbed data, for which the profiled chi-squared values are the minimum over the R20 values.
+        model.values[:, :, :, :, ::2] += 0.3
+        full.values = model.values
+        x = array([[1.9, 0.92, 1.2], [1.6, 0.88, 0.9]], float64)
+        chi2 = model.func_batch(x)
+        params = model.r20_profile_params(x)
+        for si in range(2):
+            self.assertAlmostEqual(full.func_batch(params)[si], chi2[si])
+            for i in range(2):
+                self.assertTrue(full.func_batch(params + 1e-3*eye(5)[i])[si] > chi2[si])
+
+        # A spin subset.
+        self.assertAlmostEqual(model.func_batch(x[1:], index=array([1]))[0], chi2[1])
+
+        # Numeric derivatives, perturbing the same parameter of both spins at once as the spins are independent.
+        h = 1e-6
+        grad = array([(model.func_batch(x + h*e) - model.func_batch(x - h*e)) / (2*h) for e in eye(3)]).T
+        hess = array([(model.dfunc_batch(x + h*e) - model.dfunc_batch(x - h*e)) / (2*h) for e in eye(3)]).swapaxes(0, 1)
+
+        # Check.
+        dfunc = model.dfunc_batch(x)
+        d2func = model.d2func_batch(x)
+        for si in range(2):
+            for i in range(3):
+                self.assertAlmostEqual(dfunc[si, i] / abs(grad[si]).max(), grad[si, i] / abs(grad[si]).max(), 5)
+                for j in range(3):
+                    self.assertAlmostEqual(d2func[si, i, j] / abs(hess[si]).max(), hess[si, i, j] / abs(hess[si]).max(), 5)
+
+
+    def test_r20_profile_grid(self):
+        """Test the profiled grid search target function of the CR72 model."""
+
+        # The target function.
+        model = Dispersion(num_params=8, values=self.values, r20_profile=True, **self.kargs)
+
+        # Grid points, including special cases.
+        points = array([[2.0, 1.5, 0.9, 1.0], [1.0, 1.0, 0.8, 0.5], [0.0, 1.5, 0.7, 2.0], [3.0, 0.5, 0.95, 0.1]], float64)
+
+        # Check against the standard target function.
+        chi2 = model.func_grid(points)
+        for i in range(len(points)):
+            self.assertAlmostEqual(chi2[i] / (1.0 + chi2[i]), model.func(points[i]) / (1.0 + chi2[i]))
+
+
+    def test_r20_profile_unsupported(self):
+        """Test that the profiling of the R20 parameters is refused for models which are not linear in R20."""
+
+        # The CR72 full model.
+        self.kargs['model'] = MODEL_CR72_FULL
+        self.assertRaises(RelaxError, Dispersion, num_params=9, values=self.values, r20_profile=True, **self.kargs)
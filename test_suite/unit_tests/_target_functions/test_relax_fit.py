@@ -20,14 +20,15 @@
 ###############################################################################
 
 # Python module imports.
-from numpy import array, transpose
+from numpy import array, asarray, exp, float64, linspace, ones, sqrt, transpose, zeros
+from threading import Thread
 from unittest import TestCase
 
 # relax module imports.
 from dep_check import C_module_exp_fn
 from status import Status; status = Status()
 if C_module_exp_fn:
-    from target_functions.relax_fit import setup, func_exp, dfunc_exp, d2func_exp, jacobian_exp, jacobian_chi2_exp
+    from target_functions.relax_fit import fit_batch, setup, func_exp, dfunc_exp, d2func_exp, jacobian_exp, jacobian_chi2_exp
 
 
 class Test_relax_fit(TestCase):
@@ -290,3 +291,189 @@ class Test_relax_fit(TestCase):
         for i in range(len(matrix)):
             for j in range(len(matrix[i])):
                 self.assertAlmostEqual(matrix[i, j], real[i, j], 3)
+
+
+    def test_setup_context(self):
+        """Unit test for the independence of the contexts returned by the setup() function."""
+
+        # A second curve with half the intensities, set up after the first.
+        relax_times = [0.0, 1.0, 2.0, 3.0, 4.0]
+        I = [500.0, 183.9397205855, 67.6676416185, 24.89353418395, 9.15781944435]
+        context = setup(num_params=2, num_times=len(relax_times), values=I, sd=[10.0]*5, relax_times=relax_times, scaling_matrix=self.scaling_list)
+
+        # The module level functions operate on the last context.
+        params2 = [self.R/self.scaling_list[0], 500.0/self.scaling_list[1]]
+        self.assertAlmostEqual(func_exp(params2), 0.0)
+        self.assertAlmostEqual(context.func_exp(params2), 0.0)
+
+        # A new context for the first curve is unaffected by the second.
+        context1 = setup(num_params=2, num_times=len(relax_times), values=[1000.0, 367.879441171, 135.335283237, 49.7870683679, 18.3156388887], sd=[10.0]*5, relax_times=relax_times, scaling_matrix=self.scaling_list)
+        self.assertAlmostEqual(context1.func_exp(self.params), 0.0)
+        self.assertAlmostEqual(context.func_exp(params2), 0.0)
+        self.assert_(context.func_exp(self.params) > 1000.0)
+
+        # The back calculated intensities are held by each context.
+        self.assertAlmostEqual(context.back_calc_I()[0], 1000.0)
+        self.assertAlmostEqual(context1.back_calc_I()[0], 1000.0)
+        context.func_exp(params2)
+        self.assertAlmostEqual(context.back_calc_I()[0], 500.0)
+        self.assertAlmostEqual(context1.back_calc_I()[0], 1000.0)
+
+        # Dimension checks.
+        self.assertRaises(ValueError, setup, num_params=0, num_times=5, values=I, sd=[10.0]*5, relax_times=relax_times, scaling_matrix=self.scaling_list)
+        self.assertRaises(IndexError, setup, num_params=2, num_times=6, values=I, sd=[10.0]*5, relax_times=relax_times, scaling_matrix=self.scaling_list)
+
+
+    def test_setup_context_buffer(self):
+        """Unit test for the views of the back calculated values and Jacobians exported by the context buffer."""
+
+        # A context with many more time points than the old fixed size limit.
+        relax_times = linspace(0.0, 4.0, 20000)
+        I = 1000.0 * exp(-relax_times)
+        context = setup(num_params=2, num_times=len(relax_times), values=I, sd=[10.0]*len(relax_times), relax_times=relax_times, scaling_matrix=self.scaling_list)
+
+        # The read-only view of the context.
+        data = asarray(context)
+        self.assertEqual(data.shape, (5, 20000))
+        self.assert_(not data.flags.writeable)
+
+        # The back calculated values are updated in place.
+        self.assertAlmostEqual(context.func_exp(self.params), 0.0)
+        self.assertAlmostEqual(data[0, 0], 1000.0)
+        self.assertAlmostEqual(data[0, -1], I[-1])
+
+        # The Jacobian, in the rows after the back calculated values, matches the module level function.
+        self.assertEqual(context.jacobian_exp(self.params), None)
+        jacobian = jacobian_exp(self.params)
+        for j in range(2):
+            for i in [0, 1, 10000, 19999]:
+                self.assertEqual(data[1+j, i], jacobian[j][i])
+
+        # The chi-squared Jacobian, in the last rows.
+        context.jacobian_chi2_exp(self.params)
+        jacobian = jacobian_chi2_exp(self.params)
+        for j in range(2):
+            self.assertEqual(data[3+j, 100], jacobian[j][100])
+
+        # The view keeps the context alive.
+        del context
+        self.assertAlmostEqual(data[0, 0], 1000.0)
+
+
+    def test_setup_num_params_mismatch(self):
+        """Unit test for the checks of the number of parameters of the context against the curve types and the parameter vectors."""
+
+        # Numbers of parameters matching none of the curve types.
+        relax_times = [0.0, 1.0, 2.0]
+        for num_params in [1, 4]:
+            self.assertRaises(ValueError, setup, num_params=num_params, num_times=3, values=[3.0, 2.0, 1.0], sd=[1.0]*3, relax_times=relax_times, scaling_matrix=[1.0]*num_params)
+
+        # A two parameter context used with the three parameter inversion recovery curve.
+        context = setup(num_params=2, num_times=3, values=[3.0, 2.0, 1.0], sd=[1.0]*3, relax_times=relax_times, scaling_matrix=[1.0, 1.0])
+        self.assertRaises(ValueError, context.func_inv, [1.0, 2.0])
+        self.assertRaises(ValueError, context.dfunc_inv, [1.0, 2.0])
+        self.assertRaises(ValueError, context.d2func_inv, [1.0, 2.0])
+        self.assertRaises(ValueError, context.jacobian_inv, [1.0, 2.0])
+
+        # Parameter vectors of the wrong length.
+        self.assertRaises(ValueError, context.func_exp, [1.0])
+        self.assertRaises(ValueError, context.d2func_exp, [1.0, 2.0, 3.0])
+
+        # The context is still usable.
+        self.assert_(context.func_exp([1.0, 2.0]) >= 0.0)
+
+
+    def test_setup_context_threads(self):
+        """Unit test for the use of multiple contexts in parallel threads."""
+
+        # The curves, with different rates.
+        relax_times = [0.0, 1.0, 2.0, 3.0, 4.0]
+        contexts = []
+        for i in range(8):
+            R = 0.5 + 0.25*i
+            I = [1000.0 * 2.718281828459045**(-R*t) for t in relax_times]
+            contexts.append(setup(num_params=2, num_times=len(relax_times), values=I, sd=[10.0]*5, relax_times=relax_times, scaling_matrix=self.scaling_list))
+
+        # The serial results.
+        params = [1.5, 0.8]
+        serial = [[context.func_exp(params), context.dfunc_exp(params), context.d2func_exp(params)] for context in contexts]
+
+        # The threaded results, repeated many times per context.
+        results = [None] * len(contexts)
+        def target(i):
+            for j in range(200):
+                results[i] = [contexts[i].func_exp(params), contexts[i].dfunc_exp(params), contexts[i].d2func_exp(params)]
+        threads = [Thread(target=target, args=(i,)) for i in range(len(contexts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Checks.
+        self.assertEqual(results, serial)
+        for i in range(1, len(contexts)):
+            self.assertNotEqual(serial[i][0], serial[0][0])
+
+
+    def test_fit_batch(self):
+        """Unit test for the Levenberg-Marquardt optimisation of a batch of curves by the fit_batch() function."""
+
+        # The curves of three models, with the parameters R, I0 and Iinf.
+        times = array([[0.0, 0.5, 1.0, 2.0, 3.0, 4.0]] * 2, float64)
+        data = [
+            ['exp', [[1.0, 1000.0], [3.0, 200.0]], lambda p: p[:, 1:2] * exp(-p[:, 0:1] * times)],
+            ['inv', [[1.0, -1000.0, 1000.0], [0.5, -200.0, 300.0]], lambda p: p[:, 2:3] - (p[:, 2:3] - p[:, 1:2]) * exp(-p[:, 0:1] * times)],
+            ['sat', [[1.0, 1000.0], [0.5, 500.0]], lambda p: p[:, 1:2] * (1.0 - exp(-p[:, 0:1] * times))]
+        ]
+
+        # Loop over the models.
+        for model, solution, func in data:
+            solution = array(solution, float64)
+            values = func(solution)
+            params = solution * 0.8
+            chi2 = zeros(2, float64)
+            iter_count = zeros(2, float64)
+            covar = zeros((2, len(solution[0]), len(solution[0])), float64)
+
+            # Optimise.
+            fit_batch(model=model, params=params, values=values, errors=10.0*ones(times.shape), relax_times=times, mask=zeros(times.shape), chi2=chi2, iter_count=iter_count, covar=covar)
+
+            # Checks.
+            for i in range(2):
+                self.assert_(iter_count[i] > 0)
+                self.assertAlmostEqual(chi2[i], 0.0)
+                for j in range(len(solution[i])):
+                    self.assertAlmostEqual(params[i, j] / solution[i, j], 1.0)
+                    self.assert_(covar[i, j, j] > 0.0)
+
+        # Argument checks.
+        self.assertRaises(ValueError, fit_batch, model='x', params=params, values=values, errors=ones(times.shape), relax_times=times, mask=zeros(times.shape), chi2=chi2, iter_count=iter_count, covar=covar)
+        self.assertRaises(ValueError, fit_batch, model='exp', params=zeros(3), values=values, errors=ones(times.shape), relax_times=times, mask=zeros(times.shape), chi2=chi2, iter_count=iter_count, covar=covar)
+
+
+    def test_fit_batch_mask(self):
+        """Unit test for the exclusion of masked time points by the fit_batch() function."""
+
+        # Two curves, the second with an outlier and a padded time point.
+        times = array([[0.0, 1.0, 2.0, 3.0, 4.0], [0.0, 1.0, 2.0, 3.0, 0.0]], float64)
+        values = 1000.0 * exp(-times)
+        values[1, 2] = 1e6
+        mask = zeros(times.shape, float64)
+        mask[1, 2] = 1.0
+        mask[1, 4] = 1.0
+
+        # Optimise.
+        params = array([[2.0, 800.0], [2.0, 800.0]], float64)
+        chi2 = zeros(2, float64)
+        iter_count = zeros(2, float64)
+        covar = zeros((2, 2, 2), float64)
+        fit_batch(model='exp', params=params, values=values, errors=10.0*ones(times.shape), relax_times=times, mask=mask, chi2=chi2, iter_count=iter_count, covar=covar)
+
+        # Both curves are fitted exactly.
+        for i in range(2):
+            self.assertAlmostEqual(chi2[i], 0.0)
+            self.assertAlmostEqual(params[i, 0], 1.0)
+            self.assertAlmostEqual(params[i, 1], 1000.0)
+
+        # The error of the second curve, with fewer points, is larger.
+        self.assert_(sqrt(covar[1, 0, 0]) > sqrt(covar[0, 0, 0]))
@@ -34,7 +34,7 @@ else:
     FD_SAVE = -1
 
 # relax module imports.
-from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYPE_CPMG_SQ, EXP_TYPE_CPMG_ZQ, EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_CR72, MODEL_CR72_FULL, MODEL_DPL94, MODEL_IT99, MODEL_LIST_FIT_R1, MODEL_LM63, MODEL_LM63_3SITE, MODEL_M61, MODEL_M61B, MODEL_MMQ_CR72, MODEL_MP05, MODEL_NOREX, MODEL_NS_CPMG_2SITE_3D, MODEL_NS_CPMG_2SITE_3D_FULL, MODEL_NS_CPMG_2SITE_EXPANDED, MODEL_NS_CPMG_2SITE_STAR, MODEL_NS_CPMG_2SITE_STAR_FULL, MODEL_NS_MMQ_2SITE, MODEL_NS_MMQ_3SITE, MODEL_NS_MMQ_3SITE_LINEAR, MODEL_NS_R1RHO_2SITE, MODEL_NS_R1RHO_3SITE, MODEL_NS_R1RHO_3SITE_LINEAR, MODEL_R2EFF, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01
+from lib.dispersion.variables import EXP_TYPE_CPMG_DQ, EXP_TYPE_CPMG_MQ, EXP_TYPE_CPMG_SQ, EXP_TYPE_CPMG_ZQ, EXP_TYPE_CPMG_PROTON_MQ, EXP_TYPE_CPMG_PROTON_SQ, EXP_TYPE_R1RHO, MODEL_B14, MODEL_B14_FULL, MODEL_CR72, MODEL_CR72_FULL, MODEL_DPL94, MODEL_IT99, MODEL_LIST_DERIVS, MODEL_LIST_FIT_R1, MODEL_LIST_R20_LINEAR, MODEL_LM63, MODEL_LM63_3SITE, MODEL_M61, MODEL_M61B, MODEL_MMQ_CR72, MODEL_MP05, MODEL_NOREX, MODEL_NS_CPMG_2SITE_3D, MODEL_NS_CPMG_2SITE_3D_FULL, MODEL_NS_CPMG_2SITE_EXPANDED, MODEL_NS_CPMG_2SITE_STAR, MODEL_NS_CPMG_2SITE_STAR_FULL, MODEL_NS_MMQ_2SITE, MODEL_NS_MMQ_3SITE, MODEL_NS_MMQ_3SITE_LINEAR, MODEL_NS_R1RHO_2SITE, MODEL_NS_R1RHO_3SITE, MODEL_NS_R1RHO_3SITE_LINEAR, MODEL_R2EFF, MODEL_TAP03, MODEL_TP02, MODEL_TSMFK01
 from lib.text.gui import dw, dw_AB, dw_BC, dwH, dwH_AB, dwH_BC, i0, kex, kAB, kBC, kAC, phi_ex, phi_exB, phi_exC, nu_1, nu_cpmg, r1rho, r1rho_prime, r2, r2a, r2b, r2eff, tex, theta, w_eff, w_rf
 from graphics import ANALYSIS_IMAGE_PATH, WIZARD_IMAGE_PATH
 from pipe_control import pipes, spectrum
@@ -425,6 +425,27 @@ uf.wizard_apply_button = False
 uf.wizard_image = WIZARD_IMAGE_PATH + 'nessy.png'
 
 
+# The relax_disp.newton_batch user function.
+uf = uf_info.add_uf('relax_disp.newton_batch')
+uf.title = "Switch the batched Newton optimisation of the independent spins on or off."
+uf.title_short = "Batched Newton optimisation flag."
+uf.add_keyarg(
+    name = "batch",
+    default = True,
+    py_type = "bool",
+    desc_short = "batched optimisation flag",
+    desc = "The flag specifying if the independent spins should be optimised together in batches by the Newton algorithm."
+)
+# Description.
+uf.desc.append(Desc_container())
+uf.desc[-1].add_paragraph("This user function allows the batched optimisation of the free spins (the spins not part of a cluster) to be turned on or off.  When turned on, the minimise.execute user function with the Newton algorithm will optimise all free spins of the same model together, using a bound constrained and damped Newton algorithm operating on all spins at once, rather than the Newton algorithm of the minfx library for each spin.  As the algorithms differ, the results can differ slightly from the individual optimisations.  The batched optimisation is off by default.  Only the analytic models %s support the batched optimisation." % MODEL_LIST_DERIVS)
+uf.backend = relax_disp_uf.newton_batch
+uf.menu_text = "&newton_batch"
+uf.gui_icon = "oxygen.status.object-locked"
+uf.wizard_size = (800, 500)
+uf.wizard_image = ANALYSIS_IMAGE_PATH + 'relax_disp_200x200.png'
+
+
 # The relax_disp.parameter_copy user function.
 uf = uf_info.add_uf('relax_disp.parameter_copy')
 uf.title = "Copy dispersion specific parameters values from one data pipe to another."
@@ -630,6 +651,27 @@ uf.wizard_size = (800, 500)
 uf.wizard_image = ANALYSIS_IMAGE_PATH + 'relax_disp_200x200.png'
 
 
+# The relax_disp.r20_profile user function.
+uf = uf_info.add_uf('relax_disp.r20_profile')
+uf.title = "Switch between optimised or profiled R20 values for optimisation."
+uf.title_short = "R20 profiling flag."
+uf.add_keyarg(
+    name = "profile",
+    default = True,
+    py_type = "bool",
+    desc_short = "R20 profiling flag",
+    desc = "The flag specifying if the R20 parameters should be profiled out of the optimisation or optimised together with the other model parameters."
+)
+# Description.
+uf.desc.append(Desc_container())
+uf.desc[-1].add_paragraph("This user function allows the R20 parameters (or R1rho' for the R1rho models) to be profiled out of the optimisation of the relaxation dispersion models.  In many models, the back-calculated R2eff/R1rho values are linear in the R20 parameter of each experiment, spin and field strength.  For each set of values of the other parameters, the best R20 values can then be directly found as the linear least-squares solution, bounded by the R20 constraints.  The grid search and minimisation then only operate on the exchange parameters, which greatly decreases the size of the grid search and speeds up the minimisation for large spin clusters.  For models in which the R20 parameters are not linear, this setting will have no effect.  Only the models %s support R20 profiling." % MODEL_LIST_R20_LINEAR)
+uf.backend = relax_disp_uf.r20_profile
+uf.menu_text = "r20_&profile"
+uf.gui_icon = "oxygen.status.object-locked"
+uf.wizard_size = (800, 500)
+uf.wizard_image = ANALYSIS_IMAGE_PATH + 'relax_disp_200x200.png'
+
+
 # The relax_disp.r2eff_err_estimate user function.
 uf = uf_info.add_uf('relax_disp.r2eff_err_estimate')
 uf.title = "Estimate R2eff errors by the Jacobian matrix."